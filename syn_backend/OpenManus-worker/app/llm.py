@@ -1,5 +1,6 @@
 import math
-from typing import Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Union
 
 import tiktoken
 from openai import (
@@ -54,8 +55,15 @@ class TokenCounter:
     HIGH_DETAIL_TARGET_SHORT_SIDE = 768
     TILE_SIZE = 512
 
-    def __init__(self, tokenizer):
+    # Per-message token cache (LRU entries); 0 disables caching
+    MESSAGE_CACHE_SIZE = 4096
+
+    def __init__(self, tokenizer, cache_size: int = MESSAGE_CACHE_SIZE):
         self.tokenizer = tokenizer
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Hashable, int]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def count_text(self, text: str) -> int:
         """Calculate tokens for a text string"""
@@ -144,32 +152,115 @@ class TokenCounter:
                 token_count += self.count_text(function.get("arguments", ""))
         return token_count
 
-    def count_message_tokens(self, messages: List[dict]) -> int:
-        """Calculate the total number of tokens in a message list"""
-        total_tokens = self.FORMAT_TOKENS  # Base format tokens
+    def count_single_message(self, message: dict) -> int:
+        """Calculate tokens for one message, without the list-level format tokens"""
+        tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
 
-        for message in messages:
-            tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+        # Add role tokens
+        tokens += self.count_text(message.get("role", ""))
 
-            # Add role tokens
-            tokens += self.count_text(message.get("role", ""))
+        # Add content tokens
+        if "content" in message:
+            tokens += self.count_content(message["content"])
 
-            # Add content tokens
-            if "content" in message:
-                tokens += self.count_content(message["content"])
+        # Add tool calls tokens
+        if "tool_calls" in message:
+            tokens += self.count_tool_calls(message["tool_calls"])
+
+        # Add name and tool_call_id tokens
+        tokens += self.count_text(message.get("name", ""))
+        tokens += self.count_text(message.get("tool_call_id", ""))
+
+        return tokens
+
+    @staticmethod
+    def _content_key(content) -> Hashable:
+        if not isinstance(content, list):
+            return content
+        items = []
+        for item in content:
+            if isinstance(item, str):
+                items.append(item)
+            elif isinstance(item, dict) and "text" in item:
+                items.append(("text", item["text"]))
+            elif isinstance(item, dict) and "image_url" in item:
+                # Image tokens depend only on detail and dimensions, not on the (base64) URL
+                dimensions = item.get("dimensions")
+                items.append(("image", item.get("detail", "medium"), tuple(dimensions) if dimensions else None))
+            else:
+                items.append(None)
+        return tuple(items)
+
+    @classmethod
+    def message_key(cls, message: dict) -> Hashable:
+        """
+        Cache key for a message: the fields that contribute tokens.
+
+        format_messages() rebuilds the dicts on every call, so identity is useless;
+        the key reuses the message's own strings, whose hashes Python caches.
+        """
+        tool_calls = message.get("tool_calls")
+        if tool_calls:
+            tool_calls = tuple(
+                (call["function"].get("name", ""), call["function"].get("arguments", ""))
+                if isinstance(call, dict) and "function" in call
+                else None
+                for call in tool_calls
+            )
+        return (
+            message.get("role", ""),
+            cls._content_key(message.get("content")),
+            tool_calls,
+            message.get("name", ""),
+            message.get("tool_call_id", ""),
+        )
 
-            # Add tool calls tokens
-            if "tool_calls" in message:
-                tokens += self.count_tool_calls(message["tool_calls"])
+    def _cached(self, key: Hashable, compute) -> int:
+        if self.cache_size <= 0:
+            return compute()
+        try:
+            tokens = self._cache[key]
+        except KeyError:
+            tokens = compute()
+            self.cache_misses += 1
+            self._cache[key] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return tokens
+        except TypeError:
+            # Unhashable field (e.g. non-string arguments): count directly
+            return compute()
+        self.cache_hits += 1
+        self._cache.move_to_end(key)
+        return tokens
 
-            # Add name and tool_call_id tokens
-            tokens += self.count_text(message.get("name", ""))
-            tokens += self.count_text(message.get("tool_call_id", ""))
+    def count_message_tokens(self, messages: List[dict]) -> int:
+        """Calculate the total number of tokens in a message list (each message tokenized once)"""
+        total_tokens = self.FORMAT_TOKENS  # Base format tokens
 
-            total_tokens += tokens
+        for message in messages:
+            total_tokens += self._cached(
+                self.message_key(message), lambda: self.count_single_message(message)
+            )
 
         return total_tokens
 
+    def count_tools(self, tools: List[dict]) -> int:
+        """Calculate tokens for tool schemas (identical on every agent step)"""
+        token_count = 0
+        for tool in tools:
+            text = str(tool)
+            token_count += self._cached(("tool", text), lambda: self.count_text(text))
+        return token_count
+
+    def cache_info(self) -> Dict[str, int]:
+        return {
+            "size": len(self._cache),
+            "max_size": self.cache_size,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+        }
+
 
 class LLM:
     _instances: Dict[str, "LLM"] = {}
@@ -691,10 +782,7 @@ class LLM:
             input_tokens = self.count_message_tokens(messages)
 
             # If there are tools, calculate token count for tool descriptions
-            tools_tokens = 0
-            if tools:
-                for tool in tools:
-                    tools_tokens += self.count_tokens(str(tool))
+            tools_tokens = self.token_counter.count_tools(tools) if tools else 0
 
             input_tokens += tools_tokens
 
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark: token counting across a long agent run.
+
+Replays a synthetic 200-step Manus transcript (assistant tool calls, tool
+results, periodic screenshots). Before every step the whole history is
+counted, as LLM.ask_tool does. Reports tokenization time per step with the
+per-message cache disabled (the old behaviour) and enabled.
+
+    python -m examples.benchmarks.token_counting [--steps 200]
+"""
+import argparse
+import json
+import random
+import time
+
+import tiktoken
+
+from app.llm import TokenCounter
+
+
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": f"{name} tool. " * 40,
+            "parameters": {"type": "object", "properties": {"input": {"type": "string"}}},
+        },
+    }
+    for name in ("python_execute", "browser_use", "str_replace_editor", "terminate")
+]
+
+
+def build_transcript(steps: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    words = ["account", "video", "publish", "douyin", "cookie", "upload", "title", "status", "error", "retry"]
+
+    def paragraph(n: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    messages = [
+        {"role": "system", "content": paragraph(400)},
+        {"role": "user", "content": paragraph(60)},
+    ]
+    for step in range(steps):
+        call_id = f"call_{step}"
+        messages.append({
+            "role": "assistant",
+            "content": paragraph(rng.randint(20, 80)),
+            "tool_calls": [{
+                "id": call_id,
+                "type": "function",
+                "function": {
+                    "name": rng.choice(TOOLS)["function"]["name"],
+                    "arguments": json.dumps({"input": paragraph(rng.randint(10, 60))}),
+                },
+            }],
+        })
+        messages.append({
+            "role": "tool",
+            "name": "browser_use",
+            "tool_call_id": call_id,
+            "content": paragraph(rng.randint(200, 800)),
+        })
+        if step % 20 == 19:
+            messages.append({
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "Current browser screenshot:"},
+                    {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64," + "A" * 200_000}},
+                ],
+            })
+    return messages
+
+
+def replay(counter: TokenCounter, transcript: list) -> list:
+    """Count the growing history once per step; returns per-step seconds."""
+    timings = []
+    for end in range(3, len(transcript) + 1):
+        # format_messages() hands the counter fresh dicts on every call
+        history = [dict(m) for m in transcript[:end]]
+        started = time.perf_counter()
+        counter.count_message_tokens(history)
+        counter.count_tools(TOOLS)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+
+    tokenizer = tiktoken.get_encoding("cl100k_base")
+    transcript = build_transcript(args.steps)
+
+    uncached = TokenCounter(tokenizer, cache_size=0)
+    cached = TokenCounter(tokenizer)
+    assert uncached.count_message_tokens(transcript) == cached.count_message_tokens(transcript)
+    cached = TokenCounter(tokenizer)
+
+    before = replay(uncached, transcript)
+    after = replay(cached, transcript)
+
+    print(f"transcript: {args.steps} steps, {len(transcript)} messages")
+    for label, timings in (("before (no cache)", before), ("after (cached)", after)):
+        print(
+            f"{label:>18}: {sum(timings) / len(timings) * 1000:8.3f} ms/step avg, "
+            f"{timings[-1] * 1000:8.3f} ms last step, {sum(timings):7.3f} s total"
+        )
+    print(f"speedup: {sum(before) / sum(after):.1f}x, cache: {cached.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from app.llm import TokenCounter
+
+
+class WordTokenizer:
+    """Stand-in tokenizer: one token per whitespace-separated word, counts calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text: str) -> list:
+        self.calls += 1
+        return text.split()
+
+
+def test_repeated_history_hits_cache():
+    tokenizer = WordTokenizer()
+    counter = TokenCounter(tokenizer)
+    history = [
+        {"role": "system", "content": "you are a helpful agent"},
+        {"role": "user", "content": "publish the video"},
+    ]
+
+    first = counter.count_message_tokens(history)
+    calls = tokenizer.calls
+    # format_messages() rebuilds the dicts each step, so pass equal copies
+    second = counter.count_message_tokens([dict(m) for m in history])
+
+    assert second == first
+    assert tokenizer.calls == calls
+    assert counter.cache_info()["hits"] == 2
+    assert first == TokenCounter(WordTokenizer(), cache_size=0).count_message_tokens(history)
+
+
+def test_tool_call_message_is_cached_by_arguments():
+    counter = TokenCounter(WordTokenizer())
+    message = {
+        "role": "assistant",
+        "content": "",
+        "tool_calls": [
+            {
+                "id": "call_1",
+                "type": "function",
+                "function": {"name": "browser_use", "arguments": '{"action": "go_to_url"}'},
+            }
+        ],
+    }
+    reply = {"role": "tool", "content": "done", "name": "browser_use", "tool_call_id": "call_1"}
+
+    tokens = counter.count_message_tokens([message, reply])
+    assert tokens == TokenCounter.FORMAT_TOKENS + counter.count_single_message(
+        message
+    ) + counter.count_single_message(reply)
+    assert counter.count_message_tokens([message, reply]) == tokens
+    assert counter.cache_info()["hits"] == 2
+
+    # The tool call id is not tokenized, so a new id reuses the entry
+    renamed = {**message, "tool_calls": [{**message["tool_calls"][0], "id": "call_2"}]}
+    assert counter.count_message_tokens([renamed]) == counter.count_message_tokens([message])
+
+
+def test_changed_message_gets_new_count():
+    counter = TokenCounter(WordTokenizer())
+    base = {"role": "user", "content": "publish the video"}
+    longer = {"role": "user", "content": "publish the video to douyin now"}
+    call = {
+        "role": "assistant",
+        "tool_calls": [{"function": {"name": "python_execute", "arguments": "print(1)"}}],
+    }
+    changed_call = {
+        "role": "assistant",
+        "tool_calls": [
+            {"function": {"name": "python_execute", "arguments": "print(1) print(2)"}}
+        ],
+    }
+
+    assert counter.count_message_tokens([longer]) == counter.count_message_tokens([base]) + 3
+    assert counter.count_message_tokens([changed_call]) == counter.count_message_tokens([call]) + 1
+    assert counter.cache_info()["hits"] == 0
+    assert counter.cache_info()["size"] == 4
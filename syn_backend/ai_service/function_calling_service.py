@@ -8,6 +8,7 @@
 - 支持自定义工具函数
 - 完全可控的执行流程
 """
+import asyncio
 import json
 import httpx
 from typing import Dict, Any, List, Optional, Callable
@@ -57,13 +58,16 @@ class FunctionCallingService:
         api_key: str,
         base_url: str = "https://api.openai.com/v1",
         model: str = "gpt-4o",
-        timeout: float = 60.0
+        timeout: float = 60.0,
+        max_concurrent_tools: int = 8
     ):
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.timeout = timeout
         self.tools: Dict[str, Tool] = {}
+        # 限制同一轮并发执行的工具数量
+        self._tool_semaphore = asyncio.Semaphore(max(1, max_concurrent_tools))
 
     def register_tool(self, tool: Tool):
         """注册工具函数"""
@@ -75,6 +79,61 @@ class FunctionCallingService:
         for tool in tools:
             self.register_tool(tool)
 
+    async def _execute_tool_call(self, tool_call: Dict[str, Any]):
+        """
+        执行单个 tool_call
+
+        Returns:
+            (调用记录或 None, 回填给模型的 tool 消息)
+        """
+        tool_name = tool_call["function"]["name"]
+        tool_args_str = tool_call["function"]["arguments"]
+        tool_call_id = tool_call["id"]
+
+        logger.info(f"🔧 执行工具: {tool_name}")
+        logger.debug(f"   参数: {tool_args_str}")
+
+        try:
+            # 解析参数
+            tool_args = json.loads(tool_args_str)
+
+            # 查找工具
+            if tool_name not in self.tools:
+                error_msg = f"工具 '{tool_name}' 未注册"
+                logger.error(f"❌ {error_msg}")
+                tool_result = {"error": error_msg}
+            else:
+                # 执行工具
+                async with self._tool_semaphore:
+                    tool_result = await self.tools[tool_name].execute(**tool_args)
+
+            # 记录工具调用，构建工具响应消息
+            return (
+                {
+                    "name": tool_name,
+                    "arguments": tool_args,
+                    "result": tool_result
+                },
+                {
+                    "tool_call_id": tool_call_id,
+                    "role": "tool",
+                    "name": tool_name,
+                    "content": json.dumps(tool_result, ensure_ascii=False)
+                },
+            )
+
+        except json.JSONDecodeError as e:
+            error_msg = f"解析工具参数失败: {e}"
+        except Exception as e:
+            error_msg = f"工具执行失败: {str(e)}"
+        logger.error(f"❌ {error_msg}")
+        return None, {
+            "tool_call_id": tool_call_id,
+            "role": "tool",
+            "name": tool_name,
+            "content": json.dumps({"error": error_msg}, ensure_ascii=False)
+        }
+
     async def call(
         self,
         messages: List[Dict[str, str]],
@@ -160,64 +219,15 @@ class FunctionCallingService:
                             "pending_execution": True
                         }
 
-                    # 执行工具调用
+                    # 执行工具调用：同一轮的 tool_calls 相互独立，并发执行，结果按原顺序回填
+                    outcomes = await asyncio.gather(
+                        *(self._execute_tool_call(tool_call) for tool_call in message["tool_calls"])
+                    )
                     tool_results = []
-                    for tool_call in message["tool_calls"]:
-                        tool_name = tool_call["function"]["name"]
-                        tool_args_str = tool_call["function"]["arguments"]
-                        tool_call_id = tool_call["id"]
-
-                        logger.info(f"🔧 执行工具: {tool_name}")
-                        logger.debug(f"   参数: {tool_args_str}")
-
-                        try:
-                            # 解析参数
-                            tool_args = json.loads(tool_args_str)
-
-                            # 查找工具
-                            if tool_name not in self.tools:
-                                error_msg = f"工具 '{tool_name}' 未注册"
-                                logger.error(f"❌ {error_msg}")
-                                tool_result = {"error": error_msg}
-                            else:
-                                # 执行工具
-                                tool = self.tools[tool_name]
-                                result_data = await tool.execute(**tool_args)
-                                tool_result = result_data
-
-                            # 记录工具调用
-                            tool_calls_history.append({
-                                "name": tool_name,
-                                "arguments": tool_args,
-                                "result": tool_result
-                            })
-
-                            # 构建工具响应消息
-                            tool_results.append({
-                                "tool_call_id": tool_call_id,
-                                "role": "tool",
-                                "name": tool_name,
-                                "content": json.dumps(tool_result, ensure_ascii=False)
-                            })
-
-                        except json.JSONDecodeError as e:
-                            error_msg = f"解析工具参数失败: {e}"
-                            logger.error(f"❌ {error_msg}")
-                            tool_results.append({
-                                "tool_call_id": tool_call_id,
-                                "role": "tool",
-                                "name": tool_name,
-                                "content": json.dumps({"error": error_msg}, ensure_ascii=False)
-                            })
-                        except Exception as e:
-                            error_msg = f"工具执行失败: {str(e)}"
-                            logger.error(f"❌ {error_msg}")
-                            tool_results.append({
-                                "tool_call_id": tool_call_id,
-                                "role": "tool",
-                                "name": tool_name,
-                                "content": json.dumps({"error": error_msg}, ensure_ascii=False)
-                            })
+                    for history_entry, tool_message in outcomes:
+                        if history_entry is not None:
+                            tool_calls_history.append(history_entry)
+                        tool_results.append(tool_message)
 
                     # 将工具结果添加到对话历史
                     conversation.extend(tool_results)
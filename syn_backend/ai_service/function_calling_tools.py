@@ -3,12 +3,13 @@ Function Calling 工具函数集合
 
 定义了所有可供 AI 调用的工具函数
 """
-import httpx
+import asyncio
 import os
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 from loguru import logger
 from .function_calling_service import Tool
+from .tool_dispatch import api_transport, fetch_accounts, fetch_file, fetch_files, fetch_task
 
 
 def _resolve_backend_cwd() -> Path:
@@ -40,26 +41,17 @@ async def get_system_info() -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # 获取账号信息
-            accounts_resp = await client.get("http://localhost:7000/api/v1/accounts/")
-            accounts_data = accounts_resp.json()
-            accounts_items = accounts_data.get("items") or accounts_data.get("data") or []
-            accounts_count = len(accounts_items)
-
-            # 获取视频信息
-            videos_resp = await client.get("http://localhost:7000/api/v1/files/")
-            videos_data = videos_resp.json()
-            videos_count = len(videos_data.get("data", []))
+        # 账号与视频信息互不依赖，并发获取
+        accounts_items, videos = await asyncio.gather(fetch_accounts(), fetch_files())
 
-            # 可用平台
-            platforms = ["douyin", "xiaohongshu", "bilibili", "kuaishou", "xigua", "weibo"]
+        # 可用平台
+        platforms = ["douyin", "xiaohongshu", "bilibili", "kuaishou", "xigua", "weibo"]
 
-            return {
-                "accounts_count": accounts_count,
-                "videos_count": videos_count,
-                "platforms": platforms
-            }
+        return {
+            "accounts_count": len(accounts_items),
+            "videos_count": len(videos),
+            "platforms": platforms
+        }
     except Exception as e:
         logger.error(f"获取系统信息失败: {e}")
         return {"error": str(e)}
@@ -95,21 +87,11 @@ async def list_accounts(platform: Optional[str] = None) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            url = "http://localhost:7000/api/v1/accounts/"
-            if platform:
-                url += f"?platform={platform}"
-
-            resp = await client.get(url)
-            data = resp.json()
-
-            # `/api/v1/accounts/` 返回 AccountListResponse: {success,total,items}
-            # 兼容旧格式 {data:[...]}
-            accounts = data.get("items") or data.get("data") or []
-            return {
-                "accounts": accounts,
-                "total": len(accounts)
-            }
+        accounts = await fetch_accounts(platform)
+        return {
+            "accounts": accounts,
+            "total": len(accounts)
+        }
     except Exception as e:
         logger.error(f"列出账号失败: {e}")
         return {"error": str(e)}
@@ -151,21 +133,11 @@ async def list_videos(limit: int = 20) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(
-                f"http://localhost:7000/api/v1/files/?limit={limit}"
-            )
-            data = resp.json()
-
-            # API返回格式: {"status": "success", "data": [...]}
-            if data.get("status") == "success":
-                videos = data.get("data", [])
-                return {
-                    "videos": videos,
-                    "total": len(videos)
-                }
-            else:
-                return {"error": data.get("message", "获取文件列表失败"), "videos": [], "total": 0}
+        videos = await fetch_files(limit=limit)
+        return {
+            "videos": videos,
+            "total": len(videos)
+        }
     except Exception as e:
         logger.error(f"列出视频失败: {e}")
         return {"error": str(e), "videos": [], "total": 0}
@@ -217,9 +189,9 @@ async def create_publish_task(
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with api_transport.client(timeout=30.0) as client:
             resp = await client.post(
-                "http://localhost:7000/api/v1/tasks/publish",
+                "/tasks/publish",
                 json={
                     "account_ids": account_ids,
                     "video_path": video_path,
@@ -294,16 +266,10 @@ async def get_task_status(task_id: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(
-                f"http://localhost:7000/api/v1/tasks/{task_id}"
-            )
-            data = resp.json()
-
-            if data.get("success"):
-                return data.get("data", {})
-            else:
-                return {"error": data.get("message", "查询任务失败")}
+        task = await fetch_task(task_id)
+        if task is None:
+            return {"error": "任务不存在"}
+        return task
     except Exception as e:
         logger.error(f"查询任务状态失败: {e}")
         return {"error": str(e)}
@@ -423,15 +389,11 @@ async def publish_video_to_tencent(file_id: str, custom_title: Optional[str] = N
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with api_transport.client(timeout=30.0) as client:
             # 1. 获取文件信息
-            file_resp = await client.get(f"http://localhost:7000/api/v1/files/{file_id}")
-            file_data = file_resp.json()
-
-            if file_data.get("status") != "success":
+            file_info = await fetch_file(file_id)
+            if file_info is None:
                 return {"error": "文件不存在"}
-
-            file_info = file_data["data"]
             file_path = file_info.get("file_path") or file_info.get("path")
             filename = file_info.get("filename")
 
@@ -439,7 +401,7 @@ async def publish_video_to_tencent(file_id: str, custom_title: Optional[str] = N
             if not custom_title:
                 # 使用 AI 生成标题
                 ai_resp = await client.post(
-                    "http://localhost:7000/api/v1/ai/chat",
+                    "/ai/chat",
                     json={
                         "message": f"根据文件名生成一个吸引人的视频标题（不超过30字）：{filename}",
                         "stream": False
@@ -449,7 +411,7 @@ async def publish_video_to_tencent(file_id: str, custom_title: Optional[str] = N
                 custom_title = ai_data.get("content", filename).strip()
 
             # 3. 获取视频号账号
-            accounts_resp = await client.get("http://localhost:8000/api/v1/accounts/?platform=tencent")
+            accounts_resp = await client.get("/accounts/?platform=tencent")
             accounts_data = accounts_resp.json()
 
             if not accounts_data.get("data"):
@@ -460,7 +422,7 @@ async def publish_video_to_tencent(file_id: str, custom_title: Optional[str] = N
 
             # 4. 调用统一发布接口（direct）
             upload_resp = await client.post(
-                "http://localhost:7000/api/v1/publish/direct",
+                "/publish/direct",
                 json={
                     "platform": 2,
                     "cookie_file": account_file,
@@ -528,34 +490,19 @@ async def search_files(keyword: Optional[str] = None, file_type: Optional[str] =
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            params = {"limit": limit}
-            if keyword:
-                params["keyword"] = keyword
-            if file_type:
-                params["file_type"] = file_type
-
-            resp = await client.get(
-                "http://localhost:7000/api/v1/files/",
-                params=params
-            )
-
-            if resp.status_code != 200:
-                return {"error": f"API 错误: {resp.status_code}", "files": [], "total": 0}
-
-            data = resp.json()
-            files = data.get("data", [])
+        files = await fetch_files(keyword=keyword, limit=limit)
 
-            return {
-                "files": [{
-                    "id": f.get("id"),
-                    "filename": f.get("filename"),
-                    "file_type": f.get("file_type"),
-                    "duration": f.get("duration"),
-                    "size_mb": round(f.get("size", 0) / 1024 / 1024, 2) if f.get("size") else 0
-                } for f in files],
-                "total": len(files)
-            }
+        return {
+            "files": [{
+                "id": f.get("id"),
+                "filename": f.get("filename"),
+                "file_type": f.get("file_type"),
+                "duration": f.get("duration"),
+                # file_records.filesize 以 MB 存储
+                "size_mb": round(float(f.get("filesize") or 0), 2)
+            } for f in files],
+            "total": len(files)
+        }
     except Exception as e:
         logger.error(f"搜索文件失败: {e}")
         return {"error": str(e), "files": [], "total": 0}
@@ -601,8 +548,8 @@ async def delete_file(file_id: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.delete(f"http://localhost:7000/api/v1/files/{file_id}")
+        async with api_transport.client(timeout=10.0) as client:
+            resp = await client.delete(f"/files/{file_id}")
 
             if resp.status_code != 200:
                 return {"success": False, "error": f"删除失败: {resp.status_code}"}
@@ -656,21 +603,17 @@ async def publish_to_multiple_platforms(
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with api_transport.client(timeout=30.0) as client:
             # 获取文件信息
-            file_resp = await client.get(f"http://localhost:7000/api/v1/files/{file_id}")
-            file_data = file_resp.json()
-
-            if file_data.get("status") != "success":
+            file_info = await fetch_file(file_id)
+            if file_info is None:
                 return {"error": "文件不存在"}
-
-            file_info = file_data["data"]
             filename = file_info.get("filename")
 
             # 生成标题（如果未提供）
             if not title:
                 ai_resp = await client.post(
-                    "http://localhost:7000/api/v1/ai/chat",
+                    "/ai/chat",
                     json={
                         "message": f"根据文件名生成一个吸引人的视频标题（不超过30字）：{filename}",
                         "stream": False
@@ -681,7 +624,7 @@ async def publish_to_multiple_platforms(
 
             # 调用批量发布接口
             publish_resp = await client.post(
-                "http://localhost:7000/api/v1/publish/batch",
+                "/publish/batch",
                 json={
                     "file_ids": [file_id],
                     "platforms": platforms,
@@ -760,14 +703,14 @@ async def get_analytics_summary(days: int = 7) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with api_transport.client(timeout=10.0) as client:
             from datetime import datetime, timedelta
 
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
 
             resp = await client.get(
-                "http://localhost:7000/api/v1/analytics/",
+                "/analytics/",
                 params={
                     "startDate": start_date.strftime("%Y-%m-%d"),
                     "endDate": end_date.strftime("%Y-%m-%d")
@@ -837,7 +780,7 @@ async def upload_file(file_path: str, file_type: Optional[str] = None) -> Dict[s
         if not file_path_obj.exists():
             return {"error": f"文件不存在: {file_path}"}
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with api_transport.client(timeout=60.0) as client:
             async with aiofiles.open(file_path, 'rb') as f:
                 file_content = await f.read()
 
@@ -847,7 +790,7 @@ async def upload_file(file_path: str, file_type: Optional[str] = None) -> Dict[s
                 data['file_type'] = file_type
 
             resp = await client.post(
-                "http://localhost:7000/api/v1/files/upload",
+                "/files/upload",
                 files=files,
                 data=data
             )
@@ -903,17 +846,10 @@ async def get_file_details(file_id: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(f"http://localhost:7000/api/v1/files/{file_id}")
-
-            if resp.status_code != 200:
-                return {"error": f"获取文件详情失败: {resp.status_code}"}
-
-            data = resp.json()
-            return {
-                "events": data.get("events", []),
-                "total": data.get("count", 0),
-            }
+        file_info = await fetch_file(file_id)
+        if file_info is None:
+            return {"error": f"文件不存在: {file_id}"}
+        return file_info
 
     except Exception as e:
         logger.error(f"获取文件详情失败: {e}")
@@ -952,9 +888,9 @@ async def update_file(file_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with api_transport.client(timeout=10.0) as client:
             resp = await client.patch(
-                f"http://localhost:7000/api/v1/files/{file_id}",
+                f"/files/{file_id}",
                 json=updates
             )
 
@@ -1003,9 +939,9 @@ async def batch_delete_files(file_ids: List[str]) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with api_transport.client(timeout=30.0) as client:
             resp = await client.post(
-                "http://localhost:7000/api/v1/files/batch-delete",
+                "/files/batch-delete",
                 json={"file_ids": file_ids}
             )
 
@@ -1049,8 +985,8 @@ async def get_file_tags() -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get("http://localhost:7000/api/v1/files/tags")
+        async with api_transport.client(timeout=10.0) as client:
+            resp = await client.get("/files/tags")
 
             if resp.status_code != 200:
                 return {"error": f"获取标签失败: {resp.status_code}"}
@@ -1090,9 +1026,9 @@ async def add_file_tags(file_id: str, tags: List[str]) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with api_transport.client(timeout=10.0) as client:
             resp = await client.post(
-                f"http://localhost:7000/api/v1/files/{file_id}/tags",
+                f"/files/{file_id}/tags",
                 json={"tags": tags}
             )
 
@@ -1143,8 +1079,8 @@ async def get_publish_presets() -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get("http://localhost:7000/api/v1/publish/presets")
+        async with api_transport.client(timeout=10.0) as client:
+            resp = await client.get("/publish/presets")
 
             if resp.status_code != 200:
                 return {"error": f"获取预设失败: {resp.status_code}"}
@@ -1184,9 +1120,9 @@ async def create_preset(name: str, config: Dict[str, Any]) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with api_transport.client(timeout=10.0) as client:
             resp = await client.post(
-                "http://localhost:7000/api/v1/publish/presets",
+                "/publish/presets",
                 json={"name": name, "config": config}
             )
 
@@ -1236,9 +1172,9 @@ async def delete_preset(preset_id: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with api_transport.client(timeout=10.0) as client:
             resp = await client.delete(
-                f"http://localhost:7000/api/v1/publish/presets/{preset_id}"
+                f"/publish/presets/{preset_id}"
             )
 
             if resp.status_code != 200:
@@ -1283,9 +1219,9 @@ async def apply_preset(preset_id: str, file_ids: List[str]) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with api_transport.client(timeout=30.0) as client:
             resp = await client.post(
-                f"http://localhost:7000/api/v1/publish/presets/{preset_id}/apply",
+                f"/publish/presets/{preset_id}/apply",
                 json={"file_ids": file_ids}
             )
 
@@ -1333,8 +1269,8 @@ async def get_otp_events() -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get("http://localhost:7000/api/v1/verification/otp-events")
+        async with api_transport.client(timeout=10.0) as client:
+            resp = await client.get("/verification/otp-events")
 
             if resp.status_code != 200:
                 return {"error": f"获取验证码事件失败: {resp.status_code}"}
@@ -1381,9 +1317,9 @@ async def batch_publish(
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with api_transport.client(timeout=60.0) as client:
             resp = await client.post(
-                "http://localhost:7000/api/v1/publish/batch",
+                "/publish/batch",
                 json={
                     "file_ids": file_ids,
                     "platforms": platforms,
@@ -1457,9 +1393,9 @@ async def platform_login(platform: str, credentials: Dict[str, str]) -> Dict[str
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with api_transport.client(timeout=60.0) as client:
             resp = await client.post(
-                f"http://localhost:7000/api/v1/platforms/{platform}/login",
+                f"/platforms/{platform}/login",
                 json=credentials
             )
 
@@ -1511,9 +1447,9 @@ async def verify_cookie(platform: str, cookie_data: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with api_transport.client(timeout=30.0) as client:
             resp = await client.post(
-                f"http://localhost:7000/api/v1/platforms/{platform}/verify-cookie",
+                f"/platforms/{platform}/verify-cookie",
                 json={"cookie_data": cookie_data}
             )
 
@@ -1565,9 +1501,9 @@ async def get_login_status(session_id: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with api_transport.client(timeout=10.0) as client:
             resp = await client.get(
-                f"http://localhost:7000/api/v1/platforms/login/status?session_id={session_id}"
+                f"/platforms/login/status?session_id={session_id}"
             )
 
             if resp.status_code != 200:
@@ -1614,9 +1550,9 @@ async def start_login_session(platform: str, account_id: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with api_transport.client(timeout=30.0) as client:
             resp = await client.post(
-                "http://localhost:7000/api/v1/platforms/login/start",
+                "/platforms/login/start",
                 json={"platform": platform, "account_id": account_id}
             )
 
@@ -1686,9 +1622,9 @@ async def create_matrix_task(
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with api_transport.client(timeout=30.0) as client:
             resp = await client.post(
-                "http://localhost:7000/api/v1/matrix/generate_tasks",
+                "/matrix/generate_tasks",
                 json={
                     "platforms": platforms,
                     "accounts": account_ids,
@@ -1767,8 +1703,8 @@ async def get_matrix_tasks(status: Optional[str] = None) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            url = "http://localhost:7000/api/v1/matrix/tasks"
+        async with api_transport.client(timeout=10.0) as client:
+            url = "/matrix/tasks"
             if status:
                 url += f"?status={status}"
 
@@ -1817,8 +1753,8 @@ async def get_matrix_statistics() -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get("http://localhost:7000/api/v1/matrix/stats")
+        async with api_transport.client(timeout=10.0) as client:
+            resp = await client.get("/matrix/stats")
 
             if resp.status_code != 200:
                 return {"error": f"获取统计信息失败: {resp.status_code}"}
@@ -1864,8 +1800,8 @@ async def get_account_details(account_id: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(f"http://localhost:7000/api/v1/accounts/{account_id}")
+        async with api_transport.client(timeout=10.0) as client:
+            resp = await client.get(f"/accounts/{account_id}")
 
             if resp.status_code != 200:
                 return {"error": f"获取账号详情失败: {resp.status_code}"}
@@ -1917,9 +1853,9 @@ async def create_account(
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with api_transport.client(timeout=10.0) as client:
             resp = await client.post(
-                "http://localhost:7000/api/v1/accounts/",
+                "/accounts/",
                 json={
                     "platform": platform,
                     "name": name,
@@ -1984,9 +1920,9 @@ async def update_account(account_id: str, updates: Dict[str, Any]) -> Dict[str,
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with api_transport.client(timeout=10.0) as client:
             resp = await client.patch(
-                f"http://localhost:7000/api/v1/accounts/{account_id}",
+                f"/accounts/{account_id}",
                 json=updates
             )
 
@@ -2035,8 +1971,8 @@ async def delete_account(account_id: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.delete(f"http://localhost:7000/api/v1/accounts/{account_id}")
+        async with api_transport.client(timeout=10.0) as client:
+            resp = await client.delete(f"/accounts/{account_id}")
 
             if resp.status_code != 200:
                 return {"success": False, "error": f"删除账号失败: {resp.status_code}"}
@@ -2082,9 +2018,9 @@ async def sync_account_info(account_id: str) -> Dict[str, Any]:
         }
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with api_transport.client(timeout=30.0) as client:
             resp = await client.post(
-                f"http://localhost:7000/api/v1/accounts/{account_id}/sync"
+                f"/accounts/{account_id}/sync"
             )
 
             if resp.status_code != 200:
@@ -0,0 +1,196 @@
+"""
+Function Calling 工具的执行通道
+
+- 与 FastAPI 同进程运行时：高频工具直接调用服务对象
+  （AccountService/cookie_manager、FileService、TaskStateManager），
+  其余接口经 ASGITransport 在进程内分发，不再走 localhost TCP 回环
+- Agent 独立进程运行时：所有工具共享一个带连接池的 httpx.AsyncClient
+
+通道选择：环境变量 SYNAPSE_TOOL_TRANSPORT = auto（默认）/ inprocess / http
+"""
+import asyncio
+import contextlib
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+API_BASE_URL = os.getenv("SYNAPSE_API_BASE_URL", "http://localhost:7000/api/v1").rstrip("/")
+_IN_PROCESS_BASE_URL = "http://synapse.inprocess/api/v1"
+
+
+def use_in_process() -> bool:
+    """当前进程是否就是 API 进程（可直接调用服务对象）"""
+    mode = os.getenv("SYNAPSE_TOOL_TRANSPORT", "auto").strip().lower()
+    if mode == "http":
+        return False
+    if mode == "inprocess":
+        return True
+    return "fastapi_app.main" in sys.modules
+
+
+class _ScopedClient:
+    """共享客户端的轻量包装：按调用方的超时发请求，不负责关闭连接池"""
+
+    def __init__(self, client: httpx.AsyncClient, timeout: float):
+        self._client = client
+        self._timeout = timeout
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        kwargs.setdefault("timeout", self._timeout)
+        return await self._client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+
+class ApiTransport:
+    """按事件循环复用的 API 客户端（同进程走 ASGITransport，跨进程走连接池）"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        if use_in_process():
+            from fastapi_app.main import app
+
+            return httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url=_IN_PROCESS_BASE_URL,
+                timeout=30.0,
+            )
+        return httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        # httpx 连接池绑定事件循环，换循环（如 Celery 中的 asyncio.run）时重建
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = self._build_client()
+            self._loop = loop
+        return self._client
+
+    @contextlib.asynccontextmanager
+    async def client(self, timeout: float = 30.0):
+        """
+        用法与 httpx.AsyncClient 一致：
+            async with api_transport.client(timeout=10.0) as client:
+                resp = await client.get("/accounts/")
+        """
+        yield _ScopedClient(self._get_client(), timeout)
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            with contextlib.suppress(Exception):
+                await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+api_transport = ApiTransport()
+
+
+# ============================================
+# 直接调用服务对象（同进程）/ HTTP 回退（跨进程）
+# ============================================
+
+async def fetch_accounts(platform: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """账号列表，等价于 GET /accounts/"""
+    if use_in_process():
+        from fastapi_app.api.v1.accounts.services import account_service
+
+        result = await account_service.list_accounts(platform=platform, limit=limit)
+        return result.get("items") or []
+
+    async with api_transport.client(timeout=10.0) as client:
+        params = {"limit": limit}
+        if platform:
+            params["platform"] = platform
+        resp = await client.get("/accounts/", params=params)
+        data = resp.json()
+        # `/api/v1/accounts/` 返回 AccountListResponse: {success,total,items}；兼容旧格式 {data:[...]}
+        return data.get("items") or data.get("data") or []
+
+
+async def fetch_files(keyword: Optional[str] = None, limit: int = 0) -> List[Dict[str, Any]]:
+    """素材列表，等价于 GET /files/"""
+    if use_in_process():
+        from fastapi_app.api.v1.files.services import FileService
+        from fastapi_app.db.session import main_db_pool
+
+        with main_db_pool.get_connection() as conn:
+            result = await FileService().list_files(conn, keyword=keyword, limit=limit)
+        return [item.model_dump(mode="json") for item in result.items]
+
+    async with api_transport.client(timeout=10.0) as client:
+        params: Dict[str, Any] = {"limit": limit}
+        if keyword:
+            params["keyword"] = keyword
+        resp = await client.get("/files/", params=params)
+        resp.raise_for_status()
+        data = resp.json()
+        return data.get("items") or data.get("data") or []
+
+
+async def fetch_file(file_id: Any) -> Optional[Dict[str, Any]]:
+    """单个素材，等价于 GET /files/{file_id}；不存在时返回 None"""
+    if use_in_process():
+        from fastapi_app.api.v1.files.services import FileService
+        from fastapi_app.db.session import main_db_pool
+
+        with main_db_pool.get_connection() as conn:
+            file = await FileService().get_file(conn, int(file_id))
+        return file.model_dump(mode="json") if file else None
+
+    async with api_transport.client(timeout=10.0) as client:
+        resp = await client.get(f"/files/{file_id}")
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        data = resp.json()
+        return data.get("data", data) if isinstance(data, dict) else None
+
+
+async def fetch_task(task_id: str) -> Optional[Dict[str, Any]]:
+    """任务状态，优先 Redis TaskStateManager，回退到 SQLite 任务队列"""
+    if use_in_process():
+        from fastapi_app.tasks.task_state_manager import task_state_manager
+
+        try:
+            state = task_state_manager.get_task_state(task_id)
+        except Exception as e:
+            logger.warning(f"[ToolDispatch] TaskStateManager unavailable: {e}")
+            state = None
+        if state:
+            return state
+
+        from fastapi_app.main import app
+
+        tm = getattr(app.state, "task_manager", None)
+        return tm.get_task_status(task_id) if tm else None
+
+    async with api_transport.client(timeout=10.0) as client:
+        resp = await client.get(f"/tasks/status/{task_id}")
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        data = resp.json()
+        return data.get("data") if data.get("success") else None
@@ -54,6 +54,8 @@ class PlatformAdapter(ABC):
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
         self.platform_name: str = "unknown"
+        # 最近一次 open_login_page 的来源：warm / pooled / dedicated
+        self.login_mode: Optional[str] = None
 
     @abstractmethod
     async def get_qrcode(self) -> QRCodeData:
@@ -91,3 +93,80 @@ class PlatformAdapter(ABC):
     async def supports_api_login(self) -> bool:
         """是否支持纯API登录 (无需Playwright)"""
         return False
+
+    def watch_targets(self, session_id: str) -> Optional[Tuple[Any, Any]]:
+        """
+        返回会话的 (page, context)，供 Worker 监听导航/响应事件推送登录状态
+
+        纯API登录或会话不存在时返回 None（Worker 退回定时检查）
+        """
+        return None
+
+    # ========== Playwright 扫码登录页 ==========
+
+    login_url: str = ""
+
+    async def navigate_login_page(self, page) -> None:
+        """打开扫码登录页并切换到二维码视图（新页面与登录会话池的预热页面共用）"""
+        await page.goto(self.login_url, timeout=60000)
+
+    async def open_login_page(self) -> Dict[str, Any]:
+        """
+        准备已打开登录页的浏览器会话，返回存入 SessionManager 的会话数据
+
+        Worker 无头模式会在 config 中传入 login_pool：优先取用预热好的登录页，其次在常驻浏览器上
+        新建隔离上下文；账号需要持久化 profile 或未提供池时单独启动浏览器。
+        返回数据中 warm=True 表示二维码已提前加载。失败时自行释放资源。
+        """
+        pool = self.config.get("login_pool")
+        if pool is not None:
+            lease = await pool.checkout(self.platform_name, self.config.get("account_id"), self.navigate_login_page)
+            if lease is not None:
+                self.login_mode = "warm" if lease.warm else "pooled"
+                return {
+                    "playwright": None,
+                    "browser": None,
+                    "context": lease.context,
+                    "page": lease.page,
+                    "lease": lease,
+                    "warm": lease.warm,
+                }
+
+        from playwright.async_api import async_playwright
+        from myUtils.playwright_context_factory import create_context_with_policy
+
+        playwright = await async_playwright().start()
+        browser = None
+        try:
+            browser, context, _, _ = await create_context_with_policy(
+                playwright,
+                platform=self.platform_name,
+                account_id=self.config.get("account_id"),
+                headless=self.config.get("headless", True),
+                base_context_opts={"viewport": {"width": 1280, "height": 800}},
+                launch_kwargs={"args": ["--no-sandbox", "--disable-blink-features=AutomationControlled"]},
+            )
+            page = await context.new_page()
+            await self.navigate_login_page(page)
+        except BaseException:
+            await self.close_login_session({"playwright": playwright, "browser": browser})
+            raise
+
+        self.login_mode = "dedicated"
+        return {"playwright": playwright, "browser": browser, "context": context, "page": page, "warm": False}
+
+    @staticmethod
+    async def close_login_session(session: Dict[str, Any]) -> None:
+        """释放 open_login_page 创建的资源（池化会话只关闭上下文并归还浏览器槽位）"""
+        lease = session.get("lease")
+        if lease is not None:
+            await lease.close()
+            return
+        try:
+            browser = session.get("browser")
+            if browser:
+                await browser.close()
+        finally:
+            playwright = session.get("playwright")
+            if playwright:
+                await playwright.stop()
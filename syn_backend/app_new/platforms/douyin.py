@@ -9,8 +9,7 @@ import uuid
 from typing import Dict, Any
 
 from loguru import logger
-from playwright.async_api import async_playwright, Page
-from myUtils.playwright_context_factory import create_context_with_policy
+from playwright.async_api import Page
 
 from .base import PlatformAdapter, QRCodeData, UserInfo, LoginResult, LoginStatus
 from ..session_manager import douyin_session_manager
@@ -25,6 +24,16 @@ class DouyinAdapter(PlatformAdapter):
         self.headless = config.get("headless", True) if config else True
         self.account_id = config.get("account_id") if config else None
 
+    login_url = "https://creator.douyin.com/creator-micro/login?enter_from=qr"
+
+    async def navigate_login_page(self, page: Page) -> None:
+        """访问登录页"""
+        try:
+            await page.goto(self.login_url, timeout=20000, wait_until="domcontentloaded")
+        except Exception:
+            # 降级: 访问主页
+            await page.goto("https://creator.douyin.com/", timeout=20000, wait_until="domcontentloaded")
+
     async def get_qrcode(self) -> QRCodeData:
         """
         生成抖音登录二维码
@@ -35,39 +44,16 @@ class DouyinAdapter(PlatformAdapter):
         session_id = str(uuid.uuid4())
 
         try:
-            # 创建浏览器会话
-            playwright = await async_playwright().start()
-            browser, context, _, _ = await create_context_with_policy(
-                playwright,
-                platform=self.platform_name,
-                account_id=self.account_id,
-                headless=self.headless,
-                base_context_opts={"viewport": {"width": 1280, "height": 800}},
-                launch_kwargs={"args": ["--no-sandbox", "--disable-blink-features=AutomationControlled"]},
-            )
-            page = await context.new_page()
+            # 创建浏览器会话并打开登录页（Worker 无头模式走登录会话池）
+            session = await self.open_login_page()
+            page = session["page"]
 
             # ✅ 使用 SessionManager 存储会话（内存 + Redis）
-            douyin_session_manager.create_session(session_id, {
-                "playwright": playwright,
-                "browser": browser,
-                "context": context,
-                "page": page
-            })
-
-            # 访问登录页
-            try:
-                await page.goto(
-                    "https://creator.douyin.com/creator-micro/login?enter_from=qr",
-                    timeout=20000,
-                    wait_until="domcontentloaded"
-                )
-            except Exception:
-                # 降级: 访问主页
-                await page.goto("https://creator.douyin.com/", timeout=20000, wait_until="domcontentloaded")
+            douyin_session_manager.create_session(session_id, session)
 
-            # 等待二维码加载
-            await asyncio.sleep(2)
+            # 等待二维码加载（预热页面已加载完成）
+            if not session["warm"]:
+                await asyncio.sleep(2)
 
             # 尝试多个选择器提取二维码
             qr_xpath = "//div[@id='animate_qrcode_container']//img[contains(@class,'qrcode_img')]"
@@ -204,20 +190,17 @@ class DouyinAdapter(PlatformAdapter):
             return
 
         try:
-            # ✅ 安全关闭 browser（检查是否为 None）
-            browser = session.get("browser")
-            if browser:
-                await browser.close()
-                logger.debug(f"[Douyin] Browser closed for session {session_id}")
-
-            # ✅ 安全停止 playwright（检查是否为 None）
-            playwright = session.get("playwright")
-            if playwright:
-                await playwright.stop()
-                logger.debug(f"[Douyin] Playwright stopped for session {session_id}")
+            await self.close_login_session(session)
+            logger.debug(f"[Douyin] Login session closed: {session_id}")
         except Exception as e:
             logger.warning(f"[Douyin] Cleanup failed: {e}")
 
+    def watch_targets(self, session_id: str):
+        session = douyin_session_manager.get_session(session_id)
+        if not session or not session.get("page"):
+            return None
+        return session["page"], session["context"]
+
     async def supports_api_login(self) -> bool:
         return False  # 需要Playwright
 
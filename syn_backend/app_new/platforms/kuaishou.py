@@ -9,8 +9,7 @@ import uuid
 from typing import Dict, Any
 
 from loguru import logger
-from playwright.async_api import async_playwright, Page
-from myUtils.playwright_context_factory import create_context_with_policy
+from playwright.async_api import Page
 
 from .base import PlatformAdapter, QRCodeData, UserInfo, LoginResult, LoginStatus
 from ..session_manager import kuaishou_session_manager
@@ -25,6 +24,24 @@ class KuaishouAdapter(PlatformAdapter):
         self.headless = config.get("headless", True) if config else True
         self.account_id = config.get("account_id") if config else None
 
+    login_url = "https://cp.kuaishou.com/profile"
+
+    async def navigate_login_page(self, page: Page) -> None:
+        """访问快手创作者中心并切换到扫码登录"""
+        await page.goto(self.login_url, timeout=60000)
+
+        # 尝试点击登录按钮
+        try:
+            await page.get_by_role("link", name="立即登录").click(timeout=3000)
+        except Exception:
+            pass
+
+        # 切换到扫码登录
+        try:
+            await page.get_by_text("扫码登录").click(timeout=3000)
+        except Exception:
+            pass
+
     async def get_qrcode(self) -> QRCodeData:
         """
         生成快手登录二维码
@@ -35,43 +52,16 @@ class KuaishouAdapter(PlatformAdapter):
         session_id = str(uuid.uuid4())
 
         try:
-            # 创建浏览器会话
-            playwright = await async_playwright().start()
-            browser, context, _, _ = await create_context_with_policy(
-                playwright,
-                platform=self.platform_name,
-                account_id=self.account_id,
-                headless=self.headless,
-                base_context_opts={"viewport": {"width": 1280, "height": 800}},
-                launch_kwargs={"args": ["--no-sandbox", "--disable-blink-features=AutomationControlled"]},
-            )
-            page = await context.new_page()
+            # 创建浏览器会话并打开登录页（Worker 无头模式走登录会话池）
+            session = await self.open_login_page()
+            page = session["page"]
 
             # ✅ 使用 SessionManager 存储会话（内存 + Redis）
-            kuaishou_session_manager.create_session(session_id, {
-                "playwright": playwright,
-                "browser": browser,
-                "context": context,
-                "page": page
-            })
-
-            # 访问快手创作者中心
-            await page.goto("https://cp.kuaishou.com/profile", timeout=60000)
+            kuaishou_session_manager.create_session(session_id, session)
 
-            # 尝试点击登录按钮
-            try:
-                await page.get_by_role("link", name="立即登录").click(timeout=3000)
-            except Exception:
-                pass
-
-            # 切换到扫码登录
-            try:
-                await page.get_by_text("扫码登录").click(timeout=3000)
-            except Exception:
-                pass
-
-            # 等待二维码加载
-            await asyncio.sleep(2)
+            # 等待二维码加载（预热页面已加载完成）
+            if not session["warm"]:
+                await asyncio.sleep(2)
 
             # 提取二维码
             img = page.get_by_role("img", name="qrcode")
@@ -174,20 +164,17 @@ class KuaishouAdapter(PlatformAdapter):
             return
 
         try:
-            # ✅ 安全关闭 browser（检查是否为 None）
-            browser = session.get("browser")
-            if browser:
-                await browser.close()
-                logger.debug(f"[Kuaishou] Browser closed for session {session_id}")
-
-            # ✅ 安全停止 playwright（检查是否为 None）
-            playwright = session.get("playwright")
-            if playwright:
-                await playwright.stop()
-                logger.debug(f"[Kuaishou] Playwright stopped for session {session_id}")
+            await self.close_login_session(session)
+            logger.debug(f"[Kuaishou] Login session closed: {session_id}")
         except Exception as e:
             logger.warning(f"[Kuaishou] Cleanup failed: {e}")
 
+    def watch_targets(self, session_id: str):
+        session = kuaishou_session_manager.get_session(session_id)
+        if not session or not session.get("page"):
+            return None
+        return session["page"], session["context"]
+
     async def supports_api_login(self) -> bool:
         return False  # 需要Playwright
 
@@ -9,8 +9,7 @@ import uuid
 from typing import Dict, Any
 
 from loguru import logger
-from playwright.async_api import async_playwright, Page
-from myUtils.playwright_context_factory import create_context_with_policy
+from playwright.async_api import Page
 
 from .base import PlatformAdapter, QRCodeData, UserInfo, LoginResult, LoginStatus
 from ..session_manager import tencent_session_manager
@@ -25,6 +24,8 @@ class TencentAdapter(PlatformAdapter):
         self.headless = config.get("headless", True) if config else True
         self.account_id = config.get("account_id") if config else None
 
+    login_url = "https://channels.weixin.qq.com"
+
     async def get_qrcode(self) -> QRCodeData:
         """
         生成视频号登录二维码
@@ -35,35 +36,20 @@ class TencentAdapter(PlatformAdapter):
         session_id = str(uuid.uuid4())
 
         try:
-            # 创建浏览器会话
-            playwright = await async_playwright().start()
-            browser, context, _, _ = await create_context_with_policy(
-                playwright,
-                platform=self.platform_name,
-                account_id=self.account_id,
-                headless=self.headless,
-                base_context_opts={"viewport": {"width": 1280, "height": 800}},
-                launch_kwargs={"args": ["--no-sandbox", "--disable-blink-features=AutomationControlled"]},
-            )
-            page = await context.new_page()
+            # 创建浏览器会话并打开登录页（Worker 无头模式走登录会话池）
+            session = await self.open_login_page()
+            page = session["page"]
 
             # ✅ 使用 SessionManager 存储会话（内存 + Redis）
-            tencent_session_manager.create_session(session_id, {
-                "playwright": playwright,
-                "browser": browser,
-                "context": context,
-                "page": page
-            })
+            tencent_session_manager.create_session(session_id, session)
 
-            # 访问视频号平台
-            await page.goto("https://channels.weixin.qq.com", timeout=60000)
-            await asyncio.sleep(2)
+            # 等待 iframe 中的二维码加载（预热页面已加载完成）
+            if not session["warm"]:
+                await asyncio.sleep(4)
 
             # 二维码在iframe中
             frame = page.frame_locator("iframe").first
             img = frame.get_by_role("img").first
-
-            await asyncio.sleep(2)
             src = await img.get_attribute("src")
 
             if src:
@@ -158,20 +144,17 @@ class TencentAdapter(PlatformAdapter):
             return
 
         try:
-            # ✅ 安全关闭 browser（检查是否为 None）
-            browser = session.get("browser")
-            if browser:
-                await browser.close()
-                logger.debug(f"[Tencent] Browser closed for session {session_id}")
-
-            # ✅ 安全停止 playwright（检查是否为 None）
-            playwright = session.get("playwright")
-            if playwright:
-                await playwright.stop()
-                logger.debug(f"[Tencent] Playwright stopped for session {session_id}")
+            await self.close_login_session(session)
+            logger.debug(f"[Tencent] Login session closed: {session_id}")
         except Exception as e:
             logger.warning(f"[Tencent] Cleanup failed: {e}")
 
+    def watch_targets(self, session_id: str):
+        session = tencent_session_manager.get_session(session_id)
+        if not session or not session.get("page"):
+            return None
+        return session["page"], session["context"]
+
     async def supports_api_login(self) -> bool:
         return False  # 需要Playwright
 
@@ -9,8 +9,7 @@ import uuid
 from typing import Dict, Any
 
 from loguru import logger
-from playwright.async_api import async_playwright, Page
-from myUtils.playwright_context_factory import create_context_with_policy
+from playwright.async_api import Page
 
 from .base import PlatformAdapter, QRCodeData, UserInfo, LoginResult, LoginStatus
 from ..session_manager import xiaohongshu_session_manager
@@ -25,6 +24,25 @@ class XiaohongshuAdapter(PlatformAdapter):
         self.headless = config.get("headless", True) if config else True
         self.account_id = config.get("account_id") if config else None
 
+    login_url = "https://creator.xiaohongshu.com/new/home"
+
+    async def navigate_login_page(self, page: Page) -> None:
+        """访问小红书创作者中心并切换到扫码登录"""
+        await page.goto(self.login_url, timeout=60000)
+        await asyncio.sleep(2)
+
+        # 尝试切换到扫码登录
+        try:
+            switch = await page.query_selector(".login-box-container img.css-wemwzq")
+            if switch:
+                await switch.click()
+            else:
+                btn = await page.get_by_text("扫码登录").element_handle()
+                if btn:
+                    await btn.click()
+        except Exception:
+            pass
+
     async def get_qrcode(self) -> QRCodeData:
         """
         生成小红书登录二维码
@@ -35,41 +53,12 @@ class XiaohongshuAdapter(PlatformAdapter):
         session_id = str(uuid.uuid4())
 
         try:
-            # 创建浏览器会话
-            playwright = await async_playwright().start()
-            browser, context, _, _ = await create_context_with_policy(
-                playwright,
-                platform=self.platform_name,
-                account_id=self.account_id,
-                headless=self.headless,
-                base_context_opts={"viewport": {"width": 1280, "height": 800}},
-                launch_kwargs={"args": ["--no-sandbox", "--disable-blink-features=AutomationControlled"]},
-            )
-            page = await context.new_page()
+            # 创建浏览器会话并打开登录页（Worker 无头模式走登录会话池）
+            session = await self.open_login_page()
+            page = session["page"]
 
             # ✅ 使用 SessionManager 存储会话（内存 + Redis）
-            xiaohongshu_session_manager.create_session(session_id, {
-                "playwright": playwright,
-                "browser": browser,
-                "context": context,
-                "page": page
-            })
-
-            # 访问小红书创作者中心
-            await page.goto("https://creator.xiaohongshu.com/new/home", timeout=60000)
-            await asyncio.sleep(2)
-
-            # 尝试切换到扫码登录
-            try:
-                switch = await page.query_selector(".login-box-container img.css-wemwzq")
-                if switch:
-                    await switch.click()
-                else:
-                    btn = await page.get_by_text("扫码登录").element_handle()
-                    if btn:
-                        await btn.click()
-            except Exception:
-                pass
+            xiaohongshu_session_manager.create_session(session_id, session)
 
             # 尝试多个选择器提取二维码
             selectors = [
@@ -183,20 +172,17 @@ class XiaohongshuAdapter(PlatformAdapter):
             return
 
         try:
-            # ✅ 安全关闭 browser（检查是否为 None）
-            browser = session.get("browser")
-            if browser:
-                await browser.close()
-                logger.debug(f"[XHS] Browser closed for session {session_id}")
-
-            # ✅ 安全停止 playwright（检查是否为 None）
-            playwright = session.get("playwright")
-            if playwright:
-                await playwright.stop()
-                logger.debug(f"[XHS] Playwright stopped for session {session_id}")
+            await self.close_login_session(session)
+            logger.debug(f"[XHS] Login session closed: {session_id}")
         except Exception as e:
             logger.warning(f"[XHS] Cleanup failed: {e}")
 
+    def watch_targets(self, session_id: str):
+        session = xiaohongshu_session_manager.get_session(session_id)
+        if not session or not session.get("page"):
+            return None
+        return session["page"], session["context"]
+
     async def supports_api_login(self) -> bool:
         return False  # 需要Playwright
 
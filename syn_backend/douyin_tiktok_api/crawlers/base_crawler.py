@@ -39,6 +39,7 @@ import re
 
 from httpx import Response
 
+from crawlers.session_manager import crawler_sessions
 from crawlers.utils.logger import logger
 from crawlers.utils.api_exceptions import (
     APIError,
@@ -80,34 +81,29 @@ class BaseCrawler:
         self._max_tasks = max_tasks
         self.semaphore = asyncio.Semaphore(max_tasks)
 
-        # 限制最大连接数 / Limit the maximum number of connections
+        # 最大连接数由会话管理器统一限制 / Connection limits are enforced by the session manager
         self._max_connections = max_connections
-        self.limits = httpx.Limits(max_connections=max_connections)
 
-        # 业务逻辑重试次数 / Business logic retry count
+        # 业务逻辑重试次数，同时作为底层连接重试次数 / Business logic and underlying connection retry count
         self._max_retries = max_retries
-        # 底层连接重试次数 / Underlying connection retry count
-        self.atransport = httpx.AsyncHTTPTransport(retries=max_retries)
 
         # 超时等待时间 / Timeout waiting time
         self._timeout = timeout
         self.timeout = httpx.Timeout(timeout)
-        # 异步客户端 / Asynchronous client
-        client_kwargs = {
-            "headers": self.crawler_headers,
-            "proxies": self.proxies,
-            "timeout": self.timeout,
-            "limits": self.limits,
-            "transport": self.atransport,
-        }
-        try:
-            self.aclient = httpx.AsyncClient(**client_kwargs)
-        except TypeError as exc:
-            if "proxies" in str(exc):
-                client_kwargs.pop("proxies", None)
-                self.aclient = httpx.AsyncClient(**client_kwargs)
-            else:
-                raise
+        # 异步客户端从会话管理器借用，按 (代理, Cookie) 复用长连接，请求头逐个请求传入
+        # The async client is borrowed from the session manager and reused per (proxy, cookie);
+        # headers are sent per request
+        self.aclient = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """借用共享客户端 (Borrow the shared client)"""
+        if self.aclient is None or self.aclient.is_closed:
+            self.aclient = await crawler_sessions.get_client(
+                proxies=self.proxies,
+                headers=self.crawler_headers,
+                retries=self._max_retries,
+            )
+        return self.aclient
 
     async def fetch_response(self, endpoint: str) -> Response:
         """获取数据 (Get data)
@@ -191,7 +187,11 @@ class BaseCrawler:
         """
         for attempt in range(self._max_retries):
             try:
-                response = await self.aclient.get(url, follow_redirects=True)
+                client = await self._get_client()
+                async with crawler_sessions.request_slot(client, url):
+                    response = await client.get(
+                        url, headers=self.crawler_headers, timeout=self.timeout, follow_redirects=True
+                    )
                 if not response.text.strip() or not response.content:
                     error_message = "第 {0} 次响应内容为空, 状态码: {1}, URL:{2}".format(attempt + 1,
                                                                                          response.status_code,
@@ -235,12 +235,16 @@ class BaseCrawler:
         """
         for attempt in range(self._max_retries):
             try:
-                response = await self.aclient.post(
-                    url,
-                    json=None if not params else dict(params),
-                    data=None if not data else data,
-                    follow_redirects=True
-                )
+                client = await self._get_client()
+                async with crawler_sessions.request_slot(client, url):
+                    response = await client.post(
+                        url,
+                        json=None if not params else dict(params),
+                        data=None if not data else data,
+                        headers=self.crawler_headers,
+                        timeout=self.timeout,
+                        follow_redirects=True
+                    )
                 if not response.text.strip() or not response.content:
                     error_message = "第 {0} 次响应内容为空, 状态码: {1}, URL:{2}".format(attempt + 1,
                                                                                          response.status_code,
@@ -283,7 +287,9 @@ class BaseCrawler:
             response: 响应内容 (Response content)
         """
         try:
-            response = await self.aclient.head(url)
+            client = await self._get_client()
+            async with crawler_sessions.request_slot(client, url):
+                response = await client.head(url, headers=self.crawler_headers, timeout=self.timeout)
             # logger.info("响应状态码: {0}".format(response.status_code))
             response.raise_for_status()
             return response
@@ -348,10 +354,11 @@ class BaseCrawler:
             raise APIResponseError(f"HTTP状态错误: {status_code}")
 
     async def close(self):
-        await self.aclient.aclose()
+        # 归还而不关闭共享客户端 / Release the shared client without closing it
+        self.aclient = None
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.aclient.aclose()
+        await self.close()
@@ -0,0 +1,221 @@
+# ==============================================================================
+# 爬虫 HTTP 会话管理 (Crawler HTTP session manager)
+#
+# BaseCrawler 不再为每个请求新建 httpx.AsyncClient，而是从这里借用长连接客户端：
+# - 按 (事件循环, 代理, Cookie 身份) 复用客户端，保持 keep-alive / HTTP/2 连接
+# - 每个主机的并发连接数有上限
+# - 长时间空闲的客户端会被回收
+#
+# BaseCrawler borrows long-lived clients from here instead of opening one per request.
+# ==============================================================================
+
+import asyncio
+import contextlib
+import hashlib
+import time
+import weakref
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from crawlers.utils.logger import logger
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _PooledClient:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.inflight = 0
+        self.last_used = time.monotonic()
+
+
+class _LoopState:
+    """单个事件循环下的客户端与主机信号量 (Clients and host semaphores of one event loop)"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop_ref = weakref.ref(loop)
+        self.clients: Dict[Tuple, _PooledClient] = {}
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def is_dead(self) -> bool:
+        loop = self.loop_ref()
+        return loop is None or loop.is_closed()
+
+
+class CrawlerSessionManager:
+    """
+    长连接客户端池 (Pool of long-lived HTTP clients)
+
+    Args:
+        max_connections: 单个客户端的最大连接数 (Max connections per client)
+        max_keepalive_connections: 单个客户端保持的空闲连接数 (Idle keep-alive connections per client)
+        keepalive_expiry: 空闲连接保持时间(秒) (Idle connection expiry in seconds)
+        per_host_limit: 每个主机的最大并发请求数 (Max concurrent requests per host)
+        idle_timeout: 客户端空闲多久后被回收(秒) (Evict clients idle longer than this)
+        http2: 是否启用 HTTP/2（需要 h2） (Enable HTTP/2 when h2 is installed)
+    """
+
+    def __init__(
+            self,
+            max_connections: int = 100,
+            max_keepalive_connections: int = 20,
+            keepalive_expiry: float = 30.0,
+            per_host_limit: int = 16,
+            idle_timeout: float = 300.0,
+            http2: Optional[bool] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.per_host_limit = per_host_limit
+        self.idle_timeout = idle_timeout
+        self.http2 = _http2_available() if http2 is None else http2
+
+        # 客户端与信号量都绑定事件循环，按循环分组；循环关闭后整组丢弃
+        # Clients and semaphores are loop-bound, so they are grouped per loop
+        self._loops: Dict[int, _LoopState] = {}
+        self._last_sweep = time.monotonic()
+        self.created = 0
+        self.evicted = 0
+
+    def _state(self, loop: asyncio.AbstractEventLoop) -> _LoopState:
+        state = self._loops.get(id(loop))
+        # id 可能被新循环复用 / ids can be reused by a new loop
+        if state is None or state.loop_ref() is not loop:
+            state = _LoopState(loop)
+            self._loops[id(loop)] = state
+        return state
+
+    @staticmethod
+    def _identity(proxies: Optional[dict], headers: Optional[dict]) -> Tuple:
+        proxy_key = tuple(sorted((str(k), str(v)) for k, v in (proxies or {}).items()))
+        cookie = (headers or {}).get("Cookie") or (headers or {}).get("cookie") or ""
+        # 只保留 Cookie 摘要作为身份，避免在键中保存原文 / Keep only a digest of the cookie
+        cookie_key = hashlib.sha1(cookie.encode("utf-8")).hexdigest() if cookie else ""
+        return proxy_key, cookie_key
+
+    def _build_client(self, proxies: Optional[dict], retries: int) -> httpx.AsyncClient:
+        transport = httpx.AsyncHTTPTransport(retries=retries, limits=self.limits, http2=self.http2)
+        client_kwargs = {
+            "proxies": proxies,
+            "limits": self.limits,
+            "transport": transport,
+            "http2": self.http2,
+        }
+        try:
+            return httpx.AsyncClient(**client_kwargs)
+        except TypeError as exc:
+            if "proxies" not in str(exc):
+                raise
+            # httpx>=0.28 移除了 proxies 参数，改用按协议挂载的代理 transport
+            # httpx>=0.28 dropped `proxies`; mount one proxied transport per scheme instead
+            client_kwargs.pop("proxies", None)
+            mounts = {
+                pattern: httpx.AsyncHTTPTransport(proxy=url, retries=retries, limits=self.limits, http2=self.http2)
+                for pattern, url in (proxies or {}).items()
+                if url
+            }
+            if mounts:
+                client_kwargs["mounts"] = mounts
+            return httpx.AsyncClient(**client_kwargs)
+
+    async def get_client(
+            self,
+            proxies: Optional[dict] = None,
+            headers: Optional[dict] = None,
+            retries: int = 3,
+    ) -> httpx.AsyncClient:
+        """借用一个客户端 (Borrow a client)；请求头由调用方按请求传入"""
+        loop = asyncio.get_running_loop()
+        await self._sweep(loop)
+        clients = self._state(loop).clients
+        key = (retries,) + self._identity(proxies, headers)
+        pooled = clients.get(key)
+        if pooled is None or pooled.client.is_closed:
+            pooled = _PooledClient(self._build_client(proxies, retries))
+            clients[key] = pooled
+            self.created += 1
+        pooled.last_used = time.monotonic()
+        return pooled.client
+
+    def _find(self, loop, client: httpx.AsyncClient) -> Optional[_PooledClient]:
+        for pooled in self._state(loop).clients.values():
+            if pooled.client is client:
+                return pooled
+        return None
+
+    @contextlib.asynccontextmanager
+    async def request_slot(self, client: httpx.AsyncClient, url: str):
+        """限制单主机并发，并标记客户端正在使用 (Per-host cap and in-flight tracking)"""
+        loop = asyncio.get_running_loop()
+        host = urlsplit(str(url)).netloc
+        slots = self._state(loop).host_slots
+        semaphore = slots.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            slots[host] = semaphore
+
+        pooled = self._find(loop, client)
+        async with semaphore:
+            if pooled is not None:
+                pooled.inflight += 1
+            try:
+                yield
+            finally:
+                if pooled is not None:
+                    pooled.inflight -= 1
+                    pooled.last_used = time.monotonic()
+
+    async def _sweep(self, loop) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < min(30.0, self.idle_timeout):
+            return
+        self._last_sweep = now
+
+        for loop_id in [k for k, state in self._loops.items() if state.is_dead()]:
+            self._loops.pop(loop_id, None)
+
+        clients = self._state(loop).clients
+        expired = [
+            key for key, pooled in clients.items()
+            if pooled.inflight == 0 and (pooled.client.is_closed or now - pooled.last_used > self.idle_timeout)
+        ]
+        for key in expired:
+            pooled = clients.pop(key)
+            self.evicted += 1
+            if not pooled.client.is_closed:
+                with contextlib.suppress(Exception):
+                    await pooled.client.aclose()
+        if expired:
+            logger.info("回收空闲爬虫客户端 {0} 个 (Evicted idle crawler clients)".format(len(expired)))
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环下的所有客户端 (Close all clients of the current loop)"""
+        state = self._loops.pop(id(asyncio.get_running_loop()), None)
+        for pooled in (state.clients.values() if state else ()):
+            with contextlib.suppress(Exception):
+                await pooled.client.aclose()
+
+    def stats(self) -> dict:
+        pooled = [p for state in list(self._loops.values()) for p in state.clients.values()]
+        return {
+            "clients": len(pooled),
+            "inflight": sum(p.inflight for p in pooled),
+            "created": self.created,
+            "evicted": self.evicted,
+            "http2": self.http2,
+        }
+
+
+# 全局会话管理器 (Global session manager)
+crawler_sessions = CrawlerSessionManager()
@@ -2,6 +2,7 @@
 账号管理API路由
 """
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import StreamingResponse
 from typing import Optional, Any, Dict
 import asyncio
 import subprocess
@@ -420,6 +421,51 @@ async def delete_account(account_id: str):
 #         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/deep-sync/jobs", response_model=Response[dict])
+async def start_deep_sync_job(validate_cookies: bool = False):
+    """
+    后台启动深度同步（并发补全 + 批量写回）
+
+    - 标记文件丢失的账号，补全 name/avatar/user_id，可选校验 Cookie
+    - 不再扫描磁盘新增账号、不备份/改名 Cookie 文件
+    - 已有运行中的任务时返回该任务
+    - 通过 /deep-sync/jobs/{job_id}/events 订阅进度（SSE）
+    """
+    try:
+        job = account_service.start_deep_sync(validate_cookies=validate_cookies)
+        return Response(success=True, data=dict(job["engine"].progress))
+    except Exception as e:
+        logger.error(f"启动深度同步失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/deep-sync/jobs/{job_id}", response_model=Response[dict])
+async def get_deep_sync_job(job_id: str):
+    """查询深度同步进度"""
+    try:
+        return Response(success=True, data=account_service.get_deep_sync_progress(job_id))
+    except NotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/deep-sync/jobs/{job_id}/events")
+async def stream_deep_sync_job(job_id: str):
+    """深度同步进度（SSE），任务结束时推送 type=done"""
+    try:
+        account_service.get_deep_sync_progress(job_id)
+    except NotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(
+        account_service.stream_deep_sync(job_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.delete("/invalid", response_model=StatusResponse)
 async def delete_invalid_accounts():
     """
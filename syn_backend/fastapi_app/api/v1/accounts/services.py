@@ -6,6 +6,7 @@ import sys
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import asyncio
+import json
 import random
 
 # 添加路径以导入现有模块
@@ -22,6 +23,8 @@ class AccountService:
 
     def __init__(self):
         self.manager = cookie_manager
+        # 深度同步任务：job_id -> {"engine", "task", "subscribers"}
+        self._deep_sync_jobs: Dict[str, Dict[str, Any]] = {}
 
     async def list_accounts(
         self,
@@ -129,14 +132,16 @@ class AccountService:
 
 
 
-    async def deep_sync(self) -> Dict[str, Any]:
-        """深度同步账号"""
+    async def deep_sync(self, validate_cookies: bool = False) -> Dict[str, Any]:
+        """深度同步账号（等待完成）"""
         try:
             logger.info("开始深度同步账号")
-            stats = self.manager.deep_sync_accounts()
+            job = self.start_deep_sync(validate_cookies=validate_cookies)
+            stats = await asyncio.shield(job["task"])
 
             return {
                 "success": True,
+                "job_id": job["engine"].job_id,
                 "added": stats.get('added', 0),
                 "marked_missing": stats.get('marked_missing', 0),
                 "total_files": stats.get('total_files', 0),
@@ -148,6 +153,67 @@ class AccountService:
             logger.error(f"深度同步失败: {e}")
             raise
 
+    def start_deep_sync(self, validate_cookies: bool = False) -> Dict[str, Any]:
+        """后台启动深度同步；已有运行中的任务时直接复用"""
+        from myUtils.account_deep_sync import DeepSyncEngine
+
+        for job in self._deep_sync_jobs.values():
+            if not job["task"].done():
+                return job
+
+        # 只保留最近的已完成任务，供进度查询
+        for job_id in [k for k, v in self._deep_sync_jobs.items() if v["task"].done()][:-4]:
+            self._deep_sync_jobs.pop(job_id, None)
+
+        subscribers: List[asyncio.Queue] = []
+
+        def _publish(event: Dict[str, Any]) -> None:
+            for queue in list(subscribers):
+                queue.put_nowait(event)
+
+        engine = DeepSyncEngine(self.manager, validate_cookies=validate_cookies, on_progress=_publish)
+        job = {
+            "engine": engine,
+            "subscribers": subscribers,
+            "task": asyncio.create_task(engine.run()),
+        }
+        # 后台任务的异常在进度里体现，这里只避免 "exception was never retrieved"
+        job["task"].add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._deep_sync_jobs[engine.job_id] = job
+        return job
+
+    def get_deep_sync_progress(self, job_id: str) -> Dict[str, Any]:
+        job = self._deep_sync_jobs.get(job_id)
+        if not job:
+            raise NotFoundException(f"同步任务不存在: {job_id}")
+        return dict(job["engine"].progress)
+
+    async def stream_deep_sync(self, job_id: str):
+        """SSE：先推送当前快照，再逐条推送进度，直到任务结束"""
+        job = self._deep_sync_jobs.get(job_id)
+        if not job:
+            raise NotFoundException(f"同步任务不存在: {job_id}")
+
+        def _sse(event: Dict[str, Any]) -> str:
+            return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+        queue: asyncio.Queue = asyncio.Queue()
+        job["subscribers"].append(queue)
+        try:
+            yield _sse({**job["engine"].progress, "type": "snapshot"})
+            while not job["task"].done() or not queue.empty():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event)
+                if event.get("type") == "done":
+                    break
+        finally:
+            if queue in job["subscribers"]:
+                job["subscribers"].remove(queue)
+
     async def delete_invalid_accounts(self) -> Dict[str, Any]:
         """删除所有失效账号"""
         try:
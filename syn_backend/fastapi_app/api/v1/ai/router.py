@@ -8,7 +8,7 @@ import re
 import yaml
 from fastapi.responses import StreamingResponse
 from fastapi_app.core.config import settings
-from fastapi_app.db.runtime import mysql_enabled, sa_connection
+from fastapi_app.db.runtime import async_sa_connection, mysql_enabled, sa_connection
 from sqlalchemy import text
 
 router = APIRouter(prefix="/ai", tags=["ai"])
@@ -1186,8 +1186,8 @@ async def get_model_configs():
     
     try:
         if mysql_enabled():
-            with sa_connection() as conn:
-                rows = conn.execute(text("SELECT * FROM ai_model_configs ORDER BY service_type")).mappings().all()
+            async with async_sa_connection() as conn:
+                rows = (await conn.execute(text("SELECT * FROM ai_model_configs ORDER BY service_type"))).mappings().all()
         else:
             import sqlite3
             conn = sqlite3.connect(settings.DATABASE_PATH)
@@ -1222,11 +1222,11 @@ async def get_model_config(service_type: str):
     
     try:
         if mysql_enabled():
-            with sa_connection() as conn:
-                row = conn.execute(
+            async with async_sa_connection() as conn:
+                row = (await conn.execute(
                     text("SELECT * FROM ai_model_configs WHERE service_type = :t"),
                     {"t": service_type},
-                ).mappings().first()
+                )).mappings().first()
                 row = dict(row) if row else None
         else:
             import sqlite3
@@ -1268,13 +1268,13 @@ async def upsert_model_config(request: AIModelConfigRequest):
         extra_config_json = json.dumps(request.extra_config) if request.extra_config else None
 
         if mysql_enabled():
-            with sa_connection() as conn:
-                existing = conn.execute(
+            async with async_sa_connection() as conn:
+                existing = (await conn.execute(
                     text("SELECT id FROM ai_model_configs WHERE service_type = :t"),
                     {"t": request.service_type},
-                ).mappings().first()
+                )).mappings().first()
                 if existing:
-                    conn.execute(
+                    await conn.execute(
                         text(
                             """
                             UPDATE ai_model_configs
@@ -1294,7 +1294,7 @@ async def upsert_model_config(request: AIModelConfigRequest):
                         },
                     )
                 else:
-                    conn.execute(
+                    await conn.execute(
                         text(
                             """
                             INSERT INTO ai_model_configs
@@ -1370,8 +1370,8 @@ async def delete_model_config(service_type: str):
     """删除AI模型配置"""
     try:
         if mysql_enabled():
-            with sa_connection() as conn:
-                res = conn.execute(
+            async with async_sa_connection() as conn:
+                res = await conn.execute(
                     text("DELETE FROM ai_model_configs WHERE service_type = :t"),
                     {"t": service_type},
                 )
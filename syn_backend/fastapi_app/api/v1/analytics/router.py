@@ -1,7 +1,9 @@
 import csv
 import io
+import tempfile
+import zlib
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 from fastapi import APIRouter, Query, HTTPException, Body
 from pydantic import BaseModel, Field
 from fastapi.responses import StreamingResponse
@@ -11,9 +13,10 @@ from myUtils.analytics_db import (
     get_analytics_summary,
     get_analytics_videos,
     get_chart_data,
+    iter_analytics_export_batches,
     insert_video_analytics,
     update_video_analytics,
-    upsert_video_analytics_by_key,
+    upsert_video_analytics_batch,
 )
 from fastapi_app.api.v1.analytics.douyin_sec_uid_resolver import resolve_douyin_sec_uid as resolve_douyin_sec_uid_raw
 from datetime import datetime
@@ -23,6 +26,7 @@ import os
 import httpx
 import re
 import asyncio
+import importlib.util
 import json
 import subprocess
 from myUtils.cookie_manager import cookie_manager
@@ -370,6 +374,7 @@ async def _collect_bilibili_accounts(account_ids: Optional[List[str]] = None) ->
                 vlist = _parse_bilibili_vlist(payload)
                 if not vlist:
                     break
+                records = []
                 for item in vlist:
                     video_id = item.get("bvid") or item.get("aid")
                     if not video_id:
@@ -397,7 +402,8 @@ async def _collect_bilibili_accounts(account_ids: Optional[List[str]] = None) ->
                         "share_count": item.get("share") or 0,
                         "raw_data": item,
                     }
-                    upsert_video_analytics_by_key(DB_PATH, platform="bilibili", video_id=str(video_id), data=record)
+                    records.append(record)
+                upsert_video_analytics_batch(DB_PATH, records)
                 pn += 1
             success += 1
         except Exception as exc:  # noqa: BLE001
@@ -469,6 +475,7 @@ async def _collect_douyin_tiktok_accounts(
                 if not aweme_list:
                     break
 
+                records = []
                 for item in aweme_list:
                     if not isinstance(item, dict):
                         continue
@@ -497,7 +504,8 @@ async def _collect_douyin_tiktok_accounts(
                         "collect_count": stats.get("collect_count") or 0,
                         "raw_data": item,
                     }
-                    upsert_video_analytics_by_key(DB_PATH, platform="douyin", video_id=str(video_id), data=record)
+                    records.append(record)
+                upsert_video_analytics_batch(DB_PATH, records)
 
                 data = payload.get("data") if isinstance(payload, dict) else {}
                 has_more = data.get("has_more") if isinstance(data, dict) else None
@@ -565,6 +573,80 @@ async def get_analytics(
 
 
 
+EXPORT_HEADERS = [
+    'ID', '视频ID', '标题', '平台', '视频链接',
+    '发布日期', '播放量', '点赞量', '评论量', '收藏量', '最后更新'
+]
+_EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_csv_export(batches) -> Iterator[bytes]:
+    """逐批写出 CSV，每批编码成一个块（带 BOM，便于 Excel 识别 UTF-8）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_HEADERS)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def _gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 => gzip 容器
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _write_excel_export(batches):
+    """openpyxl write-only 模式逐行写入，结果落到 SpooledTemporaryFile（超过阈值自动落盘）"""
+    import openpyxl  # type: ignore
+    from openpyxl.cell import WriteOnlyCell  # type: ignore
+    from openpyxl.styles import Font, Alignment  # type: ignore
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title="视频数据")
+    header_font = Font(bold=True)
+    header_alignment = Alignment(horizontal='center', vertical='center')
+    header_row = []
+    for header in EXPORT_HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header_row.append(cell)
+    ws.append(header_row)
+    for rows in batches:
+        for row in rows:
+            ws.append(row)
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    try:
+        wb.save(spooled)
+        spooled.seek(0)
+    except Exception:
+        spooled.close()
+        raise
+    return spooled
+
+
+def _iter_file_chunks(fh) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = fh.read(_EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fh.close()
+
+
 @router.get("/export", summary="导出分析数据")
 async def export_analytics(
     startDate: Optional[str] = Query(None),
@@ -572,9 +654,15 @@ async def export_analytics(
     platform: Optional[str] = Query(None, description="Legacy single platform"),
     platforms: Optional[List[str]] = Query(None, description="List of platforms"),
     accounts: Optional[List[str]] = Query(None, description="List of account IDs"),
-    format: str = Query("csv", pattern="^(csv|excel)$", description="导出格式 csv 或 excel")
+    format: str = Query("csv", pattern="^(csv|excel)$", description="导出格式 csv 或 excel"),
+    gzip: bool = Query(False, description="CSV 以 gzip 压缩传输（Content-Encoding: gzip），适合大批量导出"),
 ):
-    """导出分析数据为 CSV（默认）或 Excel（若依赖存在）"""
+    """
+    导出分析数据为 CSV（默认）或 Excel（若依赖存在）
+
+    按批次遍历 video_analytics 游标，只查询导出列，内存占用与行数无关；
+    CSV 边查边写，Excel 使用 write-only 模式写入临时文件后分块返回。
+    """
     try:
         # Support legacy single platform param by adding it to list if present
         if platform and platform != "all":
@@ -585,86 +673,32 @@ async def export_analytics(
         # Build account_ids list from accounts param
         account_ids = accounts
 
-        videos = get_analytics_videos(
+        batches = iter_analytics_export_batches(
             DB_PATH,
             startDate,
             endDate,
-            limit=10000,
             platforms=platforms,
-            account_ids=account_ids
+            account_ids=account_ids,
         )
-        if format == "excel":
-            try:
-                import openpyxl  # type: ignore
-                from openpyxl.styles import Font, Alignment  # type: ignore
-            except ImportError:
-                format = "csv"
+        if format == "excel" and importlib.util.find_spec("openpyxl") is None:
+            format = "csv"
 
         if format == "csv":
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow([
-                'ID', '视频ID', '标题', '平台', '视频链接',
-                '发布日期', '播放量', '点赞量', '评论量', '收藏量', '最后更新'
-            ])
-            for video in videos:
-                writer.writerow([
-                    video.get('id'),
-                    video.get('videoId'),
-                    video.get('title'),
-                    video.get('platform'),
-                    video.get('videoUrl', ''),
-                    video.get('publishDate'),
-                    video.get('playCount', 0),
-                    video.get('likeCount', 0),
-                    video.get('commentCount', 0),
-                    video.get('collectCount', 0),
-                    video.get('lastUpdated')
-                ])
-            output.seek(0)
-            return StreamingResponse(
-                iter([output.getvalue()]),
-                media_type="text/csv",
-                headers={
-                    "Content-Disposition": "attachment; filename=analytics_export.csv",
-                    "Content-Type": "text/csv; charset=utf-8-sig"
-                }
-            )
+            chunks = _iter_csv_export(batches)
+            headers = {
+                "Content-Disposition": "attachment; filename=analytics_export.csv",
+                "Content-Type": "text/csv; charset=utf-8-sig"
+            }
+            if gzip:
+                chunks = _gzip_chunks(chunks)
+                headers["Content-Encoding"] = "gzip"
+                headers["Vary"] = "Accept-Encoding"
+            return StreamingResponse(chunks, media_type="text/csv", headers=headers)
         else:
-            # Excel 导出
-            import openpyxl  # type: ignore
-            from openpyxl.styles import Font, Alignment  # type: ignore
-
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "视频数据"
-            headers = [
-                'ID', '视频ID', '标题', '平台', '视频链接',
-                '发布日期', '播放量', '点赞量', '评论量', '收藏量', '最后更新'
-            ]
-            header_font = Font(bold=True)
-            header_alignment = Alignment(horizontal='center', vertical='center')
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.alignment = header_alignment
-            for row_idx, video in enumerate(videos, 2):
-                ws.cell(row=row_idx, column=1, value=video.get('id'))
-                ws.cell(row=row_idx, column=2, value=video.get('videoId'))
-                ws.cell(row=row_idx, column=3, value=video.get('title'))
-                ws.cell(row=row_idx, column=4, value=video.get('platform'))
-                ws.cell(row=row_idx, column=5, value=video.get('videoUrl', ''))
-                ws.cell(row=row_idx, column=6, value=video.get('publishDate'))
-                ws.cell(row=row_idx, column=7, value=video.get('playCount', 0))
-                ws.cell(row=row_idx, column=8, value=video.get('likeCount', 0))
-                ws.cell(row=row_idx, column=9, value=video.get('commentCount', 0))
-                ws.cell(row=row_idx, column=10, value=video.get('collectCount', 0))
-                ws.cell(row=row_idx, column=11, value=video.get('lastUpdated'))
-            output = io.BytesIO()
-            wb.save(output)
-            output.seek(0)
+            # Excel 导出（xlsx 本身已是 zip 压缩，忽略 gzip 参数）
+            spooled = await asyncio.to_thread(_write_excel_export, batches)
             return StreamingResponse(
-                iter([output.getvalue()]),
+                _iter_file_chunks(spooled),
                 media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 headers={"Content-Disposition": "attachment; filename=analytics_export.xlsx"}
             )
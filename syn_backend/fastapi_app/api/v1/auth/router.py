@@ -300,27 +300,19 @@ async def generate_qrcode(
         raise HTTPException(status_code=500, detail=detail)
 
 
-@router.get("/qrcode/poll", response_model=LoginStatusResponse, summary="轮询登录状态")
-async def poll_login_status(session_id: str = Query(..., description="登录会话ID")):
+async def _apply_worker_status(session_id: str, session: dict, worker, result: Dict[str, Any]) -> LoginStatusResponse:
     """
-    轮询登录状态
+    处理 Worker 返回的一次登录状态（轮询与推送共用）
 
-    **NEW**: 通过 Playwright Worker 轮询状态
+    确认登录时补全账号信息并保存；同一会话的终态只处理一次。
     """
-    if session_id not in login_sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    session = login_sessions[session_id]
     platform = session["platform"]
-    worker_session_id = session.get("worker_session_id", session_id)
+    status = result["status"]
 
-    try:
-        # 使用 Playwright Worker 客户端轮询
-        from playwright_worker.client import get_worker_client
-        worker = get_worker_client()
-
-        result = await worker.poll_status(worker_session_id)
-        status = result["status"]
+    async with session.setdefault("lock", asyncio.Lock()):
+        # 推送和轮询可能同时拿到终态，后到的直接复用结果，避免重复保存
+        if session.get("response") is not None:
+            return session["response"]
         session["status"] = status
 
         if status == "confirmed":
@@ -466,19 +458,89 @@ async def poll_login_status(session_id: str = Query(..., description="登录会
             elif platform == PlatformType.TENCENT:
                 await _save_tencent_login(session, data)
 
-            del login_sessions[session_id]
+            login_sessions.pop(session_id, None)
 
-        return LoginStatusResponse(
+        response = LoginStatusResponse(
             success=True,
             status=status,
             message=result.get("message", ""),
             data=result if status == "confirmed" else None
         )
+        if status in ("confirmed", "failed", "expired"):
+            session["response"] = response
+        return response
+
+
+@router.get("/qrcode/poll", response_model=LoginStatusResponse, summary="轮询登录状态")
+async def poll_login_status(session_id: str = Query(..., description="登录会话ID")):
+    """
+    轮询登录状态
+
+    **NEW**: 通过 Playwright Worker 轮询状态；优先使用 /qrcode/events 推送，本接口作为兜底
+    """
+    if session_id not in login_sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    session = login_sessions[session_id]
+    platform = session["platform"]
+    worker_session_id = session.get("worker_session_id", session_id)
+
+    try:
+        # 使用 Playwright Worker 客户端轮询
+        from playwright_worker.client import get_worker_client
+        worker = get_worker_client()
+
+        result = await worker.poll_status(worker_session_id)
+        return await _apply_worker_status(session_id, session, worker, result)
     except Exception as e:
         logger.error(f"[Login] Poll failed: platform={platform.value} session={session_id[:8]} error={str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/qrcode/events", summary="登录状态推送（SSE）")
+async def stream_login_status(session_id: str = Query(..., description="登录会话ID")):
+    """
+    登录状态推送
+
+    状态变化时推送一条 LoginStatusResponse（JSON），终态（confirmed/failed/expired）后结束。
+    连接失败时推送 event: error，客户端回退到 /qrcode/poll 轮询。
+    """
+    if session_id not in login_sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    session = login_sessions[session_id]
+    platform = session["platform"]
+    worker_session_id = session.get("worker_session_id", session_id)
+
+    async def _events():
+        from playwright_worker.client import get_worker_client
+        worker = get_worker_client()
+        try:
+            async for result in worker.stream_status(worker_session_id):
+                response = await _apply_worker_status(session_id, session, worker, result)
+                yield f"data: {response.model_dump_json()}\n\n"
+                if response.status in ("confirmed", "failed", "expired"):
+                    break
+        except Exception as e:
+            logger.warning(f"[Login] Status stream failed: platform={platform.value} session={session_id[:8]} error={e}")
+            error = {
+                "success": False,
+                "message": str(e),
+                "fallback": f"/api/v1/auth/qrcode/poll?session_id={session_id}",
+            }
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.get("/login/unified", summary="统一登录接口")
 async def unified_login(
     platform: PlatformType = Query(..., description="平台类型"),
@@ -496,9 +558,14 @@ async def unified_login(
                 "description": "生成二维码"
             },
             "step2": {
+                "method": "GET",
+                "url": "/api/v1/auth/qrcode/events?session_id={session_id}",
+                "description": "订阅状态推送（SSE）"
+            },
+            "fallback": {
                 "method": "GET", 
                 "url": "/api/v1/auth/qrcode/poll?session_id={session_id}", 
-                "description": "轮询状态"
+                "description": "轮询状态（推送不可用时）"
             }
         }
     }
@@ -9,6 +9,7 @@
 import asyncio
 import base64
 import io
+import os
 import uuid
 import time
 from pathlib import Path
@@ -19,6 +20,7 @@ from loguru import logger
 from playwright.async_api import async_playwright
 
 from .schemas import PlatformType
+from playwright_worker.browser_pool import BrowserPool
 from utils.chrome_detector import get_chrome_executable
 
 
@@ -55,9 +57,32 @@ def _resolve_browser_executable() -> Optional[str]:
 
 
 class PlaywrightLoginManager:
-    @staticmethod
-    async def create_browser(session_id: str):
-        p = await async_playwright().start()
+    """
+    扫码登录的浏览器管理
+
+    浏览器常驻在共享池中（首次使用时启动），每个登录会话一个隔离上下文，
+    清理会话只关闭上下文；单个浏览器的并发会话数受池限制，超出时排队。
+    """
+    _pool: Optional[BrowserPool] = None
+    _playwright = None
+
+    @classmethod
+    def _browser_pool(cls) -> BrowserPool:
+        if cls._pool is None:
+            cls._pool = BrowserPool(
+                browsers=int(os.getenv("LOGIN_POOL_BROWSERS", "2")),
+                contexts_per_browser=int(os.getenv("LOGIN_POOL_CONTEXTS_PER_BROWSER", "6")),
+                recycle_after=int(os.getenv("LOGIN_POOL_RECYCLE_AFTER", "200")),
+                headless=PLAYWRIGHT_HEADLESS,
+                launcher=cls._launch_browser,
+                context_factory=cls._new_context,
+            )
+        return cls._pool
+
+    @classmethod
+    async def _launch_browser(cls):
+        if cls._playwright is None:
+            cls._playwright = await async_playwright().start()
         launch_args = {"headless": PLAYWRIGHT_HEADLESS, "args": ["--no-sandbox", "--disable-blink-features=AutomationControlled"]}
         executable_path = _resolve_browser_executable()
         if executable_path:
@@ -65,33 +90,54 @@ class PlaywrightLoginManager:
             logger.info(f"[Login] Using browser executable: {executable_path}")
         else:
             logger.info("[Login] Using bundled Playwright Chromium (no local browser configured)")
-        browser = await p.chromium.launch(**launch_args)
+        return await cls._playwright.chromium.launch(**launch_args)
+
+    @staticmethod
+    async def _new_context(browser, **_):
         context = await browser.new_context(
             viewport={'width': 1280, 'height': 800},
             user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         )
         await context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        page = await context.new_page()
+        return context
+
+    @classmethod
+    async def create_browser(cls, session_id: str):
+        await cls.evict_idle()
+        lease = await cls._browser_pool().acquire_context()
+        try:
+            page = await lease.context.new_page()
+        except BaseException:
+            await lease.close()
+            raise
         PLAYWRIGHT_SESSIONS[session_id] = {
-            "playwright": p,
-            "browser": browser,
-            "context": context,
+            "lease": lease,
+            "context": lease.context,
             "page": page,
             "created_at": time.time()
         }
         return page
 
+    @classmethod
+    async def evict_idle(cls, ttl: Optional[float] = None) -> int:
+        """回收超过 TTL 仍未结束的登录会话（被放弃的二维码），归还浏览器槽位"""
+        ttl = ttl if ttl is not None else float(os.getenv("LOGIN_POOL_SESSION_TTL", "420"))
+        now = time.time()
+        stale = [sid for sid, s in PLAYWRIGHT_SESSIONS.items() if now - s.get("created_at", now) > ttl]
+        for sid in stale:
+            logger.info(f"[Login] Evicting idle login session: {sid[:8]}")
+            await cls.cleanup_session(sid)
+        return len(stale)
+
     @staticmethod
     async def cleanup_session(session_id: str):
-        s = PLAYWRIGHT_SESSIONS.get(session_id)
+        s = PLAYWRIGHT_SESSIONS.pop(session_id, None)
         if not s:
             return
         try:
-            await s["browser"].close()
-            await s["playwright"].stop()
+            await s["lease"].close()
         except Exception:
             pass
-        PLAYWRIGHT_SESSIONS.pop(session_id, None)
 
 
 def _b64_png_from_buffer(buf: bytes) -> str:
@@ -6,7 +6,7 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional
 import json
-from fastapi_app.db.runtime import mysql_enabled, sa_connection
+from fastapi_app.db.runtime import async_sa_connection, mysql_enabled
 from sqlalchemy import text
 from fastapi_app.cache.redis_client import get_redis
 
@@ -48,20 +48,20 @@ async def get_dashboard_stats():
 
         # 获取素材/任务统计
         if mysql_enabled():
-            with sa_connection() as conn:
+            async with async_sa_connection() as conn:
                 # total_materials / status breakdown
-                total_materials = conn.execute(text("SELECT COUNT(*) AS c FROM file_records")).mappings().one()["c"]
-                material_rows = conn.execute(text("SELECT status, COUNT(*) AS c FROM file_records GROUP BY status")).mappings().all()
+                total_materials = (await conn.execute(text("SELECT COUNT(*) AS c FROM file_records"))).mappings().one()["c"]
+                material_rows = (await conn.execute(text("SELECT status, COUNT(*) AS c FROM file_records GROUP BY status"))).mappings().all()
                 material_status = {row["status"]: row["c"] for row in material_rows if row.get("status") is not None}
-                last_upload_row = conn.execute(text("SELECT MAX(upload_time) AS t FROM file_records")).mappings().one()
+                last_upload_row = (await conn.execute(text("SELECT MAX(upload_time) AS t FROM file_records"))).mappings().one()
                 last_upload = last_upload_row.get("t")
 
-                todays_publish = conn.execute(
+                todays_publish = (await conn.execute(
                     text("SELECT COUNT(*) AS c FROM publish_tasks WHERE date(created_at) = date(now()) AND status = 'success'")
-                ).mappings().one()["c"]
-                pending_alerts = conn.execute(
+                )).mappings().one()["c"]
+                pending_alerts = (await conn.execute(
                     text("SELECT COUNT(*) AS c FROM publish_tasks WHERE status = 'error'")
-                ).mappings().one()["c"]
+                )).mappings().one()["c"]
         else:
             with sqlite3.connect(DB_PATH) as conn:
                 cursor = conn.cursor()
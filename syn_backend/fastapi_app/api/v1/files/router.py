@@ -3,7 +3,7 @@ import uuid
 import asyncio
 from datetime import datetime, timezone
 from pathlib import Path
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request, status
 from typing import Optional
 from fastapi_app.db.session import main_db_pool
 from fastapi_app.schemas.file import (
@@ -13,6 +13,12 @@ from fastapi_app.schemas.file import (
 )
 from fastapi_app.schemas.common import Response
 from fastapi_app.api.v1.files.services import FileService
+from fastapi_app.api.v1.files.uploads import (
+    StreamedFile,
+    commit_temp_file,
+    get_chunked_upload_manager,
+    stream_upload_to_temp,
+)
 from fastapi_app.core.exceptions import NotFoundException, BadRequestException
 from fastapi_app.core.logger import logger
 from fastapi_app.core.config import settings
@@ -282,6 +288,77 @@ async def get_ai_cover_job(job_id: str):
     return Response(success=True, data=data)
 
 
+def _display_filename(original: str, custom: Optional[str]) -> str:
+    """自定义显示文件名（去掉路径、缺扩展名时沿用原扩展名）"""
+    if custom:
+        raw_custom = custom.strip()
+        if raw_custom:
+            safe_custom = Path(raw_custom).name  # prevent path traversal
+            if not Path(safe_custom).suffix:
+                safe_custom = f"{safe_custom}{Path(original).suffix}"
+            return safe_custom
+    return original
+
+
+async def _save_streamed_file(
+    db,
+    service: FileService,
+    streamed: StreamedFile,
+    original_filename: str,
+    filename: Optional[str],
+    note: Optional[str],
+    group: Optional[str],
+) -> dict:
+    """临时文件 -> 原子移动到素材目录 -> 写入数据库记录 -> 首帧预览"""
+    file_path = None
+    try:
+        if not service.validate_disk_space(streamed.size_mb):
+            raise BadRequestException("磁盘空间不足")
+
+        display_filename = _display_filename(original_filename, filename)
+        file_path = commit_temp_file(streamed.path, original_filename)
+
+        # Save database record - ⚠️ 只存储文件名（相对路径），便于跨机器迁移
+        file_id = await service.save_file_record(
+            db,
+            filename=display_filename,
+            file_path=file_path.name,  # 只存储文件名，如 "abc123.mp4"
+            filesize_mb=streamed.size_mb,
+            note=note,
+            group_name=group
+        )
+    except BaseException:
+        # Cleanup file if database save fails
+        streamed.path.unlink(missing_ok=True)
+        if file_path is not None:
+            file_path.unlink(missing_ok=True)
+        raise
+
+    # 🆕 自动生成首帧预览图（异步，不阻塞响应）
+    cover_path = None
+    try:
+        cover_path = await service.ensure_first_frame(db, file_id)
+        logger.info(f"首帧预览图已生成: {cover_path}")
+    except Exception as e:
+        logger.warning(f"生成首帧预览图失败（不影响上传）: {e}")
+
+    logger.info(
+        f"File uploaded and saved: {original_filename} -> {file_path} "
+        f"({streamed.size_mb:.2f}MB, ID: {file_id})"
+    )
+
+    return {
+        "id": file_id,
+        "filename": display_filename,
+        "file_path": str(file_path),
+        "size_mb": round(streamed.size_mb, 2),
+        "sha256": streamed.sha256,
+        "note": note,
+        "group_name": group,
+        "cover_path": cover_path  # 🆕 返回首帧预览图路径
+    }
+
+
 @router.post(
     "/upload",
     response_model=Response,
@@ -290,42 +367,32 @@ async def get_ai_cover_job(job_id: str):
     仅上传文件到服务器，不创建数据库记录。
 
     限制:
-    - 最大文件大小: 160MB
+    - 最大文件大小: 160MB（UPLOAD_MAX_SIZE_MB）
     - 支持格式: mp4, mov, avi, mkv等视频格式
+    - 更大的文件请使用分片上传接口 /files/uploads/*
     """
 )
 async def upload_file(
     file: UploadFile = File(..., description="要上传的文件"),
     service: FileService = Depends(get_file_service)
 ):
-    """简单文件上传"""
+    """简单文件上传（流式落盘）"""
+    streamed = None
     try:
         # Validate file
         if not file.filename:
             raise BadRequestException("文件名不能为空")
 
-        # Calculate file size
-        content = await file.read()
-        filesize_mb = len(content) / (1024 * 1024)
-
-        # Validate size (160MB limit)
-        if filesize_mb > 160:
-            raise BadRequestException(f"文件过大: {filesize_mb:.2f}MB，限制160MB")
+        # 分块写入临时文件，边写边校验大小并计算 sha256
+        streamed = await stream_upload_to_temp(file)
 
         # Validate disk space
-        if not service.validate_disk_space(filesize_mb):
+        if not service.validate_disk_space(streamed.size_mb):
             raise BadRequestException("磁盘空间不足")
 
-        # Generate unique filename
-        ext = Path(file.filename).suffix
-        unique_filename = f"{uuid.uuid4()}{ext}"
-        file_path = Path(settings.VIDEO_FILES_DIR) / unique_filename
-
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(content)
+        file_path = commit_temp_file(streamed.path, file.filename)
 
-        logger.info(f"File uploaded: {file.filename} -> {file_path} ({filesize_mb:.2f}MB)")
+        logger.info(f"File uploaded: {file.filename} -> {file_path} ({streamed.size_mb:.2f}MB)")
 
         return Response(
             success=True,
@@ -333,11 +400,14 @@ async def upload_file(
             data={
                 "filename": file.filename,
                 "saved_path": str(file_path),
-                "size_mb": round(filesize_mb, 2)
+                "size_mb": round(streamed.size_mb, 2),
+                "sha256": streamed.sha256,
             }
         )
 
     except Exception as e:
+        if streamed is not None:
+            streamed.path.unlink(missing_ok=True)
         logger.error(f"File upload error: {e}")
         if isinstance(e, (BadRequestException, NotFoundException)):
             raise
@@ -371,84 +441,122 @@ async def upload_and_save(
         if not file.filename:
             raise BadRequestException("文件名不能为空")
 
-        # Calculate file size
-        content = await file.read()
-        filesize_mb = len(content) / (1024 * 1024)
+        streamed = await stream_upload_to_temp(file)
+        data = await _save_streamed_file(db, service, streamed, file.filename, filename, note, group)
 
-        # Validate size (160MB limit)
-        if filesize_mb > 160:
-            raise BadRequestException(f"文件过大: {filesize_mb:.2f}MB，限制160MB")
+        return Response(success=True, message="文件上传并保存成功", data=data)
 
-        # Validate disk space
-        if not service.validate_disk_space(filesize_mb):
-            raise BadRequestException("磁盘空间不足")
+    except Exception as e:
+        logger.error(f"Upload and save error: {e}")
+        if isinstance(e, (BadRequestException, NotFoundException)):
+            raise
+        raise HTTPException(status_code=500, detail=f"操作失败: {str(e)}")
 
-        # Optional display filename (sanitize, keep extension)
-        display_filename = file.filename
-        if filename:
-            raw_custom = filename.strip()
-            if raw_custom:
-                safe_custom = Path(raw_custom).name  # prevent path traversal
-                if not Path(safe_custom).suffix:
-                    safe_custom = f"{safe_custom}{Path(file.filename).suffix}"
-                display_filename = safe_custom
-
-        # Generate unique filename
-        ext = Path(file.filename).suffix
-        unique_filename = f"{uuid.uuid4()}{ext}"
-        file_path = Path(settings.VIDEO_FILES_DIR) / unique_filename
-
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(content)
 
-        # Save database record - ⚠️ 只存储文件名（相对路径），便于跨机器迁移
-        file_id = await service.save_file_record(
-            db,
-            filename=display_filename,
-            file_path=unique_filename,  # 只存储文件名，如 "abc123.mp4"
-            filesize_mb=filesize_mb,
-            note=note,
-            group_name=group
-        )
+class ChunkedUploadInitRequest(BaseModel):
+    filename: str = Field(..., description="原始文件名（用于扩展名与显示）")
+    total_size: int = Field(..., gt=0, description="文件总字节数")
+    chunk_size: Optional[int] = Field(None, description="分片大小（字节），默认 UPLOAD_MULTIPART_CHUNK_SIZE")
+    sha256: Optional[str] = Field(None, description="整个文件的 sha256（可选，complete 时校验）")
 
-        # 🆕 自动生成首帧预览图（异步，不阻塞响应）
-        cover_path = None
-        try:
-            cover_path = await service.ensure_first_frame(db, file_id)
-            logger.info(f"首帧预览图已生成: {cover_path}")
-        except Exception as e:
-            logger.warning(f"生成首帧预览图失败（不影响上传）: {e}")
-
-        logger.info(
-            f"File uploaded and saved: {file.filename} -> {file_path} "
-            f"({filesize_mb:.2f}MB, ID: {file_id})"
-        )
 
-        return Response(
-            success=True,
-            message="文件上传并保存成功",
-            data={
-                "id": file_id,
-                "filename": display_filename,
-                "file_path": str(file_path),
-                "size_mb": round(filesize_mb, 2),
-                "note": note,
-                "group_name": group,
-                "cover_path": cover_path  # 🆕 返回首帧预览图路径
-            }
-        )
+class ChunkedUploadCompleteRequest(BaseModel):
+    save_record: bool = Field(True, description="是否创建素材记录（false 时仅落盘）")
+    filename: Optional[str] = Field(None, description="自定义显示文件名")
+    note: Optional[str] = None
+    group: Optional[str] = None
 
-    except Exception as e:
-        # Cleanup file if database save fails
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
 
-        logger.error(f"Upload and save error: {e}")
+@router.post(
+    "/uploads/init",
+    response_model=Response,
+    summary="分片上传：创建会话",
+    description="""
+    创建分片上传会话，返回 upload_id、chunk_size 与 total_chunks。
+
+    流程：init -> PUT /uploads/{upload_id}/chunks/{index}（可并行、失败可单片重试）
+    -> GET /uploads/{upload_id} 查询缺失分片 -> POST /uploads/{upload_id}/complete
+    """
+)
+async def init_chunked_upload(req: ChunkedUploadInitRequest):
+    manager = get_chunked_upload_manager()
+    meta = await asyncio.to_thread(manager.init, req.filename, req.total_size, req.chunk_size, req.sha256)
+    return Response(success=True, data=meta)
+
+
+@router.put(
+    "/uploads/{upload_id}/chunks/{index}",
+    response_model=Response,
+    summary="分片上传：上传单个分片",
+    description="请求体为分片原始字节（application/octet-stream）；可选请求头 X-Chunk-Sha256 用于校验",
+)
+async def put_upload_chunk(upload_id: str, index: int, request: Request):
+    manager = get_chunked_upload_manager()
+    data = await manager.write_chunk(
+        upload_id,
+        index,
+        request.stream(),
+        sha256=request.headers.get("x-chunk-sha256"),
+    )
+    return Response(success=True, data=data)
+
+
+@router.get(
+    "/uploads/{upload_id}",
+    response_model=Response,
+    summary="分片上传：查询会话状态（已收/缺失分片）",
+)
+async def get_chunked_upload(upload_id: str):
+    manager = get_chunked_upload_manager()
+    return Response(success=True, data=await asyncio.to_thread(manager.status, upload_id))
+
+
+@router.post(
+    "/uploads/{upload_id}/complete",
+    response_model=Response,
+    summary="分片上传：合并分片并保存",
+)
+async def complete_chunked_upload(
+    upload_id: str,
+    req: ChunkedUploadCompleteRequest,
+    db=Depends(get_db),
+    service: FileService = Depends(get_file_service),
+):
+    manager = get_chunked_upload_manager()
+    meta, streamed = await manager.complete(upload_id)
+    try:
+        if req.save_record:
+            data = await _save_streamed_file(
+                db, service, streamed, meta["filename"], req.filename, req.note, req.group
+            )
+        else:
+            file_path = commit_temp_file(streamed.path, meta["filename"])
+            data = {
+                "filename": meta["filename"],
+                "saved_path": str(file_path),
+                "size_mb": round(streamed.size_mb, 2),
+                "sha256": streamed.sha256,
+            }
+    except Exception as e:
+        streamed.path.unlink(missing_ok=True)
+        logger.error(f"Chunked upload complete error: {e}")
         if isinstance(e, (BadRequestException, NotFoundException)):
             raise
         raise HTTPException(status_code=500, detail=f"操作失败: {str(e)}")
 
+    return Response(success=True, message="文件上传成功", data=data)
+
+
+@router.delete(
+    "/uploads/{upload_id}",
+    response_model=Response,
+    summary="分片上传：取消会话并删除已上传分片",
+)
+async def abort_chunked_upload(upload_id: str):
+    manager = get_chunked_upload_manager()
+    await asyncio.to_thread(manager.abort, upload_id)
+    return Response(success=True, message="上传已取消")
+
 
 @router.patch(
     "/{file_id}/rename",
@@ -577,6 +685,30 @@ async def delete_group(
     return Response(success=True, message="分组已删除", data={"updated": updated})
 
 
+@router.get(
+    "/metadata/backfill",
+    response_model=Response,
+    summary="元数据回填状态",
+)
+async def metadata_backfill_status():
+    from fastapi_app.services.file_metadata_backfill import get_metadata_backfill
+
+    return Response(success=True, data=get_metadata_backfill().get_status())
+
+
+@router.post(
+    "/metadata/backfill",
+    response_model=Response,
+    summary="立即执行元数据回填",
+    description="补齐缺失的文件大小、时长、分辨率（后台进程池 ffprobe，批量写库）。"
+)
+async def run_metadata_backfill():
+    from fastapi_app.services.file_metadata_backfill import get_metadata_backfill
+
+    result = await asyncio.to_thread(get_metadata_backfill().run_once)
+    return Response(success=True, message="元数据回填完成", data=result)
+
+
 @router.post(
     "/sync",
     response_model=Response,
@@ -5,7 +5,6 @@ from typing import List, Optional
 from pathlib import Path
 import json
 import subprocess
-import math
 import warnings
 import asyncio
 from functools import partial
@@ -16,7 +15,7 @@ from fastapi_app.core.config import settings
 from fastapi_app.core.exceptions import NotFoundException, BadRequestException
 from fastapi_app.schemas.file import FileResponse, FileListResponse, FileStatsResponse, FileUpdate
 from fastapi_app.core.logger import logger
-from fastapi_app.db.runtime import mysql_enabled, sa_connection
+from fastapi_app.db.runtime import async_sa_connection, mysql_enabled
 from fastapi_app.cache.redis_client import get_redis
 from fastapi_app.core.timezone_utils import now_beijing_naive, now_beijing_iso
 from utils.video_frames import extract_first_frame
@@ -330,11 +329,11 @@ class FileService:
         Uses async semaphore to limit concurrent ffmpeg processes.
         """
         if mysql_enabled():
-            with sa_connection() as conn:
-                row = conn.execute(
+            async with async_sa_connection() as conn:
+                row = (await conn.execute(
                     text("SELECT id, file_path FROM file_records WHERE id = :id"),
                     {"id": file_id},
-                ).mappings().first()
+                )).mappings().first()
                 if not row:
                     raise NotFoundException(f"文件不存在: ID {file_id}")
 
@@ -391,17 +390,17 @@ class FileService:
             where_sql = " AND ".join(where)
             order_sql = " ORDER BY upload_time DESC, id DESC"
 
-            with sa_connection() as conn:
-                total = conn.execute(
+            async with async_sa_connection() as conn:
+                total = (await conn.execute(
                     text(f"SELECT COUNT(*) AS cnt FROM file_records WHERE {where_sql}"),
                     params,
-                ).mappings().one()["cnt"]
+                )).mappings().one()["cnt"]
 
                 sql = f"SELECT * FROM file_records WHERE {where_sql}{order_sql}"
                 if limit > 0:
                     sql += " LIMIT :limit OFFSET :offset"
                     params = {**params, "limit": int(limit), "offset": int(skip)}
-                rows = conn.execute(text(sql), params).mappings().all()
+                rows = (await conn.execute(text(sql), params)).mappings().all()
 
             items: List[FileResponse] = []
             for row in rows:
@@ -480,46 +479,19 @@ class FileService:
         rows = cursor.fetchall()
 
         files = []
+        needs_backfill = []
         for row in rows:
             # Convert Row to dict for easier access
             row_dict = dict(row)
 
-            # Best-effort 修复缺失/异常的 filesize、duration（避免前端出现 NaN / 不显示时长）
-            try:
-                stored_path = row_dict.get("file_path")
-                resolved_path = self._resolve_video_path(stored_path) if isinstance(stored_path, str) else None
-                if resolved_path and Path(resolved_path).exists():
-                    filesize = row_dict.get("filesize")
-                    if not isinstance(filesize, (int, float)) or (isinstance(filesize, float) and (math.isnan(filesize) or not math.isfinite(filesize))) or filesize <= 0:
-                        corrected = Path(resolved_path).stat().st_size / (1024 * 1024)
-                        row_dict["filesize"] = corrected
-                        cursor.execute("UPDATE file_records SET filesize = ? WHERE id = ?", (corrected, row_dict["id"]))
-                        db.commit()
-
-                    if row_dict.get("duration") is None:
-                        meta = self._probe_video_metadata(resolved_path)
-                        duration = meta.get("duration")
-                        if duration:
-                            row_dict["duration"] = duration
-                            cursor.execute("UPDATE file_records SET duration = ? WHERE id = ?", (duration, row_dict["id"]))
-                            db.commit()
-
-                    if row_dict.get("video_width") is None or row_dict.get("video_height") is None:
-                        meta = self._probe_video_metadata(resolved_path)
-                        w, h = meta.get("width"), meta.get("height")
-                        ar, ori = meta.get("aspect_ratio"), meta.get("orientation")
-                        if w and h:
-                            row_dict["video_width"] = w
-                            row_dict["video_height"] = h
-                            row_dict["aspect_ratio"] = ar
-                            row_dict["orientation"] = ori
-                            cursor.execute(
-                                "UPDATE file_records SET video_width = ?, video_height = ?, aspect_ratio = ?, orientation = ? WHERE id = ?",
-                                (w, h, ar, ori, row_dict["id"]),
-                            )
-                            db.commit()
-            except Exception:
-                pass
+            # 缺失的 filesize/duration/分辨率由后台回填服务补齐，列表接口只读
+            if (
+                row_dict.get("duration") is None
+                or row_dict.get("video_width") is None
+                or row_dict.get("video_height") is None
+                or not row_dict.get("filesize")
+            ):
+                needs_backfill.append(row_dict["id"])
 
             files.append(FileResponse(
                 id=row_dict['id'],
@@ -547,17 +519,21 @@ class FileService:
                 orientation=row_dict.get("orientation"),
             ))
 
+        if needs_backfill:
+            from fastapi_app.services.file_metadata_backfill import get_metadata_backfill
+            get_metadata_backfill().trigger(needs_backfill)
+
         return FileListResponse(total=total, items=files)
 
     async def get_file(self, db, file_id: int) -> Optional[FileResponse]:
         """Get single file by ID"""
         if mysql_enabled():
             warnings.warn("SQLite file_records path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
-                row = conn.execute(
+            async with async_sa_connection() as conn:
+                row = (await conn.execute(
                     text("SELECT * FROM file_records WHERE id = :id"),
                     {"id": file_id},
-                ).mappings().first()
+                )).mappings().first()
             if not row:
                 return None
             row_dict = dict(row)
@@ -644,11 +620,13 @@ class FileService:
             aspect_ratio = meta.get("aspect_ratio")
             orientation = meta.get("orientation")
 
-            with sa_connection() as conn:
-                self._ensure_file_record_columns_mysql(conn)
+            # 补列会自行 commit，放在单独的事务里，避免之后的 INSERT 落在已关闭的事务上
+            async with async_sa_connection() as conn:
+                await conn.run_sync(self._ensure_file_record_columns_mysql)
+            async with async_sa_connection() as conn:
                 file_id = None
                 try:
-                    res = conn.execute(
+                    res = await conn.execute(
                         text(
                             """
                             INSERT INTO file_records (
@@ -681,7 +659,7 @@ class FileService:
                     # Backward compatible fallback: if schema migration fails (no privileges / different schema),
                     # insert without new columns.
                     logger.warning(f"[FileService] MySQL insert with video metadata failed, fallback to base columns: {e}")
-                    res = conn.execute(
+                    res = await conn.execute(
                         text(
                             """
                             INSERT INTO file_records (
@@ -828,12 +806,12 @@ class FileService:
         rel = self._cover_rel_path(out_name)
 
         if mysql_enabled():
-            with sa_connection() as conn:
-                conn.execute(
+            async with async_sa_connection() as conn:
+                await conn.execute(
                     text("UPDATE file_records SET cover_image = :c WHERE id = :id"),
                     {"c": rel, "id": file_id},
                 )
-                conn.commit()
+                await conn.commit()
         else:
             cursor = db.cursor()
             self._ensure_file_record_columns(cursor, db)
@@ -896,11 +874,11 @@ class FileService:
             if not updates:
                 return True
 
-            with sa_connection() as conn:
-                exists = conn.execute(text("SELECT 1 FROM file_records WHERE id = :id"), {"id": file_id}).first()
+            async with async_sa_connection() as conn:
+                exists = (await conn.execute(text("SELECT 1 FROM file_records WHERE id = :id"), {"id": file_id})).first()
                 if not exists:
                     return False
-                conn.execute(text(f"UPDATE file_records SET {', '.join(updates)} WHERE id = :id"), params)
+                await conn.execute(text(f"UPDATE file_records SET {', '.join(updates)} WHERE id = :id"), params)
 
             logger.info(f"File record updated (MySQL): ID {file_id}")
             return True
@@ -977,15 +955,15 @@ class FileService:
         """List distinct non-empty group names."""
         if mysql_enabled():
             warnings.warn("SQLite file_records path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
-                rows = conn.execute(
+            async with async_sa_connection() as conn:
+                rows = (await conn.execute(
                     text(
                         "SELECT DISTINCT group_name "
                         "FROM file_records "
                         "WHERE group_name IS NOT NULL AND group_name != '' "
                         "ORDER BY group_name"
                     )
-                ).all()
+                )).all()
             return [r[0] for r in rows if r and r[0]]
 
         cursor = db.cursor()
@@ -1010,12 +988,12 @@ class FileService:
 
         if mysql_enabled():
             warnings.warn("SQLite file_records path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
-                res = conn.execute(
+            async with async_sa_connection() as conn:
+                res = await conn.execute(
                     text("UPDATE file_records SET group_name = :to WHERE group_name = :from"),
                     {"from": from_name, "to": to_name},
                 )
-                conn.commit()
+                await conn.commit()
                 return int(getattr(res, "rowcount", 0) or 0)
 
         cursor = db.cursor()
@@ -1035,12 +1013,12 @@ class FileService:
 
         if mysql_enabled():
             warnings.warn("SQLite file_records path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
-                res = conn.execute(
+            async with async_sa_connection() as conn:
+                res = await conn.execute(
                     text("UPDATE file_records SET group_name = NULL WHERE group_name = :name"),
                     {"name": name},
                 )
-                conn.commit()
+                await conn.commit()
                 return int(getattr(res, "rowcount", 0) or 0)
 
         cursor = db.cursor()
@@ -1072,12 +1050,12 @@ class FileService:
 
         if mysql_enabled():
             warnings.warn("SQLite file_records path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
+            async with async_sa_connection() as conn:
                 # 查询现有文件信息
-                row = conn.execute(
+                row = (await conn.execute(
                     text("SELECT id, filename, file_path FROM file_records WHERE id = :id"),
                     {"id": file_id},
-                ).mappings().first()
+                )).mappings().first()
 
                 if not row:
                     return False
@@ -1102,7 +1080,7 @@ class FileService:
                             logger.info(f"File renamed on disk: {old_full_path} -> {new_full_path}")
 
                             # 更新数据库中的 file_path（只存储文件名）
-                            conn.execute(
+                            await conn.execute(
                                 text("UPDATE file_records SET filename = :filename, file_path = :file_path WHERE id = :id"),
                                 {"filename": safe_new_filename, "file_path": safe_new_filename, "id": file_id},
                             )
@@ -1111,18 +1089,18 @@ class FileService:
                             raise BadRequestException(f"重命名文件失败: {str(e)}")
                     else:
                         # 文件不存在，仅更新数据库
-                        conn.execute(
+                        await conn.execute(
                             text("UPDATE file_records SET filename = :filename WHERE id = :id"),
                             {"filename": safe_new_filename, "id": file_id},
                         )
                 else:
                     # 仅更新数据库中的 filename（显示名称）
-                    conn.execute(
+                    await conn.execute(
                         text("UPDATE file_records SET filename = :filename WHERE id = :id"),
                         {"filename": safe_new_filename, "id": file_id},
                     )
 
-                conn.commit()
+                await conn.commit()
                 logger.info(f"File record renamed (MySQL): ID {file_id}, old: {old_filename}, new: {safe_new_filename}")
                 return True
 
@@ -1187,11 +1165,11 @@ class FileService:
 
         if mysql_enabled():
             warnings.warn("SQLite file_records path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
-                row = conn.execute(
+            async with async_sa_connection() as conn:
+                row = (await conn.execute(
                     text("SELECT file_path FROM file_records WHERE id = :id"),
                     {"id": file_id},
-                ).mappings().first()
+                )).mappings().first()
                 if not row:
                     logger.warning(f"[FileService] File not found: file_id={file_id}")
                     return False
@@ -1199,8 +1177,8 @@ class FileService:
                 logger.info(f"[FileService] Found file record: stored_path={stored_path}")
 
                 # Delete database record first
-                conn.execute(text("DELETE FROM file_records WHERE id = :id"), {"id": file_id})
-                conn.commit()
+                await conn.execute(text("DELETE FROM file_records WHERE id = :id"), {"id": file_id})
+                await conn.commit()
                 logger.info(f"[FileService] Database record deleted: file_id={file_id}")
 
             # Then delete physical file (non-blocking, with proper path resolution)
@@ -1282,12 +1260,12 @@ class FileService:
 
         if mysql_enabled():
             warnings.warn("SQLite file_records path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
+            async with async_sa_connection() as conn:
                 # 批量查询所有文件路径
                 placeholders = ", ".join([":id" + str(i) for i in range(len(file_ids))])
                 params = {f"id{i}": file_id for i, file_id in enumerate(file_ids)}
                 query = f"SELECT id, file_path FROM file_records WHERE id IN ({placeholders})"
-                rows = conn.execute(text(query), params).mappings().fetchall()
+                rows = (await conn.execute(text(query), params)).mappings().fetchall()
 
                 # 构建路径映射
                 file_path_map = {row["id"]: row["file_path"] for row in rows}
@@ -1296,8 +1274,8 @@ class FileService:
                 # 批量删除数据库记录
                 if file_path_map:
                     delete_query = f"DELETE FROM file_records WHERE id IN ({placeholders})"
-                    conn.execute(text(delete_query), params)
-                    conn.commit()
+                    await conn.execute(text(delete_query), params)
+                    await conn.commit()
                     logger.info(f"[FileService] Database records deleted: {len(file_path_map)} files")
 
             # 批量删除物理文件
@@ -1385,11 +1363,11 @@ class FileService:
         """Get file statistics"""
         if mysql_enabled():
             warnings.warn("SQLite file_records path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
-                total_files = conn.execute(text("SELECT COUNT(*) AS c FROM file_records")).mappings().one()["c"]
-                pending_files = conn.execute(text("SELECT COUNT(*) AS c FROM file_records WHERE status = 'pending'")).mappings().one()["c"]
-                published_files = conn.execute(text("SELECT COUNT(*) AS c FROM file_records WHERE status = 'published'")).mappings().one()["c"]
-                total_size_mb = conn.execute(text("SELECT COALESCE(SUM(filesize), 0) AS s FROM file_records")).mappings().one()["s"]
+            async with async_sa_connection() as conn:
+                total_files = (await conn.execute(text("SELECT COUNT(*) AS c FROM file_records"))).mappings().one()["c"]
+                pending_files = (await conn.execute(text("SELECT COUNT(*) AS c FROM file_records WHERE status = 'pending'"))).mappings().one()["c"]
+                published_files = (await conn.execute(text("SELECT COUNT(*) AS c FROM file_records WHERE status = 'published'"))).mappings().one()["c"]
+                total_size_mb = (await conn.execute(text("SELECT COALESCE(SUM(filesize), 0) AS s FROM file_records"))).mappings().one()["s"]
 
             avg_size_mb = (total_size_mb / total_files) if total_files else 0
             return FileStatsResponse(
@@ -1458,8 +1436,8 @@ class FileService:
         """
         if mysql_enabled():
             warnings.warn("SQLite file_records path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
-                rows = conn.execute(text("SELECT filename FROM file_records")).mappings().all()
+            async with async_sa_connection() as conn:
+                rows = (await conn.execute(text("SELECT filename FROM file_records"))).mappings().all()
                 existing_filenames = {r.get("filename") for r in rows if r.get("filename")}
         else:
             cursor = db.cursor()
@@ -1518,8 +1496,8 @@ class FileService:
                 duration = self._probe_duration_seconds(str(file_path))
                 
                 if mysql_enabled():
-                    with sa_connection() as conn:
-                        conn.execute(
+                    async with async_sa_connection() as conn:
+                        await conn.execute(
                             text(
                                 """
                                 INSERT INTO file_records (
@@ -0,0 +1,312 @@
+"""
+素材上传的流式落盘与分片续传
+
+- 普通上传：UploadFile 按固定块大小复制到 VIDEO_FILES_DIR/.uploads 下的临时文件，
+  边写边累计大小（超限立即中止）并计算 sha256，完成后 os.replace 原子移动到目标位置
+- 分片上传：init 创建会话 -> PUT 各分片（可并行、可单独重试）-> complete 按序合并并校验
+
+临时文件与分片会话都放在 VIDEO_FILES_DIR 下的隐藏目录中：
+与最终文件同一文件系统（rename 原子），且素材同步扫描会跳过以 "." 开头的条目。
+"""
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional
+
+from fastapi import UploadFile
+
+from fastapi_app.core.config import settings
+from fastapi_app.core.exceptions import BadRequestException, NotFoundException
+from fastapi_app.core.logger import logger
+
+
+_SESSION_META = "session.json"
+
+
+@dataclass
+class StreamedFile:
+    """已落盘的上传结果"""
+    path: Path
+    size: int
+    sha256: str
+
+    @property
+    def size_mb(self) -> float:
+        return self.size / (1024 * 1024)
+
+
+def _staging_dir() -> Path:
+    path = Path(settings.VIDEO_FILES_DIR) / ".uploads"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _too_large(limit_mb: int, size: int) -> BadRequestException:
+    return BadRequestException(f"文件过大: {size / (1024 * 1024):.2f}MB，限制{limit_mb}MB")
+
+
+def _copy_with_hash(src: BinaryIO, dest: Path, limit_bytes: int, limit_mb: int, chunk_size: int) -> StreamedFile:
+    """线程内执行：分块复制并计算 sha256，超过上限立即中止"""
+    hasher = hashlib.sha256()
+    size = 0
+    with open(dest, "wb") as out:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit_bytes:
+                raise _too_large(limit_mb, size)
+            hasher.update(chunk)
+            out.write(chunk)
+    return StreamedFile(path=dest, size=size, sha256=hasher.hexdigest())
+
+
+async def stream_upload_to_temp(file: UploadFile, max_size_mb: Optional[int] = None) -> StreamedFile:
+    """
+    将 UploadFile 流式写入临时文件（不整体读入内存、不阻塞事件循环）
+
+    Raises:
+        BadRequestException: 文件超过大小限制（临时文件已删除）
+    """
+    limit_mb = max_size_mb or settings.UPLOAD_MAX_SIZE_MB
+    limit_bytes = limit_mb * 1024 * 1024
+    # 客户端声明了大小时提前拒绝，避免白白写盘
+    if file.size is not None and file.size > limit_bytes:
+        raise _too_large(limit_mb, file.size)
+
+    temp_path = _staging_dir() / f"{uuid.uuid4().hex}.part"
+    try:
+        await file.seek(0)
+        return await asyncio.to_thread(
+            _copy_with_hash, file.file, temp_path, limit_bytes, limit_mb, settings.UPLOAD_CHUNK_SIZE
+        )
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def commit_temp_file(temp_path: Path, filename: str) -> Path:
+    """将临时文件原子移动到 VIDEO_FILES_DIR/<uuid><ext>"""
+    ext = Path(filename).suffix
+    target = Path(settings.VIDEO_FILES_DIR) / f"{uuid.uuid4()}{ext}"
+    os.replace(temp_path, target)
+    return target
+
+
+class ChunkedUploadManager:
+    """
+    分片上传会话管理
+
+    每个会话一个目录：session.json 记录文件名、总大小、分片大小等；
+    分片写入 part-<index>，先写 .tmp 再 rename，重传同一分片会覆盖旧数据。
+    """
+
+    def __init__(self, root: Optional[Path] = None, ttl_hours: Optional[int] = None):
+        self.root = root or (_staging_dir() / "chunked")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = (ttl_hours or settings.UPLOAD_SESSION_TTL_HOURS) * 3600
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    # ------------------------------------------------------------------ session
+
+    def _session_dir(self, upload_id: str) -> Path:
+        # upload_id 由服务端生成（uuid hex），拒绝任何可能的路径穿越
+        if not upload_id or not upload_id.isalnum():
+            raise NotFoundException("上传会话不存在")
+        return self.root / upload_id
+
+    def _part_path(self, upload_id: str, index: int) -> Path:
+        return self._session_dir(upload_id) / f"part-{index:06d}"
+
+    def _load(self, upload_id: str) -> dict:
+        meta_path = self._session_dir(upload_id) / _SESSION_META
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise NotFoundException("上传会话不存在或已过期")
+
+    def _received(self, upload_id: str, meta: dict) -> List[int]:
+        return [
+            i for i in range(meta["total_chunks"])
+            if self._part_path(upload_id, i).exists()
+        ]
+
+    def init(self, filename: str, total_size: int, chunk_size: Optional[int] = None,
+             sha256: Optional[str] = None) -> dict:
+        if not filename or not Path(filename).name:
+            raise BadRequestException("文件名不能为空")
+        limit_mb = settings.UPLOAD_MULTIPART_MAX_SIZE_MB
+        if total_size <= 0:
+            raise BadRequestException("total_size 必须大于 0")
+        if total_size > limit_mb * 1024 * 1024:
+            raise _too_large(limit_mb, total_size)
+
+        chunk_size = chunk_size or settings.UPLOAD_MULTIPART_CHUNK_SIZE
+        if chunk_size < 256 * 1024:
+            raise BadRequestException("chunk_size 不能小于 256KB")
+
+        self.cleanup_expired()
+
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "upload_id": upload_id,
+            "filename": Path(filename).name,
+            "total_size": total_size,
+            "chunk_size": chunk_size,
+            "total_chunks": (total_size + chunk_size - 1) // chunk_size,
+            "sha256": (sha256 or "").lower() or None,
+            "created_at": time.time(),
+        }
+        session_dir = self._session_dir(upload_id)
+        session_dir.mkdir(parents=True)
+        (session_dir / _SESSION_META).write_text(json.dumps(meta), encoding="utf-8")
+        logger.info(f"[ChunkedUpload] init {upload_id}: {meta['filename']} "
+                    f"{total_size} bytes / {meta['total_chunks']} chunks")
+        return meta
+
+    def status(self, upload_id: str) -> dict:
+        meta = self._load(upload_id)
+        received = self._received(upload_id, meta)
+        return {
+            **meta,
+            "received_chunks": received,
+            "missing_chunks": sorted(set(range(meta["total_chunks"])) - set(received)),
+        }
+
+    def abort(self, upload_id: str) -> None:
+        self._load(upload_id)
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+        self._locks.pop(upload_id, None)
+
+    def cleanup_expired(self) -> int:
+        """删除超过 TTL 未完成的会话"""
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        for session_dir in self.root.iterdir():
+            if not session_dir.is_dir():
+                continue
+            # 目录 mtime 随分片写入更新，活跃会话不会被误删
+            try:
+                if session_dir.stat().st_mtime >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            shutil.rmtree(session_dir, ignore_errors=True)
+            removed += 1
+        if removed:
+            logger.info(f"[ChunkedUpload] 清理过期会话: {removed}")
+        return removed
+
+    # ------------------------------------------------------------------ chunks
+
+    async def write_chunk(self, upload_id: str, index: int, stream: AsyncIterator[bytes],
+                          sha256: Optional[str] = None) -> dict:
+        """
+        写入单个分片（请求体流式读取，按 UPLOAD_CHUNK_SIZE 聚合后在线程中写盘）
+
+        除最后一片外，分片大小必须等于会话的 chunk_size。
+        """
+        meta = self._load(upload_id)
+        total_chunks = meta["total_chunks"]
+        if index < 0 or index >= total_chunks:
+            raise BadRequestException(f"分片序号越界: {index}（共 {total_chunks} 片）")
+
+        chunk_size = meta["chunk_size"]
+        expected = chunk_size if index < total_chunks - 1 else meta["total_size"] - chunk_size * (total_chunks - 1)
+
+        part_path = self._part_path(upload_id, index)
+        tmp_path = part_path.with_name(f"{part_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        hasher = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        fh = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for data in stream:
+                if not data:
+                    continue
+                size += len(data)
+                if size > expected:
+                    raise BadRequestException(f"分片 {index} 大小超出预期 {expected} 字节")
+                hasher.update(data)
+                buffer += data
+                if len(buffer) >= settings.UPLOAD_CHUNK_SIZE:
+                    await asyncio.to_thread(fh.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(fh.write, bytes(buffer))
+            await asyncio.to_thread(fh.close)
+
+            if size != expected:
+                raise BadRequestException(f"分片 {index} 大小不符: 收到 {size}，预期 {expected}")
+            digest = hasher.hexdigest()
+            if sha256 and sha256.lower() != digest:
+                raise BadRequestException(f"分片 {index} 校验失败")
+            os.replace(tmp_path, part_path)
+        except BaseException:
+            fh.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        return {"upload_id": upload_id, "index": index, "size": size, "sha256": digest}
+
+    def _assemble(self, upload_id: str, meta: dict) -> StreamedFile:
+        """线程内执行：按序合并分片到临时文件并计算整体 sha256"""
+        temp_path = _staging_dir() / f"{upload_id}.part"
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, "wb") as out:
+                for i in range(meta["total_chunks"]):
+                    with open(self._part_path(upload_id, i), "rb") as part:
+                        while True:
+                            data = part.read(settings.UPLOAD_CHUNK_SIZE)
+                            if not data:
+                                break
+                            size += len(data)
+                            hasher.update(data)
+                            out.write(data)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return StreamedFile(path=temp_path, size=size, sha256=hasher.hexdigest())
+
+    async def complete(self, upload_id: str) -> tuple[dict, StreamedFile]:
+        """
+        合并全部分片，返回 (会话信息, 临时文件)；调用方负责 commit_temp_file
+
+        同一会话的并发 complete 只会有一个成功，其余得到 NotFoundException。
+        """
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        async with lock:
+            meta = self._load(upload_id)
+            missing = sorted(set(range(meta["total_chunks"])) - set(self._received(upload_id, meta)))
+            if missing:
+                preview = ", ".join(str(i) for i in missing[:20])
+                raise BadRequestException(f"缺少分片: {preview}{' ...' if len(missing) > 20 else ''}")
+
+            streamed = await asyncio.to_thread(self._assemble, upload_id, meta)
+            if streamed.size != meta["total_size"] or (meta.get("sha256") and meta["sha256"] != streamed.sha256):
+                streamed.path.unlink(missing_ok=True)
+                raise BadRequestException("合并后的文件大小或校验值不匹配，请重新上传缺失/损坏的分片")
+
+            await asyncio.to_thread(shutil.rmtree, self._session_dir(upload_id), True)
+        self._locks.pop(upload_id, None)
+        return meta, streamed
+
+
+_chunked_manager: Optional[ChunkedUploadManager] = None
+
+
+def get_chunked_upload_manager() -> ChunkedUploadManager:
+    """获取全局分片上传管理器"""
+    global _chunked_manager
+    if _chunked_manager is None:
+        _chunked_manager = ChunkedUploadManager()
+    return _chunked_manager
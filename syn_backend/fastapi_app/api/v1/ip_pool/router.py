@@ -245,10 +245,12 @@ async def check_ip_health(
 
 @router.post("/check-all")
 async def check_all_health(
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
     service: IPPoolService = Depends(get_ip_pool_service)
 ):
-    """批量检测所有IP健康状态"""
-    results = await service.batch_check_health()
+    """批量并发检测所有IP健康状态（concurrency: 同时检测数, timeout: 单个检测超时秒数）"""
+    results = await service.batch_check_health(concurrency=concurrency, timeout=timeout)
     
     healthy_count = sum(1 for v in results.values() if v)
     total_count = len(results)
@@ -25,7 +25,7 @@ from fastapi_app.api.v1.publish.services import PublishService, get_publish_serv
 from fastapi_app.core.exceptions import NotFoundException, BadRequestException
 from fastapi_app.core.logger import logger
 from fastapi_app.core.config import settings
-from fastapi_app.db.runtime import mysql_enabled, sa_connection
+from fastapi_app.db.runtime import async_sa_connection, mysql_enabled
 import warnings
 from sqlalchemy import text
 
@@ -427,13 +427,13 @@ async def delete_publish_history(
     try:
         if mysql_enabled():
             warnings.warn("SQLite publish_tasks path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
+            async with async_sa_connection() as conn:
                 # 尝试按 task_id 或 celery_task_id 删除
-                result = conn.execute(
+                result = await conn.execute(
                     text("DELETE FROM publish_tasks WHERE task_id = :task_id OR celery_task_id = :task_id"),
                     {"task_id": task_id}
                 )
-                conn.commit()
+                await conn.commit()
 
                 if result.rowcount == 0:
                     raise HTTPException(status_code=404, detail="任务不存在")
@@ -493,21 +493,21 @@ async def get_publish_stats(
     try:
         if mysql_enabled():
             warnings.warn("SQLite publish_tasks path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
-                total_published = conn.execute(text("SELECT COUNT(*) AS c FROM publish_tasks WHERE status = 'success'")).mappings().one()["c"]
-                today_published = conn.execute(text("""
+            async with async_sa_connection() as conn:
+                total_published = (await conn.execute(text("SELECT COUNT(*) AS c FROM publish_tasks WHERE status = 'success'"))).mappings().one()["c"]
+                today_published = (await conn.execute(text("""
                     SELECT COUNT(*) AS c FROM publish_tasks
                     WHERE status = 'success' AND date(created_at) = date(now())
-                """)).mappings().one()["c"]
-                pending_tasks = conn.execute(text("SELECT COUNT(*) AS c FROM publish_tasks WHERE status IN ('pending','retry')")).mappings().one()["c"]
-                failed_tasks = conn.execute(text("SELECT COUNT(*) AS c FROM publish_tasks WHERE status = 'error'")).mappings().one()["c"]
+                """))).mappings().one()["c"]
+                pending_tasks = (await conn.execute(text("SELECT COUNT(*) AS c FROM publish_tasks WHERE status IN ('pending','retry')"))).mappings().one()["c"]
+                failed_tasks = (await conn.execute(text("SELECT COUNT(*) AS c FROM publish_tasks WHERE status = 'error'"))).mappings().one()["c"]
 
-                by_platform_rows = conn.execute(text("""
+                by_platform_rows = (await conn.execute(text("""
                     SELECT platform, COUNT(*) as count
                     FROM publish_tasks
                     WHERE status = 'success'
                     GROUP BY platform
-                """)).mappings().all()
+                """))).mappings().all()
 
             by_platform = {}
             platform_map = {
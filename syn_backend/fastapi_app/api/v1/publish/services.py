@@ -26,7 +26,7 @@ from myUtils.cookie_manager import cookie_manager
 from myUtils.platform_metadata_adapter import format_metadata_for_platform, PLATFORM_CONFIGS
 from fastapi_app.core.logger import logger
 from fastapi_app.core.exceptions import NotFoundException, BadRequestException
-from fastapi_app.db.runtime import mysql_enabled, sa_connection
+from fastapi_app.db.runtime import async_sa_connection, mysql_enabled
 from platforms.path_utils import resolve_cookie_file, resolve_video_file
 
 
@@ -82,11 +82,11 @@ class PublishService:
         """验证文件是否存在"""
         if mysql_enabled():
             warnings.warn("SQLite publish/file path is deprecated; using MySQL via DATABASE_URL", DeprecationWarning)
-            with sa_connection() as conn:
-                row = conn.execute(
+            async with async_sa_connection() as conn:
+                row = (await conn.execute(
                     text("SELECT * FROM file_records WHERE id = :id"),
                     {"id": file_id},
-                ).mappings().first()
+                )).mappings().first()
             if not row:
                 raise NotFoundException(f"文件不存在 ID {file_id}")
             return dict(row)
@@ -955,11 +955,11 @@ class PublishService:
                 params["status"] = status
 
             where_sql = " AND ".join(where)
-            with sa_connection() as conn:
-                rows = conn.execute(
+            async with async_sa_connection() as conn:
+                rows = (await conn.execute(
                     text(f"SELECT * FROM publish_tasks WHERE {where_sql} ORDER BY created_at DESC LIMIT :limit"),
                     params,
-                ).mappings().all()
+                )).mappings().all()
             return [dict(r) for r in rows]
 
         cursor = db.cursor()
@@ -1,6 +1,8 @@
 """
 持久化浏览器配置管理 API
 """
+import asyncio
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
@@ -20,6 +22,8 @@ class ProfileInfo(BaseModel):
     path: str
     size_bytes: int
     size_mb: float
+    cache_mb: float = 0.0  # 其中可再生缓存（可通过 prune-cache 清理）
+    last_used: Optional[float] = None
 
 
 class ProfilesListResponse(BaseModel):
@@ -35,6 +39,13 @@ class CleanupRequest(BaseModel):
     days: Optional[int] = 30  # 清理超过多少天未使用的配置
 
 
+class PruneCacheResponse(BaseModel):
+    """缓存清理响应"""
+    pruned: int
+    skipped_in_use: int
+    freed_mb: float
+
+
 class CleanupResponse(BaseModel):
     """清理响应"""
     cleaned_count: int
@@ -103,6 +114,33 @@ async def cleanup_old_profiles(request: CleanupRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/prune-cache", response_model=Response[PruneCacheResponse])
+async def prune_profile_caches():
+    """
+    清理所有持久化配置中的可再生缓存
+
+    说明:
+    - 删除 Cache / Code Cache / GPUCache 等目录，保留 Cookie、LocalStorage、IndexedDB
+    - 正在被浏览器使用的配置会跳过
+    """
+    try:
+        result = await asyncio.to_thread(persistent_browser_manager.prune_caches)
+        data = PruneCacheResponse(
+            pruned=result["pruned"],
+            skipped_in_use=result["skipped_in_use"],
+            freed_mb=round(result["freed_bytes"] / 1024 / 1024, 2),
+        )
+        logger.info(f"清理配置缓存: {data.pruned} 个, 释放 {data.freed_mb} MB, 跳过使用中 {data.skipped_in_use} 个")
+        return Response(
+            success=True,
+            data=data,
+            message=f"已清理 {data.pruned} 个配置的缓存，释放 {data.freed_mb} MB"
+        )
+    except Exception as e:
+        logger.error(f"清理配置缓存失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/{platform}/{account_id}", response_model=Response[Dict[str, Any]])
 async def delete_profile(platform: str, account_id: str):
     """
@@ -176,6 +214,7 @@ async def get_profile_stats():
             "total_count": size_info["profile_count"],
             "total_size_mb": size_info["total_mb"],
             "total_size_gb": size_info["total_gb"],
+            "cache_size_mb": size_info["cache_mb"],
             "by_platform": platform_stats
         }
 
@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import asyncio
+import json
 import subprocess
 from pathlib import Path
 from datetime import datetime, timedelta
@@ -291,6 +292,39 @@ async def system_health_check():
         raise HTTPException(status_code=500, detail=f"健康检查失败: {str(e)}")
 
 
+@router.get("/db/pool-stats", summary="数据库连接池统计")
+async def db_pool_stats():
+    """
+    SQLAlchemy 连接池统计（同步/异步引擎）
+
+    包含已借出连接数、溢出连接数、借出次数与平均/最大等待时间。
+    """
+    from fastapi_app.db.sqlalchemy_engine import get_pool_stats
+
+    return {
+        "status": "success",
+        "data": get_pool_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/scheduler/stats", summary="调度引擎统计")
+async def scheduler_stats():
+    """
+    统一调度引擎统计
+
+    包含待触发任务数、触发/跳过/失败次数、调度延迟（实际开始时间 - 计划时间）分位数
+    以及各任务的下次执行时间。
+    """
+    from myUtils.schedule_engine import schedule_engine
+
+    return {
+        "status": "success",
+        "data": {**schedule_engine.metrics(), "schedule": schedule_engine.jobs()},
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 @router.get("/playwright-worker/health", summary="Playwright Worker 健康信息")
 async def playwright_worker_health():
     """代理 Worker 的 /health（便于在 API Docs 里一键检查）。"""
@@ -585,9 +619,11 @@ async def export_logs():
 
             for log_dir in log_dirs:
                 if log_dir.exists():
-                    for log_file in log_dir.rglob("*.log"):
-                        arcname = str(log_file.relative_to(settings.BASE_DIR))
-                        zipf.write(log_file, arcname)
+                    # 含已轮转压缩的归档
+                    for pattern in ("*.log", "*.log.zip"):
+                        for log_file in log_dir.rglob(pattern):
+                            arcname = str(log_file.relative_to(settings.BASE_DIR))
+                            zipf.write(log_file, arcname)
 
         return FileResponse(
             zip_path,
@@ -598,44 +634,174 @@ async def export_logs():
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
 
 
-@router.get("/logs", summary="查看日志")
-async def view_logs(lines: int = 100):
-    """查看日志内容"""
+def _resolve_log_file() -> tuple[Optional[Path], list[Path]]:
+    """当前活动日志文件（按候选顺序取第一个存在的）"""
+    from fastapi_app.core.config import settings
+
+    log_candidates = [
+        Path(settings.LOG_FILE),
+        Path(settings.BASE_DIR) / "logs" / "app.log",
+        Path(settings.BASE_DIR) / "logs" / "backend.log",
+        Path(settings.BASE_DIR) / "logs" / "fastapi_app.log",
+        Path(settings.BASE_DIR).parent / "resources" / "supervisor" / "backend.log",
+        Path(settings.BASE_DIR).parent / "supervisor" / "backend.log",
+    ]
+    return next((p for p in log_candidates if p.exists()), None), log_candidates
+
+
+def _select_log_file(active: Path, file: Optional[str]) -> Path:
+    """按文件名选择活动文件或其轮转归档（只允许 list_log_files 列出的文件）"""
+    from fastapi_app.core.log_reader import list_log_files
+
+    if not file:
+        return active
+    for log_file in list_log_files(active):
+        if log_file.name == file:
+            return log_file.path
+    raise HTTPException(status_code=404, detail=f"日志文件不存在: {file}")
+
+
+def _parse_time(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
     try:
-        from fastapi_app.core.config import settings
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} 时间格式错误，应为 ISO 格式（如 2024-05-01T10:00:00）")
 
-        log_candidates = [
-            Path(settings.LOG_FILE),
-            Path(settings.BASE_DIR) / "logs" / "app.log",
-            Path(settings.BASE_DIR) / "logs" / "backend.log",
-            Path(settings.BASE_DIR) / "logs" / "fastapi_app.log",
-            Path(settings.BASE_DIR).parent / "resources" / "supervisor" / "backend.log",
-            Path(settings.BASE_DIR).parent / "supervisor" / "backend.log",
-        ]
-        log_file = next((p for p in log_candidates if p.exists()), None)
 
-        if not log_file:
-            return {
-                "status": "not_found",
-                "message": "No log file found.",
-                "candidates": [str(p) for p in log_candidates],
-            }
+@router.get("/logs", summary="查看日志")
+async def view_logs(lines: int = 100, file: Optional[str] = None):
+    """
+    查看日志最后 N 行
 
-        # 读取最近 N 行
-        with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-            all_lines = f.readlines()
-            recent_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
+    从文件末尾按块向前读取，内存占用与文件大小无关；file 可指定轮转归档（含 .zip）
+    """
+    from fastapi_app.core.log_reader import tail_lines
+
+    log_file, log_candidates = _resolve_log_file()
+    if not log_file:
+        return {
+            "status": "not_found",
+            "message": "No log file found.",
+            "candidates": [str(p) for p in log_candidates],
+        }
+    target = _select_log_file(log_file, file)
+    lines = max(1, min(lines, 10000))
 
+    try:
+        recent_lines = await asyncio.to_thread(tail_lines, target, lines)
         return {
             "status": "success",
-            "lines": recent_lines,
-            "total_lines": len(all_lines),
-            "log_file": str(log_file)
+            "lines": [line + "\n" for line in recent_lines],
+            "log_file": str(target),
+            "file_size": target.stat().st_size,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取日志失败: {str(e)}")
 
 
+@router.get("/logs/files", summary="日志文件列表")
+async def list_logs():
+    """活动日志文件及其轮转归档（按时间从旧到新）"""
+    from fastapi_app.core.log_reader import list_log_files
+
+    log_file, _ = _resolve_log_file()
+    if not log_file:
+        return {"status": "not_found", "files": []}
+    files = await asyncio.to_thread(list_log_files, log_file)
+    return {
+        "status": "success",
+        "files": [
+            {
+                "name": f.name,
+                "size": f.path.stat().st_size,
+                "compressed": f.compressed,
+                "active": f.started_at is None,
+                "started_at": f.started_at.isoformat() if f.started_at else None,
+            }
+            for f in files
+        ],
+    }
+
+
+@router.get("/logs/search", summary="搜索日志")
+async def search_logs(
+    level: Optional[str] = None,
+    module: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    contains: Optional[str] = None,
+    limit: int = 500,
+    format: str = "ndjson",
+):
+    """
+    按级别（最低级别）、模块前缀、时间范围、关键字搜索日志，跨轮转归档（含 .zip）
+
+    结果逐条流式返回：format=ndjson 每行一条 JSON 记录；format=sse 为 text/event-stream，结束时发送 {"done": true}
+    """
+    from fastapi.responses import StreamingResponse
+    from fastapi_app.core.log_reader import LEVELS, list_log_files, search_records
+
+    if level and level.upper() not in LEVELS:
+        raise HTTPException(status_code=400, detail=f"未知日志级别: {level}")
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format 只支持 ndjson / sse")
+    since_dt = _parse_time(since, "since")
+    until_dt = _parse_time(until, "until")
+
+    log_file, _ = _resolve_log_file()
+    files = list_log_files(log_file) if log_file else []
+    records = search_records(
+        files, level=level, module=module, since=since_dt, until=until_dt,
+        contains=contains, limit=max(1, min(limit, 10000)),
+    )
+
+    # 同步生成器由 Starlette 在线程池中迭代，不阻塞事件循环
+    def ndjson():
+        for record in records:
+            yield json.dumps(record.to_dict(), ensure_ascii=False) + "\n"
+
+    def sse():
+        count = 0
+        for record in records:
+            count += 1
+            yield f"data: {json.dumps(record.to_dict(), ensure_ascii=False)}\n\n"
+        yield f"data: {json.dumps({'done': True, 'count': count})}\n\n"
+
+    if format == "sse":
+        return StreamingResponse(
+            sse(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"},
+        )
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/logs/follow", summary="实时跟随日志（SSE）")
+async def follow_logs(lines: int = 50, poll_interval: float = 0.5):
+    """
+    先推送最后 N 行，再持续推送活动日志文件的新增行
+
+    事件数据：{"line": ...}；日志轮转时推送 {"rotated": 文件名}，随后从新文件开头继续；
+    空闲时每 15 秒发送一次注释行保持连接
+    """
+    from fastapi.responses import StreamingResponse
+    from fastapi_app.core.log_reader import follow_sse
+
+    log_file, _ = _resolve_log_file()
+    if not log_file:
+        raise HTTPException(status_code=404, detail="No log file found.")
+    lines = max(0, min(lines, 1000))
+    poll_interval = max(0.2, min(poll_interval, 5.0))
+
+    return StreamingResponse(
+        follow_sse(log_file, lines=lines, poll_interval=poll_interval),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"},
+    )
+
+
 # ========== Supervisor 进程控制 ==========
 
 import aiohttp
@@ -289,14 +289,16 @@ async def task_stats(request: Request):
 async def list_tasks(
     request: Request,
     limit: int = Query(100, ge=1, le=1000),
-    status: Optional[str] = Query(None, description="过滤状态：pending/running/success/failed/cancelled")
+    status: Optional[str] = Query(None, description="过滤状态：pending/running/success/failed/cancelled"),
+    offset: int = Query(0, ge=0, description="分页偏移（按创建时间倒序）"),
+    task_type: Optional[str] = Query(None, description="过滤任务类型"),
 ):
     # 优先使用 Redis TaskStateManager，如果不可用则回退到旧的 SQLite task_manager
     from fastapi_app.tasks.task_state_manager import task_state_manager
 
     try:
         # 从 Redis 获取任务列表
-        tasks = task_state_manager.list_tasks(status=status, limit=limit)
+        tasks = task_state_manager.list_tasks(status=status, task_type=task_type, limit=limit, offset=offset)
         summary = _summarize_tasks(tasks)
 
         # 添加 stats 字段（从 TaskStateManager 获取）
@@ -329,10 +331,12 @@ async def list_tasks(
 async def list_tasks_alias(
     request: Request,
     limit: int = Query(100, ge=1, le=1000),
-    status: Optional[str] = Query(None, description="过滤状态：pending/running/success/failed/cancelled")
+    status: Optional[str] = Query(None, description="过滤状态：pending/running/success/failed/cancelled"),
+    offset: int = Query(0, ge=0, description="分页偏移（按创建时间倒序）"),
+    task_type: Optional[str] = Query(None, description="过滤任务类型"),
 ):
     """兼容前端 /api/tasks/list 调用"""
-    return await list_tasks(request, limit, status)
+    return await list_tasks(request, limit, status, offset, task_type)
 
 
 @router.get("/{task_id}")
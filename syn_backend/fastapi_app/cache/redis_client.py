@@ -6,9 +6,8 @@ from typing import Optional, Any
 from fastapi_app.core.config import settings
 
 
-@lru_cache(maxsize=1)
-def get_redis() -> Optional[Any]:
-    """获取 Redis 客户端实例"""
+def _redis_url() -> str:
+    """解析配置中的 Redis URL"""
     # 默认 Redis URL
     default_url = "redis://localhost:6379/0"
 
@@ -25,6 +24,14 @@ def get_redis() -> Optional[Any]:
     if not url.startswith(('redis://', 'rediss://', 'unix://')):
         url = f"redis://{url}"
 
+    return url
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> Optional[Any]:
+    """获取 Redis 客户端实例"""
+    url = _redis_url()
+
     try:
         import redis  # type: ignore
     except ImportError:
@@ -37,3 +44,21 @@ def get_redis() -> Optional[Any]:
         import logging
         logging.warning(f"Failed to connect to Redis at {url}: {e}")
         return None
+
+
+@lru_cache(maxsize=1)
+def get_async_redis() -> Optional[Any]:
+    """获取 asyncio Redis 客户端实例（供 FastAPI 异步路由使用）"""
+    url = _redis_url()
+
+    try:
+        import redis.asyncio as aioredis  # type: ignore
+    except ImportError:
+        return None
+
+    try:
+        return aioredis.Redis.from_url(url, decode_responses=True)
+    except Exception as e:
+        import logging
+        logging.warning(f"Failed to connect to Redis at {url}: {e}")
+        return None
@@ -92,6 +92,21 @@ class Settings(BaseSettings):
     # When empty, the app uses SQLite files above.
     DATABASE_URL: str = ""
 
+    # SQLAlchemy 连接池（同步/异步引擎共用）
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800  # 秒，避免 MySQL wait_timeout 断开
+    DB_POOL_TIMEOUT: int = 30  # 秒，等待可用连接的最长时间
+    # SQLite 连接参数（通过 connect 事件设置 PRAGMA）
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB
+    # AI 聊天线程列表的进程内缓存（最近更新的前 N 个线程）
+    CHAT_THREAD_HEAD_CACHE_SIZE: int = 512
+    CHAT_THREAD_HEAD_CACHE_TTL: int = 30  # 秒，多进程部署时其他进程的写入最迟在此时间后可见
+    # analytics_history 降采样：超过 N 天保留每小时最后一条，超过 M 天保留每天最后一条
+    ANALYTICS_HISTORY_HOURLY_AFTER_DAYS: int = 7
+    ANALYTICS_HISTORY_DAILY_AFTER_DAYS: int = 30
+
     # Redis / Celery (optional)
     REDIS_URL: str = "redis://localhost:6379/0"
     CELERY_BROKER_URL: str = ""  # defaults to REDIS_URL when empty
@@ -102,9 +117,17 @@ class Settings(BaseSettings):
     COOKIE_FILES_DIR: str = str(Path(DATA_DIR) / "cookiesFile")
     FINGERPRINTS_DIR: str = str(Path(DATA_DIR) / "fingerprints")
     BROWSER_PROFILES_DIR: str = str(Path(DATA_DIR) / "browser_profiles")
+    BROWSER_PROFILE_MAX_MB: int = 300  # 单个持久化 profile 的空间预算，会话关闭后超出则清理缓存；0 表示不限制
     VIDEO_FILES_DIR: str = str(BASE_DIR / "videoFile")
     UPLOAD_DIR: str = str(BASE_DIR / "uploads")
 
+    # 素材上传（流式落盘 / 分片续传）
+    UPLOAD_MAX_SIZE_MB: int = 160
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 落盘/哈希的块大小
+    UPLOAD_MULTIPART_MAX_SIZE_MB: int = 4096
+    UPLOAD_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024  # 分片上传默认分片大小
+    UPLOAD_SESSION_TTL_HOURS: int = 24  # 未完成的分片会话保留时长
+
     # 任务队列配置
     TASK_QUEUE_MAX_WORKERS: int = 3  # 并发任务数（降低资源占用）
     TASK_MAX_RETRIES: int = 3
@@ -0,0 +1,390 @@
+"""
+日志读取
+
+文件日志由 loguru 写入（见 logger.py），按 100MB 轮转并压缩为 zip：
+    fastapi_app.log                                   活动文件
+    fastapi_app.2024-05-01_10-00-00_000000.log.zip     轮转归档（时间为该文件的创建时间）
+
+这里的读取都是常量内存，与文件大小无关：
+- tail_lines: 从文件末尾按块向前读取最后 N 行
+- search_records: 按级别/模块/时间范围/关键字过滤，逐条产出；跨轮转归档，透明读取 zip；
+  明文文件按时间二分定位起点
+- follow_lines: 跟随活动文件的新增内容，检测到轮转后从新文件开头继续
+- follow_sse: 最后 N 行 + follow_lines，编码为 SSE 事件并在空闲时发送心跳
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import zipfile
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, IO, Iterator, List, Optional
+
+BLOCK_SIZE = 64 * 1024
+FOLLOW_READ_LIMIT = 1024 * 1024
+
+LEVELS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+# "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+RECORD_RE = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\S* \| (\w+)\s*\| ([^:\s]+):([^:]*):(\d+) - (.*)$"
+)
+ROTATED_TIME_RE = re.compile(r"\.(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})(?:_\d+)?(?:\.\d+)?\.")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@dataclass
+class LogRecord:
+    time: str
+    level: str
+    module: str
+    function: str
+    line: int
+    message: str
+    file: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class LogFile:
+    path: Path
+    started_at: Optional[datetime]  # 轮转归档的创建时间；活动文件为 None
+    compressed: bool
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+
+# ---------- 文件 ----------
+
+def list_log_files(active: Path) -> List[LogFile]:
+    """活动文件及其轮转归档，按时间从旧到新排列（活动文件在最后）"""
+    active = Path(active)
+    files: List[LogFile] = []
+    if active.parent.exists():
+        prefix = f"{active.stem}."
+        for path in active.parent.iterdir():
+            if path == active or not path.name.startswith(prefix) or not path.is_file():
+                continue
+            match = ROTATED_TIME_RE.search(path.name[len(active.stem):])
+            if not match:
+                continue
+            started_at = datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S")
+            files.append(LogFile(path, started_at, path.suffix == ".zip"))
+    files.sort(key=lambda f: (f.started_at, f.path.name))
+    if active.exists():
+        files.append(LogFile(active, None, False))
+    return files
+
+
+def _open_text(path: Path) -> IO[str]:
+    """以文本方式打开日志；zip 归档流式解压（只读取第一个成员）"""
+    if path.suffix == ".zip":
+        archive = zipfile.ZipFile(path)
+        names = archive.namelist()
+        if not names:
+            archive.close()
+            return io.StringIO("")
+        member = archive.open(names[0])
+        return io.TextIOWrapper(member, encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+# ---------- tail ----------
+
+def iter_lines_reverse(path: Path, block_size: int = BLOCK_SIZE) -> Iterator[str]:
+    """从文件末尾向前逐行产出（不含换行符）"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        remainder = b""
+        first = True
+        while pos > 0:
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            parts = (f.read(size) + remainder).split(b"\n")
+            remainder = parts[0]
+            tail = parts[1:]
+            if first:
+                # 文件以换行结尾时最后一段为空
+                if tail and tail[-1] == b"":
+                    tail.pop()
+                first = False
+            for raw in reversed(tail):
+                yield raw.rstrip(b"\r").decode("utf-8", errors="replace")
+        if remainder:
+            yield remainder.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+def tail_lines(path: Path, lines: int) -> List[str]:
+    """最后 N 行（按原顺序）；zip 归档只能顺序解压，用定长队列保持常量内存"""
+    path = Path(path)
+    if lines <= 0:
+        return []
+    if path.suffix == ".zip":
+        with _open_text(path) as f:
+            return [line.rstrip("\r\n") for line in deque(f, maxlen=lines)]
+    result: List[str] = []
+    for line in iter_lines_reverse(path):
+        result.append(line)
+        if len(result) >= lines:
+            break
+    result.reverse()
+    return result
+
+
+# ---------- search ----------
+
+def parse_record(line: str, file: str = "") -> Optional[LogRecord]:
+    match = RECORD_RE.match(line)
+    if not match:
+        return None
+    time_str, level, module, function, lineno, message = match.groups()
+    return LogRecord(time_str, level, module, function, int(lineno), message, file)
+
+
+def _record_time(line: str) -> Optional[str]:
+    match = RECORD_RE.match(line)
+    return match.group(1) if match else None
+
+
+def _seek_time(f: IO[bytes], since: str) -> int:
+    """二分查找第一条时间 >= since 的记录所在行的偏移（日志按时间顺序写入）"""
+    f.seek(0, os.SEEK_END)
+    lo, hi = 0, f.tell()
+    while lo < hi:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        if mid:
+            f.readline()  # 跳过半行
+        record_time = None
+        while record_time is None:
+            raw = f.readline()
+            if not raw:
+                break
+            record_time = _record_time(raw.decode("utf-8", errors="replace"))
+        if record_time is None or record_time >= since:
+            hi = mid
+        else:
+            lo = mid + 1
+    if lo:
+        f.seek(lo - 1)
+        f.readline()
+        return f.tell()
+    return 0
+
+
+def _iter_file_lines(log_file: LogFile, since: Optional[str]) -> Iterator[str]:
+    if log_file.compressed:
+        with _open_text(log_file.path) as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+        return
+    with open(log_file.path, "rb") as f:
+        f.seek(_seek_time(f, since) if since else 0)
+        for raw in f:
+            yield raw.rstrip(b"\r\n").decode("utf-8", errors="replace")
+
+
+def search_records(
+    files: List[LogFile],
+    *,
+    level: Optional[str] = None,
+    module: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    contains: Optional[str] = None,
+    limit: int = 500,
+) -> Iterator[LogRecord]:
+    """
+    逐条产出匹配的日志记录（按时间从旧到新）
+
+    Args:
+        files: list_log_files 的结果（或其子集）
+        level: 最低级别（WARNING 包含 ERROR/CRITICAL）
+        module: 模块名前缀（如 fastapi_app.api）
+        since/until: 时间范围（本地时间，闭区间）
+        contains: 消息（含异常堆栈）中包含的文本
+        limit: 最多产出条数
+    """
+    min_level = LEVELS.get(level.upper(), 0) if level else 0
+    since_str = since.strftime(TIME_FORMAT) if since else None
+    until_str = until.strftime(TIME_FORMAT) if until else None
+    needle = contains.lower() if contains else None
+    emitted = 0
+
+    def matches(record: LogRecord, extra: List[str]) -> bool:
+        if min_level and LEVELS.get(record.level, 0) < min_level:
+            return False
+        if module and not record.module.startswith(module):
+            return False
+        if since_str and record.time < since_str:
+            return False
+        if needle:
+            text = record.message if not extra else "\n".join([record.message, *extra])
+            if needle not in text.lower():
+                return False
+        return True
+
+    for index, log_file in enumerate(files):
+        # 文件覆盖 [started_at, 下一个文件的 started_at)，不与时间范围相交的整体跳过
+        next_start = files[index + 1].started_at if index + 1 < len(files) else None
+        if since and next_start and next_start < since:
+            continue
+        if until and log_file.started_at and log_file.started_at > until:
+            break
+
+        current: Optional[LogRecord] = None
+        extra: List[str] = []
+        for line in _iter_file_lines(log_file, since_str):
+            record = parse_record(line, log_file.name)
+            if record is None:
+                # 多行消息（异常堆栈）的续行
+                if current is not None and len(extra) < 200:
+                    extra.append(line)
+                continue
+            if current is not None and matches(current, extra):
+                if extra:
+                    current.message = "\n".join([current.message, *extra])
+                yield current
+                emitted += 1
+                if emitted >= limit:
+                    return
+            if until_str and record.time > until_str:
+                return
+            current, extra = record, []
+        if current is not None and matches(current, extra):
+            if extra:
+                current.message = "\n".join([current.message, *extra])
+            yield current
+            emitted += 1
+            if emitted >= limit:
+                return
+
+
+# ---------- follow ----------
+
+def _read_from(path: Path, offset: int, limit: int = FOLLOW_READ_LIMIT) -> bytes:
+    """从 offset 开始读取至多 limit 字节（每次重新打开，不长期占用文件句柄，避免阻塞 Windows 上的轮转改名）"""
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+            if not names:
+                return b""
+            with archive.open(names[0]) as member:
+                member.seek(offset)
+                return member.read(limit)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(limit)
+
+
+async def follow_lines(
+    active: Path,
+    *,
+    poll_interval: float = 0.5,
+    from_end: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    跟随活动日志文件，产出 {"line": ...}；检测到轮转时产出 {"rotated": 新文件名} 并从新文件开头继续
+
+    轮转判定：文件标识（inode / Windows 文件索引）变化，或文件变短。
+    轮转前未读完的内容从最新的归档中补读。
+    """
+    active = Path(active)
+
+    def identity(path: Path):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None, 0
+        return (st.st_dev, st.st_ino), st.st_size
+
+    ident, size = await asyncio.to_thread(identity, active)
+    offset = size if from_end else 0
+    pending = b""
+
+    while True:
+        current, size = await asyncio.to_thread(identity, active)
+        if current is None:
+            await asyncio.sleep(poll_interval)
+            continue
+
+        if ident is not None and (current != ident or size < offset):
+            # 补读已轮转文件的剩余部分
+            archives = [f for f in await asyncio.to_thread(list_log_files, active) if f.started_at]
+            if archives and current != ident:
+                chunk = await asyncio.to_thread(_read_from, archives[-1].path, offset)
+                while chunk:
+                    pending += chunk
+                    *complete, pending = pending.split(b"\n")
+                    for raw in complete:
+                        yield {"line": raw.rstrip(b"\r").decode("utf-8", errors="replace")}
+                    offset += len(chunk)
+                    chunk = await asyncio.to_thread(_read_from, archives[-1].path, offset)
+            if pending:
+                yield {"line": pending.rstrip(b"\r").decode("utf-8", errors="replace")}
+            pending = b""
+            offset = 0
+            yield {"rotated": active.name}
+        ident = current
+
+        if size > offset:
+            chunk = await asyncio.to_thread(_read_from, active, offset)
+            offset += len(chunk)
+            pending += chunk
+            *complete, pending = pending.split(b"\n")
+            for raw in complete:
+                yield {"line": raw.rstrip(b"\r").decode("utf-8", errors="replace")}
+            if len(pending) > FOLLOW_READ_LIMIT:
+                # 超长的单行直接截断输出，保持内存有界
+                yield {"line": pending.decode("utf-8", errors="replace")}
+                pending = b""
+            if size > offset:
+                continue
+        await asyncio.sleep(poll_interval)
+
+
+async def follow_sse(
+    active: Path,
+    *,
+    lines: int = 50,
+    poll_interval: float = 0.5,
+    ping_interval: float = 15.0,
+) -> AsyncIterator[str]:
+    """
+    先推送最后 N 行，再持续推送新增行（SSE 文本，data: {json}）；空闲 ping_interval 秒发送一次注释行
+
+    客户端断开时外层会取消本生成器：先等待挂起的读取任务结束，再关闭 follow_lines，
+    否则 aclose() 会因生成器仍在运行而抛出 RuntimeError。
+    """
+    for line in await asyncio.to_thread(tail_lines, active, lines):
+        yield f"data: {json.dumps({'line': line}, ensure_ascii=False)}\n\n"
+
+    follower = follow_lines(active, poll_interval=poll_interval)
+    next_event = asyncio.ensure_future(follower.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_event}, timeout=ping_interval)
+            if not done:
+                yield ": ping\n\n"
+                continue
+            event = next_event.result()
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            next_event = asyncio.ensure_future(follower.__anext__())
+    finally:
+        next_event.cancel()
+        with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+            await next_event
+        await follower.aclose()
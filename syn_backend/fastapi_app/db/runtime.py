@@ -1,13 +1,13 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
-from typing import Generator, Optional
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncGenerator, Generator, Optional
 
 import sqlite3
 from sqlalchemy.engine import Connection
 
 from fastapi_app.core.config import settings
-from fastapi_app.db.sqlalchemy_engine import get_engine
+from fastapi_app.db.sqlalchemy_engine import get_async_engine, get_engine
 
 
 def mysql_enabled() -> bool:
@@ -24,6 +24,16 @@ def sa_connection() -> Generator[Connection, None, None]:
         yield conn
 
 
+@asynccontextmanager
+async def async_sa_connection() -> AsyncGenerator:
+    """
+    Async SQLAlchemy connection (aiomysql / aiosqlite) for use inside async routes.
+    """
+    engine = get_async_engine()
+    async with engine.begin() as conn:
+        yield conn
+
+
 @contextmanager
 def sqlite_connection(path: Optional[str] = None) -> Generator[sqlite3.Connection, None, None]:
     """
@@ -183,6 +183,11 @@ def ensure_main_db_schema(conn: sqlite3.Connection) -> None:
         """
     )
 
+    # 发布调度器按 (status, publish_mode, schedule_time) 加载待执行任务
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_publish_tasks_due ON publish_tasks(status, publish_mode, schedule_time)"
+    )
+
     conn.commit()
 
     added = 0
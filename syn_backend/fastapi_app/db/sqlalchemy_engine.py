@@ -1,10 +1,55 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine, Engine
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event, Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from fastapi_app.core.config import settings
 
 
+# Engine registry: one engine (and one pool) per URL for the whole process.
+_engines: Dict[str, Engine] = {}
+_async_engines: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+class _PoolWaitMixin:
+    """Records how long callers waited for a connection from the pool."""
+
+    def _init_wait_stats(self) -> None:
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):  # type: ignore[override]
+        if not hasattr(self, "wait_count"):
+            self._init_wait_stats()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_count += 1
+            self.wait_total += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+
+
+class TimedQueuePool(_PoolWaitMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_PoolWaitMixin, AsyncAdaptedQueuePool):
+    pass
+
+
 def get_database_url() -> str:
     if settings.DATABASE_URL and settings.DATABASE_URL.strip():
         return settings.DATABASE_URL.strip()
@@ -15,10 +60,144 @@ def get_database_url() -> str:
     return f"sqlite+pysqlite:///{sqlite_path}"
 
 
-def get_engine() -> Engine:
-    url = get_database_url()
-    connect_args = {}
-    if url.startswith("sqlite"):
-        connect_args = {"check_same_thread": False}
-    return create_engine(url, pool_pre_ping=True, future=True, connect_args=connect_args)
+def get_async_database_url(url: Optional[str] = None) -> str:
+    """Map a sync URL to its asyncio driver (aiosqlite / aiomysql)."""
+    url = url or get_database_url()
+    scheme, sep, rest = url.partition("://")
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if scheme.startswith("mysql"):
+        return f"mysql+aiomysql{sep}{rest}"
+    return url
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
+def _install_sqlite_pragmas(engine: Engine) -> None:
+    """Apply WAL and friends on every new DBAPI connection."""
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        finally:
+            cursor.close()
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    url = url or get_database_url()
+    engine = _engines.get(url)
+    if engine is not None:
+        return engine
+
+    with _registry_lock:
+        engine = _engines.get(url)
+        if engine is not None:
+            return engine
+
+        connect_args = {}
+        if url.startswith("sqlite"):
+            connect_args = {"check_same_thread": False}
+        engine = create_engine(
+            url,
+            pool_pre_ping=True,
+            future=True,
+            connect_args=connect_args,
+            poolclass=TimedQueuePool,
+            **_pool_kwargs(),
+        )
+        if url.startswith("sqlite"):
+            _install_sqlite_pragmas(engine)
+        _engines[url] = engine
+        return engine
+
+
+def get_async_engine(url: Optional[str] = None):
+    """Process-wide AsyncEngine for the same database (aiosqlite / aiomysql)."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = get_async_database_url(url)
+    engine = _async_engines.get(url)
+    if engine is not None:
+        return engine
+
+    with _registry_lock:
+        engine = _async_engines.get(url)
+        if engine is not None:
+            return engine
+
+        engine = create_async_engine(
+            url,
+            pool_pre_ping=True,
+            poolclass=TimedAsyncQueuePool,
+            **_pool_kwargs(),
+        )
+        if url.startswith("sqlite"):
+            _install_sqlite_pragmas(engine.sync_engine)
+        _async_engines[url] = engine
+        return engine
+
+
+def _pool_stats(pool: Any) -> Dict[str, Any]:
+    wait_count = getattr(pool, "wait_count", 0)
+    wait_total = getattr(pool, "wait_total", 0.0)
+    stats: Dict[str, Any] = {
+        "pool_class": type(pool).__name__,
+        "status": pool.status(),
+        "checkouts": wait_count,
+        "wait_avg_ms": round(wait_total / wait_count * 1000, 3) if wait_count else 0.0,
+        "wait_max_ms": round(getattr(pool, "wait_max", 0.0) * 1000, 3),
+        "timeouts": getattr(pool, "timeouts", 0),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    return stats
+
+
+def _safe_url(url: str) -> str:
+    from sqlalchemy.engine import make_url
+
+    try:
+        return make_url(url).render_as_string(hide_password=True)
+    except Exception:
+        return url
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Connection pool statistics for every engine created in this process."""
+    return {
+        "sync": {_safe_url(url): _pool_stats(engine.pool) for url, engine in list(_engines.items())},
+        "async": {_safe_url(url): _pool_stats(engine.sync_engine.pool) for url, engine in list(_async_engines.items())},
+    }
+
+
+def dispose_engines() -> None:
+    """Dispose sync engines (async engines must be disposed with dispose_async_engines)."""
+    with _registry_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
 
+async def dispose_async_engines() -> None:
+    with _registry_lock:
+        engines = list(_async_engines.values())
+        _async_engines.clear()
+    for engine in engines:
+        await engine.dispose()
@@ -322,6 +322,13 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"OpenManus Agent 初始化失败（可选功能）: {e}")
 
+    # 启动素材元数据回填（补齐 filesize/duration/分辨率，list_files 不再在请求内 ffprobe）
+    try:
+        from fastapi_app.services.file_metadata_backfill import get_metadata_backfill
+        await get_metadata_backfill().start()
+    except Exception as e:
+        logger.warning(f"素材元数据回填服务启动失败: {e}")
+
     # 启动账号数据清理调度器（每6小时清理一次）
     try:
         from fastapi_app.core.account_cleanup_scheduler import start_cleanup_scheduler
@@ -345,6 +352,13 @@ async def shutdown_event():
     except Exception as e:
         logger.warning(f"账号数据清理调度器停止失败: {e}")
 
+    # 停止素材元数据回填
+    try:
+        from fastapi_app.services.file_metadata_backfill import get_metadata_backfill
+        await get_metadata_backfill().stop()
+    except Exception as e:
+        logger.warning(f"素材元数据回填服务停止失败: {e}")
+
     # 清理 OpenManus Agent
     try:
         if hasattr(app.state, 'manus_agent'):
@@ -354,6 +368,14 @@ async def shutdown_event():
         logger.warning(f"OpenManus Agent 清理失败: {e}")
 
 
+    # 关闭 SQLAlchemy 引擎
+    try:
+        from .db.sqlalchemy_engine import dispose_async_engines, dispose_engines
+        dispose_engines()
+        await dispose_async_engines()
+    except Exception as e:
+        logger.warning(f"SQLAlchemy 引擎关闭失败: {e}")
+
     # 关闭数据库连接池
     from .db.session import main_db_pool, cookie_db_pool, ai_logs_db_pool
     main_db_pool.close_all()
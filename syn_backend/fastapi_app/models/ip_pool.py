@@ -66,6 +66,8 @@ class ProxyIP(BaseModel):
     success_count: int = Field(default=0, description="成功次数")
     fail_count: int = Field(default=0, description="失败次数")
     total_used: int = Field(default=0, description="总使用次数")
+    rolling_success_rate: Optional[float] = Field(None, description="近期成功率(滑动平均, 0-1)")
+    avg_rtt_ms: Optional[float] = Field(None, description="近期响应时间(滑动平均, 毫秒)")
     
     # 时间戳
     last_used_at: Optional[datetime] = Field(None, description="最后使用时间")
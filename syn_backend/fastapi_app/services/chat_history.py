@@ -1,11 +1,17 @@
 """
 聊天会话管理 - 数据库模型和服务
+
+会话/消息与 AI 线程共用 ai_threads / ai_messages（见 chat_store），
+这里是供同步代码使用的包装，走同一个进程级连接池。
 """
-import sqlite3
-from datetime import datetime
-from pathlib import Path
-from typing import List, Optional, Dict, Any
 import json
+import uuid
+from typing import List, Optional, Dict
+
+from sqlalchemy import text
+
+from fastapi_app.services.chat_store import ChatStore, INSERT_MESSAGE_SQL, get_chat_store
+
 
 class ChatSession:
     """聊天会话"""
@@ -31,173 +37,114 @@ class ChatMessage:
 
 class ChatHistoryService:
     """聊天历史服务"""
-    
-    def __init__(self, db_path: str = "db/database.db"):
-        self.db_path = Path(db_path)
-        self._init_tables()
-    
-    def _init_tables(self):
-        """初始化数据库表"""
-        with sqlite3.connect(self.db_path) as conn:
-            # 会话表
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS chat_sessions (
-                    session_id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    mode TEXT DEFAULT 'chat',
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    metadata TEXT
-                )
-            """)
-            
-            # 消息表
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS chat_messages (
-                    message_id TEXT PRIMARY KEY,
-                    session_id TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    metadata TEXT,
-                    FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE
-                )
-            """)
-            
-            # 创建索引
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON chat_messages(session_id)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON chat_sessions(updated_at DESC)")
-            
-            conn.commit()
-    
+
+    def __init__(self, store: Optional[ChatStore] = None):
+        self.store = store or get_chat_store()
+
+    @staticmethod
+    def _session(row) -> ChatSession:
+        metadata = json.loads(row['metadata']) if row['metadata'] else {}
+        return ChatSession(row['id'], row['title'], row['created_at'], row['updated_at'], row['mode'], metadata)
+
     def create_session(self, title: str = "新对话", mode: str = "chat") -> ChatSession:
         """创建新会话"""
-        import uuid
         session_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT INTO chat_sessions (session_id, title, mode, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (session_id, title, mode, now, now))
-            conn.commit()
-        
+        now = self.store.next_timestamps(1)[0]
+
+        with self.store.sync_engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO ai_threads (id, title, mode, created_at, updated_at, message_count)
+                VALUES (:id, :title, :mode, :now, :now, 0)
+            """), {"id": session_id, "title": title, "mode": mode, "now": now})
+        self.store.heads.invalidate()
+
         return ChatSession(session_id, title, now, now, mode)
-    
+
     def get_sessions(self, limit: int = 50, offset: int = 0) -> List[ChatSession]:
         """获取会话列表"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
-                SELECT * FROM chat_sessions 
-                ORDER BY updated_at DESC 
-                LIMIT ? OFFSET ?
-            """, (limit, offset))
-            
-            sessions = []
-            for row in cursor.fetchall():
-                metadata = json.loads(row['metadata']) if row['metadata'] else {}
-                sessions.append(ChatSession(
-                    row['session_id'], row['title'], row['created_at'],
-                    row['updated_at'], row['mode'], metadata
-                ))
-            return sessions
-    
+        with self.store.sync_engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT * FROM ai_threads
+                ORDER BY updated_at DESC, id DESC
+                LIMIT :limit OFFSET :offset
+            """), {"limit": limit, "offset": offset}).mappings().all()
+        return [self._session(row) for row in rows]
+
     def get_session(self, session_id: str) -> Optional[ChatSession]:
         """获取单个会话"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                "SELECT * FROM chat_sessions WHERE session_id = ?",
-                (session_id,)
-            )
-            row = cursor.fetchone()
-            if row:
-                metadata = json.loads(row['metadata']) if row['metadata'] else {}
-                return ChatSession(
-                    row['session_id'], row['title'], row['created_at'],
-                    row['updated_at'], row['mode'], metadata
-                )
-        return None
-    
+        with self.store.sync_engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT * FROM ai_threads WHERE id = :id"), {"id": session_id}
+            ).mappings().first()
+        return self._session(row) if row else None
+
     def update_session(self, session_id: str, title: Optional[str] = None,
                       metadata: Optional[Dict] = None):
         """更新会话"""
-        updates = []
-        params = []
-        
+        updates = ["updated_at = :now"]
+        params = {"id": session_id, "now": self.store.next_timestamps(1)[0]}
+
         if title:
-            updates.append("title = ?")
-            params.append(title)
-        
+            updates.append("title = :title")
+            params["title"] = title
+
         if metadata:
-            updates.append("metadata = ?")
-            params.append(json.dumps(metadata, ensure_ascii=False))
-        
-        updates.append("updated_at = ?")
-        params.append(datetime.now().isoformat())
-        params.append(session_id)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                f"UPDATE chat_sessions SET {', '.join(updates)} WHERE session_id = ?",
-                params
-            )
-            conn.commit()
-    
+            updates.append("metadata = :metadata")
+            params["metadata"] = json.dumps(metadata, ensure_ascii=False)
+
+        with self.store.sync_engine.begin() as conn:
+            conn.execute(text(f"UPDATE ai_threads SET {', '.join(updates)} WHERE id = :id"), params)
+        self.store.heads.invalidate()
+
     def delete_session(self, session_id: str):
         """删除会话及其所有消息"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
-            conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
-            conn.commit()
-    
+        with self.store.sync_engine.begin() as conn:
+            conn.execute(text("DELETE FROM ai_messages WHERE thread_id = :id"), {"id": session_id})
+            conn.execute(text("DELETE FROM ai_threads WHERE id = :id"), {"id": session_id})
+        self.store.heads.invalidate()
+
     def add_message(self, session_id: str, role: str, content: str,
                    metadata: Optional[Dict] = None) -> ChatMessage:
         """添加消息"""
-        import uuid
         message_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT INTO chat_messages (message_id, session_id, role, content, created_at, metadata)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (message_id, session_id, role, content, now, 
-                  json.dumps(metadata, ensure_ascii=False) if metadata else None))
-            
-            # 更新会话的 updated_at
-            conn.execute(
-                "UPDATE chat_sessions SET updated_at = ? WHERE session_id = ?",
-                (now, session_id)
-            )
-            conn.commit()
-        
+        now = self.store.next_timestamps(1)[0]
+
+        with self.store.sync_engine.begin() as conn:
+            conn.execute(INSERT_MESSAGE_SQL, {
+                "id": message_id, "thread_id": session_id, "role": role, "content": content,
+                "tool_calls": None,
+                "metadata": json.dumps(metadata, ensure_ascii=False) if metadata else None,
+                "created_at": now,
+            })
+            # 更新会话的 updated_at 与消息计数
+            conn.execute(text("""
+                UPDATE ai_threads SET updated_at = :now, message_count = message_count + 1 WHERE id = :id
+            """), {"now": now, "id": session_id})
+        self.store.heads.invalidate()
+
         return ChatMessage(message_id, session_id, role, content, now, metadata)
-    
+
     def get_messages(self, session_id: str, limit: int = 100) -> List[ChatMessage]:
         """获取会话的所有消息"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
-                SELECT * FROM chat_messages 
-                WHERE session_id = ? 
-                ORDER BY created_at ASC 
-                LIMIT ?
-            """, (session_id, limit))
-            
-            messages = []
-            for row in cursor.fetchall():
-                metadata = json.loads(row['metadata']) if row['metadata'] else {}
-                messages.append(ChatMessage(
-                    row['message_id'], row['session_id'], row['role'],
-                    row['content'], row['created_at'], metadata
-                ))
-            return messages
-    
+        with self.store.sync_engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT * FROM ai_messages
+                WHERE thread_id = :id
+                ORDER BY created_at ASC, id ASC
+                LIMIT :limit
+            """), {"id": session_id, "limit": limit}).mappings().all()
+
+        return [
+            ChatMessage(
+                row['id'], row['thread_id'], row['role'], row['content'], row['created_at'],
+                json.loads(row['metadata']) if row['metadata'] else {}
+            )
+            for row in rows
+        ]
+
     def clear_session_messages(self, session_id: str):
         """清空会话的所有消息"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
-            conn.commit()
+        with self.store.sync_engine.begin() as conn:
+            conn.execute(text("DELETE FROM ai_messages WHERE thread_id = :id"), {"id": session_id})
+            conn.execute(text("UPDATE ai_threads SET message_count = 0 WHERE id = :id"), {"id": session_id})
+        self.store.heads.invalidate()
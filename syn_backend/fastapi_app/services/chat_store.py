@@ -0,0 +1,457 @@
+"""
+AI 聊天存储（ai_threads / ai_messages）
+
+threads_router 与 ChatHistoryService 共用这一份存储：
+- 复用 get_async_engine / get_engine 的进程级连接池（WAL），异步路由不再直接 sqlite3.connect 阻塞事件循环
+- 消息按 (thread_id, created_at, id) 键集分页，线程按 (updated_at, id) 倒序键集分页，均有对应复合索引
+- 批量消息一次 executemany 写入
+- 最近更新的线程头保存在进程内 LRU 中，线程列表首屏不查库
+"""
+from __future__ import annotations
+
+import base64
+import json
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from fastapi_app.core.config import settings
+from fastapi_app.db.sqlalchemy_engine import get_async_engine, get_engine
+
+
+_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS ai_threads (
+        id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        mode TEXT NOT NULL DEFAULT 'chat',
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        metadata TEXT,
+        message_count INTEGER DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ai_messages (
+        id TEXT PRIMARY KEY,
+        thread_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        tool_calls TEXT,
+        metadata TEXT,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (thread_id) REFERENCES ai_threads(id) ON DELETE CASCADE
+    )
+    """,
+    # 键集分页用的复合索引；(thread_id, created_at, id) 同时覆盖按线程计数
+    "CREATE INDEX IF NOT EXISTS idx_ai_messages_thread_created ON ai_messages(thread_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_ai_threads_updated ON ai_threads(updated_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_ai_threads_mode_updated ON ai_threads(mode, updated_at, id)",
+    # 已被复合索引的前缀覆盖
+    "DROP INDEX IF EXISTS idx_messages_thread_id",
+]
+
+INSERT_MESSAGE_SQL = text("""
+    INSERT INTO ai_messages (id, thread_id, role, content, tool_calls, metadata, created_at)
+    VALUES (:id, :thread_id, :role, :content, :tool_calls, :metadata, :created_at)
+""")
+
+
+def _sqlite_url(db_path: str) -> str:
+    return f"sqlite+pysqlite:///{str(db_path).replace(chr(92), '/')}"
+
+
+def encode_cursor(*values: Any) -> str:
+    """把排序键编码成不透明的分页游标"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError(f"无效的分页游标: {cursor}")
+    return values[0], values[1] or ""
+
+
+def _load_json(value: Optional[str], default: Any) -> Any:
+    if not value:
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _thread_row(row) -> Dict[str, Any]:
+    thread = dict(row)
+    thread["metadata"] = _load_json(thread.get("metadata"), {})
+    return thread
+
+
+def _message_row(row) -> Dict[str, Any]:
+    message = dict(row)
+    message["tool_calls"] = _load_json(message.get("tool_calls"), None)
+    message["metadata"] = _load_json(message.get("metadata"), {})
+    return message
+
+
+class ThreadHeadCache:
+    """
+    最近更新的前 N 个线程（按 updated_at DESC, id DESC）
+
+    缓存内容始终是全表排序的一个前缀：新建/更新的线程移到最前，超出容量从尾部淘汰，
+    删除只会让前缀变短。预热期间如有写入（version 变化）则丢弃预热结果。
+    """
+
+    def __init__(self, capacity: int = 512, ttl: float = 30.0):
+        self.capacity = max(1, capacity)
+        self.ttl = ttl
+        self._heads: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._counts: Dict[str, int] = {}
+        self._complete = False
+        self._loaded_at: Optional[float] = None
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def warm(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def install(self, rows: List[Dict[str, Any]], counts: Dict[str, int], version: int) -> None:
+        if version != self.version:
+            return
+        self._heads = OrderedDict((row["id"], row) for row in rows)
+        self._counts = dict(counts)
+        self._complete = sum(counts.values()) <= len(rows)
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._loaded_at = None
+
+    def put_front(self, thread: Dict[str, Any], created: bool = False) -> None:
+        self.version += 1
+        if not self.warm:
+            return
+        if created:
+            self._counts[thread["mode"]] = self._counts.get(thread["mode"], 0) + 1
+        self._heads[thread["id"]] = thread
+        self._heads.move_to_end(thread["id"], last=False)
+        while len(self._heads) > self.capacity:
+            self._heads.popitem(last=True)
+            self._complete = False
+
+    def remove(self, thread_id: str, mode: str) -> None:
+        self.version += 1
+        if not self.warm:
+            return
+        self._heads.pop(thread_id, None)
+        self._counts[mode] = max(0, self._counts.get(mode, 0) - 1)
+
+    def total(self, mode: Optional[str] = None) -> Optional[int]:
+        if not self.warm:
+            return None
+        return self._counts.get(mode, 0) if mode else sum(self._counts.values())
+
+    def page(self, limit: int, offset: int, mode: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """缓存能完整回答这一页时返回线程列表，否则返回 None"""
+        if not self.warm:
+            self.misses += 1
+            return None
+        entries = [t for t in self._heads.values() if not mode or t["mode"] == mode]
+        if offset + limit > len(entries) and not self._complete:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [dict(t) for t in entries[offset:offset + limit]]
+
+
+class ChatStore:
+    """ai_threads / ai_messages 的异步存储"""
+
+    def __init__(self, db_path: Optional[str] = None, head_cache: Optional[ThreadHeadCache] = None):
+        self.db_path = str(db_path or settings.DATABASE_PATH)
+        self.url = _sqlite_url(self.db_path)
+        self.heads = head_cache or ThreadHeadCache(
+            settings.CHAT_THREAD_HEAD_CACHE_SIZE, settings.CHAT_THREAD_HEAD_CACHE_TTL
+        )
+        self._last_ts = datetime.min
+        self.init_tables()
+
+    @property
+    def engine(self):
+        return get_async_engine(self.url)
+
+    @property
+    def sync_engine(self):
+        return get_engine(self.url)
+
+    def init_tables(self) -> None:
+        """初始化线程相关的数据库表"""
+        with self.sync_engine.begin() as conn:
+            conn.execute(text(_DDL[0]))
+            # 如果表已存在但没有 mode 列，添加该列
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(ai_threads)"))]
+            if "mode" not in columns:
+                conn.execute(text("ALTER TABLE ai_threads ADD COLUMN mode TEXT NOT NULL DEFAULT 'chat'"))
+            for ddl in _DDL[1:]:
+                conn.execute(text(ddl))
+
+    def next_timestamps(self, count: int) -> List[str]:
+        """严格递增的时间戳：同一批消息的顺序由 created_at 保证，而不是随机的 uuid"""
+        now = datetime.now()
+        start = max(now, self._last_ts + timedelta(microseconds=1))
+        stamps = [start + timedelta(microseconds=i) for i in range(count)]
+        if stamps:
+            self._last_ts = stamps[-1]
+        return [ts.isoformat() for ts in stamps]
+
+    # ---------- 线程 ----------
+
+    async def _fetch_thread(self, conn, thread_id: str) -> Optional[Dict[str, Any]]:
+        row = (await conn.execute(
+            text("SELECT * FROM ai_threads WHERE id = :id"), {"id": thread_id}
+        )).mappings().first()
+        return _thread_row(row) if row else None
+
+    async def _touch(self, conn, thread_id: str) -> None:
+        thread = await self._fetch_thread(conn, thread_id)
+        if thread:
+            self.heads.put_front(thread)
+
+    async def create_thread(self, title: str, mode: str = "chat", metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        thread_id = str(uuid.uuid4())
+        now = self.next_timestamps(1)[0]
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text("""
+                    INSERT INTO ai_threads (id, title, mode, created_at, updated_at, metadata, message_count)
+                    VALUES (:id, :title, :mode, :now, :now, :metadata, 0)
+                """),
+                {"id": thread_id, "title": title, "mode": mode, "now": now,
+                 "metadata": json.dumps(metadata) if metadata else None},
+            )
+        thread = {
+            "id": thread_id, "title": title, "mode": mode, "created_at": now,
+            "updated_at": now, "metadata": metadata, "message_count": 0,
+        }
+        self.heads.put_front(dict(thread), created=True)
+        return thread
+
+    async def _warm_heads(self) -> None:
+        version = self.heads.version
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(
+                text("SELECT * FROM ai_threads ORDER BY updated_at DESC, id DESC LIMIT :limit"),
+                {"limit": self.heads.capacity},
+            )).mappings().all()
+            counts = (await conn.execute(text("SELECT mode, COUNT(*) FROM ai_threads GROUP BY mode"))).all()
+        self.heads.install([_thread_row(r) for r in rows], {m: n for m, n in counts}, version)
+
+    async def list_threads(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        mode: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """按更新时间倒序列出线程；传 cursor 时按键集翻页（忽略 offset）"""
+        if not self.heads.warm:
+            await self._warm_heads()
+
+        threads = None if cursor else self.heads.page(limit + 1, offset, mode)
+        if threads is None:
+            clauses, params = [], {"limit": limit + 1, "offset": 0 if cursor else offset}
+            if mode:
+                clauses.append("mode = :mode")
+                params["mode"] = mode
+            if cursor:
+                params["after_updated"], params["after_id"] = decode_cursor(cursor)
+                clauses.append("(updated_at, id) < (:after_updated, :after_id)")
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            async with self.engine.connect() as conn:
+                rows = (await conn.execute(
+                    text(f"SELECT * FROM ai_threads {where} ORDER BY updated_at DESC, id DESC LIMIT :limit OFFSET :offset"),
+                    params,
+                )).mappings().all()
+            threads = [_thread_row(r) for r in rows]
+
+        total = self.heads.total(mode)
+        if total is None:
+            async with self.engine.connect() as conn:
+                total = (await conn.execute(
+                    text(f"SELECT COUNT(*) FROM ai_threads {'WHERE mode = :mode' if mode else ''}"),
+                    {"mode": mode} if mode else {},
+                )).scalar_one()
+
+        has_more = len(threads) > limit
+        threads = threads[:limit]
+        next_cursor = encode_cursor(threads[-1]["updated_at"], threads[-1]["id"]) if has_more and threads else None
+        return {"threads": threads, "total": total, "next_cursor": next_cursor}
+
+    async def get_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        async with self.engine.connect() as conn:
+            return await self._fetch_thread(conn, thread_id)
+
+    async def update_thread(
+        self, thread_id: str, title: Optional[str] = None, metadata: Optional[Dict] = None
+    ) -> bool:
+        """更新线程标题或元数据；线程不存在返回 False"""
+        updates, params = [], {"id": thread_id}
+        if title is not None:
+            updates.append("title = :title")
+            params["title"] = title
+        if metadata is not None:
+            updates.append("metadata = :metadata")
+            params["metadata"] = json.dumps(metadata)
+
+        async with self.engine.begin() as conn:
+            if not updates:
+                return await self._fetch_thread(conn, thread_id) is not None
+            updates.append("updated_at = :now")
+            params["now"] = self.next_timestamps(1)[0]
+            result = await conn.execute(text(f"UPDATE ai_threads SET {', '.join(updates)} WHERE id = :id"), params)
+            if result.rowcount == 0:
+                return False
+            await self._touch(conn, thread_id)
+        return True
+
+    async def delete_thread(self, thread_id: str) -> bool:
+        """删除线程及其所有消息（SQLite 默认不启用外键，消息需显式删除）"""
+        async with self.engine.begin() as conn:
+            thread = await self._fetch_thread(conn, thread_id)
+            if not thread:
+                return False
+            await conn.execute(text("DELETE FROM ai_messages WHERE thread_id = :id"), {"id": thread_id})
+            await conn.execute(text("DELETE FROM ai_threads WHERE id = :id"), {"id": thread_id})
+        self.heads.remove(thread_id, thread["mode"])
+        return True
+
+    # ---------- 消息 ----------
+
+    async def add_messages(self, thread_id: str, messages: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """批量写入消息（一次 executemany）；线程不存在返回 None"""
+        stamps = self.next_timestamps(len(messages))
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "thread_id": thread_id,
+                "role": msg["role"],
+                "content": msg["content"],
+                "tool_calls": json.dumps(msg["tool_calls"]) if msg.get("tool_calls") else None,
+                "metadata": json.dumps(msg["metadata"]) if msg.get("metadata") else None,
+                "created_at": ts,
+            }
+            for msg, ts in zip(messages, stamps)
+        ]
+        async with self.engine.begin() as conn:
+            exists = (await conn.execute(
+                text("SELECT 1 FROM ai_threads WHERE id = :id"), {"id": thread_id}
+            )).first()
+            if not exists:
+                return None
+            if rows:
+                await conn.execute(INSERT_MESSAGE_SQL, rows)
+                await conn.execute(
+                    text("""
+                        UPDATE ai_threads
+                        SET message_count = message_count + :n, updated_at = :now
+                        WHERE id = :id
+                    """),
+                    {"n": len(rows), "now": stamps[-1], "id": thread_id},
+                )
+                await self._touch(conn, thread_id)
+        return [
+            {**row, "tool_calls": msg.get("tool_calls"), "metadata": msg.get("metadata")}
+            for row, msg in zip(rows, messages)
+        ]
+
+    async def get_messages(
+        self,
+        thread_id: str,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """按时间正序读取消息；传 cursor 时从游标之后继续（忽略 offset）。线程不存在返回 None"""
+        params: Dict[str, Any] = {"thread_id": thread_id, "limit": limit + 1, "offset": 0 if cursor else offset}
+        keyset = ""
+        if cursor:
+            params["after_created"], params["after_id"] = decode_cursor(cursor)
+            keyset = "AND (created_at, id) > (:after_created, :after_id)"
+
+        async with self.engine.connect() as conn:
+            if not (await conn.execute(text("SELECT 1 FROM ai_threads WHERE id = :id"), {"id": thread_id})).first():
+                return None
+            total = (await conn.execute(
+                text("SELECT COUNT(*) FROM ai_messages WHERE thread_id = :thread_id"), {"thread_id": thread_id}
+            )).scalar_one()
+            rows = (await conn.execute(
+                text(f"""
+                    SELECT * FROM ai_messages
+                    WHERE thread_id = :thread_id {keyset}
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT :limit OFFSET :offset
+                """),
+                params,
+            )).mappings().all()
+
+        messages = [_message_row(r) for r in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and messages:
+            next_cursor = encode_cursor(messages[-1]["created_at"], messages[-1]["id"])
+        return {"messages": messages, "total": total, "next_cursor": next_cursor}
+
+    async def delete_message(self, thread_id: str, message_id: str) -> bool:
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                text("DELETE FROM ai_messages WHERE id = :id AND thread_id = :thread_id"),
+                {"id": message_id, "thread_id": thread_id},
+            )
+            if result.rowcount == 0:
+                return False
+            await conn.execute(
+                text("""
+                    UPDATE ai_threads
+                    SET message_count = message_count - 1, updated_at = :now
+                    WHERE id = :id
+                """),
+                {"now": self.next_timestamps(1)[0], "id": thread_id},
+            )
+            await self._touch(conn, thread_id)
+        return True
+
+    async def clear_messages(self, thread_id: str) -> Optional[int]:
+        """清空线程消息，返回删除条数；线程不存在返回 None"""
+        async with self.engine.begin() as conn:
+            if not (await conn.execute(text("SELECT 1 FROM ai_threads WHERE id = :id"), {"id": thread_id})).first():
+                return None
+            deleted = (await conn.execute(
+                text("DELETE FROM ai_messages WHERE thread_id = :id"), {"id": thread_id}
+            )).rowcount
+            await conn.execute(
+                text("UPDATE ai_threads SET message_count = 0, updated_at = :now WHERE id = :id"),
+                {"now": self.next_timestamps(1)[0], "id": thread_id},
+            )
+            await self._touch(conn, thread_id)
+        return deleted
+
+
+_chat_store: Optional[ChatStore] = None
+
+
+def get_chat_store() -> ChatStore:
+    """获取聊天存储单例（主库 DATABASE_PATH）"""
+    global _chat_store
+    if _chat_store is None:
+        _chat_store = ChatStore()
+    return _chat_store
@@ -0,0 +1,335 @@
+"""
+素材元数据后台回填
+
+list_files 只读数据库；缺少 filesize / duration / 分辨率的 file_records 由本服务在后台补齐：
+1. 通过部分索引一次查出待补齐记录（按 id 游标分批）
+2. 在有界进程池中并行 ffprobe
+3. 每批结果在一个事务内写回
+4. 探测结果按 (path, size, mtime) 缓存在 file_probe_cache 表，文件未变化时不再重复探测
+5. 一轮结束后仍缺元数据的记录（文件丢失 / 无法探测）记为未解决，列表接口遇到它们不再触发回填，
+   只由定期扫描重试
+"""
+import asyncio
+import math
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi_app.core.config import settings
+from fastapi_app.core.logger import logger
+from utils.video_probe import probe_video_metadata
+
+
+# 需要回填的条件；查询必须使用同一表达式才能命中部分索引
+NEEDS_METADATA_SQL = (
+    "filesize IS NULL OR filesize <= 0 OR duration IS NULL "
+    "OR video_width IS NULL OR video_height IS NULL"
+)
+
+
+def _probe_file(path: str) -> dict:
+    """进程池任务：探测单个视频（必须是模块级函数以便序列化）"""
+    try:
+        return probe_video_metadata(path)
+    except Exception:
+        return {}
+
+
+def _valid_filesize(value) -> bool:
+    return isinstance(value, (int, float)) and math.isfinite(value) and value > 0
+
+
+class FileMetadataBackfill:
+    """素材元数据回填服务"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_workers: int = 2,
+        batch_size: int = 100,
+        interval_seconds: int = 300
+    ):
+        """
+        Args:
+            db_path: 主库路径，默认 settings.DATABASE_PATH
+            max_workers: ffprobe 进程池大小
+            batch_size: 每批处理（并写回）的记录数
+            interval_seconds: 后台定期扫描间隔
+        """
+        self.db_path = db_path or settings.DATABASE_PATH
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_run: Optional[datetime] = None
+        self._last_result: Dict[str, int] = {}
+        self._unresolved_ids: Set[int] = set()
+        self._file_service = None
+
+    # ------------------------------------------------------------------ schema
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def ensure_schema(self, conn: sqlite3.Connection) -> None:
+        """创建部分索引与探测缓存表"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(file_records)").fetchall()}
+        if {"filesize", "duration", "video_width", "video_height"} <= columns:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_file_records_needs_metadata "
+                f"ON file_records(id) WHERE {NEEDS_METADATA_SQL}"
+            )
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_probe_cache (
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                duration REAL,
+                video_width INTEGER,
+                video_height INTEGER,
+                aspect_ratio TEXT,
+                orientation TEXT,
+                probed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (path, size, mtime)
+            )
+        """)
+        conn.commit()
+
+    # ------------------------------------------------------------------ core
+
+    def _resolve_path(self, file_path: Optional[str]) -> Optional[str]:
+        if self._file_service is None:
+            # 延迟导入，避免与 files.services 循环依赖
+            from fastapi_app.api.v1.files.services import FileService
+
+            self._file_service = FileService()
+        return self._file_service._resolve_video_path(file_path)
+
+    def _load_cached(self, conn: sqlite3.Connection, key: Tuple[str, int, float]) -> Optional[dict]:
+        row = conn.execute(
+            """
+            SELECT duration, video_width, video_height, aspect_ratio, orientation
+            FROM file_probe_cache WHERE path = ? AND size = ? AND mtime = ?
+            """,
+            key,
+        ).fetchone()
+        if not row:
+            return None
+        return {
+            "duration": row["duration"],
+            "width": row["video_width"],
+            "height": row["video_height"],
+            "aspect_ratio": row["aspect_ratio"],
+            "orientation": row["orientation"],
+        }
+
+    def run_once(self) -> Dict[str, int]:
+        """同步执行一轮回填（在线程中调用），返回统计"""
+        stats = {"scanned": 0, "updated": 0, "probed": 0, "cache_hits": 0, "missing_files": 0}
+        executor: Optional[ProcessPoolExecutor] = None
+
+        conn = self._connect()
+        try:
+            self.ensure_schema(conn)
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    f"""
+                    SELECT id, file_path, filesize, duration, video_width, video_height
+                    FROM file_records
+                    WHERE ({NEEDS_METADATA_SQL}) AND id > ?
+                    ORDER BY id
+                    LIMIT ?
+                    """,
+                    (last_id, self.batch_size),
+                ).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1]["id"]
+                stats["scanned"] += len(rows)
+
+                # 1. stat + 缓存查询
+                pending: List[Tuple[sqlite3.Row, str, Tuple[str, int, float]]] = []
+                results: Dict[int, Tuple[sqlite3.Row, os.stat_result, Optional[dict]]] = {}
+                for row in rows:
+                    resolved = self._resolve_path(row["file_path"])
+                    if not resolved:
+                        stats["missing_files"] += 1
+                        continue
+                    try:
+                        st = os.stat(resolved)
+                    except OSError:
+                        stats["missing_files"] += 1
+                        continue
+
+                    needs_probe = row["duration"] is None or row["video_width"] is None or row["video_height"] is None
+                    meta = None
+                    if needs_probe:
+                        key = (resolved, st.st_size, st.st_mtime)
+                        meta = self._load_cached(conn, key)
+                        if meta is None:
+                            pending.append((row, resolved, key))
+                        else:
+                            stats["cache_hits"] += 1
+                    results[row["id"]] = (row, st, meta)
+
+                # 2. 有界进程池并行探测
+                if pending:
+                    if executor is None:
+                        executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    probed = list(executor.map(_probe_file, [p[1] for p in pending]))
+                    stats["probed"] += len(pending)
+                    cache_rows = []
+                    for (row, _, key), meta in zip(pending, probed):
+                        _, st, _ = results[row["id"]]
+                        results[row["id"]] = (row, st, meta)
+                        cache_rows.append((
+                            *key,
+                            meta.get("duration"),
+                            meta.get("width"),
+                            meta.get("height"),
+                            meta.get("aspect_ratio"),
+                            meta.get("orientation"),
+                        ))
+                    conn.executemany(
+                        """
+                        INSERT OR REPLACE INTO file_probe_cache
+                            (path, size, mtime, duration, video_width, video_height, aspect_ratio, orientation)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        cache_rows,
+                    )
+
+                # 3. 批量写回（COALESCE：只补齐缺失字段）
+                updates = []
+                for row, st, meta in results.values():
+                    meta = meta or {}
+                    filesize = None if _valid_filesize(row["filesize"]) else st.st_size / (1024 * 1024)
+                    duration = meta.get("duration") if row["duration"] is None else None
+                    has_dims = row["video_width"] is not None and row["video_height"] is not None
+                    w, h = (None, None) if has_dims else (meta.get("width"), meta.get("height"))
+                    if not (w and h):
+                        w = h = None
+                    if filesize is None and not duration and w is None:
+                        continue
+                    updates.append((
+                        filesize,
+                        duration or None,
+                        w,
+                        h,
+                        meta.get("aspect_ratio") if w else None,
+                        meta.get("orientation") if w else None,
+                        row["id"],
+                    ))
+
+                if updates:
+                    conn.executemany(
+                        """
+                        UPDATE file_records SET
+                            filesize = COALESCE(?, filesize),
+                            duration = COALESCE(?, duration),
+                            video_width = COALESCE(?, video_width),
+                            video_height = COALESCE(?, video_height),
+                            aspect_ratio = COALESCE(?, aspect_ratio),
+                            orientation = COALESCE(?, orientation)
+                        WHERE id = ?
+                        """,
+                        updates,
+                    )
+                    stats["updated"] += len(updates)
+                conn.commit()
+
+            self._unresolved_ids = {
+                row[0] for row in conn.execute(f"SELECT id FROM file_records WHERE {NEEDS_METADATA_SQL}")
+            }
+            stats["unresolved"] = len(self._unresolved_ids)
+        finally:
+            conn.close()
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        self._last_run = datetime.now()
+        self._last_result = stats
+        if stats["updated"] or stats["probed"]:
+            logger.info(f"[MetadataBackfill] 回填完成: {stats}")
+        return stats
+
+    # ------------------------------------------------------------------ lifecycle
+
+    async def start(self):
+        """启动后台回填循环"""
+        if self._running:
+            return
+        self._running = True
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"[MetadataBackfill] 已启动，扫描间隔: {self.interval_seconds}s, 进程数: {self.max_workers}")
+
+    async def stop(self):
+        """停止后台回填循环"""
+        if not self._running:
+            return
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        logger.info("[MetadataBackfill] 已停止")
+
+    def trigger(self, file_ids: Optional[Iterable[int]] = None) -> bool:
+        """
+        请求尽快执行一轮回填（非阻塞，可在任意协程中调用）
+
+        传入 file_ids 时，只有其中存在上一轮之后的新记录才触发；上一轮已尝试但无法补齐的记录
+        交给定期扫描，避免每次列表请求都发起一轮全量扫描。返回是否触发。
+        """
+        if self._wakeup is None:
+            return False
+        if file_ids is not None and all(file_id in self._unresolved_ids for file_id in file_ids):
+            return False
+        self._wakeup.set()
+        return True
+
+    async def _run_loop(self):
+        while self._running:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[MetadataBackfill] 回填失败: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def get_status(self) -> dict:
+        return {
+            "running": self._running,
+            "interval_seconds": self.interval_seconds,
+            "max_workers": self.max_workers,
+            "last_run": self._last_run.isoformat() if self._last_run else None,
+            "last_result": self._last_result,
+        }
+
+
+# 全局实例
+_backfill: Optional[FileMetadataBackfill] = None
+
+
+def get_metadata_backfill() -> FileMetadataBackfill:
+    """获取全局回填服务实例"""
+    global _backfill
+    if _backfill is None:
+        _backfill = FileMetadataBackfill()
+    return _backfill
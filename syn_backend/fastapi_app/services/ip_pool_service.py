@@ -1,9 +1,19 @@
 """
 IP池管理服务
+
+IP 池存放在 SQLite（WAL）中：
+- proxy_ips: 每个 IP 一行，使用计数 / 近期成功率 / RTT 用单条 UPDATE 原地累加
+- ip_bindings: account_id -> ip_id 索引，按账号查 IP 不再遍历整个池
+旧版 data/ip_pool.json 在库为空时自动导入一次，导入后改名为 ip_pool.json.migrated，
+之后即使删光所有代理也不会再次导入。
 """
 import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Any
 from datetime import datetime
 import random
 import asyncio
@@ -15,38 +25,161 @@ from fastapi_app.models.ip_pool import (
 from fastapi_app.core.logger import logger
 
 
+HEALTH_CHECK_CONCURRENCY = int(os.getenv("IP_HEALTH_CHECK_CONCURRENCY", "20"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("IP_HEALTH_CHECK_TIMEOUT", "10"))
+
+# 滑动平均系数：越大越偏向最近的结果
+EWMA_ALPHA = 0.2
+# 未测过延迟的 IP 按此 RTT 参与加权
+DEFAULT_RTT_MS = 1000.0
+
+# proxy_ips 的列（bound_account_ids 单独存在 ip_bindings 中）
+_COLUMNS = (
+    "id", "ip", "port", "protocol", "username", "password", "ip_type", "status",
+    "max_bindings", "country", "region", "city", "isp",
+    "success_count", "fail_count", "total_used", "rolling_success_rate", "avg_rtt_ms",
+    "last_used_at", "last_check_at", "created_at", "updated_at", "note", "provider",
+)
+
+# 滑动平均的 SQL 片段：首个样本直接取值
+_EWMA_SQL = "CASE WHEN {col} IS NULL THEN ? ELSE {col} * (1 - {alpha}) + ? * {alpha} END"
+
+
+def _status_value(status) -> str:
+    return status.value if hasattr(status, "value") else str(status)
+
+
+def selection_weight(ip: ProxyIP) -> float:
+    """auto_bind 的选取权重：近期成功率越高、RTT 越低、剩余绑定名额越多越容易被选中"""
+    if ip.max_bindings <= 0:
+        return 0.0
+    free_ratio = max(0, ip.max_bindings - len(ip.bound_account_ids)) / ip.max_bindings
+    # 新 IP 没有历史，按满成功率给一次机会
+    success = ip.rolling_success_rate if ip.rolling_success_rate is not None else 1.0
+    rtt = ip.avg_rtt_ms if ip.avg_rtt_ms else DEFAULT_RTT_MS
+    return (success ** 2) * free_ratio * 1000.0 / max(rtt, 50.0)
+
+
 class IPPoolService:
     """IP池管理服务"""
-    
-    def __init__(self):
-        self.ip_pool_file = Path("data/ip_pool.json")
-        self.ips: Dict[str, ProxyIP] = {}
-        self._load_ips()
-    
-    def _load_ips(self):
-        """从文件加载IP池"""
-        if self.ip_pool_file.exists():
-            try:
-                with open(self.ip_pool_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for item in data:
-                        ip = ProxyIP(**item)
-                        self.ips[ip.id] = ip
-                logger.info(f"已加载 {len(self.ips)} 个代理IP")
-            except Exception as e:
-                logger.error(f"加载IP池失败: {e}")
-        logger.info("IP池重载完成")  # 触发重载监测
-    
-    def _save_ips(self):
-        """保存IP池到文件"""
-        self.ip_pool_file.parent.mkdir(parents=True, exist_ok=True)
+
+    def __init__(self, db_path: Optional[Path] = None, legacy_json: Optional[Path] = None):
+        self.ip_pool_file = Path(legacy_json or "data/ip_pool.json")
+        self.db_path = Path(db_path or self.ip_pool_file.with_suffix(".db"))
+        self._init_db()
+        self._migrate_json()
+
+    # ---------- 存储 ----------
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
         try:
-            data = [ip.model_dump(mode="json") for ip in self.ips.values()]
-            with open(self.ip_pool_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"保存IP池失败: {e}")
-    
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """初始化IP池表"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS proxy_ips (
+                    id TEXT PRIMARY KEY,
+                    ip TEXT NOT NULL,
+                    port INTEGER NOT NULL,
+                    protocol TEXT NOT NULL,
+                    username TEXT,
+                    password TEXT,
+                    ip_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    max_bindings INTEGER NOT NULL DEFAULT 30,
+                    country TEXT,
+                    region TEXT,
+                    city TEXT,
+                    isp TEXT,
+                    success_count INTEGER NOT NULL DEFAULT 0,
+                    fail_count INTEGER NOT NULL DEFAULT 0,
+                    total_used INTEGER NOT NULL DEFAULT 0,
+                    rolling_success_rate REAL,
+                    avg_rtt_ms REAL,
+                    last_used_at TEXT,
+                    last_check_at TEXT,
+                    created_at TEXT,
+                    updated_at TEXT,
+                    note TEXT,
+                    provider TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ip_bindings (
+                    account_id TEXT PRIMARY KEY,
+                    ip_id TEXT NOT NULL,
+                    bound_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ip_bindings_ip ON ip_bindings(ip_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_proxy_ips_status ON proxy_ips(status, region)")
+
+    def _migrate_json(self):
+        """库为空时导入旧版 JSON 文件，导入后（或库里已有数据时）改名标记为已迁移"""
+        if not self.ip_pool_file.exists():
+            return
+        with self._connect() as conn:
+            if not conn.execute("SELECT 1 FROM proxy_ips LIMIT 1").fetchone():
+                try:
+                    data = json.loads(self.ip_pool_file.read_text(encoding="utf-8"))
+                    ips = [ProxyIP(**item) for item in data]
+                except Exception as e:
+                    logger.error(f"加载IP池失败: {e}")
+                    return
+                for ip in ips:
+                    self._insert_ip(conn, ip)
+                logger.info(f"已从 {self.ip_pool_file} 导入 {len(ips)} 个代理IP")
+        migrated = self.ip_pool_file.with_name(self.ip_pool_file.name + ".migrated")
+        try:
+            self.ip_pool_file.replace(migrated)
+        except OSError as e:
+            logger.warning(f"标记旧版IP池文件为已迁移失败: {e}")
+
+    @staticmethod
+    def _insert_ip(conn: sqlite3.Connection, ip: ProxyIP):
+        data = ip.model_dump(mode="json")
+        conn.execute(
+            f"INSERT OR REPLACE INTO proxy_ips ({', '.join(_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+            [data.get(col) for col in _COLUMNS],
+        )
+        now = datetime.now().isoformat()
+        conn.executemany(
+            "INSERT OR REPLACE INTO ip_bindings (account_id, ip_id, bound_at) VALUES (?, ?, ?)",
+            [(account_id, ip.id, now) for account_id in ip.bound_account_ids],
+        )
+
+    def _fetch_ips(self, conn: sqlite3.Connection, where: str = "", params=()) -> List[ProxyIP]:
+        rows = conn.execute(f"SELECT * FROM proxy_ips {where} ORDER BY created_at", params).fetchall()
+        if not rows:
+            return []
+        bindings: Dict[str, List[str]] = {}
+        ids = [row["id"] for row in rows]
+        for chunk_start in range(0, len(ids), 500):
+            chunk = ids[chunk_start:chunk_start + 500]
+            for b in conn.execute(
+                f"SELECT ip_id, account_id FROM ip_bindings WHERE ip_id IN ({', '.join('?' for _ in chunk)}) "
+                "ORDER BY bound_at",
+                chunk,
+            ):
+                bindings.setdefault(b["ip_id"], []).append(b["account_id"])
+        return [
+            ProxyIP(**{k: row[k] for k in row.keys() if row[k] is not None}, bound_account_ids=bindings.get(row["id"], []))
+            for row in rows
+        ]
+
+    # ---------- CRUD ----------
+
     def add_ip(self, request: AddIPRequest) -> ProxyIP:
         """添加IP到池中"""
         ip = ProxyIP(
@@ -64,16 +197,18 @@ class IPPoolService:
             note=request.note,
             provider=request.provider
         )
-        
-        self.ips[ip.id] = ip
-        self._save_ips()
+
+        with self._connect() as conn:
+            self._insert_ip(conn, ip)
         logger.info(f"添加IP: {ip.ip}:{ip.port}")
         return ip
-    
+
     def get_ip(self, ip_id: str) -> Optional[ProxyIP]:
         """获取单个IP"""
-        return self.ips.get(ip_id)
-    
+        with self._connect() as conn:
+            ips = self._fetch_ips(conn, "WHERE id = ?", (ip_id,))
+        return ips[0] if ips else None
+
     def list_ips(
         self,
         status: Optional[IPStatus] = None,
@@ -81,199 +216,255 @@ class IPPoolService:
         region: Optional[str] = None
     ) -> List[ProxyIP]:
         """获取IP列表"""
-        ips = list(self.ips.values())
-        
+        clauses, params = [], []
         if status:
-            ips = [ip for ip in ips if ip.status == status]
+            clauses.append("status = ?")
+            params.append(_status_value(status))
         if ip_type:
-            ips = [ip for ip in ips if ip.ip_type == ip_type]
+            clauses.append("ip_type = ?")
+            params.append(_status_value(ip_type))
         if region:
-            ips = [ip for ip in ips if ip.region == region]
-        
-        return ips
-    
+            clauses.append("region = ?")
+            params.append(region)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            return self._fetch_ips(conn, where, params)
+
     def delete_ip(self, ip_id: str) -> bool:
         """删除IP"""
-        if ip_id in self.ips:
-            ip = self.ips[ip_id]
-            del self.ips[ip_id]
-            self._save_ips()
-            logger.info(f"删除IP: {ip.ip}:{ip.port}")
-            return True
-        return False
-    
+        with self._connect() as conn:
+            row = conn.execute("SELECT ip, port FROM proxy_ips WHERE id = ?", (ip_id,)).fetchone()
+            if not row:
+                return False
+            conn.execute("DELETE FROM ip_bindings WHERE ip_id = ?", (ip_id,))
+            conn.execute("DELETE FROM proxy_ips WHERE id = ?", (ip_id,))
+        logger.info(f"删除IP: {row['ip']}:{row['port']}")
+        return True
+
     def update_ip_status(self, ip_id: str, status: IPStatus):
         """更新IP状态"""
-        if ip_id in self.ips:
-            self.ips[ip_id].status = status
-            self.ips[ip_id].updated_at = datetime.now()
-            self._save_ips()
-    
+        self._update_statuses({ip_id: status})
+
+    def _update_statuses(self, statuses: Dict[str, IPStatus]):
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE proxy_ips SET status = ?, updated_at = ? WHERE id = ?",
+                [(_status_value(status), now, ip_id) for ip_id, status in statuses.items()],
+            )
+
+    # ---------- 账号绑定 ----------
+
     def bind_account_to_ip(self, ip_id: str, account_id: str) -> bool:
         """绑定账号到IP"""
-        ip = self.ips.get(ip_id)
-        if not ip:
-            raise ValueError(f"IP {ip_id} 不存在")
-        
-        # 检查是否已达到绑定上限
-        if len(ip.bound_account_ids) >= ip.max_bindings:
-            raise ValueError(f"IP已达到绑定上限 ({ip.max_bindings})")
-        
-        # 先解绑该账号在其他IP的绑定
-        self.unbind_account(account_id)
-        
-        # 添加绑定
-        if account_id not in ip.bound_account_ids:
-            ip.bound_account_ids.append(account_id)
-            ip.updated_at = datetime.now()
-            self._save_ips()
-            logger.info(f"绑定账号 {account_id} 到IP {ip.ip}:{ip.port}")
-        
+        with self._connect() as conn:
+            # 检查上限与写入放在同一个写事务里，并发绑定不会超额
+            conn.execute("BEGIN IMMEDIATE")
+            ip = conn.execute("SELECT ip, port, max_bindings FROM proxy_ips WHERE id = ?", (ip_id,)).fetchone()
+            if not ip:
+                raise ValueError(f"IP {ip_id} 不存在")
+
+            current = conn.execute("SELECT ip_id FROM ip_bindings WHERE account_id = ?", (account_id,)).fetchone()
+            if current and current["ip_id"] == ip_id:
+                return True
+
+            # 检查是否已达到绑定上限
+            bound = conn.execute("SELECT COUNT(*) FROM ip_bindings WHERE ip_id = ?", (ip_id,)).fetchone()[0]
+            if bound >= ip["max_bindings"]:
+                raise ValueError(f"IP已达到绑定上限 ({ip['max_bindings']})")
+
+            # account_id 是主键：REPLACE 同时解除该账号在其他IP的绑定
+            now = datetime.now().isoformat()
+            conn.execute(
+                "INSERT OR REPLACE INTO ip_bindings (account_id, ip_id, bound_at) VALUES (?, ?, ?)",
+                (account_id, ip_id, now),
+            )
+            conn.execute("UPDATE proxy_ips SET updated_at = ? WHERE id IN (?, ?)",
+                         (now, ip_id, current["ip_id"] if current else ip_id))
+        logger.info(f"绑定账号 {account_id} 到IP {ip['ip']}:{ip['port']}")
         return True
-    
+
     def unbind_account(self, account_id: str) -> bool:
         """解绑账号"""
-        for ip in self.ips.values():
-            if account_id in ip.bound_account_ids:
-                ip.bound_account_ids.remove(account_id)
-                ip.updated_at = datetime.now()
-                self._save_ips()
-                logger.info(f"解绑账号 {account_id}")
-                return True
-        return False
-    
+        with self._connect() as conn:
+            row = conn.execute("SELECT ip_id FROM ip_bindings WHERE account_id = ?", (account_id,)).fetchone()
+            if not row:
+                return False
+            conn.execute("DELETE FROM ip_bindings WHERE account_id = ?", (account_id,))
+            conn.execute("UPDATE proxy_ips SET updated_at = ? WHERE id = ?", (datetime.now().isoformat(), row["ip_id"]))
+        logger.info(f"解绑账号 {account_id}")
+        return True
+
     def get_ip_for_account(self, account_id: str) -> Optional[ProxyIP]:
         """获取账号绑定的IP"""
-        for ip in self.ips.values():
-            if account_id in ip.bound_account_ids:
-                return ip
-        return None
-    
+        with self._connect() as conn:
+            ips = self._fetch_ips(
+                conn, "WHERE id = (SELECT ip_id FROM ip_bindings WHERE account_id = ?)", (account_id,)
+            )
+        return ips[0] if ips else None
+
     def auto_bind_account(
         self,
         account_id: str,
         prefer_region: Optional[str] = None
     ) -> Optional[ProxyIP]:
-        """自动为账号分配IP"""
+        """自动为账号分配IP（按近期成功率与RTT加权随机）"""
+        available = [
+            ip for ip in self.list_ips(status=IPStatus.AVAILABLE)
+            if len(ip.bound_account_ids) < ip.max_bindings
+        ]
+
         # 1. 优先选择同地区的可用IP
         candidates = []
-        
         if prefer_region:
-            candidates = [
-                ip for ip in self.ips.values()
-                if ip.region == prefer_region
-                and len(ip.bound_account_ids) < ip.max_bindings
-                and ip.status == IPStatus.AVAILABLE
-            ]
-        
+            candidates = [ip for ip in available if ip.region == prefer_region]
+
         # 2. 如果没有同地区的，选择任意可用IP
         if not candidates:
-            candidates = [
-                ip for ip in self.ips.values()
-                if len(ip.bound_account_ids) < ip.max_bindings
-                and ip.status == IPStatus.AVAILABLE
-            ]
-        
+            candidates = available
+
         if not candidates:
             logger.warning(f"没有可用IP为账号 {account_id} 分配")
             return None
-        
-        # 选择绑定数最少的IP
-        best_ip = min(candidates, key=lambda x: len(x.bound_account_ids))
+
+        weights = [selection_weight(ip) for ip in candidates]
+        if any(weights):
+            best_ip = random.choices(candidates, weights=weights, k=1)[0]
+        else:
+            # 全部权重为 0（近期全部失败）时退回绑定数最少
+            best_ip = min(candidates, key=lambda x: len(x.bound_account_ids))
         self.bind_account_to_ip(best_ip.id, account_id)
-        return best_ip
-    
-    async def check_ip_health(self, ip: ProxyIP) -> bool:
-        """检测IP健康状态"""
+        return self.get_ip(best_ip.id)
+
+    # ---------- 健康检测 ----------
+
+    async def check_ip_health(self, ip: ProxyIP, timeout: Optional[float] = None) -> bool:
+        """检测IP健康状态（同时记录RTT与近期成功率）"""
+        timeout = timeout or HEALTH_CHECK_TIMEOUT
+        healthy = False
+        rtt_ms = None
         try:
             proxy_url = ip.to_proxy_url()
-            client_kwargs = {"timeout": 10.0}
-            
+            client_kwargs = {"timeout": timeout}
+
             # 只有当proxy_url存在时才设置代理
             if proxy_url:
                 client_kwargs["proxy"] = proxy_url
-            
+
             async with httpx.AsyncClient(**client_kwargs) as client:
+                started = time.perf_counter()
                 # 测试请求到百度 (国内更稳定)
                 try:
                     response = await client.get("https://www.baidu.com")
-                    ip.last_check_at = datetime.now()
-                    
+
                     if 200 <= response.status_code < 400:
                         logger.info(f"IP {ip.ip}:{ip.port} 健康检测通过")
-                        return True
+                        healthy = True
                     else:
                         logger.warning(f"IP {ip.ip}:{ip.port} 返回状态码 {response.status_code}")
-                        return False
                 except Exception as e:
                     # 如果百度失败，尝试备用地址 (myip)
                     try:
                         response = await client.get("https://myip.ipip.net")
-                        if response.status_code == 200:
-                            return True
-                    except:
+                        healthy = response.status_code == 200
+                    except Exception:
                         pass
-                    raise e
-                    
+                    if not healthy:
+                        raise e
+                if healthy:
+                    rtt_ms = (time.perf_counter() - started) * 1000
+
         except Exception as e:
             logger.error(f"IP {ip.ip}:{ip.port} 健康检测失败: {e}")
-            return False
-    
-    async def batch_check_health(self) -> Dict[str, bool]:
-        """批量检测IP健康状态"""
-        results = {}
-        tasks = []
-        
-        for ip_id, ip in self.ips.items():
-            task = self.check_ip_health(ip)
-            tasks.append((ip_id, task))
-        
-        for ip_id, task in tasks:
-            healthy = await task
-            results[ip_id] = healthy
-            
-            # 更新状态
-            if healthy:
-                self.update_ip_status(ip_id, IPStatus.AVAILABLE)
-            else:
-                self.update_ip_status(ip_id, IPStatus.FAILED)
-        
+
+        self._record_check(ip.id, healthy, rtt_ms)
+        return healthy
+
+    def _record_check(self, ip_id: str, healthy: bool, rtt_ms: Optional[float]):
+        success = 1.0 if healthy else 0.0
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                f"""
+                UPDATE proxy_ips SET
+                    last_check_at = ?,
+                    rolling_success_rate = {_EWMA_SQL.format(col='rolling_success_rate', alpha=EWMA_ALPHA)},
+                    avg_rtt_ms = CASE WHEN ? IS NULL THEN avg_rtt_ms
+                                 ELSE {_EWMA_SQL.format(col='avg_rtt_ms', alpha=EWMA_ALPHA)} END
+                WHERE id = ?
+                """,
+                (now, success, success, rtt_ms, rtt_ms, rtt_ms, ip_id),
+            )
+
+    async def batch_check_health(
+        self,
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, bool]:
+        """批量并发检测IP健康状态"""
+        timeout = timeout or HEALTH_CHECK_TIMEOUT
+        semaphore = asyncio.Semaphore(max(1, concurrency or HEALTH_CHECK_CONCURRENCY))
+
+        async def _check(ip: ProxyIP) -> bool:
+            async with semaphore:
+                try:
+                    # 外层超时兜底：主地址和备用地址各自超时时整体仍受控
+                    return await asyncio.wait_for(self.check_ip_health(ip, timeout), timeout * 2)
+                except asyncio.TimeoutError:
+                    logger.error(f"IP {ip.ip}:{ip.port} 健康检测超时")
+                    self._record_check(ip.id, False, None)
+                    return False
+
+        ips = self.list_ips()
+        healthy = await asyncio.gather(*(_check(ip) for ip in ips))
+        results = {ip.id: ok for ip, ok in zip(ips, healthy)}
+
+        # 更新状态
+        self._update_statuses({
+            ip_id: IPStatus.AVAILABLE if ok else IPStatus.FAILED
+            for ip_id, ok in results.items()
+        })
         return results
-    
-    def record_usage(self, ip_id: str, success: bool):
-        """记录IP使用结果"""
-        if ip_id in self.ips:
-            ip = self.ips[ip_id]
-            ip.total_used += 1
-            
-            if success:
-                ip.success_count += 1
-            else:
-                ip.fail_count += 1
-            
-            ip.last_used_at = datetime.now()
-            self._save_ips()
-    
+
+    def record_usage(self, ip_id: str, success: bool, rtt_ms: Optional[float] = None):
+        """记录IP使用结果（原地累加，不重写整个池）"""
+        value = 1.0 if success else 0.0
+        with self._connect() as conn:
+            conn.execute(
+                f"""
+                UPDATE proxy_ips SET
+                    total_used = total_used + 1,
+                    success_count = success_count + ?,
+                    fail_count = fail_count + ?,
+                    last_used_at = ?,
+                    rolling_success_rate = {_EWMA_SQL.format(col='rolling_success_rate', alpha=EWMA_ALPHA)},
+                    avg_rtt_ms = CASE WHEN ? IS NULL THEN avg_rtt_ms
+                                 ELSE {_EWMA_SQL.format(col='avg_rtt_ms', alpha=EWMA_ALPHA)} END
+                WHERE id = ?
+                """,
+                (int(success), int(not success), datetime.now().isoformat(),
+                 value, value, rtt_ms, rtt_ms, rtt_ms, ip_id),
+            )
+
     def get_statistics(self) -> IPStatsResponse:
         """获取IP池统计"""
-        total = len(self.ips)
-        available = sum(1 for ip in self.ips.values() if ip.status == IPStatus.AVAILABLE)
-        in_use = sum(1 for ip in self.ips.values() if ip.status == IPStatus.IN_USE)
-        failed = sum(1 for ip in self.ips.values() if ip.status == IPStatus.FAILED)
-        banned = sum(1 for ip in self.ips.values() if ip.status == IPStatus.BANNED)
-        
-        total_bindings = sum(len(ip.bound_account_ids) for ip in self.ips.values())
-        
-        # 计算平均成功率
-        success_rates = [ip.success_rate for ip in self.ips.values() if ip.total_used > 0]
-        avg_success_rate = sum(success_rates) / len(success_rates) if success_rates else 0.0
-        
+        with self._connect() as conn:
+            counts = {
+                row["status"]: row["n"]
+                for row in conn.execute("SELECT status, COUNT(*) AS n FROM proxy_ips GROUP BY status")
+            }
+            total_bindings = conn.execute("SELECT COUNT(*) FROM ip_bindings").fetchone()[0]
+            # 计算平均成功率
+            avg_success_rate = conn.execute(
+                "SELECT AVG(ROUND(success_count * 100.0 / total_used, 2)) FROM proxy_ips WHERE total_used > 0"
+            ).fetchone()[0] or 0.0
+
         return IPStatsResponse(
-            total=total,
-            available=available,
-            in_use=in_use,
-            failed=failed,
-            banned=banned,
+            total=sum(counts.values()),
+            available=counts.get(IPStatus.AVAILABLE.value, 0),
+            in_use=counts.get(IPStatus.IN_USE.value, 0),
+            failed=counts.get(IPStatus.FAILED.value, 0),
+            banned=counts.get(IPStatus.BANNED.value, 0),
             total_bindings=total_bindings,
             avg_success_rate=round(avg_success_rate, 2)
         )
@@ -2,9 +2,10 @@
 矩阵发布调度器
 核心逻辑：平台优先 → 账号轮询 → 素材分配
 """
+import os
 import sys
 import threading
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from collections import deque
 from pathlib import Path
 from datetime import datetime
@@ -17,64 +18,174 @@ from fastapi_app.models.matrix_task import MatrixTask, TaskStatus
 from fastapi_app.core.logger import logger
 
 
+class MatrixTaskJournal:
+    """
+    矩阵任务持久化：快照 + 追加式日志（JSONL）
+
+    - 每次状态变化只追加变化任务的一行 {"op": "upsert", "task": {...}}
+    - 日志行数超过阈值时压缩：把当前全部任务写成快照（临时文件 + os.replace），再清空日志
+    - 启动时加载快照并按顺序重放日志；崩溃导致的半行会被忽略
+    """
+
+    def __init__(self, snapshot_file: Path, compact_threshold: int = 1000, fsync: bool = False):
+        self.snapshot_file = snapshot_file
+        self.journal_file = snapshot_file.with_suffix(".journal.jsonl")
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.entries = 0
+        self._fh = None
+
+    def load(self) -> Dict[str, dict]:
+        """返回按首次出现顺序排列的 task_id -> 最新任务数据"""
+        tasks: Dict[str, dict] = {}
+        if self.snapshot_file.exists():
+            try:
+                with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                    for item in json.load(f):
+                        if isinstance(item, dict) and item.get("task_id"):
+                            tasks[item["task_id"]] = item
+            except Exception as e:
+                logger.error(f"Failed to load matrix tasks snapshot: {e}")
+
+        self.entries = 0
+        if self.journal_file.exists():
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                for lineno, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"矩阵任务日志第 {lineno} 行损坏，已忽略（可能是崩溃时的未完成写入）")
+                        continue
+                    self.entries += 1
+                    op = record.get("op")
+                    if op == "upsert":
+                        item = record.get("task") or {}
+                        if item.get("task_id"):
+                            tasks[item["task_id"]] = item
+                    elif op == "reset":
+                        tasks.clear()
+        return tasks
+
+    def _handle(self):
+        if self._fh is None:
+            self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.journal_file, "a", encoding="utf-8")
+        return self._fh
+
+    def _write(self, records: List[dict]) -> None:
+        fh = self._handle()
+        fh.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        fh.flush()
+        if self.fsync:
+            os.fsync(fh.fileno())
+        self.entries += len(records)
+
+    def append(self, tasks: Iterable[MatrixTask]) -> None:
+        records = [{"op": "upsert", "task": t.model_dump(mode="json")} for t in tasks]
+        if records:
+            self._write(records)
+
+    def append_reset(self) -> None:
+        self._write([{"op": "reset"}])
+
+    def should_compact(self, total_tasks: int) -> bool:
+        # 阈值随任务总量增长，保证压缩的摊销成本为 O(1)
+        return self.entries >= max(self.compact_threshold, total_tasks)
+
+    def compact(self, tasks: Iterable[MatrixTask]) -> None:
+        """写入完整快照并清空日志"""
+        self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_file.with_suffix(".json.tmp")
+        data = [t.model_dump(mode="json") for t in tasks]
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_file)
+
+        # 快照落盘后才截断日志：两步之间崩溃时重放日志也是幂等的
+        self.close()
+        with open(self.journal_file, "w", encoding="utf-8"):
+            pass
+        self.entries = 0
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
 class MatrixScheduler:
     """矩阵任务调度器"""
 
-    def __init__(self):
+    def __init__(self, tasks_file: Optional[Path] = None, compact_threshold: int = 1000):
         self.pending_queue = deque()  # 待执行队列
         self.retry_queue = deque()    # 重试队列（优先级更高）
-        self.running = []             # 正在执行的任务
-        self.finished = []            # 已完成任务
-        self.failed = []              # 失败任务
+        self.running: Dict[str, MatrixTask] = {}   # 正在执行的任务（task_id 索引）
+        self.finished: Dict[str, MatrixTask] = {}  # 已完成任务
+        self.failed: Dict[str, MatrixTask] = {}    # 失败任务
         self._lock = threading.Lock()
         
         # 任务索引（快速查找）
         self.task_index: Dict[str, MatrixTask] = {}
-        self.tasks_file = Path("data/matrix_tasks.json")
+        self.tasks_file = Path(tasks_file) if tasks_file else Path("data/matrix_tasks.json")
+        self._journal = MatrixTaskJournal(self.tasks_file, compact_threshold=compact_threshold)
         self._load_tasks()
 
     def _load_tasks(self):
-        """从文件加载任务"""
-        if self.tasks_file.exists():
+        """加载快照并重放日志，恢复各队列"""
+        try:
+            items = self._journal.load()
+        except Exception as e:
+            logger.error(f"Failed to load matrix tasks: {e}")
+            return
+
+        for item in items.values():
             try:
-                with open(self.tasks_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for item in data:
-                        try:
-                            task = MatrixTask(**item)
-                            self.task_index[task.task_id] = task
-                            
-                            # 根据状态恢复队列
-                            if task.status == TaskStatus.PENDING:
-                                self.pending_queue.append(task)
-                            elif task.status == TaskStatus.RETRY or task.status == TaskStatus.NEED_VERIFICATION:
-                                self.retry_queue.append(task)
-                            elif task.status == TaskStatus.RUNNING:
-                                # 重启后，运行中的任务重置为 Pending 或 Retry
-                                task.status = TaskStatus.RETRY
-                                task.retry_count += 1
-                                task.error_message = f"System restarted at {datetime.now()}"
-                                self.retry_queue.append(task)
-                            elif task.status == TaskStatus.FINISHED:
-                                self.finished.append(task)
-                            elif task.status == TaskStatus.FAILED:
-                                self.failed.append(task)
-                        except Exception as e:
-                            logger.error(f"Error loading task item: {e}")
-                logger.info(f"已加载 {len(self.task_index)} 个矩阵任务")
+                task = MatrixTask(**item)
+                self.task_index[task.task_id] = task
+                
+                # 根据状态恢复队列
+                if task.status == TaskStatus.PENDING:
+                    self.pending_queue.append(task)
+                elif task.status == TaskStatus.RETRY or task.status == TaskStatus.NEED_VERIFICATION:
+                    self.retry_queue.append(task)
+                elif task.status == TaskStatus.RUNNING:
+                    # 重启后，运行中的任务重置为 Pending 或 Retry
+                    task.status = TaskStatus.RETRY
+                    task.retry_count += 1
+                    task.error_message = f"System restarted at {datetime.now()}"
+                    self.retry_queue.append(task)
+                elif task.status == TaskStatus.FINISHED:
+                    self.finished[task.task_id] = task
+                elif task.status == TaskStatus.FAILED:
+                    self.failed[task.task_id] = task
             except Exception as e:
-                logger.error(f"Failed to load matrix tasks: {e}")
+                logger.error(f"Error loading task item: {e}")
 
-    def _save_tasks(self):
-        """保存任务到文件"""
-        self.tasks_file.parent.mkdir(parents=True, exist_ok=True)
+        if items:
+            logger.info(f"已加载 {len(self.task_index)} 个矩阵任务（重放日志 {self._journal.entries} 条）")
+            # 启动时压缩一次，把恢复结果（含 running -> retry）固化为新快照
+            self._compact()
+
+    def _compact(self):
+        try:
+            self._journal.compact(list(self.task_index.values()))
+        except Exception as e:
+            logger.error(f"Failed to compact matrix tasks: {e}")
+
+    def _save_tasks(self, tasks: Iterable[MatrixTask] = ()):
+        """追加变化任务到日志（调用方持有锁或处于单线程上下文），必要时压缩"""
         try:
-            # 序列化所有任务
-            data = [t.model_dump(mode="json") for t in self.task_index.values()]
-            with open(self.tasks_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            self._journal.append(tasks)
         except Exception as e:
             logger.error(f"Failed to save matrix tasks: {e}")
+            return
+        if self._journal.should_compact(len(self.task_index)):
+            self._compact()
 
     def generate_tasks(
         self,
@@ -242,7 +353,8 @@ class MatrixScheduler:
                     )
 
         logger.info(f"矩阵任务生成完成: 总计 {len(all_tasks)} 个任务")
-        self._save_tasks()
+        with self._lock:
+            self._save_tasks(all_tasks)
         return all_tasks
     
     def _create_and_add_task(
@@ -318,8 +430,8 @@ class MatrixScheduler:
             if task:
                 task.status = TaskStatus.RUNNING
                 task.started_at = datetime.now()
-                self.running.append(task)
-                self._save_tasks()
+                self.running[task.task_id] = task
+                self._save_tasks([task])
 
         return task
 
@@ -343,11 +455,11 @@ class MatrixScheduler:
 
                 task.status = TaskStatus.RUNNING
                 task.started_at = datetime.now()
-                self.running.append(task)
+                self.running[task.task_id] = task
                 tasks.append(task)
 
             if tasks:
-                self._save_tasks()
+                self._save_tasks(tasks)
 
         return tasks
 
@@ -378,7 +490,7 @@ class MatrixScheduler:
             if status == "success":
                 task.status = TaskStatus.FINISHED
                 task.completed_at = datetime.now()
-                self.finished.append(task)
+                self.finished[task_id] = task
                 logger.info(f"任务 {task_id} 执行成功")
 
             elif status == "fail":
@@ -388,7 +500,7 @@ class MatrixScheduler:
                 if task.retry_count >= task.max_retries:
                     task.status = TaskStatus.FAILED
                     task.completed_at = datetime.now()
-                    self.failed.append(task)
+                    self.failed[task_id] = task
                     logger.error(f"任务 {task_id} 失败 (已达最大重试次数 {task.max_retries})")
                 else:
                     task.status = TaskStatus.RETRY
@@ -402,15 +514,19 @@ class MatrixScheduler:
                 self.retry_queue.append(task)
                 logger.warning(f"任务 {task_id} 需要验证，移至 retry 队列末尾")
 
-            self._save_tasks()
+            self._save_tasks([task])
             return task
 
     def _remove_from_all_queues(self, task: MatrixTask):
-        """从所有队列中移除任务"""
-        for queue in [self.pending_queue, self.retry_queue, self.running]:
+        """从所有队列中移除任务（running/finished/failed 为 O(1)，仅排队中的任务需扫描 deque）"""
+        for index in (self.running, self.finished, self.failed):
+            if index.pop(task.task_id, None) is not None:
+                return
+        for queue in (self.retry_queue, self.pending_queue):
             try:
                 queue.remove(task)
-            except (ValueError, AttributeError):
+                return
+            except ValueError:
                 pass
 
     def get_task_by_id(self, task_id: str) -> Optional[MatrixTask]:
@@ -422,9 +538,9 @@ class MatrixScheduler:
         return {
             "pending": list(self.pending_queue),
             "retry": list(self.retry_queue),
-            "running": self.running.copy(),
-            "finished": self.finished.copy(),
-            "failed": self.failed.copy(),
+            "running": list(self.running.values()),
+            "finished": list(self.finished.values()),
+            "failed": list(self.failed.values()),
         }
 
     def get_statistics(self) -> Dict[str, int]:
@@ -440,27 +556,33 @@ class MatrixScheduler:
 
     def reset(self):
         """重置所有队列"""
-        self.pending_queue.clear()
-        self.retry_queue.clear()
-        self.running.clear()
-        self.finished.clear()
-        self.failed.clear()
-        self.task_index.clear()
-        self._save_tasks()
+        with self._lock:
+            self.pending_queue.clear()
+            self.retry_queue.clear()
+            self.running.clear()
+            self.finished.clear()
+            self.failed.clear()
+            self.task_index.clear()
+            try:
+                self._journal.append_reset()
+            except Exception as e:
+                logger.error(f"Failed to save matrix tasks: {e}")
+            self._compact()
         logger.info("任务调度器已重置")
 
     def cancel_task(self, task_id: str) -> bool:
         """取消任务"""
-        task = self.task_index.get(task_id)
-        if not task:
-            return False
-        
-        self._remove_from_all_queues(task)
-        task.status = TaskStatus.FAILED
-        task.error_message = "用户取消"
-        task.completed_at = datetime.now()
-        self.failed.append(task)
-        self._save_tasks()
+        with self._lock:
+            task = self.task_index.get(task_id)
+            if not task:
+                return False
+
+            self._remove_from_all_queues(task)
+            task.status = TaskStatus.FAILED
+            task.error_message = "用户取消"
+            task.completed_at = datetime.now()
+            self.failed[task_id] = task
+            self._save_tasks([task])
         logger.info(f"任务 {task_id} 已取消")
         return True
 
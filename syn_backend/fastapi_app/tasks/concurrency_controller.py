@@ -6,21 +6,69 @@ from __future__ import annotations
 
 import time
 import uuid
-from contextlib import contextmanager
-from typing import Optional, Dict, Any
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional, Dict, Any, List
 from loguru import logger
 
-from fastapi_app.cache.redis_client import get_redis
+from fastapi_app.cache.redis_client import get_async_redis, get_redis
+
+
+# 原子申请多个维度的令牌（全有或全无）
+# KEYS: 各维度信号量 ZSET
+# ARGV: now, expire_at, token, key_ttl, max_1 .. max_n
+# 返回 {0, 0} 表示成功；否则返回 {被占满维度的序号(从1开始), 该维度最早过期令牌的时间}
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local expire_at = tonumber(ARGV[2])
+local token = ARGV[3]
+local ttl = tonumber(ARGV[4])
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now)
+    if redis.call('ZCARD', key) >= tonumber(ARGV[4 + i]) then
+        local earliest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        return {i, earliest[2] or '0'}
+    end
+end
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, expire_at, token)
+    redis.call('EXPIRE', key, ttl)
+end
+return {0, '0'}
+"""
+
+# 释放令牌，并向对应维度的唤醒列表推送通知
+# KEYS: n 个信号量 ZSET，随后 n 个唤醒 LIST
+# ARGV: token, n, key_ttl
+RELEASE_SCRIPT = """
+local n = tonumber(ARGV[2])
+for i = 1, n do
+    if redis.call('ZREM', KEYS[i], ARGV[1]) == 1 then
+        local wakeup = KEYS[n + i]
+        redis.call('LPUSH', wakeup, '1')
+        redis.call('LTRIM', wakeup, 0, 63)
+        redis.call('EXPIRE', wakeup, tonumber(ARGV[3]))
+    end
+end
+return 1
+"""
 
 
 class ConcurrencyController:
     """分布式并发控制器"""
 
-    def __init__(self):
-        self.redis = get_redis()
+    def __init__(self, redis_client: Optional[Any] = None, async_redis_client: Optional[Any] = None):
+        self.redis = redis_client if redis_client is not None else get_redis()
+        self._async_redis = async_redis_client
         self.config_key = "concurrency:config"
         self.semaphore_prefix = "concurrency:semaphore:"
+        self.wakeup_prefix = "concurrency:wakeup:"
         self.stats_prefix = "concurrency:stats:"
+        # 单次阻塞等待上限（秒），防止令牌因进程崩溃未释放时无人唤醒
+        self.max_block = 5.0
+
+        if self.redis:
+            self._acquire_script = self.redis.register_script(ACQUIRE_SCRIPT)
+            self._release_script = self.redis.register_script(RELEASE_SCRIPT)
 
     def _get_config(self) -> Dict[str, Any]:
         """获取并发控制配置"""
@@ -37,6 +85,18 @@ class ConcurrencyController:
 
         return self._default_config()
 
+    async def _get_config_async(self, aredis: Any) -> Dict[str, Any]:
+        """获取并发控制配置（异步）"""
+        try:
+            config_json = await aredis.get(self.config_key)
+            if config_json:
+                import json
+                return json.loads(config_json)
+        except Exception as e:
+            logger.error(f"[Concurrency] Failed to get config: {e}")
+
+        return self._default_config()
+
     def _default_config(self) -> Dict[str, Any]:
         """默认配置"""
         return {
@@ -75,6 +135,83 @@ class ConcurrencyController:
             logger.error(f"[Concurrency] Failed to update config: {e}")
             return False
 
+    def _build_dimensions(
+        self,
+        config: Dict[str, Any],
+        platform: Optional[str],
+        account_id: Optional[str],
+        task_type: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        根据配置生成需要限流的维度（0 表示不限制，不参与申请）
+
+        顺序与原逐个申请时一致：全局 -> 平台 -> 账号 -> 任务类型
+        """
+        dimensions = []
+
+        global_max = config.get("global_max", 0)
+        if global_max > 0:
+            dimensions.append({
+                "key": "global",
+                "max": global_max,
+                "max_wait": 30,
+                "message": "全局并发限制，请稍后重试",
+            })
+        else:
+            logger.debug("[Concurrency] Global concurrency unlimited (global_max=0)")
+
+        if platform:
+            platform_max = config.get("platform_max", {}).get(platform, 0)
+            if platform_max > 0:
+                dimensions.append({
+                    "key": f"platform:{platform}",
+                    "max": platform_max,
+                    "max_wait": 30,
+                    "message": f"平台 {platform} 并发限制，请稍后重试",
+                })
+
+        if account_id:
+            account_max = config.get("account_max", 1)
+            if account_max > 0:
+                dimensions.append({
+                    "key": f"account:{account_id}",
+                    "max": account_max,
+                    "max_wait": 60,
+                    "message": f"账号 {account_id} 正在执行任务，请稍后重试",
+                })
+
+        if task_type:
+            task_type_max = config.get("task_type_max", {}).get(task_type, 0)
+            if task_type_max > 0:
+                dimensions.append({
+                    "key": f"task_type:{task_type}",
+                    "max": task_type_max,
+                    "max_wait": 30,
+                    "message": f"任务类型 {task_type} 并发限制",
+                })
+
+        return dimensions
+
+    def _script_args(self, dimensions: List[Dict[str, Any]], token: str, timeout: int):
+        now = time.time()
+        keys = [f"{self.semaphore_prefix}{d['key']}" for d in dimensions]
+        args = [now, now + timeout, token, timeout + 60]  # 额外60秒确保清理
+        args.extend(d["max"] for d in dimensions)
+        return keys, args
+
+    def _release_args(self, dimensions: List[Dict[str, Any]], token: str, timeout: int):
+        keys = [f"{self.semaphore_prefix}{d['key']}" for d in dimensions]
+        keys.extend(f"{self.wakeup_prefix}{d['key']}" for d in dimensions)
+        return keys, [token, len(dimensions), timeout + 60]
+
+    def _block_seconds(self, earliest_expire: float, deadline: float) -> float:
+        """计算本轮阻塞等待时长：不超过剩余等待时间、最早令牌的过期时间和 max_block"""
+        now = time.time()
+        block = min(deadline - now, self.max_block)
+        if earliest_expire > 0:
+            block = min(block, max(earliest_expire - now, 0))
+        return max(block, 0.01)
+
     @contextmanager
     def acquire(
         self,
@@ -86,6 +223,9 @@ class ConcurrencyController:
         """
         获取并发令牌（上下文管理器）
 
+        所有维度的令牌通过一个 Lua 脚本原子申请：要么全部获得，要么一个都不占用。
+        申请失败时在被占满维度的唤醒列表上 BLPOP，直到有令牌释放或等待超时。
+
         Args:
             platform: 平台名称（douyin, xiaohongshu等）
             account_id: 账号ID
@@ -113,149 +253,147 @@ class ConcurrencyController:
             return
 
         timeout = timeout or config.get("timeout", 300)
-        token = str(uuid.uuid4())
-        acquired_locks = []
+        dimensions = self._build_dimensions(config, platform, account_id, task_type)
+        if not dimensions:
+            yield True
+            return
 
+        token = str(uuid.uuid4())
+        self._acquire_all(dimensions, token, timeout)
         try:
-            # 1. 尝试获取全局并发令牌（0表示无限制）
-            global_max = config.get("global_max", 0)
-            if global_max > 0:  # 只有大于0才进行限制
-                if not self._acquire_semaphore("global", global_max, token, timeout):
-                    logger.warning(f"[Concurrency] Global limit reached ({global_max}), waiting...")
-                    # 等待获取
-                    if not self._wait_and_acquire("global", global_max, token, timeout, max_wait=30):
-                        raise ConcurrencyLimitException("全局并发限制，请稍后重试")
-                acquired_locks.append(("global", token))
-            else:
-                logger.debug("[Concurrency] Global concurrency unlimited (global_max=0)")
-
-            # 2. 尝试获取平台级别令牌
-            if platform:
-                platform_max = config.get("platform_max", {}).get(platform, 0)
-                if platform_max > 0:  # 只有大于0才进行限制
-                    semaphore_key = f"platform:{platform}"
-                    if not self._acquire_semaphore(semaphore_key, platform_max, token, timeout):
-                        logger.warning(f"[Concurrency] Platform {platform} limit reached ({platform_max}), waiting...")
-                        if not self._wait_and_acquire(semaphore_key, platform_max, token, timeout, max_wait=30):
-                            raise ConcurrencyLimitException(f"平台 {platform} 并发限制，请稍后重试")
-                    acquired_locks.append((semaphore_key, token))
-
-            # 3. 尝试获取账号级别令牌（最严格）
-            if account_id:
-                account_max = config.get("account_max", 1)
-                if account_max > 0:  # 只有大于0才进行限制
-                    semaphore_key = f"account:{account_id}"
-                    if not self._acquire_semaphore(semaphore_key, account_max, token, timeout):
-                        logger.warning(f"[Concurrency] Account {account_id} is busy, waiting...")
-                        if not self._wait_and_acquire(semaphore_key, account_max, token, timeout, max_wait=60):
-                            raise ConcurrencyLimitException(f"账号 {account_id} 正在执行任务，请稍后重试")
-                    acquired_locks.append((semaphore_key, token))
-
-            # 4. 尝试获取任务类型令牌
-            if task_type:
-                task_type_max = config.get("task_type_max", {}).get(task_type, 0)
-                if task_type_max > 0:  # 只有大于0才进行限制
-                    semaphore_key = f"task_type:{task_type}"
-                    if not self._acquire_semaphore(semaphore_key, task_type_max, token, timeout):
-                        logger.warning(f"[Concurrency] Task type {task_type} limit reached ({task_type_max})")
-                        if not self._wait_and_acquire(semaphore_key, task_type_max, token, timeout, max_wait=30):
-                            raise ConcurrencyLimitException(f"任务类型 {task_type} 并发限制")
-                    acquired_locks.append((semaphore_key, token))
-
             # 记录统计信息
             self._record_stats(platform, account_id, task_type, "acquired")
-
-            logger.debug(f"[Concurrency] Acquired locks: {acquired_locks}")
+            logger.debug(f"[Concurrency] Acquired locks: {[d['key'] for d in dimensions]}")
             yield True
-
-        except ConcurrencyLimitException:
-            raise
-        except Exception as e:
-            logger.error(f"[Concurrency] Acquire error: {e}")
-            raise
         finally:
             # 释放所有已获取的令牌
-            for semaphore_key, token in acquired_locks:
-                self._release_semaphore(semaphore_key, token)
+            self._release_all(dimensions, token, timeout)
+            self._record_stats(platform, account_id, task_type, "released")
+
+    def _acquire_all(self, dimensions: List[Dict[str, Any]], token: str, timeout: int):
+        """原子申请所有维度的令牌，等待超时抛出 ConcurrencyLimitException"""
+        deadline = time.time() + max(d["max_wait"] for d in dimensions)
+        warned = set()
+
+        while True:
+            keys, args = self._script_args(dimensions, token, timeout)
+            try:
+                blocked_at, earliest = self._acquire_script(keys=keys, args=args)
+            except Exception as e:
+                logger.error(f"[Concurrency] Acquire error: {e}")
+                raise
+
+            if int(blocked_at) == 0:
+                return
+
+            dimension = dimensions[int(blocked_at) - 1]
+            if time.time() >= deadline:
+                raise ConcurrencyLimitException(dimension["message"])
+
+            if dimension["key"] not in warned:
+                warned.add(dimension["key"])
+                logger.warning(f"[Concurrency] {dimension['key']} limit reached ({dimension['max']}), waiting...")
+
+            block = self._block_seconds(float(earliest), deadline)
+            self.redis.blpop([f"{self.wakeup_prefix}{dimension['key']}"], timeout=block)
+
+    def _release_all(self, dimensions: List[Dict[str, Any]], token: str, timeout: int):
+        """释放令牌并唤醒一个等待者"""
+        keys, args = self._release_args(dimensions, token, timeout)
+        try:
+            self._release_script(keys=keys, args=args)
+            logger.debug(f"[Concurrency] Released {[d['key'] for d in dimensions]}")
+        except Exception as e:
+            logger.error(f"[Concurrency] Release semaphore error: {e}")
 
-            # 记录统计信息
-            if acquired_locks:
-                self._record_stats(platform, account_id, task_type, "released")
+    @asynccontextmanager
+    async def acquire_async(
+        self,
+        platform: Optional[str] = None,
+        account_id: Optional[str] = None,
+        task_type: str = "publish",
+        timeout: Optional[int] = None
+    ):
+        """
+        acquire() 的异步版本，供 FastAPI 路由等事件循环内使用
 
-    def _acquire_semaphore(self, key: str, max_count: int, token: str, timeout: int) -> bool:
+        Usage:
+            async with concurrency_controller.acquire_async(platform="douyin"):
+                ...
         """
-        尝试获取信号量令牌
+        aredis = self._get_async_redis()
+        if not aredis:
+            logger.warning("[Concurrency] Redis not available, skipping concurrency control")
+            yield True
+            return
 
-        Args:
-            key: 信号量键
-            max_count: 最大并发数
-            token: 令牌ID
-            timeout: 超时时间
+        config = await self._get_config_async(aredis)
 
-        Returns:
-            bool: 是否成功获取
-        """
-        semaphore_key = f"{self.semaphore_prefix}{key}"
-        now = time.time()
-        expire_time = now + timeout
+        # 如果未启用并发控制，直接放行
+        if not config.get("enabled", True):
+            yield True
+            return
 
-        try:
-            # 清理过期的令牌
-            self.redis.zremrangebyscore(semaphore_key, 0, now)
+        timeout = timeout or config.get("timeout", 300)
+        dimensions = self._build_dimensions(config, platform, account_id, task_type)
+        if not dimensions:
+            yield True
+            return
 
-            # 尝试添加令牌
-            current_count = self.redis.zcard(semaphore_key)
-            if current_count < max_count:
-                self.redis.zadd(semaphore_key, {token: expire_time})
-                self.redis.expire(semaphore_key, timeout + 60)  # 额外60秒确保清理
-                logger.debug(f"[Concurrency] Acquired {key}: {current_count + 1}/{max_count}")
-                return True
+        token = str(uuid.uuid4())
+        acquire_script = aredis.register_script(ACQUIRE_SCRIPT)
+        release_script = aredis.register_script(RELEASE_SCRIPT)
+        deadline = time.time() + max(d["max_wait"] for d in dimensions)
 
-            return False
-        except Exception as e:
-            logger.error(f"[Concurrency] Acquire semaphore error: {e}")
-            return False
+        while True:
+            keys, args = self._script_args(dimensions, token, timeout)
+            blocked_at, earliest = await acquire_script(keys=keys, args=args)
+            if int(blocked_at) == 0:
+                break
 
-    def _wait_and_acquire(
+            dimension = dimensions[int(blocked_at) - 1]
+            if time.time() >= deadline:
+                raise ConcurrencyLimitException(dimension["message"])
+
+            block = self._block_seconds(float(earliest), deadline)
+            await aredis.blpop([f"{self.wakeup_prefix}{dimension['key']}"], timeout=block)
+
+        try:
+            await self._record_stats_async(aredis, platform, task_type, "acquired")
+            yield True
+        finally:
+            keys, args = self._release_args(dimensions, token, timeout)
+            try:
+                await release_script(keys=keys, args=args)
+            except Exception as e:
+                logger.error(f"[Concurrency] Release semaphore error: {e}")
+            await self._record_stats_async(aredis, platform, task_type, "released")
+
+    def _get_async_redis(self):
+        if self._async_redis is None:
+            self._async_redis = get_async_redis()
+        return self._async_redis
+
+    def _stats_pipeline(
         self,
-        key: str,
-        max_count: int,
-        token: str,
-        timeout: int,
-        max_wait: int = 30,
-        poll_interval: float = 0.5
-    ) -> bool:
-        """
-        等待并获取信号量令牌
+        client: Any,
+        platform: Optional[str],
+        task_type: str,
+        action: str
+    ):
+        stats_key = f"{self.stats_prefix}counters"
+        pipe = client.pipeline(transaction=False)
+        pipe.hincrby(stats_key, f"{action}:total", 1)
 
-        Args:
-            key: 信号量键
-            max_count: 最大并发数
-            token: 令牌ID
-            timeout: 令牌超时时间
-            max_wait: 最大等待时间（秒）
-            poll_interval: 轮询间隔（秒）
-
-        Returns:
-            bool: 是否成功获取
-        """
-        start_time = time.time()
-        while time.time() - start_time < max_wait:
-            if self._acquire_semaphore(key, max_count, token, timeout):
-                return True
-            time.sleep(poll_interval)
+        if platform:
+            pipe.hincrby(stats_key, f"{action}:platform:{platform}", 1)
 
-        return False
+        if task_type:
+            pipe.hincrby(stats_key, f"{action}:task_type:{task_type}", 1)
 
-    def _release_semaphore(self, key: str, token: str):
-        """释放信号量令牌"""
-        semaphore_key = f"{self.semaphore_prefix}{key}"
-        try:
-            removed = self.redis.zrem(semaphore_key, token)
-            if removed:
-                logger.debug(f"[Concurrency] Released {key}")
-        except Exception as e:
-            logger.error(f"[Concurrency] Release semaphore error: {e}")
+        # 设置过期时间
+        pipe.expire(stats_key, 86400)  # 保存24小时
+        return pipe
 
     def _record_stats(
         self,
@@ -266,17 +404,19 @@ class ConcurrencyController:
     ):
         """记录并发统计信息"""
         try:
-            stats_key = f"{self.stats_prefix}counters"
-            self.redis.hincrby(stats_key, f"{action}:total", 1)
-
-            if platform:
-                self.redis.hincrby(stats_key, f"{action}:platform:{platform}", 1)
-
-            if task_type:
-                self.redis.hincrby(stats_key, f"{action}:task_type:{task_type}", 1)
+            self._stats_pipeline(self.redis, platform, task_type, action).execute()
+        except Exception as e:
+            logger.error(f"[Concurrency] Record stats error: {e}")
 
-            # 设置过期时间
-            self.redis.expire(stats_key, 86400)  # 保存24小时
+    async def _record_stats_async(
+        self,
+        aredis: Any,
+        platform: Optional[str],
+        task_type: str,
+        action: str
+    ):
+        try:
+            await self._stats_pipeline(aredis, platform, task_type, action).execute()
         except Exception as e:
             logger.error(f"[Concurrency] Record stats error: {e}")
 
@@ -4,7 +4,6 @@ Celery 发布任务定义
 """
 from __future__ import annotations
 
-import asyncio
 import json
 import traceback
 import sys
@@ -19,6 +18,7 @@ from loguru import logger
 from fastapi_app.tasks.celery_app import celery_app
 from fastapi_app.tasks.task_state_manager import task_state_manager
 from fastapi_app.tasks.concurrency_controller import concurrency_controller, ConcurrencyLimitException
+from fastapi_app.tasks.worker_runtime import worker_runtime
 from fastapi_app.core.timezone_utils import now_beijing_naive, now_beijing_iso
 
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -243,13 +243,11 @@ def publish_single_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
             # 创建临时服务实例执行发布
             service = BatchPublishService(task_manager=None)
 
-            # 执行异步发布逻辑
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                result = loop.run_until_complete(service.handle_single_publish(task_data))
-            finally:
-                loop.close()
+            # 在 Worker 常驻事件循环上执行发布（共享 Playwright 驱动与浏览器池）
+            result, timings = worker_runtime.run_timed(service.handle_single_publish(task_data))
+            if isinstance(result, dict):
+                result["timings"] = timings
+            logger.info(f"[Celery] Task {task_id} timings: {timings}")
 
             # 更新素材状态为已发布
             if task_data.get('file_id'):
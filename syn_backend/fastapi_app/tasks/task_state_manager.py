@@ -1,10 +1,17 @@
 """
 任务状态管理器 - 使用 Redis 持久化任务状态
 替代原有的 SQLite 任务队列，支持分布式部署
+
+索引：
+- celery:index:created          全部任务，score 为创建时间（列表分页）
+- celery:index:status:<status>  按状态，score 为进入该状态的时间
+- celery:index:type:<type>      按类型，score 为创建时间
+任务详情 key 带 7 天 TTL；索引中超过保留期的条目由 archive_expired() 定期裁剪，保持索引有界。
 """
 from __future__ import annotations
 
 import json
+import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from loguru import logger
@@ -13,13 +20,22 @@ from fastapi_app.cache.redis_client import get_redis
 from fastapi_app.core.timezone_utils import now_beijing_naive, now_beijing_iso
 
 
+TASK_TTL_SECONDS = 86400 * 7
+STATUSES = ("pending", "running", "success", "failed", "retry", "cancelled")
+# 索引裁剪最小间隔（秒），在写入路径上顺带执行
+ARCHIVE_INTERVAL_SECONDS = 600
+
+
 class TaskStateManager:
     """基于 Redis 的任务状态管理器"""
 
-    def __init__(self):
-        self.redis = get_redis()
+    def __init__(self, redis_client: Optional[Any] = None, ttl_seconds: int = TASK_TTL_SECONDS):
+        self.redis = redis_client if redis_client is not None else get_redis()
         self.key_prefix = "celery:task:"
         self.index_prefix = "celery:index:"
+        self.ttl_seconds = ttl_seconds
+        self._last_archive = 0.0
+        self._created_index_ready = False
 
     def _task_key(self, task_id: str) -> str:
         """获取任务的 Redis key"""
@@ -29,6 +45,71 @@ class TaskStateManager:
         """获取索引的 Redis key"""
         return f"{self.index_prefix}{index_type}"
 
+    def _fetch_states(self, task_ids: List[str]) -> List[Dict[str, Any]]:
+        """MGET 一次取回多个任务详情；已过期的 id 顺带从全局索引移除"""
+        if not task_ids:
+            return []
+        values = self.redis.mget([self._task_key(task_id) for task_id in task_ids])
+        tasks, missing = [], []
+        for task_id, task_json in zip(task_ids, values):
+            if task_json:
+                tasks.append(json.loads(task_json))
+            else:
+                missing.append(task_id)
+        if missing:
+            self.redis.zrem(self._index_key("created"), *missing)
+        return tasks
+
+    def _ensure_created_index(self) -> None:
+        """旧数据没有 created 索引：首次使用时由各状态索引合并回填（只做一次）"""
+        if self._created_index_ready:
+            return
+        marker = self._index_key("created:backfilled")
+        if not self.redis.exists(marker):
+            created_key = self._index_key("created")
+            for s in STATUSES:
+                # NX：已在 created 索引中的任务保留真实创建时间
+                entries = dict(self.redis.zrange(self._index_key(f"status:{s}"), 0, -1, withscores=True))
+                if entries:
+                    self.redis.zadd(created_key, entries, nx=True)
+            self.redis.set(marker, "1")
+        self._created_index_ready = True
+
+    def _maybe_archive(self) -> None:
+        now = time.time()
+        if now - self._last_archive < ARCHIVE_INTERVAL_SECONDS:
+            return
+        self._last_archive = now
+        self.archive_expired()
+
+    def archive_expired(self, older_than_seconds: Optional[int] = None) -> int:
+        """
+        裁剪超过保留期的索引条目（任务详情 key 已由 TTL 过期）
+
+        Args:
+            older_than_seconds: 保留期，默认与任务 TTL 相同
+
+        Returns:
+            int: 从 created 索引移除的任务数
+        """
+        if not self.redis:
+            return 0
+
+        try:
+            cutoff = now_beijing_naive().timestamp() - (older_than_seconds or self.ttl_seconds)
+            type_keys = [self._index_key(f"type:{t}") for t in self.redis.smembers(self._index_key("types"))]
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zremrangebyscore(self._index_key("created"), "-inf", cutoff)
+            for key in [self._index_key(f"status:{s}") for s in STATUSES] + type_keys:
+                pipe.zremrangebyscore(key, "-inf", cutoff)
+            removed = pipe.execute()[0]
+            if removed:
+                logger.info(f"[TaskState] Archived {removed} tasks older than {cutoff:.0f}")
+            return removed
+        except Exception as e:
+            logger.error(f"[TaskState] Failed to archive tasks: {e}")
+            return 0
+
     def create_task(
         self,
         task_id: str,
@@ -70,24 +151,20 @@ class TaskStateManager:
                 "retry_count": 0
             }
 
-            # 保存任务状态
-            self.redis.set(
-                self._task_key(task_id),
-                json.dumps(task_state, ensure_ascii=False),
-                ex=86400 * 7  # 保存7天
-            )
-
-            # 添加到状态索引（用于列表查询）
-            self.redis.zadd(
-                self._index_key(f"status:{task_state['status']}"),
-                {task_id: now_beijing_naive().timestamp()}
-            )
-
+            created_ts = now_beijing_naive().timestamp()
+            pipe = self.redis.pipeline(transaction=False)
+            # 保存任务状态（保存7天）
+            pipe.set(self._task_key(task_id), json.dumps(task_state, ensure_ascii=False), ex=self.ttl_seconds)
+            # 全局创建时间索引（用于列表分页）
+            pipe.zadd(self._index_key("created"), {task_id: created_ts})
+            # 添加到状态索引
+            pipe.zadd(self._index_key(f"status:{task_state['status']}"), {task_id: created_ts})
             # 添加到类型索引
-            self.redis.zadd(
-                self._index_key(f"type:{task_type}"),
-                {task_id: now_beijing_naive().timestamp()}
-            )
+            pipe.zadd(self._index_key(f"type:{task_type}"), {task_id: created_ts})
+            pipe.sadd(self._index_key("types"), task_type)
+            pipe.execute()
+
+            self._maybe_archive()
 
             logger.debug(f"[TaskState] Created task {task_id}")
             return True
@@ -128,6 +205,7 @@ class TaskStateManager:
             # 获取当前任务状态
             task_key = self._task_key(task_id)
             task_json = self.redis.get(task_key)
+            pipe = self.redis.pipeline(transaction=False)
 
             if not task_json:
                 logger.warning(f"[TaskState] Task {task_id} not found, creating new state")
@@ -146,18 +224,21 @@ class TaskStateManager:
                     "result": None,
                     "retry_count": 0
                 }
+                pipe.zadd(self._index_key("created"), {task_id: now_beijing_naive().timestamp()}, nx=True)
+                old_status = None
             else:
                 task_state = json.loads(task_json)
+                old_status = task_state.get('status')
 
             # 更新状态索引
-            old_status = task_state.get('status')
-            if status and status != old_status:
+            new_status = status or task_state['status']
+            if new_status != old_status:
                 # 从旧状态索引中移除
                 if old_status:
-                    self.redis.zrem(self._index_key(f"status:{old_status}"), task_id)
+                    pipe.zrem(self._index_key(f"status:{old_status}"), task_id)
                 # 添加到新状态索引
-                self.redis.zadd(
-                    self._index_key(f"status:{status}"),
+                pipe.zadd(
+                    self._index_key(f"status:{new_status}"),
                     {task_id: now_beijing_naive().timestamp()}
                 )
 
@@ -177,12 +258,9 @@ class TaskStateManager:
 
             task_state['updated_at'] = now_beijing_iso()
 
-            # 保存更新后的状态
-            self.redis.set(
-                task_key,
-                json.dumps(task_state, ensure_ascii=False),
-                ex=86400 * 7
-            )
+            # 保存更新后的状态（与索引变更同一批次发送）
+            pipe.set(task_key, json.dumps(task_state, ensure_ascii=False), ex=self.ttl_seconds)
+            pipe.execute()
 
             logger.debug(f"[TaskState] Updated task {task_id}, status={status}")
             return True
@@ -238,47 +316,21 @@ class TaskStateManager:
             return []
 
         try:
-            # 确定查询的索引
+            # 确定查询的索引：均为服务端分页，只取当前页的 id
             if status:
                 # 按指定状态筛选
                 index_key = self._index_key(f"status:{status}")
-                task_ids = self.redis.zrevrange(index_key, offset, offset + limit - 1)
             elif task_type:
                 # 按类型筛选
                 index_key = self._index_key(f"type:{task_type}")
-                task_ids = self.redis.zrevrange(index_key, offset, offset + limit - 1)
             else:
-                # 获取所有任务：合并所有状态索引
-                all_task_ids = set()
-                for s in ["pending", "running", "success", "failed", "retry", "cancelled"]:
-                    status_key = self._index_key(f"status:{s}")
-                    ids = self.redis.zrevrange(status_key, 0, -1)
-                    all_task_ids.update(ids)
-
-                # 获取所有任务的详情并按创建时间排序
-                all_tasks_with_time = []
-                for task_id in all_task_ids:
-                    task_state = self.get_task_state(task_id)
-                    if task_state:
-                        # 使用创建时间作为排序依据
-                        created_at = task_state.get('created_at', '')
-                        all_tasks_with_time.append((created_at, task_state))
-
-                # 按创建时间倒序排序
-                all_tasks_with_time.sort(key=lambda x: x[0], reverse=True)
-
-                # 应用分页
-                tasks = [task for _, task in all_tasks_with_time[offset:offset + limit]]
-                return tasks
-
-            # 批量获取任务详情（当按状态或类型筛选时）
-            tasks = []
-            for task_id in task_ids:
-                task_state = self.get_task_state(task_id)
-                if task_state:
-                    tasks.append(task_state)
-
-            return tasks
+                # 全部任务：按创建时间倒序
+                self._ensure_created_index()
+                index_key = self._index_key("created")
+
+            task_ids = self.redis.zrevrange(index_key, offset, offset + limit - 1)
+            # 批量获取任务详情
+            return self._fetch_states(task_ids)
 
         except Exception as e:
             logger.error(f"[TaskState] Failed to list tasks: {e}")
@@ -302,13 +354,11 @@ class TaskStateManager:
             }
 
         try:
-            stats = {
-                "pending": self.redis.zcard(self._index_key("status:pending")) or 0,
-                "running": self.redis.zcard(self._index_key("status:running")) or 0,
-                "success": self.redis.zcard(self._index_key("status:success")) or 0,
-                "failed": self.redis.zcard(self._index_key("status:failed")) or 0,
-                "retry": self.redis.zcard(self._index_key("status:retry")) or 0,
-            }
+            counted = ("pending", "running", "success", "failed", "retry")
+            pipe = self.redis.pipeline(transaction=False)
+            for s in counted:
+                pipe.zcard(self._index_key(f"status:{s}"))
+            stats = {s: count or 0 for s, count in zip(counted, pipe.execute())}
             stats["total"] = sum(stats.values())
 
             return stats
@@ -359,19 +409,22 @@ class TaskStateManager:
         try:
             # 获取任务状态以便从索引中删除
             task_state = self.get_task_state(task_id)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zrem(self._index_key("created"), task_id)
             if task_state:
                 # 从状态索引中移除
                 status = task_state.get('status')
                 if status:
-                    self.redis.zrem(self._index_key(f"status:{status}"), task_id)
+                    pipe.zrem(self._index_key(f"status:{status}"), task_id)
 
                 # 从类型索引中移除
                 task_type = task_state.get('task_type')
                 if task_type:
-                    self.redis.zrem(self._index_key(f"type:{task_type}"), task_id)
+                    pipe.zrem(self._index_key(f"type:{task_type}"), task_id)
 
             # 删除任务数据
-            self.redis.delete(self._task_key(task_id))
+            pipe.delete(self._task_key(task_id))
+            pipe.execute()
 
             logger.info(f"[TaskState] Deleted task {task_id}")
             return True
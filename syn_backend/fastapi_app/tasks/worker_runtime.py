@@ -0,0 +1,255 @@
+"""
+Celery Worker 常驻运行时
+
+worker_pool="threads" 下每个发布任务原本都要新建事件循环、启动 Playwright 驱动、
+拉起 Chromium。这里把它们提升到 Worker 进程级别：
+- 一个常驻事件循环（独立线程 run_forever），各执行线程通过 run() 把协程提交进来
+- 一个共享 Playwright 驱动 + BrowserPool，每次上传借出隔离的 BrowserContext
+- 浏览器每服务 N 个任务回收重启
+- 分阶段计时（launch / navigate / upload / publish），写回任务结果
+
+由 Celery 信号启动/关闭；未在 Worker 内（如本地脚本直接调用上传）时，
+current_browser_pool() 返回 None，上传器退回自行启动浏览器。
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Coroutine, Dict, Optional
+
+from loguru import logger
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return int(raw.strip())
+    except ValueError:
+        logger.warning(f"[WorkerRuntime] {name}={raw!r} 不是整数，使用默认值 {default}")
+        return default
+
+
+class PhaseTimer:
+    """记录单个任务各阶段耗时（毫秒），同名阶段累加"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 1)
+
+    def snapshot(self) -> Dict[str, float]:
+        data = dict(self.timings)
+        data["total"] = round((time.perf_counter() - self._started) * 1000, 1)
+        return data
+
+
+_current_timer: contextvars.ContextVar[Optional[PhaseTimer]] = contextvars.ContextVar(
+    "publish_phase_timer", default=None
+)
+
+
+def phase(name: str):
+    """上传器内标记阶段：with phase("navigate"): ...；不在计时任务内时为空操作"""
+    timer = _current_timer.get()
+    if timer is None:
+        return contextlib.nullcontext()
+    return timer.phase(name)
+
+
+async def _new_context(browser, **options):
+    return await browser.new_context(**options)
+
+
+class WorkerRuntime:
+    """Worker 进程级常驻事件循环与浏览器池"""
+
+    def __init__(
+        self,
+        *,
+        browsers: int = 2,
+        contexts_per_browser: int = 2,
+        recycle_after: int = 20,
+        max_memory_mb: int = 0,
+    ):
+        self.browsers = browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.recycle_after = recycle_after
+        self.max_memory_mb = max_memory_mb
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pool = None
+        self.tasks_run = 0
+
+    # ---------- 事件循环 ----------
+
+    @property
+    def started(self) -> bool:
+        return self._loop is not None and self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self.started:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=_run, name="worker-runtime-loop", daemon=True)
+            self._loop = loop
+            self._pool = None
+            self._thread.start()
+            ready.wait()
+            logger.info("[WorkerRuntime] 常驻事件循环已启动")
+            return loop
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """在常驻循环上执行协程并阻塞等待结果（供 Celery 执行线程调用）"""
+        loop = self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def run_timed(self, coro: Coroutine, timeout: Optional[float] = None):
+        """执行协程并返回 (结果, 分阶段耗时)；计时器经 contextvar 传入上传器"""
+        timer = PhaseTimer()
+
+        async def _wrapped():
+            _current_timer.set(timer)
+            return await coro
+
+        try:
+            result = self.run(_wrapped(), timeout)
+        finally:
+            self.tasks_run += 1
+        return result, timer.snapshot()
+
+    # ---------- 浏览器池 ----------
+
+    def _build_pool(self):
+        from playwright_worker.browser_pool import BrowserPool
+
+        async def _launch():
+            from myUtils.browser_context import build_browser_args
+            from utils.base_social_media import HEADLESS_FLAG
+
+            options = build_browser_args()
+            options["headless"] = HEADLESS_FLAG
+            if not options.get("executable_path"):
+                options.pop("executable_path", None)
+            playwright = await pool._ensure_playwright()
+            with phase("launch"):
+                return await playwright.chromium.launch(**options)
+
+        pool = BrowserPool(
+            browsers=self.browsers,
+            contexts_per_browser=self.contexts_per_browser,
+            recycle_after=self.recycle_after,
+            max_memory_mb=self.max_memory_mb,
+            launcher=_launch,
+            context_factory=_new_context,
+        )
+        return pool
+
+    def browser_pool(self):
+        """返回当前循环上的浏览器池；不在常驻循环内调用时返回 None"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        if running is not self._loop:
+            return None
+        if self._pool is None:
+            self._pool = self._build_pool()
+        return self._pool
+
+    # ---------- 关闭与指标 ----------
+
+    def stop(self, timeout: float = 30.0) -> None:
+        with self._lock:
+            loop, thread, pool = self._loop, self._thread, self._pool
+            self._loop = self._thread = self._pool = None
+        if loop is None:
+            return
+        if pool is not None and thread is not None and thread.is_alive():
+            try:
+                asyncio.run_coroutine_threadsafe(pool.close(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"[WorkerRuntime] 关闭浏览器池失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+        logger.info("[WorkerRuntime] 常驻事件循环已关闭")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "tasks_run": self.tasks_run,
+            "browser_pool": self._pool.stats() if self._pool is not None else None,
+        }
+
+
+worker_runtime = WorkerRuntime(
+    browsers=_env_int("PUBLISH_POOL_BROWSERS", 2),
+    contexts_per_browser=_env_int("PUBLISH_POOL_CONTEXTS_PER_BROWSER", 2),
+    recycle_after=_env_int("PUBLISH_POOL_RECYCLE_AFTER", 20),
+    max_memory_mb=_env_int("PUBLISH_POOL_MAX_MEMORY_MB", 0),
+)
+
+
+def current_browser_pool():
+    """上传器获取 Worker 共享浏览器池；不在 Worker 常驻循环内时返回 None"""
+    return worker_runtime.browser_pool()
+
+
+def _connect_signals() -> None:
+    try:
+        from celery import signals
+    except ImportError:
+        return
+
+    @signals.worker_process_init.connect(weak=False)
+    def _on_process_init(**_):
+        # prefork 子进程：不能继承父进程的循环线程，重新启动
+        worker_runtime._loop = worker_runtime._thread = worker_runtime._pool = None
+        worker_runtime.start()
+
+    @signals.worker_ready.connect(weak=False)
+    def _on_worker_ready(**_):
+        # threads/solo 池：任务与 Worker 主进程同进程
+        worker_runtime.start()
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def _on_process_shutdown(**_):
+        worker_runtime.stop()
+
+    @signals.worker_shutdown.connect(weak=False)
+    def _on_worker_shutdown(**_):
+        worker_runtime.stop()
+
+
+_connect_signals()
@@ -0,0 +1,87 @@
+"""
+Test the concurrent deep sync engine
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+from myUtils.account_deep_sync import DeepSyncEngine
+from myUtils.cookie_manager import CookieManager
+
+
+class _TmpCookieManager(CookieManager):
+    def __init__(self, root):
+        self.cookies_dir = root / "cookiesFile"
+        self.cookies_dir.mkdir()
+        self.db_path = root / "cookie_store.db"
+        self.lock = threading.Lock()
+        self._ensure_database()
+
+
+def _seed(manager, count):
+    with sqlite3.connect(manager.db_path) as conn:
+        for i in range(count):
+            cookie_file = f"douyin_{i}.json"
+            # every 5th account lost its cookie file
+            if i % 5:
+                (manager.cookies_dir / cookie_file).write_text(
+                    json.dumps({"cookies": [{"name": "sessionid", "value": str(i), "domain": ".douyin.com"}]}),
+                    encoding="utf-8",
+                )
+            conn.execute(
+                "INSERT INTO cookie_accounts (account_id, platform, platform_code, name, status, cookie_file) "
+                "VALUES (?, 'douyin', 3, '', 'valid', ?)",
+                (f"acc{i}", cookie_file),
+            )
+
+
+def test_deep_sync_enriches_concurrently_and_writes_once(tmp_path):
+    manager = _TmpCookieManager(tmp_path)
+    _seed(manager, 40)
+    inflight = {"now": 0, "peak": 0}
+    events = []
+
+    async def fake_enrich(platform, storage_state, account):
+        inflight["now"] += 1
+        inflight["peak"] = max(inflight["peak"], inflight["now"])
+        await asyncio.sleep(0.05)
+        inflight["now"] -= 1
+        return {"user_id": f"uid-{account['account_id']}", "name": f"name-{account['account_id']}", "avatar": "a.png"}
+
+    engine = DeepSyncEngine(
+        manager, per_platform_concurrency=3, enrich_concurrency=8, enrich=fake_enrich, on_progress=events.append
+    )
+    started = time.perf_counter()
+    stats = asyncio.run(engine.run())
+    elapsed = time.perf_counter() - started
+
+    assert stats["marked_missing"] == 8
+    assert stats["enriched"] == 32
+    # 32 enrichments x 50ms bounded by 3 per platform, not run one by one
+    assert inflight["peak"] == 3
+    assert elapsed < 32 * 0.05
+    assert engine.progress["status"] == "completed"
+    assert engine.progress["done"] == engine.progress["total"] == 40
+    assert [e["type"] for e in events].count("progress") == 40
+    assert events[0]["type"] == "start" and events[-1]["type"] == "done"
+
+    rows = {row["account_id"]: row for row in manager.list_flat_accounts()}
+    assert rows["acc0"]["status"] == "file_missing"
+    assert rows["acc1"]["user_id"] == "uid-acc1"
+    assert rows["acc1"]["name"] == "name-acc1"
+
+
+def test_deep_sync_validation_marks_expired(tmp_path):
+    manager = _TmpCookieManager(tmp_path)
+    _seed(manager, 3)
+
+    async def reject(platform, storage_state, account):
+        return None
+
+    stats = asyncio.run(DeepSyncEngine(manager, validate_cookies=True, enrich=reject).run())
+
+    assert stats["expired"] == 2
+    statuses = {row["account_id"]: row["status"] for row in manager.list_flat_accounts()}
+    assert statuses == {"acc0": "file_missing", "acc1": "expired", "acc2": "expired"}
@@ -37,3 +37,11 @@ def test_analytics_export_excel(client):
     assert response.status_code == 200
     # Will either be Excel or fall back to CSV if openpyxl not available
     assert "text/csv" in response.headers["content-type"] or "spreadsheet" in response.headers["content-type"]
+
+
+def test_analytics_export_csv_gzip(client):
+    """Gzip-encoded CSV export still decodes to the same header row"""
+    response = client.get("/api/v1/analytics/export?format=csv&gzip=true")
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content.decode("utf-8-sig").splitlines()[0].startswith("ID,视频ID,标题")
@@ -0,0 +1,190 @@
+"""
+Test batched video_analytics ingestion, the daily rollup and history compaction
+"""
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from myUtils.analytics_db import (
+    _build_filter_clause,
+    compact_analytics_history,
+    ensure_analytics_schema,
+    get_analytics_summary,
+    get_chart_data,
+    insert_video_analytics,
+    upsert_video_analytics_batch,
+    upsert_video_analytics_by_key,
+)
+
+
+def _video(video_id, plays, platform="douyin", **extra):
+    return {"platform": platform, "video_id": video_id, "title": f"v{video_id}", "play_count": plays, **extra}
+
+
+def _history(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT v.video_id, h.play_count FROM analytics_history h "
+            "JOIN video_analytics v ON v.id = h.video_analytics_id ORDER BY h.id"
+        ).fetchall()
+
+
+def test_batch_upsert_dedupes_and_records_changed_history(tmp_path):
+    db_path = tmp_path / "database.db"
+
+    stats = upsert_video_analytics_batch(db_path, [
+        _video("a", 1), _video("b", 2), _video("a", 5, platform="DOUYIN"), {"platform": "douyin", "video_id": " "},
+    ])
+    assert stats == {"inserted": 2, "updated": 0, "unchanged": 0, "history": 2, "skipped": 1}
+
+    # 未变化的计数不写历史；字符串数字与已存整数视为相同
+    stats = upsert_video_analytics_batch(db_path, [
+        _video("a", "5", title=None), _video("b", 3), _video("c", 0, platform="bilibili"),
+    ])
+    assert stats == {"inserted": 1, "updated": 1, "unchanged": 1, "history": 2, "skipped": 0}
+    assert _history(db_path) == [("a", 5), ("b", 2), ("b", 3), ("c", 0)]
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT platform, video_id, title, play_count FROM video_analytics ORDER BY id").fetchall()
+    assert rows == [("douyin", "a", "va", 5), ("douyin", "b", "vb", 3), ("bilibili", "c", "vc", 0)]
+
+    row_id = upsert_video_analytics_by_key(db_path, platform="douyin", video_id="b", data={"play_count": 9})
+    assert row_id == 2
+    assert len(_history(db_path)) == 4
+
+
+def test_insert_existing_video_updates_in_place(tmp_path):
+    db_path = tmp_path / "database.db"
+    ensure_analytics_schema(db_path)
+
+    row_id = insert_video_analytics(db_path, _video("a", 1))
+    assert insert_video_analytics(db_path, _video("a", 7, platform="Douyin")) == row_id
+    # 没有 video_id 的记录仍按普通插入处理
+    manual_id = insert_video_analytics(db_path, {"platform": "douyin", "title": "manual"})
+    assert manual_id != row_id
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT id, video_id, play_count FROM video_analytics ORDER BY id").fetchall()
+    assert rows == [(row_id, "a", 7), (manual_id, None, 0)]
+
+
+def test_legacy_duplicates_collapse_before_unique_index(tmp_path):
+    db_path = tmp_path / "database.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE video_analytics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, task_id INTEGER, account_id INTEGER,
+                platform VARCHAR(20) NOT NULL, video_id VARCHAR(100), video_url TEXT, title VARCHAR(500),
+                thumbnail TEXT, publish_date DATE, play_count INTEGER DEFAULT 0, like_count INTEGER DEFAULT 0,
+                comment_count INTEGER DEFAULT 0, collect_count INTEGER DEFAULT 0, share_count INTEGER DEFAULT 0,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP, match_confidence FLOAT, raw_data TEXT
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO video_analytics (platform, video_id, play_count, last_updated) VALUES (?, ?, ?, ?)",
+            [("douyin", "x", 1, "2024-01-02"), ("douyin", "x", 2, "2024-01-03"), ("douyin", "x", 3, "2024-01-01"),
+             ("douyin", None, 0, "2024-01-01"), ("douyin", None, 0, "2024-01-01")],
+        )
+
+    ensure_analytics_schema(db_path)
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT id, video_id, play_count FROM video_analytics ORDER BY id").fetchall()
+    assert rows == [(2, "x", 2), (4, None, 0), (5, None, 0)]
+
+    stats = upsert_video_analytics_batch(db_path, [_video("x", 7)])
+    assert stats["updated"] == 1
+
+
+# 单元测试默认用小数据量；压测规模可通过 ANALYTICS_ROLLUP_TEST_ROWS=1000000 开启
+ROLLUP_ROWS = int(os.getenv("ANALYTICS_ROLLUP_TEST_ROWS", "20000"))
+
+
+def _raw_summary(conn, where, params):
+    row = conn.execute(f"""
+        SELECT COUNT(*), COALESCE(SUM(play_count), 0), COALESCE(SUM(like_count), 0),
+               COALESCE(SUM(comment_count), 0), COALESCE(SUM(collect_count), 0), COALESCE(AVG(play_count), 0)
+        FROM video_analytics {where}
+    """, params).fetchone()
+    return {
+        "totalVideos": row[0], "totalPlays": row[1], "totalLikes": row[2],
+        "totalComments": row[3], "totalCollects": row[4], "avgPlayCount": round(row[5], 2),
+    }
+
+
+def _raw_chart(conn, where, params):
+    return [
+        {"date": r[0], "playCount": r[1], "likeCount": r[2], "commentCount": r[3], "collectCount": r[4]}
+        for r in conn.execute(f"""
+            SELECT publish_date, SUM(play_count), SUM(like_count), SUM(comment_count), SUM(collect_count)
+            FROM video_analytics {where} GROUP BY publish_date ORDER BY publish_date ASC
+        """, params)
+    ]
+
+
+def test_daily_rollup_matches_raw_aggregates(tmp_path):
+    db_path = tmp_path / "database.db"
+    ensure_analytics_schema(db_path)
+    rng = random.Random(7)
+    platforms = ["douyin", "kuaishou", "bilibili", "xiaohongshu"]
+    dates = [f"2024-{m:02d}-{d:02d}" for m in range(1, 13) for d in range(1, 29)] + [None]
+
+    def rows():
+        for i in range(ROLLUP_ROWS):
+            yield (
+                rng.choice(platforms), f"v{i}", rng.randint(1, 40) if i % 97 else None, rng.choice(dates),
+                rng.randint(0, 10**6), rng.randint(0, 10**4), rng.randint(0, 500), rng.randint(0, 800),
+                rng.randint(0, 300),
+            )
+
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("""
+            INSERT INTO video_analytics (platform, video_id, account_id, publish_date, play_count,
+                                         like_count, comment_count, collect_count, share_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows())
+        # 后续编辑/移动日期/删除同样由触发器增量维护
+        conn.execute("UPDATE video_analytics SET publish_date = '2024-02-30', account_id = 99 WHERE id % 1000 = 3")
+        conn.execute("DELETE FROM video_analytics WHERE id % 1000 = 7")
+        conn.commit()
+    upsert_video_analytics_batch(db_path, [
+        _video(f"v{i}", rng.randint(0, 10**6), platform=platforms[0], account_id=5, publish_date="2024-03-01")
+        for i in range(0, ROLLUP_ROWS, 4999)
+    ])
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM analytics_daily_rollup").fetchone()[0] < 60000
+        for kwargs in (
+            {},
+            {"platforms": ["douyin", "bilibili"]},
+            {"account_ids": ["5", "99", "17"], "start_date": "2024-02-01", "end_date": "2024-06-30"},
+            {"platforms": ["kuaishou"], "start_date": "2024-11-15"},
+        ):
+            where, params = _build_filter_clause(
+                kwargs.get("start_date"), kwargs.get("end_date"), None, kwargs.get("platforms"), kwargs.get("account_ids")
+            )
+            assert get_analytics_summary(db_path, **kwargs) == _raw_summary(conn, where, params)
+            assert get_chart_data(db_path, **kwargs) == _raw_chart(conn, where, params)
+
+
+def test_history_compaction_keeps_latest_snapshot_per_bucket(tmp_path):
+    db_path = tmp_path / "database.db"
+    ensure_analytics_schema(db_path)
+    now = datetime.utcnow()
+    old_day = (now - timedelta(days=40)).replace(hour=0, minute=0, second=0, microsecond=0)
+    old_hour = (now - timedelta(days=10)).replace(minute=0, second=0, microsecond=0)
+    snapshots = [
+        (old_day + timedelta(hours=1), 1), (old_day + timedelta(hours=5), 2),
+        (old_hour + timedelta(minutes=10), 3), (old_hour + timedelta(minutes=40), 4),
+        (now - timedelta(hours=2), 5), (now - timedelta(hours=1), 6),
+    ]
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO analytics_history (video_analytics_id, play_count, recorded_at) VALUES (1, ?, ?)",
+            [(plays, at.strftime("%Y-%m-%d %H:%M:%S")) for at, plays in snapshots],
+        )
+
+    removed = compact_analytics_history(db_path, hourly_after_days=7, daily_after_days=30)
+    assert removed == {"daily": 1, "hourly": 1}
+    with sqlite3.connect(db_path) as conn:
+        assert [r[0] for r in conn.execute("SELECT play_count FROM analytics_history ORDER BY id")] == [2, 4, 5, 6]
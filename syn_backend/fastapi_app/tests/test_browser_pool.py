@@ -0,0 +1,118 @@
+"""
+Test the Playwright worker's shared browser pool
+"""
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from playwright_worker.browser_pool import POOL_TAG_SWITCH, BrowserPool, _PooledBrowser
+
+
+class _FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+        self.browser.open_contexts -= 1
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.open_contexts = 0
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, **kwargs):
+        self.open_contexts += 1
+        return _FakeContext(self)
+
+    async def close(self):
+        self.closed = True
+
+
+def _pool(**kwargs):
+    launched = []
+
+    async def launcher():
+        browser = _FakeBrowser()
+        launched.append(browser)
+        return browser
+
+    async def context_factory(browser, **_):
+        return await browser.new_context()
+
+    return BrowserPool(launcher=launcher, context_factory=context_factory, **kwargs), launched
+
+
+def test_pool_bounds_browsers_and_contexts():
+    """500 concurrent checks never exceed browsers x contexts_per_browser"""
+    pool, launched = _pool(browsers=2, contexts_per_browser=3, recycle_after=0)
+    peak = {"active": 0, "queued": 0}
+
+    async def check(i):
+        async with pool.context(platform="douyin", account_id=f"acc{i}") as context:
+            active = sum(b.open_contexts for b in launched)
+            peak["active"] = max(peak["active"], active)
+            peak["queued"] = max(peak["queued"], pool.stats()["queue_depth"])
+            assert context.browser.open_contexts <= 3
+            await asyncio.sleep(0.001)
+        assert context.closed
+
+    async def main():
+        await asyncio.gather(*(check(i) for i in range(500)))
+        stats = pool.stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(main())
+    assert len(launched) == 2
+    assert peak["active"] == 6
+    assert peak["queued"] > 0
+    assert stats["queue_depth"] == 0
+    assert stats["check_duration"]["count"] == 500
+    assert stats["context_create"]["count"] == 500
+    assert all(b.closed for b in launched)
+
+
+def test_pool_recycles_browser_after_n_contexts():
+    pool, launched = _pool(browsers=1, contexts_per_browser=1, recycle_after=3)
+
+    async def main():
+        for i in range(7):
+            async with pool.context(platform="douyin", account_id=f"acc{i}"):
+                pass
+        stats = pool.stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(main())
+    assert len(launched) == 3
+    assert stats["recycled_browsers"] == 2
+    assert launched[0].closed and launched[1].closed
+
+
+def test_memory_counts_only_this_pools_browsers():
+    psutil = pytest.importorskip("psutil")
+    sleeper = [sys.executable, "-c", "import time; time.sleep(30)"]
+    pooled = subprocess.Popen(sleeper + [f"{POOL_TAG_SWITCH}=pooled"])
+    # 同一 Worker 里其它用途的浏览器（专用登录 / 发布）不计入
+    other = subprocess.Popen(sleeper + ["--headless", "chromium"])
+    try:
+        pool, _ = _pool(max_memory_mb=1)
+        assert pool._browser_memory_mb() is None
+
+        pool._browsers.append(_PooledBrowser(_FakeBrowser(), tag="pooled"))
+        measured = pool._browser_memory_mb()
+        assert pool._browsers[0].pid == pooled.pid
+        expected = psutil.Process(pooled.pid).memory_info().rss / (1024 * 1024)
+        assert measured == pytest.approx(expected, rel=0.5)
+    finally:
+        for proc in (pooled, other):
+            proc.kill()
+            proc.wait()
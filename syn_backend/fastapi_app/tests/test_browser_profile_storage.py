@@ -0,0 +1,87 @@
+"""
+Test incremental disk accounting and cache pruning for persistent browser profiles
+"""
+import os
+import socket
+
+from myUtils.browser_profile_storage import ProfileStorage, cache_root
+
+
+def _write(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+
+def _profile(base, name="douyin_u1"):
+    root = base / name
+    _write(root / "Default" / "Network" / "Cookies", 4000)
+    _write(root / "Default" / "Local Storage" / "leveldb" / "000003.log", 2000)
+    _write(root / "Default" / "Cache" / "Cache_Data" / "f_000001", 10000)
+    _write(root / "Default" / "Code Cache" / "js" / "index", 3000)
+    _write(root / "GrShaderCache" / "data_0", 1000)
+    _write(root / "storage_state.json", 500)
+    return root
+
+
+def test_cache_root_matches_profile_level_caches():
+    assert cache_root("Default/Cache/Cache_Data") == "Default/Cache"
+    assert cache_root("Default/Service Worker/CacheStorage/abc") == "Default/Service Worker/CacheStorage"
+    assert cache_root("GrShaderCache") == "GrShaderCache"
+    assert cache_root("Default/Network") is None
+    assert cache_root("Default/Service Worker/Database") is None
+
+
+def test_accounting_is_incremental_by_directory_mtime(tmp_path):
+    root = _profile(tmp_path)
+    storage = ProfileStorage(tmp_path, budget_bytes=0)
+
+    entry = storage.refresh_all()["douyin_u1"]
+    assert entry["size_bytes"] == 20500 and entry["cache_bytes"] == 14000
+    full_scan = storage.dirs_scanned
+
+    # 目录未变化：不重新列出任何目录，索引也不重写
+    index_mtime = storage.index_path.stat().st_mtime_ns
+    storage.refresh_all()
+    assert storage.dirs_scanned == full_scan
+    assert storage.index_path.stat().st_mtime_ns == index_mtime
+
+    # 新增文件只重新列出其所在目录
+    _write(root / "Default" / "Cache" / "Cache_Data" / "f_000002", 5000)
+    assert storage.refresh_all()["douyin_u1"]["size_bytes"] == 25500
+    assert storage.dirs_scanned == full_scan + 1
+
+    # 另一个实例从索引加载，同样无需重新统计
+    other = ProfileStorage(tmp_path, budget_bytes=0)
+    assert other.refresh_all()["douyin_u1"]["size_bytes"] == 25500
+    assert other.dirs_scanned == 0
+
+
+def test_prune_keeps_login_state_and_budget_runs_after_close(tmp_path):
+    root = _profile(tmp_path)
+    storage = ProfileStorage(tmp_path, budget_bytes=10000)
+
+    result = storage.enforce_budget(root, wait_release=0)
+    assert result["pruned"] and result["freed_bytes"] == 14000
+    assert sorted(result["removed"]) == ["Default/Cache", "Default/Code Cache", "GrShaderCache"]
+    assert (root / "Default" / "Network" / "Cookies").exists()
+    assert (root / "Default" / "Local Storage" / "leveldb" / "000003.log").exists()
+    assert not (root / "Default" / "Cache").exists()
+    assert storage.last_used("douyin_u1") is not None
+
+    # 预算内不清理
+    _write(root / "Default" / "Cache" / "Cache_Data" / "f_000001", 1000)
+    assert not storage.enforce_budget(root, wait_release=0)["pruned"]
+
+
+def test_profile_in_use_is_not_pruned(tmp_path):
+    root = _profile(tmp_path)
+    os.symlink(f"{socket.gethostname()}-{os.getpid()}", root / "SingletonLock")
+    storage = ProfileStorage(tmp_path, budget_bytes=0)
+
+    assert storage.prune_cache("douyin_u1")["reason"] == "in_use"
+    assert (root / "Default" / "Cache").exists()
+
+    # 锁指向已退出的进程视为残留
+    os.unlink(root / "SingletonLock")
+    os.symlink(f"{socket.gethostname()}-99999999", root / "SingletonLock")
+    assert storage.prune_all()["pruned"] == 1
@@ -0,0 +1,93 @@
+"""
+Test the pooled chat store: keyset pagination, batched inserts and the thread head cache
+"""
+import asyncio
+
+from fastapi_app.db.sqlalchemy_engine import dispose_async_engines, dispose_engines
+from fastapi_app.services.chat_history import ChatHistoryService
+from fastapi_app.services.chat_store import ChatStore, ThreadHeadCache
+
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await dispose_async_engines()
+
+    return asyncio.run(main())
+
+
+def test_batched_messages_page_by_cursor(tmp_path):
+    store = ChatStore(tmp_path / "chat.db", head_cache=ThreadHeadCache(capacity=8))
+
+    async def scenario():
+        thread = await store.create_thread("long", mode="agent")
+        added = await store.add_messages(
+            thread["id"], [{"role": "user", "content": f"m{i}", "metadata": {"i": i}} for i in range(250)]
+        )
+        assert len(added) == 250
+
+        seen, cursor = [], None
+        while True:
+            page = await store.get_messages(thread["id"], limit=100, cursor=cursor)
+            seen += [m["content"] for m in page["messages"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert page["total"] == 250
+        assert seen == [f"m{i}" for i in range(250)]
+        assert (await store.get_thread(thread["id"]))["message_count"] == 250
+        assert await store.get_messages("missing") is None
+
+    _run(scenario())
+    dispose_engines()
+
+
+def test_thread_list_is_served_from_head_cache(tmp_path):
+    store = ChatStore(tmp_path / "chat.db", head_cache=ThreadHeadCache(capacity=5))
+
+    async def scenario():
+        ids = [(await store.create_thread(f"t{i}", mode="chat" if i % 2 else "agent"))["id"] for i in range(8)]
+
+        first = await store.list_threads(limit=3)
+        assert [t["title"] for t in first["threads"]] == ["t7", "t6", "t5"]
+        assert first["total"] == 8
+        hits = store.heads.hits
+
+        # touching an old thread moves it to the front without a reload
+        await store.add_messages(ids[0], [{"role": "user", "content": "hi"}])
+        again = await store.list_threads(limit=3)
+        assert [t["title"] for t in again["threads"]] == ["t0", "t7", "t6"]
+        assert store.heads.hits == hits + 1
+
+        # pages past the cached prefix fall back to keyset queries
+        titles, cursor = [], None
+        while True:
+            page = await store.list_threads(limit=3, cursor=cursor)
+            titles += [t["title"] for t in page["threads"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert titles == ["t0", "t7", "t6", "t5", "t4", "t3", "t2", "t1"]
+
+        await store.delete_thread(ids[7])
+        chats = await store.list_threads(limit=10, mode="chat")
+        assert [t["title"] for t in chats["threads"]] == ["t5", "t3", "t1"]
+        assert chats["total"] == 3
+
+    _run(scenario())
+    dispose_engines()
+
+
+def test_chat_history_service_shares_the_store(tmp_path):
+    store = ChatStore(tmp_path / "chat.db")
+    service = ChatHistoryService(store)
+    session = service.create_session("legacy")
+    for i in range(3):
+        service.add_message(session.session_id, "user", f"m{i}")
+
+    assert [m.content for m in service.get_messages(session.session_id)] == ["m0", "m1", "m2"]
+    page = _run(store.get_messages(session.session_id))
+    assert page["total"] == 3
+    dispose_engines()
@@ -0,0 +1,104 @@
+"""
+Test the multi-account collection scheduler
+"""
+import asyncio
+import time
+
+from myUtils.collection_scheduler import CollectionScheduler, RateLimiter
+
+
+class _FakeTikHub:
+    rate_limiter = None
+
+
+class _FakeCollector:
+    def __init__(self):
+        self.browser_active = 0
+        self.browser_peak = 0
+        self.platform_active = {}
+        self.platform_peak = {}
+        self.order = []
+
+    def _enter(self, platform):
+        self.platform_active[platform] = self.platform_active.get(platform, 0) + 1
+        self.platform_peak[platform] = max(self.platform_peak.get(platform, 0), self.platform_active[platform])
+
+    def _exit(self, platform):
+        self.platform_active[platform] -= 1
+
+    async def _api(self, platform, account):
+        self._enter(platform)
+        await asyncio.sleep(0.01)
+        self._exit(platform)
+        self.order.append(("api", account["account_id"]))
+        if account["account_id"].endswith("bad"):
+            return {"success": False, "error": "no eid"}
+        return {"success": True, "count": 1, "source": "tikhub"}
+
+    async def _browser(self, platform, account_id):
+        self._enter(platform)
+        self.browser_active += 1
+        self.browser_peak = max(self.browser_peak, self.browser_active)
+        await asyncio.sleep(0.1)
+        self.browser_active -= 1
+        self._exit(platform)
+        self.order.append(("browser", account_id))
+        return {"success": True, "count": 2}
+
+    async def collect_kuaishou_data_tikhub(self, account, client, max_pages):
+        return await self._api("kuaishou", account)
+
+    async def collect_kuaishou_data(self, cookie_file, account_id):
+        return await self._browser("kuaishou", account_id)
+
+    async def collect_douyin_data(self, cookie_file, account_id):
+        return await self._browser("douyin", account_id)
+
+
+def _accounts():
+    accounts = [
+        {"account_id": f"ks{i}", "name": f"ks{i}", "platform": "kuaishou", "cookie_file": "c.json"}
+        for i in range(10)
+    ]
+    accounts.append({"account_id": "ks-bad", "name": "ks-bad", "platform": "kuaishou", "cookie_file": "c.json"})
+    accounts += [
+        {"account_id": f"dy{i}", "name": f"dy{i}", "platform": "douyin", "cookie_file": "c.json"}
+        for i in range(4)
+    ]
+    return accounts
+
+
+def test_api_lane_is_not_blocked_by_browser_lane():
+    collector = _FakeCollector()
+    scheduler = CollectionScheduler(collector, concurrency=8, platform_concurrency=2, browser_budget=2)
+    results = asyncio.run(scheduler.run(_accounts(), _FakeTikHub()))
+
+    assert results["total"] == 15
+    assert results["success"] == 15
+    assert collector.browser_peak <= 2
+    assert max(collector.platform_peak.values()) <= 2
+    # every API account finishes before the first browser scroll completes
+    first_browser = next(i for i, (lane, _) in enumerate(collector.order) if lane == "browser")
+    assert sum(1 for lane, _ in collector.order[:first_browser] if lane == "api") == 11
+    # the failed API account fell back to the browser lane
+    assert ("browser", "ks-bad") in collector.order
+    assert results["accounts_per_minute"] > 0
+
+
+def test_rate_limiter_spaces_requests():
+    async def main():
+        limiter = RateLimiter(50)
+        started = time.perf_counter()
+        await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+        return time.perf_counter() - started
+
+    assert asyncio.run(main()) >= 5 / 50 * 0.9
+
+
+def test_uses_api_lane_only_with_tikhub_and_api_platform():
+    kuaishou = [{"platform": "kuaishou"}]
+    douyin = [{"platform": "douyin"}]
+    assert CollectionScheduler.uses_api_lane(kuaishou + douyin, _FakeTikHub())
+    # 没有 TikHub 或只有纯浏览器平台时只会运行慢通道（--concurrency 作用于浏览器通道）
+    assert not CollectionScheduler.uses_api_lane(kuaishou, None)
+    assert not CollectionScheduler.uses_api_lane(douyin, _FakeTikHub())
@@ -0,0 +1,158 @@
+"""
+Stress tests for the Redis-backed concurrency controller
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from fastapi_app.tasks.concurrency_controller import (
+    ConcurrencyController,
+    ConcurrencyLimitException,
+)
+
+ACQUIRERS = 200
+
+
+def _config(**overrides):
+    config = {
+        "global_max": 20,
+        "platform_max": {"douyin": 8},
+        "account_max": 0,
+        "task_type_max": {"publish": 0},
+        "enabled": True,
+        "timeout": 60,
+    }
+    config.update(overrides)
+    return config
+
+
+class _InFlight:
+    """Tracks concurrent holders per dimension and the peak seen"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = {}
+        self.peak = {}
+
+    def enter(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.current[key] = self.current.get(key, 0) + 1
+                self.peak[key] = max(self.peak.get(key, 0), self.current[key])
+
+    def exit(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.current[key] -= 1
+
+
+@pytest.fixture
+def fake_server():
+    return fakeredis.FakeServer()
+
+
+def test_no_overshoot_with_concurrent_threads(fake_server):
+    """200 threads contend for global/platform/account tokens without exceeding any limit"""
+    client = fakeredis.FakeRedis(server=fake_server, decode_responses=True, max_connections=ACQUIRERS * 2)
+    controller = ConcurrencyController(redis_client=client)
+    controller.update_config(_config(account_max=2))
+
+    in_flight = _InFlight()
+    errors = []
+
+    def worker(i):
+        platform = "douyin" if i % 2 == 0 else "kuaishou"
+        account = f"acc-{i % 10}"
+        try:
+            with controller.acquire(platform=platform, account_id=account):
+                in_flight.enter("global", platform, account)
+                time.sleep(0.005)
+                in_flight.exit("global", platform, account)
+        except Exception as e:  # pragma: no cover - surfaced via assertion
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(ACQUIRERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=120)
+
+    assert not errors
+    assert in_flight.peak["global"] <= 20
+    assert in_flight.peak["douyin"] <= 8
+    assert all(in_flight.peak[f"acc-{i}"] <= 2 for i in range(10))
+    assert controller.get_current_usage()["global"]["current"] == 0
+
+
+def test_all_or_nothing_when_one_dimension_is_full(fake_server):
+    """A blocked platform token must not leave a global token behind"""
+    client = fakeredis.FakeRedis(server=fake_server, decode_responses=True, max_connections=ACQUIRERS * 2)
+    controller = ConcurrencyController(redis_client=client)
+    controller.update_config(_config(global_max=5, platform_max={"douyin": 1}))
+
+    dimensions = controller._build_dimensions(controller._get_config(), "douyin", None, "publish")
+    for d in dimensions:
+        d["max_wait"] = 0
+
+    controller._acquire_all(dimensions, "holder", 60)
+    with pytest.raises(ConcurrencyLimitException):
+        controller._acquire_all(dimensions, "waiter", 60)
+
+    assert client.zcard("concurrency:semaphore:global") == 1
+    assert client.zcard("concurrency:semaphore:platform:douyin") == 1
+
+
+def test_waiter_is_woken_on_release(fake_server):
+    """Release pushes a wakeup so a blocked waiter proceeds before max_block elapses"""
+    client = fakeredis.FakeRedis(server=fake_server, decode_responses=True, max_connections=ACQUIRERS * 2)
+    controller = ConcurrencyController(redis_client=client)
+    controller.max_block = 10
+    controller.update_config(_config(global_max=1))
+
+    acquired = threading.Event()
+    waited = []
+
+    def waiter():
+        acquired.wait()
+        start = time.time()
+        with controller.acquire():
+            waited.append(time.time() - start)
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    with controller.acquire():
+        acquired.set()
+        time.sleep(0.2)
+    t.join(timeout=10)
+
+    assert waited and waited[0] < 2
+
+
+def test_no_overshoot_with_async_acquirers(fake_server):
+    """The asyncio variant respects the same limits"""
+    client = fakeredis.FakeRedis(server=fake_server, decode_responses=True, max_connections=ACQUIRERS * 2)
+    async_client = fakeredis.FakeAsyncRedis(server=fake_server, decode_responses=True, max_connections=ACQUIRERS * 2)
+    controller = ConcurrencyController(redis_client=client, async_redis_client=async_client)
+    controller.update_config(_config())
+
+    in_flight = _InFlight()
+
+    async def worker(i):
+        async with controller.acquire_async(platform="douyin", account_id=f"acc-{i}"):
+            in_flight.enter("global", "douyin")
+            await asyncio.sleep(0.002)
+            in_flight.exit("global", "douyin")
+
+    async def main():
+        await asyncio.gather(*(worker(i) for i in range(ACQUIRERS)))
+
+    asyncio.run(main())
+
+    assert in_flight.peak["douyin"] <= 8
+    assert in_flight.peak["global"] <= 20
+    assert client.zcard("concurrency:semaphore:platform:douyin") == 0
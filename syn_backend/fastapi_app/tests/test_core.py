@@ -58,3 +58,17 @@ def test_redoc_endpoint(client):
     response = client.get("/api/redoc")
     assert response.status_code == 200
     assert b"redoc" in response.content.lower()
+
+
+def test_db_pool_stats(client):
+    """Test SQLAlchemy pool statistics endpoint reuses a single engine"""
+    from fastapi_app.db.sqlalchemy_engine import get_engine
+
+    assert get_engine() is get_engine()
+
+    response = client.get("/api/v1/system/db/pool-stats")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert "sync" in data and "async" in data
+    stats = next(iter(data["sync"].values()))
+    assert {"checked_out", "overflow", "wait_avg_ms"} <= set(stats)
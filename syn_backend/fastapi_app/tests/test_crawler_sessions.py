@@ -0,0 +1,129 @@
+"""
+Benchmark the pooled crawler sessions against a local stub server
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+DOUYIN_API_ROOT = Path(__file__).resolve().parents[2] / "douyin_tiktok_api"
+sys.path.insert(0, str(DOUYIN_API_ROOT))
+
+from crawlers.base_crawler import BaseCrawler  # noqa: E402
+from crawlers.session_manager import crawler_sessions  # noqa: E402
+
+REQUESTS = 100
+CONCURRENCY = 20
+BODY = b'{"status_code": 0, "aweme_list": []}'
+
+
+class _StubServer:
+    """Minimal keep-alive HTTP/1.1 server that counts accepted connections"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/aweme/v1/web/aweme/post/"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _run(fetch_one):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i):
+        async with semaphore:
+            data = await fetch_one(i)
+            assert data["status_code"] == 0
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - started)
+
+
+def test_pooled_sessions_reuse_connections_and_raise_throughput():
+    headers = {"User-Agent": "bench", "Cookie": "sessionid=abc"}
+
+    async def main():
+        # Before: one AsyncClient per request, as the crawlers used to do
+        before_server = _StubServer()
+        url = await before_server.start()
+
+        async def fetch_unpooled(_):
+            async with httpx.AsyncClient(headers=headers, timeout=10) as client:
+                return (await client.get(url)).json()
+
+        before_rps = await _run(fetch_unpooled)
+        await before_server.stop()
+
+        # After: a fresh BaseCrawler per handler call, borrowing the pooled client
+        after_server = _StubServer()
+        url = await after_server.start()
+
+        async def fetch_pooled(_):
+            async with BaseCrawler(crawler_headers=headers) as crawler:
+                return await crawler.fetch_get_json(url)
+
+        after_rps = await _run(fetch_pooled)
+        stats = crawler_sessions.stats()
+        await crawler_sessions.aclose()
+        await after_server.stop()
+        return before_server, before_rps, after_server, after_rps, stats
+
+    before, before_rps, after, after_rps, stats = asyncio.run(main())
+    print(f"\nunpooled: {before_rps:.0f} req/s over {before.connections} connections")
+    print(f"pooled:   {after_rps:.0f} req/s over {after.connections} connections")
+
+    assert before.requests == after.requests == REQUESTS
+    assert before.connections == REQUESTS
+    assert after.connections <= CONCURRENCY
+    assert stats["clients"] == 1
+    assert after_rps > before_rps
+
+
+def test_clients_are_keyed_by_cookie_identity():
+    async def main():
+        a1 = await crawler_sessions.get_client(headers={"Cookie": "a"})
+        a2 = await crawler_sessions.get_client(headers={"Cookie": "a", "User-Agent": "other"})
+        b = await crawler_sessions.get_client(headers={"Cookie": "b"})
+        proxied = await crawler_sessions.get_client(
+            proxies={"http://": "http://127.0.0.1:9", "https://": None}, headers={"Cookie": "a"}
+        )
+        await crawler_sessions.aclose()
+        return a1, a2, b, proxied
+
+    a1, a2, b, proxied = asyncio.run(main())
+    assert a1 is a2
+    assert a1 is not b
+    assert a1 is not proxied
@@ -0,0 +1,140 @@
+"""
+Load test for the distribution claim engine
+"""
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from myUtils.distribution_claim_engine import ClaimEngine
+from myUtils.distribution_manager import DistributionManager
+
+CLAIMS = 1000
+VIDEOS = 600
+
+
+def _create_db(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            """
+            CREATE TABLE distribution_tasks (
+                task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                qr_token TEXT UNIQUE NOT NULL,
+                platform TEXT NOT NULL,
+                poi_location TEXT,
+                expire_time DATETIME,
+                title_template TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE task_videos (
+                video_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id INTEGER NOT NULL,
+                file_path TEXT NOT NULL,
+                status TEXT DEFAULT 'AVAILABLE',
+                claimer_id TEXT,
+                distribution_time DATETIME
+            )
+            """
+        )
+
+
+def test_concurrent_claims_hand_out_each_video_once(tmp_path):
+    db_path = tmp_path / "database.db"
+    _create_db(db_path)
+    engine = ClaimEngine(db_path, flush_interval=0.05, batch_size=100)
+    manager = DistributionManager(db_path=db_path, claim_engine=engine)
+    created = manager.create_task("douyin", "title", [f"/videos/{i}.mp4" for i in range(VIDEOS)])
+    token = created["qr_token"]
+
+    barrier = threading.Barrier(50)
+
+    def claim(i):
+        if i < 50:
+            barrier.wait()
+        return manager.claim_video_atomically(token, f"phone-{i}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        results = list(pool.map(claim, range(CLAIMS)))
+    elapsed = time.perf_counter() - started
+    engine.close()
+    print(f"\n{CLAIMS} claims in {elapsed * 1000:.0f}ms ({CLAIMS / elapsed:.0f} claims/s)")
+
+    won = [r["data"]["video_id"] for r in results if r["success"]]
+    assert len(won) == VIDEOS
+    assert len(set(won)) == VIDEOS
+    assert {r["error"] for r in results if not r["success"]} == {"No videos available"}
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT video_id, status, claimer_id FROM task_videos").fetchall()
+    assert all(status == "DISTRIBUTED" and claimer for _, status, claimer in rows)
+    assert len({claimer for _, _, claimer in rows}) == VIDEOS
+    assert engine.persisted == VIDEOS
+
+
+def test_expired_and_unknown_tasks_are_rejected(tmp_path):
+    db_path = tmp_path / "database.db"
+    _create_db(db_path)
+    engine = ClaimEngine(db_path)
+    manager = DistributionManager(db_path=db_path, claim_engine=engine)
+    expired = (datetime.now() - timedelta(minutes=1)).isoformat()
+    token = manager.create_task("douyin", "t", ["/a.mp4"], expire_time=expired)["qr_token"]
+
+    assert manager.claim_video_atomically(token, "p1") == {"success": False, "error": "Task expired"}
+    assert manager.claim_video_atomically("missing", "p1") == {"success": False, "error": "Task not found"}
+    engine.close()
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_videos_added_during_preload_are_queued_once(tmp_path, backend):
+    redis = pytest.importorskip("fakeredis").FakeRedis() if backend == "redis" else None
+    db_path = tmp_path / "database.db"
+    _create_db(db_path)
+    engine = ClaimEngine(db_path, redis=redis)
+    manager = DistributionManager(db_path=db_path, claim_engine=engine)
+    created = manager.create_task("douyin", "t", ["/a.mp4", "/b.mp4"])
+    token = created["qr_token"]
+
+    load = engine.backend.load
+
+    def racing_load(qr_token, meta, videos):
+        # 读库快照之后、列表就绪之前追加：此时 add_videos 的推送会被丢弃
+        manager.add_videos_to_task(created["task_id"], ["/c.mp4"])
+        return load(qr_token, meta, videos)
+
+    engine.backend.load = racing_load
+    assert engine.preload(token)["task_id"] == created["task_id"]
+    assert not load(token, {"task_id": 0}, [])
+    engine.backend.load = load
+
+    manager.add_videos_to_task(created["task_id"], ["/d.mp4"])
+    # 重复推送（补齐与追加同时发生）只入队一次
+    engine.add_videos(token, [{"video_id": 4, "file_path": "/d.mp4"}])
+    assert engine.stats(token)["remaining"] == 4
+
+    claimed = [manager.claim_video_atomically(token, f"p{i}") for i in range(5)]
+    engine.close()
+    assert [c["data"]["video_path"] for c in claimed[:4]] == ["/a.mp4", "/b.mp4", "/c.mp4", "/d.mp4"]
+    assert claimed[4] == {"success": False, "error": "No videos available"}
+
+
+def test_distribution_time_is_utc_like_sqlite_path(tmp_path):
+    db_path = tmp_path / "database.db"
+    _create_db(db_path)
+    engine = ClaimEngine(db_path)
+    manager = DistributionManager(db_path=db_path, claim_engine=engine)
+    token = manager.create_task("douyin", "t", ["/a.mp4"])["qr_token"]
+
+    assert manager.claim_video_atomically(token, "p1")["success"]
+    engine.close()
+    with sqlite3.connect(db_path) as conn:
+        engine_time, sql_time = conn.execute("SELECT distribution_time, CURRENT_TIMESTAMP FROM task_videos").fetchone()
+    gap = datetime.fromisoformat(sql_time) - datetime.fromisoformat(engine_time)
+    assert abs(gap.total_seconds()) < 60
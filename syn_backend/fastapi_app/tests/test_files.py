@@ -122,3 +122,116 @@ def test_upload_and_save_endpoint_with_local_video(test_db_pool):
         app.dependency_overrides.pop(get_main_db, None)
         if saved_path and Path(saved_path).exists():
             Path(saved_path).unlink()
+
+
+def test_metadata_backfill_fills_filesize_and_caches_probe(test_db, tmp_path):
+    """Backfill fills missing filesize in one batch and reuses cached probe results"""
+    import sqlite3
+    from fastapi_app.services.file_metadata_backfill import FileMetadataBackfill
+
+    video = tmp_path / "backfill_sample.mp4"
+    video.write_bytes(b"\0" * 2048)
+
+    conn = sqlite3.connect(test_db)
+    FileService()._ensure_file_record_columns(conn.cursor(), conn)
+    conn.execute(
+        "INSERT INTO file_records (filename, filesize, file_path) VALUES (?, 0, ?)",
+        (video.name, str(video)),
+    )
+    conn.commit()
+    conn.close()
+
+    backfill = FileMetadataBackfill(db_path=test_db, max_workers=1)
+    first = backfill.run_once()
+    assert first["updated"] >= 1
+    assert first["probed"] == 1
+
+    conn = sqlite3.connect(test_db)
+    filesize = conn.execute(
+        "SELECT filesize FROM file_records WHERE file_path = ?", (str(video),)
+    ).fetchone()[0]
+    conn.close()
+    assert filesize == pytest.approx(2048 / (1024 * 1024))
+
+    second = backfill.run_once()
+    assert second["probed"] == 0
+    assert second["cache_hits"] == 1
+
+    # 无法探测的记录（这里不是有效视频，时长一直为空）不再由列表请求反复触发全量扫描
+    import asyncio
+
+    backfill._wakeup = asyncio.Event()
+    conn = sqlite3.connect(test_db)
+    stuck_id = conn.execute("SELECT id FROM file_records WHERE file_path = ?", (str(video),)).fetchone()[0]
+    conn.close()
+    assert stuck_id in backfill._unresolved_ids
+    assert not backfill.trigger([stuck_id])
+    assert backfill.trigger([stuck_id, max(backfill._unresolved_ids) + 1])
+
+
+def test_chunked_upload_out_of_order_with_retry(client, tmp_path, monkeypatch):
+    """Chunks may arrive in any order and be re-sent; complete assembles and hashes the file"""
+    import hashlib
+    from fastapi_app.api.v1.files import uploads
+
+    monkeypatch.setattr(settings, "VIDEO_FILES_DIR", str(tmp_path))
+    monkeypatch.setattr(uploads, "_chunked_manager", None)
+
+    chunk_size = 256 * 1024
+    payload = bytes(range(256)) * (chunk_size * 3 // 256) + b"tail"
+    resp = client.post("/api/v1/files/uploads/init", json={
+        "filename": "big.mp4",
+        "total_size": len(payload),
+        "chunk_size": chunk_size,
+        "sha256": hashlib.sha256(payload).hexdigest(),
+    })
+    assert resp.status_code == 200
+    session = resp.json()["data"]
+    upload_id = session["upload_id"]
+    assert session["total_chunks"] == 4
+
+    chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+    for index in (3, 1, 0):
+        resp = client.put(f"/api/v1/files/uploads/{upload_id}/chunks/{index}", content=chunks[index])
+        assert resp.status_code == 200
+
+    # Missing chunk blocks completion; a truncated chunk is rejected
+    assert client.get(f"/api/v1/files/uploads/{upload_id}").json()["data"]["missing_chunks"] == [2]
+    resp = client.post(f"/api/v1/files/uploads/{upload_id}/complete", json={"save_record": False})
+    assert resp.status_code == 400
+    resp = client.put(f"/api/v1/files/uploads/{upload_id}/chunks/2", content=chunks[2][:10])
+    assert resp.status_code == 400
+
+    resp = client.put(
+        f"/api/v1/files/uploads/{upload_id}/chunks/2",
+        content=chunks[2],
+        headers={"X-Chunk-Sha256": hashlib.sha256(chunks[2]).hexdigest()},
+    )
+    assert resp.status_code == 200
+
+    resp = client.post(f"/api/v1/files/uploads/{upload_id}/complete", json={"save_record": False})
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert data["sha256"] == hashlib.sha256(payload).hexdigest()
+    assert Path(data["saved_path"]).read_bytes() == payload
+    assert Path(data["saved_path"]).parent == tmp_path
+    assert client.get(f"/api/v1/files/uploads/{upload_id}").status_code == 404
+
+
+def test_streamed_upload_enforces_size_limit(client, tmp_path, monkeypatch):
+    """Oversized uploads are rejected and leave no temp files behind"""
+    monkeypatch.setattr(settings, "VIDEO_FILES_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_MAX_SIZE_MB", 1)
+
+    resp = client.post(
+        "/api/v1/files/upload",
+        files={"file": ("clip.mp4", b"\0" * (1024 * 1024 + 1), "video/mp4")},
+    )
+    assert resp.status_code == 400
+    assert list((tmp_path / ".uploads").glob("*.part")) == []
+
+    resp = client.post("/api/v1/files/upload", files={"file": ("clip.mp4", b"abc", "video/mp4")})
+    assert resp.status_code == 200
+    saved = Path(resp.json()["data"]["saved_path"])
+    assert saved.read_bytes() == b"abc"
+    assert saved.parent == tmp_path
@@ -0,0 +1,71 @@
+"""
+Test function calling tool dispatch
+"""
+import asyncio
+import json
+import time
+
+import httpx
+
+from ai_service import function_calling_service as fcs
+from ai_service.function_calling_service import FunctionCallingService, Tool
+from ai_service.tool_dispatch import use_in_process
+
+
+def _tool_call(call_id, name, args):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+
+
+class _FakeLLM:
+    """Returns one assistant turn with parallel tool_calls, then a final answer"""
+
+    def __init__(self, tool_calls):
+        self.turns = [
+            {"choices": [{"finish_reason": "tool_calls", "message": {"role": "assistant", "content": None, "tool_calls": tool_calls}}]},
+            {"choices": [{"finish_reason": "stop", "message": {"role": "assistant", "content": "done"}}]},
+        ]
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(json.loads(request.content))
+        return httpx.Response(200, json=self.turns[len(self.requests) - 1])
+
+
+def test_tool_calls_from_one_turn_run_concurrently(monkeypatch):
+    async def slow(value: str):
+        await asyncio.sleep(0.2)
+        return {"value": value}
+
+    llm = _FakeLLM([
+        _tool_call("c1", "slow", {"value": "a"}),
+        _tool_call("c2", "slow", {"value": "b"}),
+        _tool_call("c3", "missing", {}),
+        _tool_call("c4", "slow", {"value": "c"}),
+    ])
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        fcs.httpx, "AsyncClient",
+        lambda **kwargs: real_client(transport=httpx.MockTransport(llm.handler), **kwargs),
+    )
+
+    service = FunctionCallingService(api_key="k", base_url="http://llm.test/v1")
+    service.register_tool(Tool("slow", "slow tool", {"type": "object", "properties": {}}, slow))
+
+    started = time.perf_counter()
+    result = asyncio.run(service.call([{"role": "user", "content": "hi"}]))
+    elapsed = time.perf_counter() - started
+
+    assert result["success"] and result["message"] == "done"
+    assert elapsed < 0.5
+    # Tool messages are fed back in the original tool_call order
+    tool_messages = [m for m in llm.requests[1]["messages"] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["c1", "c2", "c3", "c4"]
+    assert json.loads(tool_messages[1]["content"]) == {"value": "b"}
+    assert "未注册" in json.loads(tool_messages[2]["content"])["error"]
+
+
+def test_transport_mode_follows_env(monkeypatch):
+    monkeypatch.setenv("SYNAPSE_TOOL_TRANSPORT", "http")
+    assert use_in_process() is False
+    monkeypatch.setenv("SYNAPSE_TOOL_TRANSPORT", "inprocess")
+    assert use_in_process() is True
@@ -0,0 +1,86 @@
+"""
+Test the SQLite-backed IP pool service
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from fastapi_app.models.ip_pool import AddIPRequest, IPStatus, ProxyIP
+from fastapi_app.services.ip_pool_service import IPPoolService, selection_weight
+
+
+@pytest.fixture
+def service(tmp_path):
+    return IPPoolService(db_path=tmp_path / "ip_pool.db", legacy_json=tmp_path / "ip_pool.json")
+
+
+def test_bindings_usage_and_migration(tmp_path):
+    legacy = tmp_path / "ip_pool.json"
+    legacy.write_text(json.dumps([
+        ProxyIP(ip="1.1.1.1", port=8000, bound_account_ids=["acc1"], max_bindings=2).model_dump(mode="json")
+    ]), encoding="utf-8")
+    service = IPPoolService(db_path=tmp_path / "ip_pool.db", legacy_json=legacy)
+
+    migrated = service.get_ip_for_account("acc1")
+    assert migrated is not None and migrated.ip == "1.1.1.1"
+
+    other = service.add_ip(AddIPRequest(ip="2.2.2.2", port=9000, max_bindings=1))
+    service.bind_account_to_ip(other.id, "acc1")
+    assert service.get_ip_for_account("acc1").id == other.id
+    assert service.get_ip(migrated.id).bound_account_ids == []
+    with pytest.raises(ValueError):
+        service.bind_account_to_ip(other.id, "acc2")
+
+    for ok in (True, True, False):
+        service.record_usage(other.id, ok, rtt_ms=100)
+    ip = service.get_ip(other.id)
+    assert (ip.total_used, ip.success_count, ip.fail_count) == (3, 2, 1)
+    assert ip.avg_rtt_ms == pytest.approx(100)
+    assert 0 < ip.rolling_success_rate < 1
+
+    stats = service.get_statistics()
+    assert stats.total == 2 and stats.total_bindings == 1
+
+    # 导入后旧文件被标记为已迁移，删光代理后重启也不会再导入
+    assert not legacy.exists() and (tmp_path / "ip_pool.json.migrated").exists()
+    for ip in service.list_ips():
+        service.delete_ip(ip.id)
+    restarted = IPPoolService(db_path=tmp_path / "ip_pool.db", legacy_json=legacy)
+    assert restarted.get_statistics().total == 0
+
+
+def test_auto_bind_prefers_fast_reliable_ips(service):
+    fast = service.add_ip(AddIPRequest(ip="10.0.0.1", port=1, max_bindings=1000))
+    slow = service.add_ip(AddIPRequest(ip="10.0.0.2", port=1, max_bindings=1000))
+    service.record_usage(fast.id, True, rtt_ms=80)
+    service.record_usage(slow.id, False, rtt_ms=2000)
+
+    assert selection_weight(service.get_ip(fast.id)) > selection_weight(service.get_ip(slow.id))
+    picks = [service.auto_bind_account(f"acc{i}").id for i in range(50)]
+    assert picks.count(fast.id) > 40
+
+
+def test_batch_health_check_runs_concurrently(service, monkeypatch):
+    for i in range(12):
+        service.add_ip(AddIPRequest(ip=f"10.0.1.{i}", port=1))
+    inflight = {"now": 0, "peak": 0}
+
+    async def fake_check(ip, timeout=None):
+        inflight["now"] += 1
+        inflight["peak"] = max(inflight["peak"], inflight["now"])
+        await asyncio.sleep(0.05 if not ip.ip.endswith(".0") else 5)
+        inflight["now"] -= 1
+        return True
+
+    monkeypatch.setattr(service, "check_ip_health", fake_check)
+    started = time.perf_counter()
+    results = asyncio.run(service.batch_check_health(concurrency=4, timeout=0.1))
+    elapsed = time.perf_counter() - started
+
+    assert inflight["peak"] == 4
+    assert elapsed < 12 * 0.05
+    assert sum(results.values()) == 11
+    failed = service.list_ips(status=IPStatus.FAILED)
+    assert [ip.ip for ip in failed] == ["10.0.1.0"]
@@ -0,0 +1,138 @@
+"""
+Test constant-memory log tail / search / follow
+"""
+import asyncio
+import zipfile
+
+import pytest
+
+from fastapi_app.core.log_reader import (
+    follow_lines,
+    follow_sse,
+    list_log_files,
+    search_records,
+    tail_lines,
+)
+
+
+def _line(ts, level, module, message):
+    return f"{ts} | {level: <8} | {module}:run:10 - {message}\n"
+
+
+def _write_logs(tmp_path):
+    active = tmp_path / "fastapi_app.log"
+    archive = tmp_path / "fastapi_app.2024-05-01_00-00-00_000000.log"
+    archive.write_text(
+        _line("2024-05-01 08:00:00", "INFO", "fastapi_app.main", "old start")
+        + _line("2024-05-01 09:00:00", "ERROR", "fastapi_app.api.auth", "old failure")
+        + "Traceback (most recent call last):\n  ValueError: boom\n",
+        encoding="utf-8",
+    )
+    with zipfile.ZipFile(str(archive) + ".zip", "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(archive, archive.name)
+    archive.unlink()
+
+    lines = [
+        _line(f"2024-05-02 {h:02d}:{m:02d}:00", "WARNING" if m % 7 == 0 else "DEBUG", "fastapi_app.worker", f"tick {h}-{m}")
+        for h in range(10, 14)
+        for m in range(60)
+    ]
+    active.write_text("".join(lines), encoding="utf-8")
+    return active
+
+
+def test_tail_reads_across_block_boundaries(tmp_path):
+    active = _write_logs(tmp_path)
+    assert tail_lines(active, 2) == [
+        "2024-05-02 13:58:00 | DEBUG    | fastapi_app.worker:run:10 - tick 13-58",
+        "2024-05-02 13:59:00 | DEBUG    | fastapi_app.worker:run:10 - tick 13-59",
+    ]
+    from fastapi_app.core import log_reader
+
+    small_blocks = list(log_reader.iter_lines_reverse(active, block_size=7))
+    assert len(small_blocks) == 240 and small_blocks[0].endswith("tick 13-59")
+
+    archive = list_log_files(active)[0]
+    assert archive.compressed and archive.started_at.day == 1
+    assert tail_lines(archive.path, 2) == ["Traceback (most recent call last):", "  ValueError: boom"]
+
+
+def test_search_filters_and_prunes_archives(tmp_path):
+    from datetime import datetime
+
+    active = _write_logs(tmp_path)
+    files = list_log_files(active)
+    assert [f.started_at is None for f in files] == [False, True]
+
+    errors = list(search_records(files, level="error", contains="valueerror"))
+    assert len(errors) == 1 and errors[0].module == "fastapi_app.api.auth"
+    assert errors[0].message.endswith("ValueError: boom") and errors[0].file.endswith(".log.zip")
+
+    window = list(search_records(
+        files, level="WARNING", module="fastapi_app.worker",
+        since=datetime(2024, 5, 2, 11, 0), until=datetime(2024, 5, 2, 11, 59),
+    ))
+    assert [r.time[-8:-3] for r in window] == [f"11:{m:02d}" for m in range(0, 60, 7)]
+
+    assert len(list(search_records(files, limit=3))) == 3
+
+
+def test_follow_handles_rotation(tmp_path):
+    active = tmp_path / "fastapi_app.log"
+    active.write_text("before\n", encoding="utf-8")
+
+    async def scenario():
+        follower = follow_lines(active, poll_interval=0.01)
+        received = []
+
+        async def collect(count):
+            while len(received) < count:
+                received.append(await follower.__anext__())
+
+        task = asyncio.ensure_future(collect(4))
+        await asyncio.sleep(0.05)
+        with open(active, "a", encoding="utf-8") as f:
+            f.write("first\npart")
+        await asyncio.sleep(0.05)
+        with open(active, "a", encoding="utf-8") as f:
+            f.write("ial\n")
+        await asyncio.sleep(0.05)
+        # 轮转：改名为归档，新建活动文件
+        active.rename(tmp_path / "fastapi_app.2024-05-02_10-00-00_000000.log")
+        active.write_text("after\n", encoding="utf-8")
+        await asyncio.wait_for(task, timeout=5)
+        await follower.aclose()
+        return received
+
+    received = asyncio.run(scenario())
+    assert received == [{"line": "first"}, {"line": "partial"}, {"rotated": "fastapi_app.log"}, {"line": "after"}]
+
+
+def test_follow_sse_cancel_mid_follow_closes_cleanly(tmp_path):
+    active = tmp_path / "fastapi_app.log"
+    active.write_text("before\n", encoding="utf-8")
+
+    async def scenario():
+        stream = follow_sse(active, lines=1, poll_interval=0.01, ping_interval=0.02)
+        received = []
+
+        async def consume():
+            async for chunk in stream:
+                received.append(chunk)
+
+        # 与 StreamingResponse 一致：客户端断开时取消正在迭代响应体的任务
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.05)
+        with open(active, "a", encoding="utf-8") as f:
+            f.write("after\n")
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await stream.aclose()
+        return received
+
+    received = asyncio.run(scenario())
+    assert received[0] == 'data: {"line": "before"}\n\n'
+    assert 'data: {"line": "after"}\n\n' in received
+    assert ": ping\n\n" in received
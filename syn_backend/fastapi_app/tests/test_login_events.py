@@ -0,0 +1,126 @@
+"""
+Test event-driven QR login status push
+"""
+import asyncio
+
+from playwright_worker.login_events import LoginWatcher
+
+
+class _Emitter:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.handlers[event].remove(handler)
+
+    def emit(self, event, arg):
+        for handler in list(self.handlers.get(event, [])):
+            handler(arg)
+
+
+class _Page(_Emitter):
+    main_frame = object()
+
+
+class _Response:
+    def __init__(self, url):
+        self.url = url
+
+
+def _run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def test_page_events_trigger_checks_and_only_changes_are_pushed():
+    async def scenario():
+        page, context = _Page(), _Emitter()
+        statuses = iter(["waiting", "waiting", "scanned", "confirmed"])
+        watcher = LoginWatcher(
+            "s1", lambda: asyncio.sleep(0, {"status": next(statuses)}),
+            targets=(page, context), fallback_interval=60, min_interval=0,
+        )
+        queue = watcher.subscribe()
+        assert (await queue.get())["status"] == "waiting"
+
+        # 无关资源请求不触发检查；登录接口响应、主文档跳转触发检查
+        page.emit("response", _Response("https://cdn.example.com/app.js"))
+        await asyncio.sleep(0.05)
+        assert watcher.checks == 1
+        page.emit("response", _Response("https://sso.example.com/check_qrconnect"))
+        await asyncio.sleep(0.05)
+        assert watcher.checks == 2 and queue.empty()
+
+        page.emit("framenavigated", page.main_frame)
+        assert (await queue.get())["status"] == "scanned"
+        context.emit("page", object())
+        assert (await queue.get())["status"] == "confirmed"
+
+        await asyncio.sleep(0)
+        assert watcher.finished and watcher._task is None
+        assert not page.handlers["response"] and not context.handlers["page"]
+
+        # 终态后新的订阅者直接拿到结果
+        assert watcher.subscribe().get_nowait()["status"] == "confirmed"
+
+    _run(scenario())
+
+
+def test_without_page_falls_back_to_interval_and_missing_session_expires():
+    async def scenario():
+        results = [{"status": "waiting"}, {"status": "waiting"}, None]
+        watcher = LoginWatcher("s2", lambda: asyncio.sleep(0, results.pop(0)), fallback_interval=0.05, min_interval=0)
+        queue = watcher.subscribe()
+        assert (await queue.get())["status"] == "waiting"
+        assert (await queue.get())["status"] == "expired"
+        assert watcher.checks == 3
+
+    _run(scenario())
+
+
+def test_last_unsubscribe_stops_watching():
+    async def scenario():
+        page = _Page()
+        watcher = LoginWatcher(
+            "s3", lambda: asyncio.sleep(0, {"status": "waiting"}), targets=(page, None), fallback_interval=60,
+        )
+        first, second = watcher.subscribe(), watcher.subscribe()
+        await first.get()
+        watcher.unsubscribe(first)
+        assert watcher._task is not None
+        watcher.unsubscribe(second)
+        assert watcher._task is None and not page.handlers["response"]
+
+    _run(scenario())
+
+
+def test_transient_check_errors_are_retried_not_failed():
+    async def scenario():
+        outcomes = [RuntimeError("page crashed"), {"status": "waiting"}, RuntimeError("net"), {"status": "scanned"}]
+
+        async def check():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        watcher = LoginWatcher("s4", check, fallback_interval=0.01, min_interval=0)
+        queue = watcher.subscribe()
+        assert (await queue.get())["status"] == "waiting"
+        assert (await queue.get())["status"] == "scanned"
+        assert watcher.errors == 2 and not watcher.finished
+        watcher.unsubscribe(queue)
+
+        # 连续出错达到上限：通知订阅者中止监听，但不产生 failed 终态
+        async def broken():
+            raise RuntimeError("adapter down")
+
+        watcher = LoginWatcher("s5", broken, fallback_interval=0.01, min_interval=0, max_errors=3)
+        queue = watcher.subscribe()
+        event = await queue.get()
+        assert "adapter down" in event["error"]
+        assert watcher.last_event is None and watcher._task is None and watcher.checks == 3
+
+    _run(scenario())
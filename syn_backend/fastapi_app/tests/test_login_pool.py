@@ -0,0 +1,170 @@
+"""
+Test the pre-warmed QR login session pool
+"""
+import asyncio
+
+from playwright_worker.browser_pool import BrowserPool
+from playwright_worker.login_pool import LoginSessionPool, _WarmPage
+
+
+class _FakeContext:
+    def __init__(self, browser, account_id):
+        self.browser = browser
+        self.account_id = account_id
+        self.closed = False
+
+    async def new_page(self):
+        return {"context": self, "url": None}
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeBrowser:
+    def is_connected(self):
+        return True
+
+    async def close(self):
+        pass
+
+
+def _login_pool(policies=None, **kwargs):
+    async def launcher():
+        return _FakeBrowser()
+
+    async def context_factory(browser, account_id=None, **_):
+        return _FakeContext(browser, account_id)
+
+    browser_pool = BrowserPool(
+        browsers=kwargs.pop("browsers", 1), contexts_per_browser=kwargs.pop("contexts_per_browser", 4),
+        recycle_after=0, launcher=launcher, context_factory=context_factory,
+    )
+    policies = policies or {}
+    pool = LoginSessionPool(
+        browser_pool,
+        describe_policy=lambda platform, account_id: policies.get(account_id, {}),
+        **kwargs,
+    )
+    return pool
+
+
+async def _settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def test_warm_page_is_served_and_refilled():
+    navigated = []
+
+    async def navigate(page):
+        page["url"] = "login"
+        navigated.append(page)
+
+    async def main():
+        pool = _login_pool()
+        pool.prewarm("douyin", navigate)
+        await _settle()
+        assert pool.stats()["warm_pages"] == {"douyin": 1}
+
+        lease = await pool.checkout("douyin", "acc1", navigate)
+        assert lease.warm and lease.page["url"] == "login"
+        assert len(navigated) == 1
+        await _settle()
+        # 取走后在后台补充
+        assert pool.stats()["warm_pages"] == {"douyin": 1} and len(navigated) == 2
+
+        pool.record_time_to_qr("douyin", 120, "warm")
+        pool.record_time_to_qr("douyin", 2400, "pooled")
+        await lease.close()
+        stats = pool.stats()
+        await pool.close()
+        return lease, stats
+
+    lease, stats = asyncio.run(main())
+    assert lease.context.closed
+    assert stats["sessions"] == 0 and stats["warm_hits"] == 1
+    assert stats["time_to_qr"]["douyin"]["all"]["count"] == 2
+    assert stats["time_to_qr"]["douyin"]["warm"]["p50_ms"] == 120
+    assert stats["browser_pool"]["browsers"] == 1
+    # 扫码会话的持有时长不计入单次检查耗时
+    assert stats["browser_pool"]["check_duration"]["count"] == 0
+    assert stats["browser_pool"]["lease_duration"]["count"] >= 1
+
+
+def test_account_policies_bypass_warm_pages():
+    async def navigate(page):
+        page["url"] = "login"
+
+    async def main():
+        pool = _login_pool(policies={"fp": {"per_account": True}, "profile": {"persistent": True}})
+        pool.prewarm("kuaishou", navigate)
+        await _settle()
+
+        lease = await pool.checkout("kuaishou", "fp", navigate)
+        assert not lease.warm and lease.context.account_id == "fp"
+        assert await pool.checkout("kuaishou", "profile", navigate) is None
+        stats = pool.stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats["warm_pages"] == {"kuaishou": 1}
+    assert stats["warm_hits"] == 0 and stats["sessions"] == 1
+
+
+def test_stale_pages_and_sessions_are_evicted_without_starving_logins():
+    async def navigate(page):
+        page["url"] = "login"
+
+    async def main():
+        pool = _login_pool(contexts_per_browser=1, warm_max_age=0, session_ttl=0)
+        # 唯一的槽位被真实登录占用时不预热
+        lease = await pool.checkout("tencent", "acc", navigate)
+        await _settle()
+        assert pool.stats()["warm_pages"] == {}
+
+        await asyncio.sleep(0.01)
+        assert await pool.sweep() == {"sessions": 1, "warm_pages": 0}
+        assert lease.closed and pool.stats()["browser_pool"]["active_contexts"] == 0
+
+        # 过期的预热页面被丢弃，改为新建页面
+        await _settle()
+        await asyncio.sleep(0.01)
+        fresh = await pool.checkout("tencent", "acc", navigate)
+        assert not fresh.warm
+        stats = pool.stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats["evicted_sessions"] == 1
+
+
+def test_sweep_keeps_pages_added_while_closing_expired_ones():
+    async def navigate(page):
+        page["url"] = "login"
+
+    async def main():
+        pool = _login_pool()
+        pool.prewarm("douyin", navigate)
+        await _settle()
+        (expired,) = pool._warm["douyin"]
+        added = []
+
+        async def close_while_refilling():
+            # 关闭过期页面的间隙里，_refill 追加了一个新的预热页面
+            lease = await pool.browser_pool.acquire_context(account_id=None)
+            added.append(_WarmPage(lease, await lease.context.new_page()))
+            pool._warm["douyin"].append(added[0])
+            expired.context_lease.context.closed = True
+
+        expired.context_lease.context.close = close_while_refilling
+        pool.warm_max_age = 0
+        await asyncio.sleep(0.01)
+        assert await pool.sweep() == {"sessions": 0, "warm_pages": 1}
+        assert pool._warm["douyin"] == added
+        await pool.close()
+        return added[0]
+
+    added = asyncio.run(main())
+    assert added.context_lease.closed and added.context_lease.context.closed
@@ -0,0 +1,67 @@
+"""
+Test MatrixScheduler journal persistence
+"""
+import json
+
+from fastapi_app.models.matrix_task import TaskStatus
+from fastapi_app.services.matrix_scheduler import MatrixScheduler
+
+
+def _generate(scheduler, materials):
+    return scheduler.generate_tasks(
+        platforms=["douyin"],
+        accounts={"douyin": ["acc1", "acc2"]},
+        materials=materials,
+    )
+
+
+def test_journal_replay_recovers_state(tmp_path):
+    """State transitions are appended to the journal and replayed after a restart"""
+    tasks_file = tmp_path / "matrix_tasks.json"
+    scheduler = MatrixScheduler(tasks_file=tasks_file, compact_threshold=10_000)
+    tasks = _generate(scheduler, [f"m{i}" for i in range(6)])
+
+    done, failed_once, running = scheduler.pop_next_tasks(3)
+    scheduler.report_result(done.task_id, "success")
+    scheduler.report_result(failed_once.task_id, "fail", "boom")
+    scheduler.cancel_task(tasks[-1].task_id)
+
+    # Only appends so far: 6 created + 3 popped + 3 results
+    journal_lines = scheduler._journal.journal_file.read_text(encoding="utf-8").splitlines()
+    assert len(journal_lines) == 12
+    # Simulate a crash in the middle of a write
+    with open(scheduler._journal.journal_file, "a", encoding="utf-8") as f:
+        f.write('{"op": "upsert", "task": {')
+    scheduler._journal.close()
+
+    restored = MatrixScheduler(tasks_file=tasks_file)
+    stats = restored.get_statistics()
+    assert stats == {"pending": 2, "retry": 2, "running": 0, "finished": 1, "failed": 1, "total": 6}
+    assert done.task_id in restored.finished
+    assert tasks[-1].task_id in restored.failed
+    # The task that was running at crash time goes to retry with its retry_count bumped
+    recovered = restored.get_task_by_id(running.task_id)
+    assert recovered.status == TaskStatus.RETRY
+    assert recovered.retry_count == 1
+    assert [t.task_id for t in restored.retry_queue] == [failed_once.task_id, running.task_id]
+
+    # Recovery compacts into a fresh snapshot and truncates the journal
+    assert len(json.loads(tasks_file.read_text(encoding="utf-8"))) == 6
+    assert restored._journal.journal_file.read_text(encoding="utf-8") == ""
+    restored._journal.close()
+
+
+def test_journal_compacts_when_threshold_reached(tmp_path):
+    tasks_file = tmp_path / "matrix_tasks.json"
+    scheduler = MatrixScheduler(tasks_file=tasks_file, compact_threshold=5)
+    _generate(scheduler, ["a", "b"])
+    assert scheduler._journal.entries == 2
+
+    for task in scheduler.pop_next_tasks(2):
+        scheduler.report_result(task.task_id, "success")
+    # 2 + 2 pops reached the threshold and compacted; only the last results remain
+    assert scheduler._journal.entries < 5
+
+    scheduler.reset()
+    scheduler._journal.close()
+    assert MatrixScheduler(tasks_file=tasks_file).get_statistics()["total"] == 0
@@ -0,0 +1,135 @@
+"""
+Test the shared due-time schedule engine and the publish TaskScheduler built on it
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from myUtils.schedule_engine import ScheduleEngine, every
+from myUtils.task_scheduler import TaskScheduler
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_jobs_fire_on_time_and_hot_insert_wakes_loop():
+    engine = ScheduleEngine(workers=2)
+    fired = []
+    engine.schedule_at("late", time.time() + 30, lambda: fired.append("late"))
+    engine.start()
+    try:
+        # 比当前堆顶更早的任务插入后立即生效，不必等到 30 秒后
+        engine.schedule_at("early", time.time() + 0.1, lambda: fired.append("early"), tag="t")
+        assert _wait_for(lambda: fired == ["early"])
+
+        metrics = engine.metrics()
+        assert metrics["fired"] == 1
+        assert metrics["latency_ms"]["max"] < 200
+        assert metrics["latency_by_tag"]["t"]["count"] == 1
+        assert [j["job_id"] for j in engine.jobs()] == ["late"]
+
+        assert engine.cancel("late")
+        assert engine.metrics()["jobs"] == 0
+    finally:
+        engine.stop()
+
+
+def test_recurring_job_skips_while_previous_run_is_busy():
+    engine = ScheduleEngine(workers=2)
+    release = threading.Event()
+    runs = []
+
+    def slow():
+        runs.append(time.time())
+        release.wait(2)
+
+    engine.schedule_recurring("slow", every(0.05), slow, tag="r", first_at=time.time())
+    engine.start()
+    try:
+        assert _wait_for(lambda: engine.metrics()["skipped"] >= 2)
+        assert len(runs) == 1
+        release.set()
+        assert _wait_for(lambda: len(runs) >= 2)
+        assert engine.cancel_tag("r") == 1
+    finally:
+        release.set()
+        engine.stop()
+
+
+def test_task_scheduler_claims_due_tasks_once(tmp_path):
+    db_path = tmp_path / "database.db"
+    now = datetime.now()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE publish_tasks (
+                task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                platform TEXT, account_id TEXT, material_id TEXT, title TEXT,
+                schedule_time DATETIME, publish_mode TEXT DEFAULT 'auto', status TEXT DEFAULT 'pending',
+                error_message TEXT, updated_at DATETIME, published_at DATETIME
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO publish_tasks (platform, schedule_time, publish_mode) VALUES (?, ?, ?)",
+            [
+                ("douyin", (now - timedelta(minutes=1)).isoformat(), "auto"),
+                ("kuaishou", (now + timedelta(hours=1)).isoformat(), "auto"),
+                ("bilibili", None, "manual"),
+            ],
+        )
+
+    dispatched = []
+    engine = ScheduleEngine(workers=2)
+    scheduler = TaskScheduler(db_path=str(db_path), engine=engine, dispatcher=dispatched.append)
+    scheduler.start()
+    try:
+        assert _wait_for(lambda: len(dispatched) == 1)
+        assert dispatched[0]["platform"] == "douyin"
+        assert dispatched[0]["status"] == "publishing"
+        assert [j["job_id"] for j in engine.jobs(TaskScheduler.TAG)] == ["publish:2"]
+
+        # 热插入新任务；对账不会重复加入已在堆中的任务
+        with sqlite3.connect(db_path) as conn:
+            task_id = conn.execute(
+                "INSERT INTO publish_tasks (platform, schedule_time) VALUES ('xhs', ?)", (now.isoformat(),)
+            ).lastrowid
+        scheduler.schedule_task(task_id, now.isoformat())
+        assert _wait_for(lambda: len(dispatched) == 2)
+        assert scheduler.load_pending_tasks() == 0
+
+        # 已被认领的任务再次到期不会重复执行
+        scheduler.schedule_task(1, None)
+        time.sleep(0.1)
+        assert len(dispatched) == 2
+
+        with sqlite3.connect(db_path) as conn:
+            indexes = [row[1] for row in conn.execute("PRAGMA index_list(publish_tasks)")]
+        assert "idx_publish_tasks_due" in indexes
+    finally:
+        scheduler.stop()
+        engine.stop()
+
+
+def test_publish_lane_is_not_starved_by_slow_jobs():
+    engine = ScheduleEngine(workers=1, lanes={"publish": 1})
+    release = threading.Event()
+    fired = []
+    engine.schedule_at("sweep", time.time(), lambda: release.wait(5), tag="maintenance")
+    engine.start()
+    try:
+        # 共享线程池被长任务占满时，publish 任务仍准点执行
+        engine.schedule_at("publish:1", time.time() + 0.05, lambda: fired.append("publish"), tag="publish")
+        engine.schedule_at("other", time.time() + 0.05, lambda: fired.append("other"), tag="maintenance")
+        assert _wait_for(lambda: fired == ["publish"])
+        assert engine.metrics()["latency_by_tag"]["publish"]["max_ms"] < 500
+        release.set()
+        assert _wait_for(lambda: fired == ["publish", "other"])
+    finally:
+        release.set()
+        engine.stop()
@@ -0,0 +1,52 @@
+"""
+Test TaskQueueManager duplicate detection and batched writer isolation
+"""
+import threading
+from concurrent.futures import Future
+
+from myUtils.task_queue_manager import Task, TaskQueueManager, TaskStatus, TaskType
+
+
+def _task(task_id):
+    return Task(task_id=task_id, task_type=TaskType.PUBLISH, data={"n": 1}, max_retries=0)
+
+
+def test_finished_task_id_cannot_be_added_again(tmp_path):
+    tm = TaskQueueManager(tmp_path / "queue.db")
+    try:
+        task = _task("t1")
+        assert tm.add_task(task)
+        # 尚未落库时重复添加
+        assert not tm.add_task(_task("t1"))
+
+        assert tm.task_queue.remove("t1")
+        task.status = TaskStatus.FAILED
+        tm.update_task_status(task)
+        tm._writer.flush()
+
+        # 已失败（不在队列、不在执行）的任务ID仍然视为已存在
+        assert not tm.add_task(_task("t1"))
+        assert not tm.task_queue.contains("t1")
+        assert tm.add_task(_task("t2"))
+    finally:
+        tm._writer.close()
+
+
+def test_failed_write_does_not_roll_back_other_rows(tmp_path):
+    tm = TaskQueueManager(tmp_path / "queue.db")
+    writer = tm._writer
+    try:
+        # 先让写线程阻塞在一个 call 上，保证后面的写操作落在同一个批次里
+        gate = threading.Event()
+        writer._queue.put(("call", lambda conn: gate.wait(5), Future()))
+        assert tm.add_task(_task("a"))
+        writer.update("broken", ("too", "few", "params"))
+        assert tm.add_task(_task("b"))
+        gate.set()
+        writer.flush()
+
+        rows = tm._query("SELECT task_id FROM task_queue ORDER BY task_id")
+        assert [r[0] for r in rows] == ["a", "b"]
+        assert not tm._unflushed_ids
+    finally:
+        writer.close()
@@ -0,0 +1,91 @@
+"""
+Test the indexed, pipelined Redis task state manager
+"""
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from fastapi_app.tasks.task_state_manager import TaskStateManager
+
+
+class _CountingRedis:
+    """Counts commands that reach the client directly (pipelines count once)"""
+
+    def __init__(self, client):
+        self._client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            self.calls.append(name)
+            return attr(*args, **kwargs)
+
+        return wrapper
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def test_unfiltered_listing_pages_over_created_index(client):
+    manager = TaskStateManager(redis_client=client)
+    for i in range(30):
+        manager.create_task(f"t{i:02d}", "publish" if i % 2 else "batch_publish", {"i": i})
+        client.zincrby(manager._index_key("created"), i, f"t{i:02d}")
+    manager.update_task_state("t05", status="running")
+    manager.update_task_state("t05", status="success")
+
+    counting = _CountingRedis(client)
+    manager.redis = counting
+    page = manager.list_tasks(limit=10, offset=5)
+    assert [t["task_id"] for t in page] == [f"t{i:02d}" for i in range(24, 14, -1)]
+    assert "get" not in counting.calls and counting.calls.count("mget") == 1
+
+    assert [t["task_id"] for t in manager.list_tasks(status="success")] == ["t05"]
+    assert len(manager.list_tasks(task_type="publish", limit=100)) == 15
+
+    counting.calls.clear()
+    stats = manager.get_queue_stats()
+    assert stats == {"pending": 29, "running": 0, "success": 1, "failed": 0, "retry": 0, "total": 30}
+    assert counting.calls == ["pipeline"]
+
+
+def test_expired_tasks_leave_indexes(client):
+    manager = TaskStateManager(redis_client=client)
+    manager.create_task("old", "publish", {})
+    manager.create_task("new", "publish", {})
+    for key in ("created", "status:pending", "type:publish"):
+        client.zadd(manager._index_key(key), {"old": 1})
+
+    # 详情 key 已过期：列表跳过并清理 created 索引
+    client.delete(manager._task_key("old"))
+    assert [t["task_id"] for t in manager.list_tasks()] == ["new"]
+    assert client.zscore(manager._index_key("created"), "old") is None
+
+    assert manager.archive_expired() == 0
+    assert client.zscore(manager._index_key("status:pending"), "old") is None
+    assert client.zscore(manager._index_key("type:publish"), "old") is None
+    assert manager.get_queue_stats()["total"] == 1
+
+    manager.delete_task("new")
+    assert client.zcard(manager._index_key("created")) == 0
+
+
+def test_legacy_status_indexes_are_backfilled(client):
+    manager = TaskStateManager(redis_client=client)
+    for task_id, status, ts in (("a", "success", 10), ("b", "failed", 20)):
+        client.set(manager._task_key(task_id), json.dumps({"task_id": task_id, "status": status}))
+        client.zadd(manager._index_key(f"status:{status}"), {task_id: ts})
+
+    assert [t["task_id"] for t in manager.list_tasks()] == ["b", "a"]
+    # 未知任务的状态更新同样进入索引
+    manager.update_task_state("c", status="running")
+    assert [t["task_id"] for t in manager.list_tasks(status="running")] == ["c"]
+    assert manager.list_tasks()[0]["task_id"] == "c"
@@ -0,0 +1,101 @@
+"""
+Test the Celery worker runtime: one persistent loop, shared browser pool, phase timings
+"""
+import asyncio
+import threading
+
+from playwright_worker.browser_pool import BrowserPool
+from fastapi_app.tasks.worker_runtime import WorkerRuntime, current_browser_pool, phase
+
+
+class _FakeContext:
+    async def close(self):
+        pass
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, **kwargs):
+        return _FakeContext()
+
+    async def close(self):
+        self.closed = True
+
+
+def _runtime(recycle_after):
+    runtime = WorkerRuntime(browsers=1, contexts_per_browser=2, recycle_after=recycle_after)
+    launched = []
+
+    def build_pool():
+        async def launcher():
+            with phase("launch"):
+                await asyncio.sleep(0.01)
+                launched.append(_FakeBrowser())
+                return launched[-1]
+
+        return BrowserPool(
+            browsers=1, contexts_per_browser=2, recycle_after=recycle_after,
+            launcher=launcher, context_factory=lambda b, **kw: b.new_context(**kw),
+        )
+
+    runtime._build_pool = build_pool
+    return runtime, launched
+
+
+async def _fake_upload(runtime):
+    pool = runtime.browser_pool()
+    async with pool.context() as context:
+        with phase("navigate"):
+            await asyncio.sleep(0.001)
+        with phase("upload"):
+            await asyncio.sleep(0.001)
+        with phase("publish"):
+            await asyncio.sleep(0.001)
+    return {"success": True, "loop": id(asyncio.get_running_loop())}
+
+
+def test_tasks_share_one_loop_and_recycle_browsers():
+    runtime, launched = _runtime(recycle_after=3)
+    results = []
+
+    def celery_thread():
+        for _ in range(3):
+            results.append(runtime.run_timed(_fake_upload(runtime)))
+
+    threads = [threading.Thread(target=celery_thread) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = runtime.stats()
+    runtime.stop()
+
+    assert len(results) == 6
+    assert len({result["loop"] for result, _ in results}) == 1
+    # 6 tasks, recycled every 3 -> 2 launches instead of 6
+    assert len(launched) == 2
+    assert stats["tasks_run"] == 6
+    for _, timings in results:
+        assert {"navigate", "upload", "publish", "total"} <= set(timings)
+    assert sum(1 for _, timings in results if "launch" in timings) == 2
+
+
+def test_browser_pool_is_only_exposed_on_the_runtime_loop():
+    runtime, _ = _runtime(recycle_after=0)
+
+    async def probe():
+        return current_browser_pool()
+
+    assert asyncio.run(probe()) is None
+    assert runtime.run(_probe_inside(runtime)) is True
+    runtime.stop()
+    assert runtime.started is False
+
+
+async def _probe_inside(runtime):
+    return runtime.browser_pool() is not None
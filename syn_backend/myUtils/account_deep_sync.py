@@ -0,0 +1,245 @@
+"""
+账号深度同步引擎（异步、有界并发）
+
+替代 CookieManager.deep_sync_accounts 中的逐个串行处理：
+- Cookie 文件并发读取（线程池，受 io_concurrency 限制）
+- 先用 Cookie 内容本地提取 user_id/name/avatar
+- 仍缺字段（或需要校验）时走 Playwright Worker /account/enrich 补全：
+  按平台信号量限流，Worker 侧在共享浏览器池上开上下文，不再每个账号起一个浏览器
+- 所有变更在一个事务内批量写回
+- 通过 progress 快照 / on_progress 回调增量上报进度（SSE 使用）
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+_BLANK_NAMES = (None, "", "-", "未命名账号")
+
+
+def _load_json(path: Path) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class DeepSyncEngine:
+    """单次深度同步任务"""
+
+    def __init__(
+        self,
+        manager,
+        *,
+        validate_cookies: bool = False,
+        io_concurrency: int = 16,
+        per_platform_concurrency: int = 3,
+        enrich_concurrency: int = 4,
+        enrich_timeout: float = 30.0,
+        enrich: Optional[Callable[[str, Dict[str, Any], Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ):
+        self.manager = manager
+        self.validate_cookies = validate_cookies
+        self.per_platform_concurrency = max(1, per_platform_concurrency)
+        self.enrich_timeout = enrich_timeout
+        self._io_slots = asyncio.Semaphore(max(1, io_concurrency))
+        # 全局上限与 Worker 浏览器池容量对齐，避免把请求全部堆在 Worker 排队
+        self._enrich_slots = asyncio.Semaphore(max(1, enrich_concurrency))
+        self._platform_slots: Dict[str, asyncio.Semaphore] = {}
+        self._enrich = enrich or self._enrich_via_worker
+        self._on_progress = on_progress
+        self._client = None
+
+        self.job_id = uuid.uuid4().hex
+        self.stats = {
+            "added": 0, "marked_missing": 0, "validated": 0, "expired": 0,
+            "total_files": 0, "backed_up": 0, "cleaned_up": 0, "enriched": 0, "failed": 0,
+        }
+        self.progress: Dict[str, Any] = {
+            "job_id": self.job_id,
+            "status": "pending",
+            "total": 0,
+            "done": 0,
+            "stats": self.stats,
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+        self._persist: Dict[str, Dict[str, Any]] = {}
+        self._status_updates: Dict[str, str] = {}
+
+    # ---------- 进度 ----------
+
+    def _emit(self, **event) -> None:
+        if self._on_progress is None:
+            return
+        payload = {**self.progress, **event}
+        try:
+            self._on_progress(payload)
+        except Exception as e:
+            logger.debug(f"[DeepSync] 进度回调失败: {e}")
+
+    def _advance(self, account: Dict[str, Any], outcome: str) -> None:
+        self.progress["done"] += 1
+        self._emit(type="progress", account_id=account.get("account_id"), outcome=outcome)
+
+    # ---------- 补全 ----------
+
+    def _platform_slot(self, platform: str) -> asyncio.Semaphore:
+        slot = self._platform_slots.get(platform)
+        if slot is None:
+            slot = asyncio.Semaphore(self.per_platform_concurrency)
+            self._platform_slots[platform] = slot
+        return slot
+
+    async def _enrich_via_worker(self, platform: str, storage_state: Dict[str, Any], account: Dict[str, Any]):
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.enrich_timeout)
+        worker_base_url = os.environ.get("PLAYWRIGHT_WORKER_URL", "http://127.0.0.1:7001").rstrip("/")
+        try:
+            from config.conf import PLAYWRIGHT_HEADLESS
+            desired_headless = bool(PLAYWRIGHT_HEADLESS)
+        except Exception:
+            desired_headless = True
+
+        resp = await self._client.post(
+            f"{worker_base_url}/account/enrich",
+            json={
+                "platform": self.manager._normalize_platform(platform),
+                "storage_state": storage_state,
+                "headless": desired_headless,
+                "account_id": account.get("account_id"),
+            },
+        )
+        if resp.status_code >= 400:
+            return None
+        payload = resp.json()
+        if not isinstance(payload, dict) or not payload.get("success"):
+            return None
+        return payload.get("data") or {}
+
+    @staticmethod
+    def _apply_enriched(account: Dict[str, Any], enriched: Dict[str, Any]) -> bool:
+        """与 CookieManager._enrich_with_fast_validator 的合并规则一致"""
+        changed = False
+        if enriched.get("user_id") and not account.get("user_id"):
+            account["user_id"] = str(enriched["user_id"])
+            changed = True
+        if enriched.get("name"):
+            current_name = account.get("name")
+            if (
+                current_name in _BLANK_NAMES
+                or (isinstance(current_name, str) and current_name.startswith("未命名账号"))
+                or (account.get("user_id") and str(current_name) == str(account.get("user_id")))
+            ):
+                account["name"] = str(enriched["name"])
+                changed = True
+        if enriched.get("avatar") and not account.get("avatar"):
+            account["avatar"] = enriched["avatar"]
+            changed = True
+        return changed
+
+    # ---------- 单账号 ----------
+
+    async def _sync_one(self, account: Dict[str, Any], path: Optional[Path]) -> None:
+        account_id = account.get("account_id")
+        if path is None:
+            if account.get("status") not in ("file_missing", "expired"):
+                self._status_updates[account_id] = "file_missing"
+                self.stats["marked_missing"] += 1
+                logger.info(f"[DeepSync] 标记文件丢失: {account.get('name')} (status: file_missing)")
+            self._advance(account, "file_missing")
+            return
+
+        try:
+            async with self._io_slots:
+                data = await asyncio.to_thread(_load_json, path)
+
+            needs_update = False
+            extracted = self.manager._extract_user_info_from_cookie(account["platform"], data)
+            if extracted.get("user_id") and not account.get("user_id"):
+                account["user_id"] = extracted["user_id"]
+                needs_update = True
+            if extracted.get("avatar") and not account.get("avatar"):
+                account["avatar"] = extracted["avatar"]
+                needs_update = True
+            if extracted.get("name") and account.get("name") in _BLANK_NAMES:
+                account["name"] = extracted["name"]
+                needs_update = True
+
+            incomplete = not account.get("name") or not account.get("user_id") or not account.get("avatar")
+            validate = self.validate_cookies and account.get("status") in ("valid", "unchecked")
+            if (incomplete or validate) and isinstance(data, dict) and data:
+                async with self._platform_slot(account["platform"]), self._enrich_slots:
+                    try:
+                        enriched = await self._enrich(account["platform"], data, account)
+                    except Exception as e:
+                        logger.warning(f"[DeepSync] Worker 补全失败 {account_id}: {e}")
+                        enriched = None
+                if enriched and self._apply_enriched(account, enriched):
+                    needs_update = True
+                    self.stats["enriched"] += 1
+
+            if validate:
+                if not account.get("user_id"):
+                    self._status_updates[account_id] = "expired"
+                    self.stats["expired"] += 1
+                    logger.info(f"[DeepSync] Cookie已失效: {account.get('name')} ({account['platform']})")
+                else:
+                    self.stats["validated"] += 1
+                    if account.get("status") == "unchecked":
+                        self._status_updates[account_id] = "valid"
+
+            if needs_update:
+                self._persist[account_id] = account
+            self._advance(account, "updated" if needs_update else "unchanged")
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"[DeepSync] 补全失败 {account_id}: {e}")
+            self._advance(account, "failed")
+
+    # ---------- 入口 ----------
+
+    async def run(self) -> Dict[str, int]:
+        self.progress.update(status="running", started_at=datetime.now(timezone.utc).isoformat())
+        started = time.perf_counter()
+        try:
+            cookies_dir = Path(self.manager.cookies_dir)
+            disk_files = await asyncio.to_thread(lambda: {f.name: f for f in cookies_dir.glob("*.json")})
+            self.stats["total_files"] = len(disk_files)
+            accounts = await asyncio.to_thread(self.manager.list_flat_accounts)
+            self.progress["total"] = len(accounts)
+            self._emit(type="start")
+
+            await asyncio.gather(*(
+                self._sync_one(account, disk_files.get(account.get("cookie_file") or ""))
+                for account in accounts
+            ))
+
+            written = await asyncio.to_thread(
+                self.manager.apply_sync_results, list(self._persist.values()), self._status_updates
+            )
+            self.progress.update(status="completed", written=written)
+            logger.info(
+                f"[DeepSync] 完成: {len(accounts)} 个账号, 写入 {written} 条, "
+                f"耗时 {time.perf_counter() - started:.1f}s, stats={self.stats}"
+            )
+            return self.stats
+        except Exception as e:
+            self.progress.update(status="failed", error=str(e))
+            raise
+        finally:
+            self.progress["finished_at"] = datetime.now(timezone.utc).isoformat()
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+            self._emit(type="done")
@@ -4,7 +4,7 @@ Analytics database schema and helper functions
 import sqlite3
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Any, Iterable, List, Dict, Iterator, Optional, Tuple
 import json
 
 try:
@@ -63,8 +63,166 @@ def ensure_analytics_schema(db_path: Path):
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_video_analytics_platform ON video_analytics(platform)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_video_analytics_publish_date ON video_analytics(publish_date)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_analytics_history_video_id ON analytics_history(video_analytics_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_analytics_history_recorded_at ON analytics_history(recorded_at)")
+        _ensure_video_key_index(conn)
+        _ensure_daily_rollup(conn)
         
         conn.commit()
+    _schema_ready.add(str(db_path))
+
+
+_schema_ready: set = set()
+
+
+def _ensure_video_key_index(conn: sqlite3.Connection) -> None:
+    """Unique (platform, video_id) index; collapses legacy duplicates onto the most recently updated row first"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_video_analytics_platform_video'"
+    ).fetchone()
+    if exists:
+        return
+
+    conn.execute("DROP TABLE IF EXISTS temp._va_keep")
+    conn.execute("""
+        CREATE TEMP TABLE _va_keep AS
+        SELECT id, keep_id FROM (
+            SELECT id,
+                   FIRST_VALUE(id) OVER (
+                       PARTITION BY platform, video_id ORDER BY last_updated DESC, id DESC
+                   ) AS keep_id
+            FROM video_analytics
+            WHERE video_id IS NOT NULL
+        )
+        WHERE id != keep_id
+    """)
+    conn.execute("""
+        UPDATE analytics_history
+        SET video_analytics_id = (SELECT keep_id FROM _va_keep WHERE _va_keep.id = analytics_history.video_analytics_id)
+        WHERE video_analytics_id IN (SELECT id FROM _va_keep)
+    """)
+    conn.execute("DELETE FROM video_analytics WHERE id IN (SELECT id FROM _va_keep)")
+    conn.execute("DROP TABLE temp._va_keep")
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_video_analytics_platform_video ON video_analytics(platform, video_id)"
+    )
+
+
+# ---------- Daily rollup ----------
+#
+# analytics_daily_rollup holds per (publish_date, platform, account_id) totals of video_analytics.
+# Triggers keep it in step with every write path (batch upserts, manual edits, cleanup deletes)
+# inside the writer's own transaction. Key columns may be NULL, so matching uses IS.
+
+ROLLUP_COUNTERS = ("play_count", "like_count", "comment_count", "collect_count", "share_count")
+
+_ROLLUP_MATCH = "publish_date IS {row}.publish_date AND platform IS {row}.platform AND account_id IS {row}.account_id"
+
+
+def _rollup_apply_sql(row: str, sign: str) -> str:
+    """Statements adding (+) or subtracting (-) one video_analytics row to its rollup bucket"""
+    match = _ROLLUP_MATCH.format(row=row)
+    counters = ",\n            ".join(
+        f"{c} = {c} {sign} COALESCE({row}.{c}, 0)" for c in ROLLUP_COUNTERS
+    )
+    statements = []
+    if sign == "+":
+        statements.append(f"""
+        INSERT INTO analytics_daily_rollup (publish_date, platform, account_id)
+        SELECT {row}.publish_date, {row}.platform, {row}.account_id
+        WHERE NOT EXISTS (SELECT 1 FROM analytics_daily_rollup WHERE {match});""")
+    statements.append(f"""
+        UPDATE analytics_daily_rollup SET
+            video_count = video_count {sign} 1,
+            {counters}
+        WHERE {match};""")
+    if sign == "-":
+        statements.append(f"""
+        DELETE FROM analytics_daily_rollup WHERE video_count <= 0 AND {match};""")
+    return "".join(statements)
+
+
+def _ensure_daily_rollup(conn: sqlite3.Connection) -> None:
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_daily_rollup'"
+    ).fetchone()
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS analytics_daily_rollup (
+            publish_date DATE,
+            platform VARCHAR(20),
+            account_id INTEGER,
+            video_count INTEGER NOT NULL DEFAULT 0,
+            {", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in ROLLUP_COUNTERS)}
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_analytics_rollup_key ON analytics_daily_rollup(publish_date, platform, account_id)"
+    )
+    watched = ", ".join(("publish_date", "platform", "account_id") + ROLLUP_COUNTERS)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_video_analytics_rollup_insert
+        AFTER INSERT ON video_analytics
+        BEGIN{_rollup_apply_sql("NEW", "+")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_video_analytics_rollup_update
+        AFTER UPDATE OF {watched} ON video_analytics
+        BEGIN{_rollup_apply_sql("OLD", "-")}{_rollup_apply_sql("NEW", "+")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_video_analytics_rollup_delete
+        AFTER DELETE ON video_analytics
+        BEGIN{_rollup_apply_sql("OLD", "-")}
+        END
+    """)
+    if not exists:
+        _rebuild_daily_rollup(conn)
+
+
+def _rebuild_daily_rollup(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM analytics_daily_rollup")
+    conn.execute(f"""
+        INSERT INTO analytics_daily_rollup (publish_date, platform, account_id, video_count, {", ".join(ROLLUP_COUNTERS)})
+        SELECT publish_date, platform, account_id, COUNT(*),
+               {", ".join(f"COALESCE(SUM({c}), 0)" for c in ROLLUP_COUNTERS)}
+        FROM video_analytics
+        GROUP BY publish_date, platform, account_id
+    """)
+
+
+def rebuild_daily_rollup(db_path: Path) -> None:
+    """Recompute analytics_daily_rollup from video_analytics (repair / after bulk imports with triggers off)"""
+    with sqlite3.connect(db_path) as conn:
+        _rebuild_daily_rollup(conn)
+        conn.commit()
+
+
+def compact_analytics_history(db_path: Path, hourly_after_days: int = 7, daily_after_days: int = 30) -> Dict[str, int]:
+    """
+    Downsample analytics_history: snapshots older than hourly_after_days keep the latest row per
+    video per hour, older than daily_after_days the latest row per video per day.
+    Returns rows removed by each pass.
+    """
+    removed = {}
+    with sqlite3.connect(db_path) as conn:
+        for name, days, bucket in (
+            ("daily", daily_after_days, "%Y-%m-%d"),
+            ("hourly", hourly_after_days, "%Y-%m-%d %H"),
+        ):
+            cutoff = conn.execute("SELECT datetime('now', ?)", (f"-{int(days)} days",)).fetchone()[0]
+            cursor = conn.execute(f"""
+                DELETE FROM analytics_history
+                WHERE recorded_at < :cutoff
+                  AND id NOT IN (
+                      SELECT MAX(id) FROM analytics_history
+                      WHERE recorded_at < :cutoff
+                      GROUP BY video_analytics_id, strftime('{bucket}', recorded_at)
+                  )
+            """, {"cutoff": cutoff})
+            removed[name] = cursor.rowcount
+        conn.commit()
+    return removed
 
 
 def _build_filter_clause(
@@ -121,6 +279,8 @@ def get_analytics_summary(
     account_ids: Optional[List[str]] = None,
 ) -> Dict:
     """Get analytics summary statistics"""
+    if str(db_path) not in _schema_ready:
+        ensure_analytics_schema(db_path)
     with sqlite3.connect(db_path) as conn:
         cursor = conn.cursor()
         
@@ -128,15 +288,15 @@ def get_analytics_summary(
             start_date, end_date, platform, platforms, account_ids
         )
         
+        # Reads the per-day rollup (O(days x accounts)) instead of scanning video_analytics
         cursor.execute(f"""
             SELECT 
-                COUNT(*) as total_videos,
+                COALESCE(SUM(video_count), 0) as total_videos,
                 COALESCE(SUM(play_count), 0) as total_plays,
                 COALESCE(SUM(like_count), 0) as total_likes,
                 COALESCE(SUM(comment_count), 0) as total_comments,
-                COALESCE(SUM(collect_count), 0) as total_collects,
-                COALESCE(AVG(play_count), 0) as avg_play_count
-            FROM video_analytics
+                COALESCE(SUM(collect_count), 0) as total_collects
+            FROM analytics_daily_rollup
             {where_clause}
         """, params)
         
@@ -148,7 +308,7 @@ def get_analytics_summary(
             "totalLikes": row[2],
             "totalComments": row[3],
             "totalCollects": row[4],
-            "avgPlayCount": round(row[5], 2)
+            "avgPlayCount": round(row[1] / row[0], 2) if row[0] else 0
         }
 
 
@@ -196,6 +356,52 @@ def get_analytics_videos(
         return [dict(row) for row in cursor.fetchall()]
 
 
+# Columns written by /analytics/export, in output order (raw_data is never read)
+EXPORT_COLUMNS = (
+    "id",
+    "video_id",
+    "title",
+    "platform",
+    "video_url",
+    "publish_date",
+    "play_count",
+    "like_count",
+    "comment_count",
+    "collect_count",
+    "last_updated",
+)
+
+
+def iter_analytics_export_batches(
+    db_path: Path,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    platforms: Optional[List[str]] = None,
+    account_ids: Optional[List[str]] = None,
+    batch_size: int = 1000,
+) -> Iterator[List[tuple]]:
+    """Iterate export rows (EXPORT_COLUMNS tuples) batch by batch without materializing the result set"""
+    # Streaming responses pull batches from a threadpool, so the connection may hop threads
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        where_clause, params = _build_filter_clause(
+            start_date, end_date, None, platforms, account_ids
+        )
+        cursor = conn.execute(f"""
+            SELECT {", ".join(EXPORT_COLUMNS)}
+            FROM video_analytics
+            {where_clause}
+            ORDER BY publish_date DESC
+        """, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
 def get_chart_data(
     db_path: Path,
     start_date: Optional[str] = None,
@@ -205,6 +411,8 @@ def get_chart_data(
     account_ids: Optional[List[str]] = None,
 ) -> List[Dict]:
     """Get chart data for trend visualization"""
+    if str(db_path) not in _schema_ready:
+        ensure_analytics_schema(db_path)
     with sqlite3.connect(db_path) as conn:
         cursor = conn.cursor()
 
@@ -221,7 +429,7 @@ def get_chart_data(
                 SUM(like_count) as likeCount,
                 SUM(comment_count) as commentCount,
                 SUM(collect_count) as collectCount
-            FROM video_analytics
+            FROM analytics_daily_rollup
             {where_clause}
             GROUP BY publish_date
             ORDER BY publish_date ASC
@@ -238,7 +446,16 @@ def get_chart_data(
 
 
 def insert_video_analytics(db_path: Path, data: Dict) -> int:
-    """Insert new video analytics record"""
+    """
+    Insert a video analytics record and return its row id.
+    Records with platform + video_id go through the (platform, video_id) upsert, so an existing
+    video is updated in place and its row id returned instead of violating the unique index.
+    """
+    platform = (data.get("platform") or "").lower()
+    video_id = str(data.get("video_id") or "").strip()
+    if platform and video_id:
+        return upsert_video_analytics_by_key(db_path, platform=platform, video_id=video_id, data=data)
+
     with sqlite3.connect(db_path) as conn:
         cursor = conn.cursor()
         
@@ -294,104 +511,148 @@ def update_video_analytics(db_path: Path, video_id: int, data: Dict):
         ))
 
 
+COUNTER_COLUMNS = ("play_count", "like_count", "comment_count", "collect_count", "share_count")
+
+# Row values per lookup chunk: 2 parameters each, well below SQLITE_MAX_VARIABLE_NUMBER
+_KEY_CHUNK = 400
+
+_UPSERT_SQL = """
+    INSERT INTO video_analytics (
+        task_id, account_id, platform, video_id, video_url,
+        title, thumbnail, publish_date, play_count, like_count,
+        comment_count, collect_count, share_count, match_confidence, raw_data
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(platform, video_id) DO UPDATE SET
+        task_id = COALESCE(excluded.task_id, task_id),
+        account_id = COALESCE(excluded.account_id, account_id),
+        video_url = COALESCE(excluded.video_url, video_url),
+        title = COALESCE(excluded.title, title),
+        thumbnail = COALESCE(excluded.thumbnail, thumbnail),
+        publish_date = COALESCE(excluded.publish_date, publish_date),
+        play_count = excluded.play_count,
+        like_count = excluded.like_count,
+        comment_count = excluded.comment_count,
+        collect_count = excluded.collect_count,
+        share_count = excluded.share_count,
+        match_confidence = COALESCE(excluded.match_confidence, match_confidence),
+        raw_data = excluded.raw_data,
+        last_updated = CURRENT_TIMESTAMP
+"""
+
+
+def _counter(value: Any) -> Any:
+    """Digit strings scraped from pages compare equal to the stored integers"""
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value or 0
+
+
+def _lookup_by_key(conn: sqlite3.Connection, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], tuple]:
+    """(platform, video_id) -> (id, *COUNTER_COLUMNS) for existing rows"""
+    found = {}
+    for start in range(0, len(keys), _KEY_CHUNK):
+        chunk = keys[start:start + _KEY_CHUNK]
+        values = ",".join(["(?, ?)"] * len(chunk))
+        params = [part for key in chunk for part in key]
+        for row in conn.execute(f"""
+            SELECT platform, video_id, id, {", ".join(COUNTER_COLUMNS)}
+            FROM video_analytics
+            WHERE (platform, video_id) IN (VALUES {values})
+        """, params):
+            found[(row[0], row[1])] = tuple(row[2:])
+    return found
+
+
+def upsert_video_analytics_batch(db_path: Path, records: Iterable[Dict[str, Any]], *, record_history: bool = True) -> Dict[str, int]:
+    """
+    Upsert many video records keyed by (platform, video_id) in one transaction.
+
+    Records without platform/video_id are skipped; duplicates within the batch keep the last one.
+    When record_history is set, an analytics_history row is appended for each new video and for
+    each video whose counters changed.
+    Returns counts: inserted, updated, unchanged, history, skipped.
+    """
+    if str(db_path) not in _schema_ready:
+        ensure_analytics_schema(db_path)
+
+    batch: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    skipped = 0
+    for data in records:
+        platform = (data.get("platform") or "").lower()
+        video_id = str(data.get("video_id") or "").strip()
+        if not platform or not video_id:
+            skipped += 1
+            continue
+        batch[(platform, video_id)] = data
+
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "history": 0, "skipped": skipped}
+    if not batch:
+        return stats
+
+    keys = list(batch)
+    rows = []
+    for (platform, video_id), data in batch.items():
+        rows.append((
+            data.get("task_id"),
+            data.get("account_id"),
+            platform,
+            video_id,
+            data.get("video_url"),
+            data.get("title"),
+            data.get("thumbnail"),
+            data.get("publish_date"),
+            *(_counter(data.get(column)) for column in COUNTER_COLUMNS),
+            data.get("match_confidence"),
+            json.dumps(data.get("raw_data", {})),
+        ))
+
+    with sqlite3.connect(db_path) as conn:
+        before = _lookup_by_key(conn, keys)
+        conn.executemany(_UPSERT_SQL, rows)
+
+        history = []
+        new_keys = [key for key in keys if key not in before]
+        inserted_ids = _lookup_by_key(conn, new_keys) if new_keys else {}
+        for key, row in zip(keys, rows):
+            counters = row[8:13]
+            previous = before.get(key)
+            if previous is None:
+                stats["inserted"] += 1
+                history.append((inserted_ids[key][0],) + counters)
+            elif tuple(previous[1:]) != counters:
+                stats["updated"] += 1
+                history.append((previous[0],) + counters)
+            else:
+                stats["unchanged"] += 1
+
+        if record_history and history:
+            conn.executemany("""
+                INSERT INTO analytics_history (
+                    video_analytics_id, play_count, like_count,
+                    comment_count, collect_count, share_count
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """, history)
+            stats["history"] = len(history)
+        conn.commit()
+
+    return stats
+
+
 def upsert_video_analytics_by_key(db_path: Path, *, platform: str, video_id: str, data: Dict) -> int:
     """
     Insert or update a video_analytics row by (platform, video_id).
-    Returns row id.
+    Returns row id. Prefer upsert_video_analytics_batch for collector loops.
     """
     platform = (platform or "").lower()
     video_id = str(video_id or "").strip()
     if not platform or not video_id:
         raise ValueError("platform and video_id are required for upsert")
 
+    upsert_video_analytics_batch(
+        db_path, [{**data, "platform": platform, "video_id": video_id}], record_history=False
+    )
     with sqlite3.connect(db_path) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT id
-            FROM video_analytics
-            WHERE platform = ?
-              AND video_id = ?
-            ORDER BY last_updated DESC
-            LIMIT 1
-            """,
-            (platform, video_id),
-        )
-        row = cursor.fetchone()
-
-        raw_json = json.dumps(data.get("raw_data", {}))
-
-        if row:
-            row_id = int(row["id"])
-            cursor.execute(
-                """
-                UPDATE video_analytics
-                SET
-                    task_id = COALESCE(?, task_id),
-                    account_id = COALESCE(?, account_id),
-                    video_url = COALESCE(?, video_url),
-                    title = COALESCE(?, title),
-                    thumbnail = COALESCE(?, thumbnail),
-                    publish_date = COALESCE(?, publish_date),
-                    play_count = ?,
-                    like_count = ?,
-                    comment_count = ?,
-                    collect_count = ?,
-                    share_count = ?,
-                    match_confidence = COALESCE(?, match_confidence),
-                    raw_data = ?,
-                    last_updated = CURRENT_TIMESTAMP
-                WHERE id = ?
-                """,
-                (
-                    data.get("task_id"),
-                    data.get("account_id"),
-                    data.get("video_url"),
-                    data.get("title"),
-                    data.get("thumbnail"),
-                    data.get("publish_date"),
-                    data.get("play_count", 0),
-                    data.get("like_count", 0),
-                    data.get("comment_count", 0),
-                    data.get("collect_count", 0),
-                    data.get("share_count", 0),
-                    data.get("match_confidence"),
-                    raw_json,
-                    row_id,
-                ),
-            )
-            conn.commit()
-            return row_id
-
-        cursor.execute(
-            """
-            INSERT INTO video_analytics (
-                task_id, account_id, platform, video_id, video_url,
-                title, thumbnail, publish_date, play_count, like_count,
-                comment_count, collect_count, share_count, match_confidence, raw_data
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                data.get("task_id"),
-                data.get("account_id"),
-                platform,
-                video_id,
-                data.get("video_url"),
-                data.get("title"),
-                data.get("thumbnail"),
-                data.get("publish_date"),
-                data.get("play_count", 0),
-                data.get("like_count", 0),
-                data.get("comment_count", 0),
-                data.get("collect_count", 0),
-                data.get("share_count", 0),
-                data.get("match_confidence"),
-                raw_json,
-            ),
-        )
-        conn.commit()
-        return cursor.lastrowid
+        return _lookup_by_key(conn, [(platform, video_id)])[(platform, video_id)][0]
 
 
 def record_analytics_history(db_path: Path, video_analytics_id: int):
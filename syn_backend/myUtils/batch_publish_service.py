@@ -7,6 +7,7 @@
 4. 进度实时反馈
 5. 验证码自动处理（后移队列）
 """
+import asyncio
 import uuid
 from datetime import datetime
 from pathlib import Path
@@ -94,12 +95,13 @@ class BatchPublishService:
                 upload_title = upload_title.split("#", 1)[0].strip()
 
             # 兼容旧数据：cookie_file/video_path 可能只有文件名（相对路径）
-            cookie_file = resolve_cookie_file(cookie_file)
-            video_path = resolve_video_file(video_path)
+            # 发布任务共享 Worker 的常驻事件循环，文件系统 / SQLite 等阻塞调用都放到线程中执行
+            cookie_file = await asyncio.to_thread(resolve_cookie_file, cookie_file)
+            video_path = await asyncio.to_thread(resolve_video_file, video_path)
 
             # Fail fast with a clear error if file path is still invalid after resolution.
             try:
-                if not Path(str(video_path)).exists():
+                if not await asyncio.to_thread(Path(str(video_path)).exists):
                     raise FileNotFoundError(f"视频文件不存在: {video_path}")
             except Exception as e:
                 raise FileNotFoundError(f"视频文件不存在: {video_path}") from e
@@ -123,7 +125,7 @@ class BatchPublishService:
             if result is None:
                 # 没有返回值，但没抛出异常，认为成功
                 logger.info(f"[Publish] 发布成功: {account_id} @ platform_{platform}")
-                cookie_manager.update_account(account_id, status='valid')
+                await asyncio.to_thread(cookie_manager.update_account, account_id, status='valid')
                 return {
                     "success": True,
                     "account_id": account_id,
@@ -135,7 +137,7 @@ class BatchPublishService:
             if result and result.get('captcha_required'):
                 logger.warning(f"[Publish] 检测到验证码: {account_id} @ platform_{platform}")
                 # 标记账号状态为需要验证
-                cookie_manager.update_account(account_id, status='needs_verification')
+                await asyncio.to_thread(cookie_manager.update_account, account_id, status='needs_verification')
                 raise CaptchaRequiredException(
                     message=result.get('error', '需要人工处理验证码'),
                     account_id=account_id,
@@ -145,7 +147,7 @@ class BatchPublishService:
             # 检查账号是否被封禁
             if result and result.get('account_blocked'):
                 logger.error(f"[Publish] 账号被封禁: {account_id} @ platform_{platform}")
-                cookie_manager.update_account(account_id, status='blocked')
+                await asyncio.to_thread(cookie_manager.update_account, account_id, status='blocked')
                 raise AccountBlockedException(
                     account_id=account_id,
                     platform=platform
@@ -154,7 +156,7 @@ class BatchPublishService:
             if result and result.get('success'):
                 logger.info(f"[Publish] 发布成功: {account_id} @ platform_{platform}")
                 # 更新账号状态为正常
-                cookie_manager.update_account(account_id, status='valid')
+                await asyncio.to_thread(cookie_manager.update_account, account_id, status='valid')
                 return {
                     "success": True,
                     "account_id": account_id,
@@ -132,6 +132,7 @@ class PersistentBrowserManager:
     - 每个账号有独立的 user_data_dir
     - 保留 Cookie、LocalStorage、登录状态等
     - 自动集成设备指纹
+    - 空间统计走增量索引，会话关闭后按预算清理缓存（见 browser_profile_storage）
     """
 
     def __init__(self, base_dir: Optional[Path] = None):
@@ -149,6 +150,9 @@ class PersistentBrowserManager:
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
 
+        from myUtils.browser_profile_storage import get_profile_storage
+        self.storage = get_profile_storage(self.base_dir)
+
     def get_user_data_dir(self, account_id: str, platform: str, user_id: Optional[str] = None) -> Path:
         """
         获取账号的持久化浏览器数据目录
@@ -275,6 +279,7 @@ class PersistentBrowserManager:
         try:
             if user_dir.exists():
                 shutil.rmtree(user_dir)
+                self.storage.forget(user_dir.name)
                 print(f"✅ 已删除持久化配置: {user_dir}")
                 return True
             else:
@@ -288,42 +293,34 @@ class PersistentBrowserManager:
         """
         列出所有持久化浏览器配置文件
 
+        大小来自增量索引：只重新统计自上次以来有文件增删的目录
+
         Returns:
-            List[Dict]: 包含 platform, account_id, path, size_mb 的列表
+            List[Dict]: 包含 platform, account_id, path, size_mb, cache_mb 的列表
         """
-        import os
         profiles = []
 
         if not self.base_dir.exists():
             return profiles
 
-        for item in self.base_dir.iterdir():
-            if not item.is_dir():
-                continue
-
+        for name, entry in self.storage.refresh_all().items():
             # 解析目录名 (格式: platform_account_id)
-            parts = item.name.split('_', 1)
-            if len(parts) == 2:
-                platform, account_id = parts
-
-                # 计算目录大小
-                total_size = 0
-                try:
-                    for dirpath, dirnames, filenames in os.walk(item):
-                        for filename in filenames:
-                            filepath = Path(dirpath) / filename
-                            if filepath.exists():
-                                total_size += filepath.stat().st_size
-                except Exception:
-                    total_size = 0
-
-                profiles.append({
-                    "platform": platform,
-                    "account_id": account_id,
-                    "path": str(item),
-                    "size_bytes": total_size,
-                    "size_mb": round(total_size / 1024 / 1024, 2)
-                })
+            parts = name.split('_', 1)
+            if len(parts) != 2:
+                continue
+            platform, account_id = parts
+            total_size = entry.get("size_bytes", 0)
+            cache_size = entry.get("cache_bytes", 0)
+
+            profiles.append({
+                "platform": platform,
+                "account_id": account_id,
+                "path": str(self.base_dir / name),
+                "size_bytes": total_size,
+                "size_mb": round(total_size / 1024 / 1024, 2),
+                "cache_mb": round(cache_size / 1024 / 1024, 2),
+                "last_used": entry.get("last_used"),
+            })
 
         return profiles
 
@@ -331,6 +328,8 @@ class PersistentBrowserManager:
         """
         清理超过指定天数未使用的持久化配置
 
+        最后使用时间取会话关闭时记录的时间，没有记录时取目录修改时间
+
         Args:
             days: 天数阈值
 
@@ -352,10 +351,10 @@ class PersistentBrowserManager:
                 continue
 
             try:
-                # 检查最后修改时间
-                mtime = item.stat().st_mtime
-                if current_time - mtime > threshold:
+                last_used = max(self.storage.last_used(item.name) or 0, item.stat().st_mtime)
+                if current_time - last_used > threshold:
                     shutil.rmtree(item)
+                    self.storage.forget(item.name)
                     print(f"✅ 已清理旧配置: {item.name} (超过{days}天未使用)")
                     cleaned += 1
             except Exception as e:
@@ -363,12 +362,28 @@ class PersistentBrowserManager:
 
         return cleaned
 
+    def prune_caches(self) -> Dict[str, Any]:
+        """
+        清理所有未被浏览器占用的 profile 中的可再生缓存（Cache / Code Cache / GPUCache 等），
+        保留 Cookie 与本地存储
+
+        Returns:
+            Dict: 包含 pruned, skipped_in_use, freed_bytes
+        """
+        return self.storage.prune_all()
+
+    def watch_context(self, context: Any, user_data_dir: Path) -> None:
+        """持久化上下文关闭后统计该 profile 并按预算清理缓存（需在事件循环内调用）"""
+        from myUtils.browser_profile_storage import watch_persistent_context
+
+        watch_persistent_context(context, user_data_dir)
+
     def get_total_size(self) -> Dict[str, Any]:
         """
         获取所有持久化配置的总大小
 
         Returns:
-            Dict: 包含 total_bytes, total_mb, total_gb, profile_count
+            Dict: 包含 total_bytes, total_mb, total_gb, cache_mb, profile_count
         """
         profiles = self.list_all_profiles()
         total_bytes = sum(p["size_bytes"] for p in profiles)
@@ -377,6 +392,7 @@ class PersistentBrowserManager:
             "total_bytes": total_bytes,
             "total_mb": round(total_bytes / 1024 / 1024, 2),
             "total_gb": round(total_bytes / 1024 / 1024 / 1024, 2),
+            "cache_mb": round(sum(p["cache_mb"] for p in profiles), 2),
             "profile_count": len(profiles),
             "profiles": profiles
         }
@@ -0,0 +1,334 @@
+"""
+持久化浏览器 profile 的磁盘管理
+
+- 空间统计：按目录缓存「目录 mtime / 目录内文件大小 / 子目录列表」到索引文件（profiles 根目录下的
+  .profile_index.json），目录 mtime 未变时直接复用，只对有增删文件的目录重新 stat；
+  原地追加写入不改变目录 mtime，因此会话关闭后对该 profile 做一次完整统计
+- 缓存清理：删除 Chromium 可再生的缓存目录（Cache / Code Cache / GPUCache 等），
+  保留 Cookies、Local Storage、IndexedDB 等登录态数据；profile 正在被浏览器使用时跳过
+- 空间预算：会话关闭后超出 BROWSER_PROFILE_MAX_MB 的 profile 自动清理缓存
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+INDEX_FILE = ".profile_index.json"
+
+# 相对于 user_data_dir 或其下一级（Default / Profile N）的可再生缓存目录
+CACHE_SUBPATHS: Tuple[Tuple[str, ...], ...] = tuple(
+    tuple(p.split("/"))
+    for p in (
+        "Cache",
+        "Code Cache",
+        "GPUCache",
+        "DawnCache",
+        "DawnGraphiteCache",
+        "DawnWebGPUCache",
+        "GrShaderCache",
+        "GraphiteDawnCache",
+        "ShaderCache",
+        "Service Worker/CacheStorage",
+        "Service Worker/ScriptCache",
+        "Crashpad",
+        "component_crx_cache",
+        "extensions_crx_cache",
+    )
+)
+
+DEFAULT_MAX_MB = 300
+
+
+def _default_budget_bytes() -> int:
+    try:
+        from fastapi_app.core.config import settings
+
+        max_mb = int(settings.BROWSER_PROFILE_MAX_MB)
+    except Exception:
+        max_mb = int(os.getenv("BROWSER_PROFILE_MAX_MB", DEFAULT_MAX_MB))
+    return max(0, max_mb) * 1024 * 1024
+
+
+def cache_root(rel: str) -> Optional[str]:
+    """rel（以 / 分隔的相对路径）位于可再生缓存目录内时返回该缓存目录的相对路径"""
+    parts = rel.split("/") if rel else []
+    for start in (0, 1):
+        for sub in CACHE_SUBPATHS:
+            if tuple(parts[start:start + len(sub)]) == sub:
+                return "/".join(parts[:start + len(sub)])
+    return None
+
+
+def is_profile_in_use(profile_dir: Path) -> bool:
+    """Chromium 运行时会在 user_data_dir 中持有锁文件"""
+    singleton = profile_dir / "SingletonLock"
+    if os.path.lexists(singleton):
+        # Linux/macOS：SingletonLock -> "{hostname}-{pid}"，进程已退出的视为残留
+        try:
+            host, _, pid = os.readlink(singleton).rpartition("-")
+            if host == socket.gethostname():
+                os.kill(int(pid), 0)
+        except (OSError, ValueError):
+            return False
+        return True
+    lockfile = profile_dir / "lockfile"
+    if lockfile.exists():
+        # Windows：浏览器运行时 lockfile 被独占打开，无法删除；能删除说明是残留
+        try:
+            lockfile.unlink()
+        except OSError:
+            return True
+    return False
+
+
+class ProfileStorage:
+    """某个 profile 根目录下所有 user_data_dir 的空间统计与清理（线程安全，索引可被多进程共享）"""
+
+    def __init__(self, base_dir: Path, budget_bytes: Optional[int] = None):
+        self.base_dir = Path(base_dir)
+        self.index_path = self.base_dir / INDEX_FILE
+        self.budget_bytes = _default_budget_bytes() if budget_bytes is None else max(0, int(budget_bytes))
+        self._lock = threading.RLock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._index_mtime_ns: Optional[int] = None
+        self.dirs_scanned = 0  # 本进程内重新列出的目录数（统计用）
+
+    # ---------- 索引 ----------
+
+    def _load(self) -> None:
+        """索引文件被其他进程更新过时重新加载"""
+        try:
+            mtime_ns = self.index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime_ns == self._index_mtime_ns:
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+            self._index = data.get("profiles") or {}
+            self._index_mtime_ns = mtime_ns
+        except Exception as e:
+            logger.warning(f"[ProfileStorage] 索引损坏，将重新统计: {e}")
+            self._index = {}
+
+    def _save(self) -> None:
+        tmp = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps({"version": 1, "profiles": self._index}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.index_path)
+            self._index_mtime_ns = self.index_path.stat().st_mtime_ns
+        except Exception as e:
+            logger.warning(f"[ProfileStorage] 保存索引失败: {e}")
+            with contextlib.suppress(OSError):
+                tmp.unlink()
+
+    # ---------- 统计 ----------
+
+    def _scan(self, root: Path, cached_dirs: Dict[str, list], full: bool) -> Dict[str, list]:
+        dirs: Dict[str, list] = {}
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            path = root / rel if rel else root
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = cached_dirs.get(rel)
+            if not full and cached and cached[0] == mtime_ns:
+                direct, children = cached[1], cached[2]
+            else:
+                direct, children = 0, []
+                self.dirs_scanned += 1
+                try:
+                    with os.scandir(path) as entries:
+                        for entry in entries:
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    children.append(entry.name)
+                                elif entry.is_file(follow_symlinks=False):
+                                    direct += entry.stat(follow_symlinks=False).st_size
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+            dirs[rel] = [mtime_ns, direct, children]
+            stack.extend(f"{rel}/{name}" if rel else name for name in children)
+        return dirs
+
+    def refresh(self, name: str, full: bool = False, save: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        更新单个 profile 的空间统计
+
+        Args:
+            name: profile 目录名（{platform}_{user_id}）
+            full: 忽略目录 mtime 重新 stat 全部文件
+        """
+        root = self.base_dir / name
+        with self._lock:
+            self._load()
+            if not root.is_dir():
+                if self._index.pop(name, None) is not None and save:
+                    self._save()
+                return None
+            entry = self._index.get(name) or {}
+            dirs = self._scan(root, entry.get("dirs") or {}, full)
+            caches: Dict[str, int] = {}
+            for rel, (_, direct, _) in dirs.items():
+                cache = cache_root(rel)
+                if cache:
+                    caches[cache] = caches.get(cache, 0) + direct
+            entry.update({
+                "dirs": dirs,
+                "size_bytes": sum(d[1] for d in dirs.values()),
+                "cache_bytes": sum(caches.values()),
+                "caches": sorted(caches),
+                "scanned_at": time.time(),
+            })
+            self._index[name] = entry
+            if save:
+                self._save()
+            return entry
+
+    def refresh_all(self) -> Dict[str, Dict[str, Any]]:
+        """增量更新所有 profile 并移除已不存在的条目"""
+        with self._lock:
+            self._load()
+            names = [p.name for p in self.base_dir.iterdir() if p.is_dir()] if self.base_dir.exists() else []
+            stale = set(self._index) - set(names)
+            for name in stale:
+                self._index.pop(name, None)
+            scanned = self.dirs_scanned
+            for name in names:
+                self.refresh(name, save=False)
+            # 没有目录变化时不重写索引
+            if stale or self.dirs_scanned != scanned or not self.index_path.exists():
+                self._save()
+            return {name: self._index[name] for name in names if name in self._index}
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self._load()
+            if self._index.pop(name, None) is not None:
+                self._save()
+
+    def last_used(self, name: str) -> Optional[float]:
+        with self._lock:
+            self._load()
+            return (self._index.get(name) or {}).get("last_used")
+
+    # ---------- 清理 ----------
+
+    def prune_cache(self, name: str, force: bool = False) -> Dict[str, Any]:
+        """
+        删除 profile 中可再生的缓存目录，保留 Cookie / LocalStorage / IndexedDB 等数据
+
+        Args:
+            name: profile 目录名
+            force: profile 正在被浏览器使用时也清理（可能导致浏览器异常，慎用）
+        """
+        root = self.base_dir / name
+        if not root.is_dir():
+            return {"profile": name, "pruned": False, "freed_bytes": 0, "reason": "not_found"}
+        if not force and is_profile_in_use(root):
+            return {"profile": name, "pruned": False, "freed_bytes": 0, "reason": "in_use"}
+
+        with self._lock:
+            before = self.refresh(name, full=True, save=False) or {}
+            size_before = before.get("size_bytes", 0)
+            removed: List[str] = []
+            for rel in before.get("caches") or []:
+                shutil.rmtree(root / rel, ignore_errors=True)
+                removed.append(rel)
+            after = self.refresh(name, full=False) or {}
+        freed = max(0, size_before - after.get("size_bytes", 0))
+        if removed:
+            logger.info(f"[ProfileStorage] {name} 清理缓存 {len(removed)} 个目录，释放 {freed / 1024 / 1024:.1f} MB")
+        return {
+            "profile": name,
+            "pruned": bool(removed),
+            "removed": removed,
+            "freed_bytes": freed,
+            "size_bytes": after.get("size_bytes", 0),
+        }
+
+    def prune_all(self) -> Dict[str, Any]:
+        results = [self.prune_cache(name) for name in self.refresh_all()]
+        return {
+            "pruned": sum(1 for r in results if r["pruned"]),
+            "skipped_in_use": sum(1 for r in results if r.get("reason") == "in_use"),
+            "freed_bytes": sum(r["freed_bytes"] for r in results),
+        }
+
+    def enforce_budget(self, profile_dir: Path, wait_release: float = 5.0) -> Dict[str, Any]:
+        """
+        浏览器会话关闭后调用：完整统计该 profile，超出预算时清理缓存
+
+        Args:
+            profile_dir: user_data_dir
+            wait_release: 等待浏览器进程释放 profile 锁的最长时间（秒）
+        """
+        profile_dir = Path(profile_dir)
+        name = profile_dir.name
+        deadline = time.monotonic() + wait_release
+        while is_profile_in_use(profile_dir) and time.monotonic() < deadline:
+            time.sleep(0.2)
+
+        with self._lock:
+            entry = self.refresh(name, full=True, save=False)
+            if entry is None:
+                return {"profile": name, "size_bytes": 0, "pruned": False}
+            entry["last_used"] = time.time()
+            self._save()
+        size = entry["size_bytes"]
+        result: Dict[str, Any] = {"profile": name, "size_bytes": size, "pruned": False}
+        if self.budget_bytes and size > self.budget_bytes:
+            result = self.prune_cache(name)
+            if result["size_bytes"] > self.budget_bytes:
+                logger.warning(
+                    f"[ProfileStorage] {name} 清理缓存后仍占用 {result['size_bytes'] / 1024 / 1024:.1f} MB，"
+                    f"超出预算 {self.budget_bytes / 1024 / 1024:.0f} MB（未删除登录态数据）"
+                )
+        return result
+
+
+_storages: Dict[str, ProfileStorage] = {}
+_storages_lock = threading.Lock()
+
+
+def get_profile_storage(base_dir: Path) -> ProfileStorage:
+    """同一 profile 根目录共享一个实例（PersistentBrowserManager 会按策略目录临时创建多个实例）"""
+    key = str(Path(base_dir).resolve())
+    with _storages_lock:
+        storage = _storages.get(key)
+        if storage is None:
+            storage = _storages[key] = ProfileStorage(Path(base_dir))
+        return storage
+
+
+def watch_persistent_context(context: Any, user_data_dir: Path) -> None:
+    """持久化上下文关闭后在线程池中执行空间预算检查，不阻塞事件循环"""
+    import asyncio
+
+    storage = get_profile_storage(Path(user_data_dir).parent)
+    loop = asyncio.get_running_loop()
+
+    def on_close(*_):
+        future = loop.run_in_executor(None, storage.enforce_budget, Path(user_data_dir))
+        future.add_done_callback(_log_enforce_error)
+
+    context.on("close", on_close)
+
+
+def _log_enforce_error(future) -> None:
+    if not future.cancelled() and future.exception():
+        logger.warning(f"[ProfileStorage] 空间预算检查失败: {future.exception()}")
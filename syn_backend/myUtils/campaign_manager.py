@@ -224,6 +224,7 @@ class CampaignManager:
                 )
                 
                 # 插入任务
+                scheduled = []
                 for task in tasks:
                     cursor.execute("""
                         INSERT INTO publish_tasks 
@@ -241,6 +242,8 @@ class CampaignManager:
                         task.get('publish_mode', 'auto'),
                         'pending'
                     ))
+                    if task.get('publish_mode', 'auto') == 'auto':
+                        scheduled.append((cursor.lastrowid, task.get('schedule_time')))
                 
                 # 更新任务包状态
                 cursor.execute("""
@@ -250,7 +253,13 @@ class CampaignManager:
                 """, (len(tasks), package_id))
                 
                 conn.commit()
-                return {"success": True, "task_count": len(tasks), "tasks": tasks}
+
+            # 调度器在本进程运行时直接热插入，无需等待对账
+            from myUtils.task_scheduler import task_scheduler
+            if task_scheduler.running:
+                for task_id, schedule_time in scheduled:
+                    task_scheduler.schedule_task(task_id, schedule_time)
+            return {"success": True, "task_count": len(tasks), "tasks": tasks}
                 
         except Exception as e:
             print(f"Error generating tasks: {e}")
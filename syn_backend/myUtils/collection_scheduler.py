@@ -0,0 +1,191 @@
+"""
+Multi-account collection scheduler for VideoDataCollector.
+
+Accounts run concurrently under three limits:
+- per-platform concurrency (avoid hammering one creator backend)
+- a global browser budget for the Playwright scroll fallbacks
+- per-provider API rate limits (requests/second, e.g. TikHub)
+
+API-backed accounts go through a fast lane; browser-backed accounts (and API
+failures that fall back to scrolling) go through a slow lane, so slow scrolls
+never block cheap API calls. Each account's videos are written to
+video_analytics by the collector as soon as that account finishes.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+class RateLimiter:
+    """Evenly spaced requests: at most `rate` acquisitions per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# platform -> (TikHub collector method, browser collector method)
+_PLATFORM_ROUTES = {
+    "kuaishou": ("collect_kuaishou_data_tikhub", "collect_kuaishou_data"),
+    "xiaohongshu": ("collect_xiaohongshu_data_tikhub", "collect_xiaohongshu_data"),
+    "channels": ("collect_channels_data_tikhub", "collect_channels_data"),
+    "douyin": (None, "collect_douyin_data"),
+}
+
+_STOP = object()
+
+
+class CollectionScheduler:
+    def __init__(
+        self,
+        collector,
+        *,
+        concurrency: int = 8,
+        platform_concurrency: int = 2,
+        browser_budget: int = 2,
+        api_rates: Optional[Dict[str, float]] = None,
+        tikhub_max_pages: int = 5,
+        on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ):
+        self.collector = collector
+        self.concurrency = max(1, concurrency)
+        self.platform_concurrency = max(1, platform_concurrency)
+        self.browser_budget = max(1, browser_budget)
+        self.api_rates = api_rates or {}
+        self.tikhub_max_pages = tikhub_max_pages
+        self._on_result = on_result
+
+        self._platform_slots: Dict[str, asyncio.Semaphore] = {}
+        self._browser_slots = asyncio.Semaphore(self.browser_budget)
+        self._limiters: Dict[str, RateLimiter] = {}
+        self.results: Dict[str, Any] = {"total": 0, "success": 0, "failed": 0, "details": []}
+
+    @staticmethod
+    def uses_api_lane(accounts: List[Dict[str, Any]], tikhub) -> bool:
+        """Whether any account would start in the fast (API) lane."""
+        if not tikhub:
+            return False
+        return any(_PLATFORM_ROUTES.get(account.get("platform"), (None, None))[0] for account in accounts)
+
+    def limiter(self, provider: str) -> RateLimiter:
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            limiter = RateLimiter(self.api_rates.get(provider, 0.0))
+            self._limiters[provider] = limiter
+        return limiter
+
+    def _platform_slot(self, platform: str) -> asyncio.Semaphore:
+        slot = self._platform_slots.get(platform)
+        if slot is None:
+            slot = asyncio.Semaphore(self.platform_concurrency)
+            self._platform_slots[platform] = slot
+        return slot
+
+    def _record(self, account: Dict[str, Any], result: Optional[Dict[str, Any]]) -> None:
+        if not result:
+            return
+        self.results["total"] += 1
+        self.results["success" if result.get("success") else "failed"] += 1
+        detail = {
+            "account": account.get("name"),
+            "account_id": account.get("account_id"),
+            "platform": account.get("platform"),
+            **result,
+        }
+        self.results["details"].append(detail)
+        if self._on_result is not None:
+            self._on_result(detail)
+
+    # ---------- lanes ----------
+
+    async def _run_api(self, account: Dict[str, Any], tikhub) -> Optional[Dict[str, Any]]:
+        api_method, _ = _PLATFORM_ROUTES[account["platform"]]
+        async with self._platform_slot(account["platform"]):
+            return await getattr(self.collector, api_method)(account, tikhub, self.tikhub_max_pages)
+
+    async def _run_browser(self, account: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        _, browser_method = _PLATFORM_ROUTES[account["platform"]]
+        async with self._platform_slot(account["platform"]), self._browser_slots:
+            return await getattr(self.collector, browser_method)(account["cookie_file"], account["account_id"])
+
+    async def _fast_worker(self, fast: asyncio.Queue, slow: asyncio.Queue, tikhub) -> None:
+        while True:
+            account = await fast.get()
+            if account is _STOP:
+                return
+            try:
+                result = await self._run_api(account, tikhub)
+            except Exception as e:
+                result = {"success": False, "error": f"{type(e).__name__}: {e}"}
+            if result and result.get("success"):
+                self._record(account, result)
+            else:
+                logger.warning(
+                    f"[Collector] {account['platform']} API failed for {account['account_id']}, "
+                    f"falling back to browser: {(result or {}).get('error')}"
+                )
+                slow.put_nowait(account)
+
+    async def _slow_worker(self, slow: asyncio.Queue) -> None:
+        while True:
+            account = await slow.get()
+            if account is _STOP:
+                return
+            try:
+                result = await self._run_browser(account)
+            except Exception as e:
+                logger.error(f"[Collector] Browser collection failed for {account['account_id']}: {e}")
+                result = {"success": False, "error": f"{type(e).__name__}: {e}"}
+            self._record(account, result)
+
+    async def run(self, accounts: List[Dict[str, Any]], tikhub=None) -> Dict[str, Any]:
+        fast: asyncio.Queue = asyncio.Queue()
+        slow: asyncio.Queue = asyncio.Queue()
+        for account in accounts:
+            if account.get("platform") not in _PLATFORM_ROUTES:
+                continue
+            (fast if self.uses_api_lane([account], tikhub) else slow).put_nowait(account)
+
+        if tikhub is not None:
+            tikhub.rate_limiter = self.limiter("tikhub")
+
+        started = time.perf_counter()
+        fast_workers = [
+            asyncio.create_task(self._fast_worker(fast, slow, tikhub))
+            for _ in range(min(self.concurrency, max(1, fast.qsize())))
+        ]
+        slow_workers = [
+            asyncio.create_task(self._slow_worker(slow))
+            for _ in range(self.browser_budget)
+        ]
+        try:
+            # fast lane drains first; its failures are re-queued onto the slow lane
+            for _ in fast_workers:
+                fast.put_nowait(_STOP)
+            await asyncio.gather(*fast_workers)
+            for _ in slow_workers:
+                slow.put_nowait(_STOP)
+            await asyncio.gather(*slow_workers)
+        finally:
+            for task in fast_workers + slow_workers:
+                task.cancel()
+
+        elapsed = time.perf_counter() - started
+        self.results["elapsed_seconds"] = round(elapsed, 2)
+        self.results["accounts_per_minute"] = round(self.results["total"] / elapsed * 60, 1) if elapsed > 0 else None
+        return self.results
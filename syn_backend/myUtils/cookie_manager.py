@@ -1,3 +1,4 @@
+import asyncio
 import json
 import sqlite3
 import threading
@@ -1183,96 +1184,47 @@ class CookieManager:
 
         说明：
         - 关闭“自动备份”和“自动扫描磁盘添加新账号”，避免重复 cookie / 误改文件名。
+        - 实际逻辑在 myUtils.account_deep_sync.DeepSyncEngine（并发补全 + 批量写回）；
+          已在事件循环中的调用方应直接 await 引擎。
         """
-        stats = {"added": 0, "marked_missing": 0, "validated": 0, "expired": 0, "total_files": 0, "backed_up": 0, "cleaned_up": 0}
-
-        # 1. 获取所有磁盘文件
-        disk_files = {f.name: f for f in self.cookies_dir.glob("*.json")}
-        stats["total_files"] = len(disk_files)
-
-        # 2. 获取所有数据库账号
-        db_accounts = self.list_flat_accounts()
-        db_filenames = {a['cookie_file']: a for a in db_accounts}
-
-        # 不再自动添加无主文件，避免重复账号/改名
-
-        # 3. 处理文件丢失的账号（标记为file_missing）
-        for account in db_accounts:
-            filename = account['cookie_file']
-            if not filename or filename not in disk_files:
-                if account['status'] not in ['file_missing', 'expired']:
-                    self.update_account_status(account['platform'], account['account_id'], "file_missing")
-                    stats["marked_missing"] += 1
-                    print(f"[DeepSync] 标记文件丢失: {account['name']} (status: file_missing)")
-            else:
-                # 文件存在，尝试补全 user_id/name/avatar
-                try:
-                    data = json.load(open(disk_files[filename], 'r', encoding='utf-8'))
-                    extracted = self._extract_user_info_from_cookie(account['platform'], data)
-                    needs_update = False
-                    if extracted.get("user_id") and not account.get("user_id"):
-                        account['user_id'] = extracted["user_id"]
-                        needs_update = True
-                    if extracted.get("avatar") and not account.get("avatar"):
-                        account['avatar'] = extracted["avatar"]
-                        needs_update = True
-                    if extracted.get("name") and account.get("name") in [None, "", "-", "未命名账号"]:
-                        account['name'] = extracted["name"]
-                        needs_update = True
-                    # 如果仍缺关键字段，尝试 HTTP 快速校验补全
-                    if (not account.get("name") or not account.get("user_id") or not account.get("avatar")):
-                        self._enrich_with_fast_validator(account['platform'], filename, account)
-                        if account.get("name") or account.get("user_id") or account.get("avatar"):
-                            needs_update = True
-                    # 再兜底：直接访问页面抓取（重用 fetch_user_info_service 逻辑）
-                    if (not account.get("name") or not account.get("user_id") or not account.get("avatar")):
-                        try:
-                            from myUtils.fetch_user_info_service import fetch_single_user_info
-                            info = asyncio.run(fetch_single_user_info(account['platform'], disk_files[filename]))
-                            if info:
-                                if info.get("name"):
-                                    account["name"] = info["name"]
-                                if info.get("avatar"):
-                                    account["avatar"] = info["avatar"]
-                                if info.get("user_id"):
-                                    account["user_id"] = info["user_id"]
-                                needs_update = True
-                        except Exception as e:
-                            print(f"[DeepSync] 页面抓取补全失败 {account.get('account_id')}: {e}")
-                    if needs_update:
-                        self._persist_account(account)
-                        print(f"[DeepSync] 补全账号信息: {account['account_id']} ({account['platform']})")
-                except Exception as e:
-                    print(f"[DeepSync] 补全失败 {account.get('account_id')}: {e}")
-
-        # 4. 验证Cookie有效性（如果启用）
-        if validate_cookies:
-            print("[DeepSync] 开始验证Cookie有效性...")
-            db_accounts_refreshed = self.list_flat_accounts()  # 重新获取账号列表
-            for account in db_accounts_refreshed:
-                if account['status'] in ['valid', 'unchecked']:  # 只验证valid和unchecked状态的账号
-                    filename = account['cookie_file']
-                    if filename and filename in disk_files:
-                        try:
-                            # 使用fast_validator快速验证
-                            platform_code = PLATFORM_CODES.get(self._normalize_platform(account['platform']))
-                            if platform_code:
-                                self._enrich_with_fast_validator(account['platform'], filename, account)
-                                # 检查验证结果（通过比较是否有user_id判断）
-                                if not account.get('user_id'):
-                                    # 验证失败，标记为expired
-                                    self.update_account_status(account['platform'], account['account_id'], "expired")
-                                    stats["expired"] += 1
-                                    print(f"[DeepSync] Cookie已失效: {account['name']} ({account['platform']})")
-                                else:
-                                    stats["validated"] += 1
-                                    # 更新为valid状态
-                                    if account['status'] == 'unchecked':
-                                        self.update_account_status(account['platform'], account['account_id'], "valid")
-                        except Exception as e:
-                            print(f"[DeepSync] 验证失败 {account.get('account_id')}: {e}")
-
-        return stats
+        from myUtils.account_deep_sync import DeepSyncEngine
+
+        return asyncio.run(DeepSyncEngine(self, validate_cookies=validate_cookies).run())
+
+    def apply_sync_results(self, accounts: List[Dict[str, Any]], status_updates: Dict[str, str]) -> int:
+        """在一个事务内批量写回 DeepSync 结果（账号字段补全 + 状态变更）。"""
+        if not accounts and not status_updates:
+            return 0
+        now = datetime.now(timezone.utc).isoformat()
+        with self.lock, sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                """
+                UPDATE cookie_accounts
+                SET name = ?, status = ?, cookie_file = ?, last_checked = ?, avatar = ?, original_name = ?, note = ?, user_id = ?
+                WHERE account_id = ? AND platform = ?
+                """,
+                [
+                    (
+                        account.get("name", ""),
+                        account.get("status", "expired"),
+                        account.get("cookie_file", ""),
+                        account.get("last_checked"),
+                        account.get("avatar"),
+                        account.get("original_name"),
+                        account.get("note"),
+                        account.get("user_id"),
+                        account.get("account_id"),
+                        account.get("platform"),
+                    )
+                    for account in accounts
+                ],
+            )
+            conn.executemany(
+                "UPDATE cookie_accounts SET status = ?, last_checked = ? WHERE account_id = ?",
+                [(status, now, account_id) for account_id, status in status_updates.items()],
+            )
+            conn.commit()
+        return len(accounts) + len(status_updates)
 
     async def run_maintenance(self, account_id: str = None) -> Dict[str, Any]:
         """
@@ -0,0 +1,367 @@
+"""
+二维码派发领取引擎（无锁）
+
+claim_video_atomically 每次领取都要在 SQLite 上 BEGIN IMMEDIATE，
+几百台手机同时扫码时所有领取都排在写锁后面。这里改为：
+- 任务首次被领取时，把 AVAILABLE 的 task_videos 一次性预载到 Redis 列表
+  （无 Redis 时用进程内 deque）
+- 领取 = 原子弹出一条（Redis LPOP / deque.popleft），不碰 SQLite
+- 过期与领完在内存/Redis 中判断
+- 领取记录进入持久化队列，后台线程批量写回 task_videos
+- 预载时读库与写入列表之间追加的视频（add_videos 此时还看不到已预载的列表），
+  在预载完成后按快照的最大 video_id 补齐；列表按 video_id 去重，同一视频只会入队一次
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # 未安装 redis 时只会用到进程内实现
+    WatchError = None
+
+
+def _parse_expire(value: Any) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        # 与原实现一致：无法解析的过期时间视为不过期
+        return None
+
+
+class _MemoryBackend:
+    """进程内实现：deque.popleft 在 GIL 下是原子的"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._videos: Dict[str, deque] = {}
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._seen: Dict[str, set] = {}
+        self._claims: deque = deque()
+        self._lock = threading.Lock()
+
+    def load(self, qr_token: str, meta: Dict[str, Any], videos: List[Dict[str, Any]]) -> bool:
+        with self._lock:
+            if qr_token in self._meta:
+                return False
+            self._videos[qr_token] = deque(videos)
+            self._seen[qr_token] = {v["video_id"] for v in videos}
+            self._meta[qr_token] = meta
+            return True
+
+    def meta(self, qr_token: str) -> Optional[Dict[str, Any]]:
+        return self._meta.get(qr_token)
+
+    def pop(self, qr_token: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._videos[qr_token].popleft()
+        except (KeyError, IndexError):
+            return None
+
+    def push(self, qr_token: str, videos: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            if qr_token not in self._meta:
+                return 0
+            seen = self._seen[qr_token]
+            fresh = [v for v in videos if v["video_id"] not in seen]
+            seen.update(v["video_id"] for v in fresh)
+            self._videos[qr_token].extend(fresh)
+            return len(fresh)
+
+    def remaining(self, qr_token: str) -> int:
+        return len(self._videos.get(qr_token, ()))
+
+    def evict(self, qr_token: str) -> None:
+        with self._lock:
+            self._videos.pop(qr_token, None)
+            self._seen.pop(qr_token, None)
+            self._meta.pop(qr_token, None)
+
+    def record_claim(self, record: Dict[str, Any]) -> None:
+        self._claims.append(record)
+
+    def drain_claims(self, limit: int) -> List[Dict[str, Any]]:
+        drained = []
+        while len(drained) < limit:
+            try:
+                drained.append(self._claims.popleft())
+            except IndexError:
+                break
+        return drained
+
+
+class _RedisBackend:
+    """Redis 实现：多进程/多实例共享同一份待领取列表"""
+
+    name = "redis"
+
+    def __init__(self, redis, prefix: str = "distribution:claim"):
+        self.redis = redis
+        self.prefix = prefix
+        self.claims_key = f"{prefix}:persist"
+
+    def _videos_key(self, qr_token: str) -> str:
+        return f"{self.prefix}:{qr_token}:videos"
+
+    def _meta_key(self, qr_token: str) -> str:
+        return f"{self.prefix}:{qr_token}:meta"
+
+    def _ids_key(self, qr_token: str) -> str:
+        return f"{self.prefix}:{qr_token}:ids"
+
+    def load(self, qr_token: str, meta: Dict[str, Any], videos: List[Dict[str, Any]]) -> bool:
+        # WATCH meta + MULTI：列表、去重集合和 meta 一起生效，其它进程看到 meta 时列表必然已就绪；
+        # 并发预载时只有一个 EXEC 成功
+        meta_key, videos_key, ids_key = self._meta_key(qr_token), self._videos_key(qr_token), self._ids_key(qr_token)
+        with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                pipe.watch(meta_key)
+                if pipe.exists(meta_key):
+                    return False
+                pipe.multi()
+                pipe.delete(videos_key, ids_key)
+                if videos:
+                    pipe.rpush(videos_key, *[json.dumps(v) for v in videos])
+                    pipe.sadd(ids_key, *[v["video_id"] for v in videos])
+                pipe.set(meta_key, json.dumps(meta))
+                if meta.get("expire_ts"):
+                    # 过期后再保留一小时，之后由 Redis 自行清理
+                    cleanup_at = int(meta["expire_ts"]) + 3600
+                    for key in (meta_key, videos_key, ids_key):
+                        pipe.expireat(key, cleanup_at)
+                pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    def meta(self, qr_token: str) -> Optional[Dict[str, Any]]:
+        raw = self.redis.get(self._meta_key(qr_token))
+        return json.loads(raw) if raw else None
+
+    def pop(self, qr_token: str) -> Optional[Dict[str, Any]]:
+        raw = self.redis.lpop(self._videos_key(qr_token))
+        return json.loads(raw) if raw else None
+
+    def push(self, qr_token: str, videos: List[Dict[str, Any]]) -> int:
+        if not videos or not self.redis.exists(self._meta_key(qr_token)):
+            return 0
+        # SADD 返回 1 的一方负责入队，补齐与 add_videos 同时推送同一视频时只入队一次
+        pipe = self.redis.pipeline(transaction=False)
+        for video in videos:
+            pipe.sadd(self._ids_key(qr_token), video["video_id"])
+        fresh = [video for video, added in zip(videos, pipe.execute()) if added]
+        if fresh:
+            self.redis.rpush(self._videos_key(qr_token), *[json.dumps(v) for v in fresh])
+        return len(fresh)
+
+    def remaining(self, qr_token: str) -> int:
+        return int(self.redis.llen(self._videos_key(qr_token)) or 0)
+
+    def evict(self, qr_token: str) -> None:
+        self.redis.delete(self._meta_key(qr_token), self._videos_key(qr_token), self._ids_key(qr_token))
+
+    def record_claim(self, record: Dict[str, Any]) -> None:
+        self.redis.rpush(self.claims_key, json.dumps(record))
+
+    def drain_claims(self, limit: int) -> List[Dict[str, Any]]:
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrange(self.claims_key, 0, limit - 1)
+        pipe.ltrim(self.claims_key, limit, -1)
+        raw, _ = pipe.execute()
+        return [json.loads(item) for item in raw or []]
+
+
+class ClaimEngine:
+    """
+    预载 + 原子弹出的领取引擎
+
+    Args:
+        db_path: 主库路径（distribution_tasks / task_videos）
+        redis: 同步 Redis 客户端；None 时使用进程内 deque
+        flush_interval: 后台批量落库间隔(秒)
+        batch_size: 单次落库的最大领取记录数
+    """
+
+    def __init__(self, db_path, redis=None, flush_interval: float = 0.5, batch_size: int = 500):
+        self.db_path = db_path
+        self.backend = _RedisBackend(redis) if redis is not None else _MemoryBackend()
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self._load_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher_lock = threading.Lock()
+        self._missing: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.persisted = 0
+
+    # ---------- 预载 ----------
+
+    def preload(self, qr_token: str) -> Optional[Dict[str, Any]]:
+        """从 SQLite 预载任务的可领取视频；任务不存在返回 None"""
+        meta = self.backend.meta(qr_token)
+        if meta is not None:
+            return meta
+        with self._load_lock:
+            meta = self.backend.meta(qr_token)
+            if meta is not None:
+                return meta
+            # 不存在的 token 短时间内不重复查库，避免被刷
+            if time.monotonic() - self._missing.get(qr_token, -60.0) < 30:
+                return None
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                task = conn.execute(
+                    "SELECT task_id, expire_time, title_template, poi_location, platform "
+                    "FROM distribution_tasks WHERE qr_token = ?",
+                    (qr_token,),
+                ).fetchone()
+                if not task:
+                    self._missing[qr_token] = time.monotonic()
+                    return None
+                videos = [
+                    {"video_id": row["video_id"], "file_path": row["file_path"]}
+                    for row in conn.execute(
+                        "SELECT video_id, file_path FROM task_videos "
+                        "WHERE task_id = ? AND status = 'AVAILABLE' ORDER BY video_id",
+                        (task["task_id"],),
+                    )
+                ]
+            meta = {
+                "task_id": task["task_id"],
+                "expire_ts": _parse_expire(task["expire_time"]),
+                "title_template": task["title_template"],
+                "poi_location": task["poi_location"],
+                "platform": task["platform"],
+            }
+            if self.backend.load(qr_token, meta, videos):
+                logger.info(f"[ClaimEngine] 预载任务 {task['task_id']}: {len(videos)} 个视频 ({self.backend.name})")
+                self._reconcile(qr_token, task["task_id"], videos[-1]["video_id"] if videos else 0)
+            return self.backend.meta(qr_token) or meta
+
+    def _reconcile(self, qr_token: str, task_id, last_video_id: int) -> None:
+        """补齐读库快照之后、列表就绪之前追加的视频（那段时间 add_videos 的推送会被丢弃）"""
+        with sqlite3.connect(self.db_path) as conn:
+            videos = [
+                {"video_id": row[0], "file_path": row[1]}
+                for row in conn.execute(
+                    "SELECT video_id, file_path FROM task_videos "
+                    "WHERE task_id = ? AND status = 'AVAILABLE' AND video_id > ? ORDER BY video_id",
+                    (task_id, last_video_id),
+                )
+            ]
+        added = self.backend.push(qr_token, videos) if videos else 0
+        if added:
+            logger.info(f"[ClaimEngine] 任务 {task_id} 补齐预载期间追加的 {added} 个视频")
+
+    def add_videos(self, qr_token: str, videos: List[Dict[str, Any]]) -> None:
+        """任务追加视频时同步到已预载的列表（未预载的任务首次领取时会从库里读到）"""
+        self.backend.push(qr_token, videos)
+
+    def evict(self, qr_token: str) -> None:
+        self.backend.evict(qr_token)
+        self._missing.pop(qr_token, None)
+
+    # ---------- 领取 ----------
+
+    def claim(self, qr_token: str, claimer_id) -> Dict[str, Any]:
+        """与 DistributionManager.claim_video_atomically 返回结构一致"""
+        try:
+            meta = self.preload(qr_token)
+            if meta is None:
+                return {"success": False, "error": "Task not found"}
+            if meta.get("expire_ts") and time.time() > meta["expire_ts"]:
+                return {"success": False, "error": "Task expired"}
+
+            video = self.backend.pop(qr_token)
+            if video is None:
+                return {"success": False, "error": "No videos available"}
+
+            self.backend.record_claim({
+                "video_id": video["video_id"],
+                "claimer_id": claimer_id,
+                # 与原 SQLite 领取路径的 CURRENT_TIMESTAMP 一致，使用 UTC
+                "claimed_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            })
+            self._ensure_flusher()
+            return {
+                "success": True,
+                "data": {
+                    "video_id": video["video_id"],
+                    "video_path": video["file_path"],
+                    "title": meta.get("title_template"),
+                    "poi": meta.get("poi_location"),
+                    "platform": meta.get("platform"),
+                },
+            }
+        except Exception as e:
+            logger.error(f"[ClaimEngine] Claim error: {e}")
+            return {"success": False, "error": str(e)}
+
+    # ---------- 批量落库 ----------
+
+    def flush(self) -> int:
+        """把已领取记录批量写回 task_videos，返回写入条数"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self.backend.drain_claims(self.batch_size)
+                if not batch:
+                    break
+                try:
+                    with sqlite3.connect(self.db_path, timeout=30) as conn:
+                        conn.executemany(
+                            """
+                            UPDATE task_videos
+                            SET status = 'DISTRIBUTED', claimer_id = ?, distribution_time = ?
+                            WHERE video_id = ? AND status = 'AVAILABLE'
+                            """,
+                            [(r["claimer_id"], r["claimed_at"], r["video_id"]) for r in batch],
+                        )
+                        conn.commit()
+                except Exception as e:
+                    # 写库失败时放回队列，下次重试
+                    for record in batch:
+                        self.backend.record_claim(record)
+                    logger.error(f"[ClaimEngine] 批量落库失败，稍后重试: {e}")
+                    break
+                written += len(batch)
+        self.persisted += written
+        return written
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._flusher_lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, name="claim-engine-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+
+    def stats(self, qr_token: Optional[str] = None) -> Dict[str, Any]:
+        data = {"backend": self.backend.name, "persisted": self.persisted}
+        if qr_token:
+            data["remaining"] = self.backend.remaining(qr_token)
+        return data
@@ -1,3 +1,4 @@
+import atexit
 import sqlite3
 import uuid
 import json
@@ -10,9 +11,40 @@ import os
 BASE_DIR = Path(__file__).parent.parent
 DB_PATH = BASE_DIR / "db" / "database.db"
 
+def _default_claim_engine(db_path):
+    """
+    按环境变量 DISTRIBUTION_CLAIM_ENGINE 创建领取引擎：
+    off（默认，沿用 SQLite 事务领取）/ memory（进程内）/ redis / auto（有 Redis 用 Redis，否则进程内）
+    """
+    mode = (os.getenv("DISTRIBUTION_CLAIM_ENGINE") or "off").strip().lower()
+    if mode in ("", "0", "off", "false", "no"):
+        return None
+
+    from myUtils.distribution_claim_engine import ClaimEngine
+
+    redis = None
+    if mode in ("redis", "auto"):
+        try:
+            from fastapi_app.cache.redis_client import get_redis
+            redis = get_redis()
+            if redis is not None:
+                redis.ping()
+        except Exception as e:
+            if mode == "redis":
+                raise
+            print(f"Claim engine: Redis unavailable, using in-process queue: {e}")
+            redis = None
+    engine = ClaimEngine(db_path, redis=redis)
+    # 刷新线程是守护线程：退出前把尚未写回的领取记录落库，否则进程内队列丢失后这些视频会被再次派发
+    atexit.register(engine.close)
+    return engine
+
+
 class DistributionManager:
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, claim_engine=None):
         self.db_path = db_path or DB_PATH
+        # 可选的无锁领取引擎（预载 + 原子弹出 + 异步批量落库）
+        self.claim_engine = claim_engine
 
     def delete_task(self, task_id):
         """
@@ -21,6 +53,11 @@ class DistributionManager:
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
+                if self.claim_engine:
+                    cursor.execute("SELECT qr_token FROM distribution_tasks WHERE task_id = ?", (task_id,))
+                    row = cursor.fetchone()
+                    if row:
+                        self.claim_engine.evict(row[0])
                 cursor.execute("DELETE FROM task_videos WHERE task_id = ?", (task_id,))
                 cursor.execute("DELETE FROM distribution_tasks WHERE task_id = ?", (task_id,))
                 conn.commit()
@@ -71,12 +108,25 @@ class DistributionManager:
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
+                cursor.execute("SELECT COALESCE(MAX(video_id), 0) FROM task_videos")
+                last_video_id = cursor.fetchone()[0]
                 video_data = [(task_id, f) for f in video_files]
                 cursor.executemany("""
                     INSERT INTO task_videos (task_id, file_path, status)
                     VALUES (?, ?, 'AVAILABLE')
                 """, video_data)
                 conn.commit()
+                if self.claim_engine:
+                    cursor.execute("SELECT qr_token FROM distribution_tasks WHERE task_id = ?", (task_id,))
+                    row = cursor.fetchone()
+                    if row:
+                        cursor.execute(
+                            "SELECT video_id, file_path FROM task_videos WHERE task_id = ? AND video_id > ? ORDER BY video_id",
+                            (task_id, last_video_id),
+                        )
+                        self.claim_engine.add_videos(
+                            row[0], [{"video_id": r[0], "file_path": r[1]} for r in cursor.fetchall()]
+                        )
                 return {"success": True, "count": len(video_files)}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -150,6 +200,8 @@ class DistributionManager:
         """
         原子操作：领取视频
         """
+        if self.claim_engine:
+            return self.claim_engine.claim(qr_token, claimer_id)
         try:
             with sqlite3.connect(self.db_path) as conn:
                 conn.row_factory = sqlite3.Row
@@ -228,6 +280,13 @@ class DistributionManager:
         """
         按 task_id 领取一条可用视频（用于发布/派发），并标记为已分发
         """
+        if self.claim_engine:
+            # 与扫码领取共用同一份预载列表，避免同一视频被两条路径各领一次
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute("SELECT qr_token FROM distribution_tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if not row:
+                return {"success": False, "error": "No videos available"}
+            return self.claim_engine.claim(row[0], claimer_id)
         try:
             with sqlite3.connect(self.db_path) as conn:
                 conn.row_factory = sqlite3.Row
@@ -274,4 +333,4 @@ class DistributionManager:
             return {"success": False, "error": str(e)}
 
 # 全局实例
-distribution_manager = DistributionManager()
+distribution_manager = DistributionManager(claim_engine=_default_claim_engine(DB_PATH))
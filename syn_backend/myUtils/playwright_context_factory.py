@@ -10,43 +10,9 @@ from myUtils.fingerprint_policy import get_fingerprint_policy, resolve_proxy
 from utils.base_social_media import set_init_script
 
 
-async def create_context_with_policy(
-    playwright,
-    *,
-    platform: str,
-    account_id: Optional[str],
-    headless: bool,
-    storage_state: Any = None,
-    force_ephemeral: bool = False,
-    base_context_opts: Optional[Dict[str, Any]] = None,
-    launch_kwargs: Optional[Dict[str, Any]] = None,
-) -> Tuple[Optional[Any], Any, Optional[Dict[str, Any]], Dict[str, Any]]:
-    """
-    Build a Playwright context with fingerprint policy, proxy, and persistence.
-    Returns (browser, context, fingerprint, policy).
-    """
-    policy = get_fingerprint_policy(account_id, platform)
-    apply_fingerprint = bool(policy.get("apply_fingerprint", True)) and bool(account_id)
-    apply_stealth = bool(policy.get("apply_stealth", True))
-    use_persistent_profile = bool(policy.get("use_persistent_profile", True)) and bool(account_id)
-    user_id = None
-    if account_id:
-        try:
-            from myUtils.cookie_manager import cookie_manager
-            acc = cookie_manager.get_account_by_id(account_id)
-            user_id = acc.get("user_id") if acc else None
-        except Exception as e:
-            logger.warning(f"[playwright] Failed to load user_id: {e}")
-    if use_persistent_profile and not user_id:
-        logger.warning("[playwright] Missing user_id; disabling persistent profile")
-        use_persistent_profile = False
-    if force_ephemeral:
-        use_persistent_profile = False
-    if storage_state is not None and use_persistent_profile:
-        # storage_state is not supported by launch_persistent_context; fall back to non-persistent
-        use_persistent_profile = False
-
-    launch_opts = {"headless": headless}
+def build_launch_options(*, headless: bool, launch_kwargs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Chromium launch options shared by one-off launches and the browser pool."""
+    launch_opts: Dict[str, Any] = {"headless": headless}
     if launch_kwargs:
         launch_opts.update(launch_kwargs)
 
@@ -72,13 +38,97 @@ async def create_context_with_policy(
         except Exception as e:
             logger.warning(f"[playwright] Failed to load LOCAL_CHROME_PATH: {e}")
 
+    return launch_opts
+
+
+async def launch_browser(playwright, *, headless: bool, launch_kwargs: Optional[Dict[str, Any]] = None):
+    """Launch a plain Chromium browser (no profile/proxy) to host per-account contexts."""
+    return await playwright.chromium.launch(**build_launch_options(headless=headless, launch_kwargs=launch_kwargs))
+
+
+def _resolve_account_policy(platform: str, account_id: Optional[str]) -> Dict[str, Any]:
+    policy = get_fingerprint_policy(account_id, platform)
+    apply_fingerprint = bool(policy.get("apply_fingerprint", True)) and bool(account_id)
+    wants_persistent_profile = bool(policy.get("use_persistent_profile", True)) and bool(account_id)
+    user_id = None
+    if account_id:
+        try:
+            from myUtils.cookie_manager import cookie_manager
+            acc = cookie_manager.get_account_by_id(account_id)
+            user_id = acc.get("user_id") if acc else None
+        except Exception as e:
+            logger.warning(f"[playwright] Failed to load user_id: {e}")
+    return {
+        "policy": policy,
+        "user_id": user_id,
+        "apply_fingerprint": apply_fingerprint,
+        "wants_persistent_profile": wants_persistent_profile,
+        "use_persistent_profile": wants_persistent_profile and bool(user_id),
+    }
+
+
+def describe_context_policy(platform: str, account_id: Optional[str]) -> Dict[str, bool]:
+    """
+    Predict what create_context_with_policy would build, without launching anything.
+
+    persistent: the account's persistent profile would be used (needs its own browser);
+    per_account: an account fingerprint or proxy would be applied (context cannot be shared/pre-built).
+    """
+    resolved = _resolve_account_policy(platform, account_id)
+    return {
+        "persistent": resolved["use_persistent_profile"],
+        "per_account": resolved["apply_fingerprint"] or resolve_proxy(resolved["policy"]) is not None,
+    }
+
+
+async def create_context_with_policy(
+    playwright,
+    *,
+    platform: str,
+    account_id: Optional[str],
+    headless: bool,
+    storage_state: Any = None,
+    force_ephemeral: bool = False,
+    base_context_opts: Optional[Dict[str, Any]] = None,
+    launch_kwargs: Optional[Dict[str, Any]] = None,
+    browser: Any = None,
+) -> Tuple[Optional[Any], Any, Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Build a Playwright context with fingerprint policy, proxy, and persistence.
+    Returns (browser, context, fingerprint, policy).
+
+    When `browser` is given (e.g. from a shared pool) no browser is launched:
+    an isolated context is created on it and the proxy is applied per context.
+    The caller keeps ownership of the browser and must only close the context.
+    """
+    resolved = _resolve_account_policy(platform, account_id)
+    policy = resolved["policy"]
+    user_id = resolved["user_id"]
+    apply_fingerprint = resolved["apply_fingerprint"]
+    apply_stealth = bool(policy.get("apply_stealth", True))
+    use_persistent_profile = resolved["use_persistent_profile"]
+    if resolved["wants_persistent_profile"] and not user_id:
+        logger.warning("[playwright] Missing user_id; disabling persistent profile")
+    if force_ephemeral:
+        use_persistent_profile = False
+    if storage_state is not None and use_persistent_profile:
+        # storage_state is not supported by launch_persistent_context; fall back to non-persistent
+        use_persistent_profile = False
+    if browser is not None:
+        # a shared browser cannot host a persistent profile
+        use_persistent_profile = False
+
+    launch_opts = build_launch_options(headless=headless, launch_kwargs=launch_kwargs) if browser is None else {}
+
     proxy = resolve_proxy(policy)
-    if proxy:
+    if proxy and browser is None:
         launch_opts["proxy"] = proxy
 
     context_opts = build_context_options(**(base_context_opts or {}))
     if storage_state is not None:
         context_opts["storage_state"] = storage_state
+    if proxy and browser is not None:
+        context_opts["proxy"] = proxy
 
     fingerprint = None
     if apply_fingerprint:
@@ -94,7 +144,9 @@ async def create_context_with_policy(
         except Exception as e:
             logger.warning(f"[fp] apply failed: {e}")
 
-    if use_persistent_profile:
+    if browser is not None:
+        context = await browser.new_context(**context_opts)
+    elif use_persistent_profile:
         profile_root = policy.get("persistent_profile_dir") or "browser_profiles"
         try:
             from config.conf import BASE_DIR
@@ -114,6 +166,7 @@ async def create_context_with_policy(
 
         user_data_dir = custom_manager.get_user_data_dir(account_id, platform, user_id=user_id)
         context = await playwright.chromium.launch_persistent_context(str(user_data_dir), **context_opts, **launch_opts)
+        custom_manager.watch_context(context, user_data_dir)
         try:
             browser = context.browser()
         except Exception:
@@ -0,0 +1,284 @@
+"""
+统一调度引擎
+
+TaskScheduler（定时发布）、ScheduledTaskService（定时采集/检查）、UserInfoSyncScheduler
+（账号状态巡检）共用这一个引擎，取代各自每 30/60 秒轮询一次的线程：
+- 所有任务的下次触发时间放在一个小顶堆里，调度线程在 Condition 上等待到堆顶到期，
+  新任务插入时立即唤醒，准点触发
+- 到期任务交给工作线程池执行（任务本身通常只是把工作投递到任务队列 / Celery），
+  调度线程从不内联执行任务体
+- 可为指定 tag 配置独立线程池（lanes）：定时发布不与耗时的巡检 / 采集 / 清理任务争抢工作线程
+- 周期任务触发后按 next_fn 计算下次时间；上一次仍在执行时跳过本次
+- 记录每次实际开始时间相对计划时间的延迟，供 /system/scheduler/stats 查看
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+def every(seconds: float) -> Callable[[float], float]:
+    """固定间隔"""
+    return lambda now: now + seconds
+
+
+def random_every(min_seconds: float, max_seconds: float) -> Callable[[float], float]:
+    """随机间隔（每次触发后重新抽取）"""
+    return lambda now: now + random.uniform(min_seconds, max_seconds)
+
+
+def daily_at(hhmm: str) -> Callable[[float], float]:
+    """每天固定时刻（本地时间，"HH:MM"）"""
+    hour, minute = (int(part) for part in hhmm.split(":"))
+
+    def next_fire(now: float) -> float:
+        current = datetime.fromtimestamp(now)
+        target = current.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= current:
+            target += timedelta(days=1)
+        return target.timestamp()
+
+    return next_fire
+
+
+class _Job:
+    __slots__ = ("job_id", "callback", "tag", "next_fn", "due", "version", "running", "runs", "skipped", "last_run")
+
+    def __init__(self, job_id: str, callback: Callable[[], Any], tag: Optional[str], next_fn, due: float, version: int):
+        self.job_id = job_id
+        self.callback = callback
+        self.tag = tag
+        self.next_fn = next_fn
+        self.due = due
+        self.version = version
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.last_run: Optional[float] = None
+
+
+class ScheduleEngine:
+    """到点触发的单线程调度器 + 执行线程池"""
+
+    def __init__(self, workers: int = 4, latency_window: int = 500, lanes: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            workers: 共享线程池大小
+            latency_window: 调度延迟统计窗口
+            lanes: tag -> 独立线程池大小；这些 tag 的任务不进入共享线程池
+        """
+        self.workers = max(1, workers)
+        self.lanes = {tag: max(1, int(size)) for tag, size in (lanes or {}).items()}
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []
+        self._jobs: Dict[str, _Job] = {}
+        self._seq = itertools.count()
+        self._versions = itertools.count(1)
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lane_executors: Dict[str, ThreadPoolExecutor] = {}
+
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._latency_by_tag: Dict[str, Dict[str, float]] = {}
+        self.fired = 0
+        self.skipped = 0
+        self.failed = 0
+
+    # ---------- 注册 ----------
+
+    def schedule_at(self, job_id: str, when: float, callback: Callable[[], Any], tag: Optional[str] = None) -> None:
+        """一次性任务：在 when（epoch 秒）触发；同名任务会被替换"""
+        self._add(job_id, when, callback, tag, None)
+
+    def schedule_recurring(
+        self,
+        job_id: str,
+        next_fn: Callable[[float], float],
+        callback: Callable[[], Any],
+        tag: Optional[str] = None,
+        first_at: Optional[float] = None,
+    ) -> None:
+        """周期任务：首次在 first_at（默认 next_fn(now)）触发，之后每次触发后按 next_fn 计算"""
+        self._add(job_id, first_at if first_at is not None else next_fn(time.time()), callback, tag, next_fn)
+
+    def _add(self, job_id, when, callback, tag, next_fn) -> None:
+        with self._cond:
+            job = _Job(job_id, callback, tag, next_fn, when, next(self._versions))
+            self._jobs[job_id] = job
+            heapq.heappush(self._heap, (when, next(self._seq), job_id, job.version))
+            # 新任务可能比当前等待的堆顶更早
+            self._cond.notify()
+
+    def cancel(self, job_id: str) -> bool:
+        with self._cond:
+            # 堆中残留的条目因版本不匹配在弹出时丢弃
+            return self._jobs.pop(job_id, None) is not None
+
+    def cancel_tag(self, tag: str) -> int:
+        with self._cond:
+            ids = [job_id for job_id, job in self._jobs.items() if job.tag == tag]
+            for job_id in ids:
+                del self._jobs[job_id]
+            return len(ids)
+
+    def has_job(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    # ---------- 运行 ----------
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="schedule-job")
+            self._lane_executors = {
+                tag: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"schedule-{tag}")
+                for tag, size in self.lanes.items()
+            }
+            self._thread = threading.Thread(target=self._loop, name="schedule-engine", daemon=True)
+            self._thread.start()
+        logger.info(f"[ScheduleEngine] 已启动 (workers={self.workers}, lanes={self.lanes}, jobs={len(self._jobs)})")
+
+    def stop(self, wait: bool = False) -> None:
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+        for executor in [self._executor, *self._lane_executors.values()]:
+            if executor:
+                executor.shutdown(wait=wait)
+        logger.info("[ScheduleEngine] 已停止")
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _loop(self) -> None:
+        with self._cond:
+            while self._running:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, job_id, version = self._heap[0]
+                job = self._jobs.get(job_id)
+                if job is None or job.version != version:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = due - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                self._fire(job)
+
+    def _fire(self, job: _Job) -> None:
+        """持锁调用：把到期任务交给线程池，并安排周期任务的下一次"""
+        due = job.due
+        if job.running:
+            job.skipped += 1
+            self.skipped += 1
+            logger.warning(f"[ScheduleEngine] {job.job_id} 上一次仍在执行，跳过本次")
+        else:
+            job.running = True
+            self._lane_executors.get(job.tag, self._executor).submit(self._run, job, due)
+
+        if job.next_fn is None:
+            self._jobs.pop(job.job_id, None)
+            return
+        job.due = job.next_fn(max(time.time(), due))
+        heapq.heappush(self._heap, (job.due, next(self._seq), job.job_id, job.version))
+
+    def _run(self, job: _Job, due: float) -> None:
+        started = time.time()
+        self._record_latency(job.tag or job.job_id, max(0.0, started - due))
+        try:
+            job.callback()
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"[ScheduleEngine] 任务 {job.job_id} 执行失败: {e}")
+        finally:
+            job.runs += 1
+            job.last_run = started
+            job.running = False
+
+    # ---------- 指标 ----------
+
+    def _record_latency(self, key: str, seconds: float) -> None:
+        with self._cond:
+            self.fired += 1
+            self._latencies.append(seconds)
+            stats = self._latency_by_tag.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def metrics(self) -> Dict[str, Any]:
+        """调度延迟（实际开始时间 - 计划时间）等指标"""
+        with self._cond:
+            window = sorted(self._latencies)
+            pending = len(self._jobs)
+            by_tag = {
+                key: {
+                    "count": int(s["count"]),
+                    "avg_ms": round(s["total"] / s["count"] * 1000, 3) if s["count"] else 0.0,
+                    "max_ms": round(s["max"] * 1000, 3),
+                }
+                for key, s in self._latency_by_tag.items()
+            }
+
+        def pct(p: float) -> float:
+            return round(window[min(len(window) - 1, int(len(window) * p))] * 1000, 3) if window else 0.0
+
+        return {
+            "running": self._running,
+            "jobs": pending,
+            "fired": self.fired,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "latency_ms": {
+                "p50": pct(0.5),
+                "p95": pct(0.95),
+                "max": round(window[-1] * 1000, 3) if window else 0.0,
+                "window": len(window),
+            },
+            "latency_by_tag": by_tag,
+        }
+
+    def jobs(self, tag: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._cond:
+            jobs = [j for j in self._jobs.values() if tag is None or j.tag == tag]
+            return [
+                {
+                    "job_id": j.job_id,
+                    "tag": j.tag,
+                    "next_run": datetime.fromtimestamp(j.due).isoformat(),
+                    "recurring": j.next_fn is not None,
+                    "running": j.running,
+                    "runs": j.runs,
+                    "skipped": j.skipped,
+                    "last_run": datetime.fromtimestamp(j.last_run).isoformat() if j.last_run else None,
+                }
+                for j in sorted(jobs, key=lambda j: j.due)
+            ]
+
+
+schedule_engine = ScheduleEngine(
+    workers=int(os.getenv("SCHEDULE_ENGINE_WORKERS", "4")),
+    # 定时发布（TaskScheduler.TAG）单独一个线程池，不被巡检/采集等长任务占满
+    lanes={"publish": int(os.getenv("SCHEDULE_ENGINE_PUBLISH_WORKERS", "2"))},
+)
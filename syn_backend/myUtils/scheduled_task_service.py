@@ -7,8 +7,6 @@
 4. 支持 Cron 表达式配置
 """
 import asyncio
-import threading
-import schedule
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -18,15 +16,18 @@ import sqlite3
 from myUtils.video_collector import collector
 from myUtils.cookie_manager import cookie_manager
 from myUtils.task_queue_manager import Task, TaskType, TaskQueueManager
+from myUtils.schedule_engine import ScheduleEngine, daily_at, every, schedule_engine
 
 class ScheduledTaskService:
     """定时任务服务"""
 
-    def __init__(self, task_manager: TaskQueueManager, db_path: Path):
+    TAG = "scheduled_task_service"
+
+    def __init__(self, task_manager: TaskQueueManager, db_path: Path, engine: ScheduleEngine = None):
         self.task_manager = task_manager
         self.db_path = db_path
+        self.engine = engine or schedule_engine
         self.running = False
-        self.scheduler_thread = None
 
         # 注册任务处理器
         self.task_manager.register_handler(TaskType.DATA_COLLECT, self.handle_data_collect)
@@ -142,8 +143,8 @@ class ScheduledTaskService:
             print(f"❌ [Scheduler] 账号检查失败: {e}")
             raise
 
-    def add_scheduled_task(self, task_type: TaskType, schedule_func: Callable):
-        """添加定时任务到调度器"""
+    def add_scheduled_task(self, task_type: TaskType, next_fn: Callable[[float], float]):
+        """添加定时任务到调度引擎（到点只向任务队列投递，不在调度线程内执行）"""
         def job():
             """创建并提交任务到队列"""
             task_id = f"{task_type.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -156,21 +157,15 @@ class ScheduledTaskService:
             )
             self.task_manager.add_task(task)
 
-        schedule_func(job)
+        self.engine.schedule_recurring(f"{self.TAG}:{task_type.value}", next_fn, job, tag=self.TAG)
 
     def setup_default_schedules(self):
         """设置默认调度"""
         # 每天凌晨2点采集数据
-        self.add_scheduled_task(
-            TaskType.DATA_COLLECT,
-            lambda job: schedule.every().day.at("02:00").do(job)
-        )
+        self.add_scheduled_task(TaskType.DATA_COLLECT, daily_at("02:00"))
 
         # 每6小时检查账号状态
-        self.add_scheduled_task(
-            TaskType.ACCOUNT_CHECK,
-            lambda job: schedule.every(6).hours.do(job)
-        )
+        self.add_scheduled_task(TaskType.ACCOUNT_CHECK, every(6 * 3600))
 
         print("✅ [Scheduler] 默认调度任务已设置")
         print("   - 每天 02:00 采集数据")
@@ -188,14 +183,7 @@ class ScheduledTaskService:
         # 设置调度
         self.setup_default_schedules()
 
-        # 启动调度线程
-        def run_scheduler():
-            while self.running:
-                schedule.run_pending()
-                time.sleep(60)  # 每分钟检查一次
-
-        self.scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-        self.scheduler_thread.start()
+        self.engine.start()
 
         print("✅ [Scheduler] 调度器已启动")
 
@@ -204,10 +192,8 @@ class ScheduledTaskService:
         print("🛑 [Scheduler] 停止调度器...")
         self.running = False
 
-        if self.scheduler_thread:
-            self.scheduler_thread.join(timeout=5)
-
-        schedule.clear()
+        # 只移除本服务的任务，引擎与其他调度器共用
+        self.engine.cancel_tag(self.TAG)
         print("✅ [Scheduler] 调度器已停止")
 
     def trigger_task_now(self, task_type: TaskType) -> str:
@@ -227,18 +213,10 @@ class ScheduledTaskService:
 
     def get_next_schedules(self) -> List[Dict]:
         """获取下次执行时间"""
-        jobs = schedule.get_jobs()
-        schedules = []
-
-        for job in jobs:
-            schedules.append({
-                "job": str(job.job_func),
-                "next_run": job.next_run.isoformat() if job.next_run else None,
-                "interval": str(job.interval) if hasattr(job, 'interval') else None,
-                "unit": job.unit if hasattr(job, 'unit') else None
-            })
-
-        return schedules
+        return [
+            {"job": job["job_id"], "next_run": job["next_run"], "last_run": job["last_run"], "runs": job["runs"]}
+            for job in self.engine.jobs(self.TAG)
+        ]
 
 # 全局实例
 _scheduled_task_service_instance = None
@@ -2,20 +2,29 @@
 任务队列管理器
 功能：
 1. 管理批量发布任务队列
-2. 支持任务优先级
+2. 支持任务优先级与定时执行（data.not_before）
 3. 并发控制
 4. 任务状态追踪
 5. 失败重试机制
+
+实现说明：
+- 内存队列是按 (not_before, priority, seq) 排序的堆，worker 在 asyncio.Condition 上
+  等待新任务或堆顶任务到期，不再轮询
+- 所有写操作交给单个后台写线程，使用一条长连接（WAL 模式），按批合并为一个事务提交
 """
 import asyncio
+import heapq
+import itertools
+import queue
 import sqlite3
 import threading
+import time
 import json
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Callable
+from typing import Any, Dict, List, Optional, Callable
 from enum import Enum
-from queue import PriorityQueue, Empty
 import traceback
 from loguru import logger
 
@@ -62,6 +71,23 @@ class Task:
         """优先级比较（数字越小优先级越高）"""
         return self.priority < other.priority
 
+    @property
+    def not_before(self) -> float:
+        """最早执行时间（时间戳），未设置或解析失败时返回 0 表示立即执行"""
+        value = self.data.get("not_before") if isinstance(self.data, dict) else None
+        if not value:
+            return 0.0
+        try:
+            if isinstance(value, (int, float)):
+                return float(value)
+            if isinstance(value, str):
+                s = value.strip().replace("T", " ").replace("Z", "")
+                return datetime.fromisoformat(s).timestamp()
+        except Exception:
+            # Never block task execution due to scheduling parse errors.
+            pass
+        return 0.0
+
     def to_dict(self) -> Dict:
         """转换为字典"""
         return {
@@ -79,26 +105,331 @@ class Task:
             "completed_at": self.completed_at.isoformat() if self.completed_at else None
         }
 
+
+class TaskHeap:
+    """
+    asyncio 原生的任务堆
+
+    元素按 (not_before, priority, seq) 排序，未到期的任务不会被取出。
+    put()/remove() 线程安全，可在任意线程调用；get() 只能在 bind() 绑定的事件循环中调用。
+    """
+
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._all_done = threading.Condition(self._lock)
+        self._queued_ids: set = set()
+        self._unfinished = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cond: Optional[asyncio.Condition] = None
+        self._wakeup_pending = False
+        self._closed = False
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """绑定 worker 所在的事件循环（需在该循环内调用）"""
+        self._loop = loop
+        self._cond = asyncio.Condition()
+        self._closed = False
+
+    def put(self, task: Task) -> bool:
+        """入队，同一 task_id 已在队列中时返回 False"""
+        with self._lock:
+            if task.task_id in self._queued_ids:
+                return False
+            heapq.heappush(self._heap, (task.not_before, task.priority, next(self._seq), task))
+            self._queued_ids.add(task.task_id)
+            self._unfinished += 1
+        self._wakeup()
+        return True
+
+    def remove(self, task_id: str) -> bool:
+        """从队列中移除尚未执行的任务（惰性删除，出堆时丢弃）"""
+        with self._lock:
+            if task_id not in self._queued_ids:
+                return False
+            self._queued_ids.discard(task_id)
+            self._unfinished -= 1
+            if self._unfinished <= 0:
+                self._all_done.notify_all()
+        return True
+
+    def contains(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._queued_ids
+
+    def qsize(self) -> int:
+        with self._lock:
+            return len(self._queued_ids)
+
+    def task_done(self):
+        with self._lock:
+            self._unfinished -= 1
+            if self._unfinished <= 0:
+                self._all_done.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """阻塞直到所有已入队任务都执行完毕（或被移除）"""
+        with self._all_done:
+            return self._all_done.wait_for(lambda: self._unfinished <= 0, timeout)
+
+    def close(self):
+        """唤醒所有等待中的 worker 并让 get() 返回 None"""
+        self._closed = True
+        self._wakeup(notify_all=True)
+
+    def _pop_due(self) -> tuple:
+        """弹出已到期的堆顶任务；返回 (task, 下一次等待秒数)"""
+        with self._lock:
+            while self._heap:
+                not_before, _, _, task = self._heap[0]
+                if task.task_id not in self._queued_ids:
+                    heapq.heappop(self._heap)  # 已被移除
+                    continue
+                delay = not_before - time.time()
+                if delay > 0:
+                    return None, delay
+                heapq.heappop(self._heap)
+                self._queued_ids.discard(task.task_id)
+                return task, None
+            return None, None
+
+    async def get(self) -> Optional[Task]:
+        """等待并取出下一个到期任务，队列关闭时返回 None"""
+        async with self._cond:
+            while not self._closed:
+                task, delay = self._pop_due()
+                if task is not None:
+                    # 还有其它到期任务时，顺带唤醒下一个 worker
+                    if self._heap:
+                        self._cond.notify()
+                    return task
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        return None
+
+    def _wakeup(self, notify_all: bool = False):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        if not notify_all:
+            with self._lock:
+                if self._wakeup_pending:
+                    return
+                self._wakeup_pending = True
+        try:
+            loop.call_soon_threadsafe(self._schedule_notify, notify_all)
+        except RuntimeError:
+            # 事件循环已关闭
+            self._wakeup_pending = False
+
+    def _schedule_notify(self, notify_all: bool):
+        with self._lock:
+            self._wakeup_pending = False
+        self._loop.create_task(self._notify(notify_all))
+
+    async def _notify(self, notify_all: bool):
+        async with self._cond:
+            if notify_all:
+                self._cond.notify_all()
+            else:
+                self._cond.notify()
+
+
+class SQLiteWriter:
+    """
+    单连接 SQLite 写线程
+
+    写操作先进入内存队列，后台线程一次最多取 batch_size 个，在同一个事务内执行：
+    插入按顺序执行，同一任务的多次状态更新只保留最后一次。
+    批次事务失败时逐条重放，只丢弃出错的那一条，不影响同批的其它任务。
+    """
+
+    INSERT_SQL = """
+        INSERT OR IGNORE INTO task_queue (
+            task_id, task_type, priority, status, data,
+            max_retries, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+
+    UPDATE_SQL = """
+        UPDATE task_queue SET
+            status = ?,
+            result = ?,
+            error_message = ?,
+            retry_count = ?,
+            started_at = ?,
+            completed_at = ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE task_id = ?
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        batch_size: int = 500,
+        on_insert_ignored: Optional[Callable[[str], None]] = None,
+        on_inserts_done: Optional[Callable[[List[str]], None]] = None
+    ):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.on_insert_ignored = on_insert_ignored
+        self.on_inserts_done = on_inserts_done
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="TaskQueueWriter", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def connect(db_path: Path) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def insert(self, task_id: str, params: tuple):
+        self._queue.put(("insert", task_id, params))
+
+    def update(self, task_id: str, params: tuple):
+        self._queue.put(("update", task_id, params))
+
+    def call(self, fn: Callable[[sqlite3.Connection], Any], timeout: Optional[float] = 30) -> Any:
+        """在写线程中执行 fn(conn) 并等待结果（排在已提交的写操作之后）"""
+        future: Future = Future()
+        self._queue.put(("call", fn, future))
+        return future.result(timeout=timeout)
+
+    def flush(self, timeout: Optional[float] = 30):
+        """等待此前提交的写操作全部落库"""
+        self.call(lambda conn: None, timeout=timeout)
+
+    def close(self, timeout: float = 5):
+        self._queue.put(("stop",))
+        self._thread.join(timeout=timeout)
+
+    def _run(self):
+        conn = self.connect(self.db_path)
+        running = True
+        while running:
+            ops = [self._queue.get()]
+            while len(ops) < self.batch_size:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            running = self._apply(conn, ops)
+        conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, ops: List[tuple]) -> bool:
+        running = True
+        inserts: List[tuple] = []
+        updates: Dict[str, tuple] = {}
+        results: List[tuple] = []
+        ignored: List[str] = []
+
+        def write_pending():
+            for task_id, params in inserts:
+                if conn.execute(self.INSERT_SQL, params).rowcount == 0:
+                    ignored.append(task_id)
+            if updates:
+                conn.executemany(self.UPDATE_SQL, list(updates.values()))
+            inserts.clear()
+            updates.clear()
+
+        try:
+            conn.execute("BEGIN")
+            for op in ops:
+                kind = op[0]
+                if kind == "insert":
+                    inserts.append((op[1], op[2]))
+                elif kind == "update":
+                    updates.pop(op[1], None)
+                    updates[op[1]] = op[2]
+                elif kind == "call":
+                    write_pending()
+                    try:
+                        results.append((op[2], op[1](conn), None))
+                    except Exception as e:
+                        results.append((op[2], None, e))
+                elif kind == "stop":
+                    running = False
+            write_pending()
+            conn.execute("COMMIT")
+        except Exception as e:
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            if len(ops) > 1:
+                # 逐条重放，定位出错的写操作
+                logger.warning(f"[TaskQueue] 批量写入失败 ({len(ops)} ops)，逐条重试: {e}")
+                for op in ops:
+                    running = self._apply(conn, [op]) and running
+                return running
+            op = ops[0]
+            logger.error(f"[TaskQueue] 写入失败 ({op[0]} {op[1] if op[0] != 'call' else ''}): {e}")
+            if op[0] == "call" and not op[2].done():
+                op[2].set_exception(e)
+            elif op[0] == "insert":
+                # 未落库的任务不能继续留在内存队列里
+                if self.on_insert_ignored:
+                    self.on_insert_ignored(op[1])
+                if self.on_inserts_done:
+                    self.on_inserts_done([op[1]])
+            return running
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        for task_id in ignored:
+            logger.warning(f"[TaskQueue] 任务ID已存在，忽略: {task_id}")
+            if self.on_insert_ignored:
+                self.on_insert_ignored(task_id)
+        if self.on_inserts_done:
+            inserted = [op[1] for op in ops if op[0] == "insert"]
+            if inserted:
+                self.on_inserts_done(inserted)
+        return running
+
+
 class TaskQueueManager:
     """任务队列管理器"""
 
-    def __init__(self, db_path: Path, max_workers: int = 3):
+    def __init__(self, db_path: Path, max_workers: int = 3, write_batch_size: int = 500):
         self.db_path = db_path
         self.max_workers = max_workers
-        self.task_queue = PriorityQueue()
+        self.task_queue = TaskHeap()
         self.workers = []
         self.running = False
         self.task_handlers = {}
         self.active_tasks = {}
         self.lock = threading.Lock()
+        # 已提交给写线程、尚未落库的 task_id（查重时数据库里还看不到）
+        self._unflushed_ids: set = set()
 
         # 初始化数据库
         self.init_database()
 
+        # 唯一的写连接 + 只读连接（WAL 下读写互不阻塞）
+        self._writer = SQLiteWriter(
+            db_path,
+            batch_size=write_batch_size,
+            on_insert_ignored=self.task_queue.remove,
+            on_inserts_done=self._on_inserts_done
+        )
+        self._reader = SQLiteWriter.connect(db_path)
+        self._read_lock = threading.Lock()
+
     def init_database(self):
         """初始化任务数据库"""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
 
             # 创建任务表
             cursor.execute("""
@@ -137,34 +468,54 @@ class TaskQueueManager:
             conn.commit()
             logger.info("[TaskQueue] 数据库初始化完成")
 
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """读取前先等待写队列落库，保证读到自己的写入"""
+        self._writer.flush()
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
     def register_handler(self, task_type: TaskType, handler: Callable):
         """注册任务处理器"""
         self.task_handlers[task_type] = handler
         logger.info(f"[TaskQueue] 注册处理器: {task_type}")
 
+    def _on_inserts_done(self, task_ids: List[str]):
+        with self.lock:
+            self._unflushed_ids.difference_update(task_ids)
+
+    def _task_exists(self, task_id: str) -> bool:
+        """task_id 是否已存在：待落库 / 队列中 / 执行中 / 数据库中（含已完成、失败的任务）"""
+        if task_id in self._unflushed_ids or task_id in self.active_tasks or self.task_queue.contains(task_id):
+            return True
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT 1 FROM task_queue WHERE task_id = ? LIMIT 1", (task_id,)
+            ).fetchone()
+        return row is not None
+
     def add_task(self, task: Task) -> bool:
-        """添加任务到队列"""
+        """添加任务到队列（持久化由写线程异步批量完成）；task_id 已存在时返回 False"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO task_queue (
-                        task_id, task_type, priority, status, data,
-                        max_retries, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    task.task_id,
-                    task.task_type,
-                    task.priority,
-                    task.status,
-                    json.dumps(task.data),
-                    task.max_retries,
-                    task.created_at.isoformat()
-                ))
-                conn.commit()
-
-            # 添加到内存队列
-            self.task_queue.put((task.priority, task))
+            with self.lock:
+                if self._task_exists(task.task_id):
+                    logger.warning(f"[TaskQueue] 任务ID已存在，忽略重复添加: {task.task_id}")
+                    return False
+                self._unflushed_ids.add(task.task_id)
+
+            if not self.task_queue.put(task):
+                self._on_inserts_done([task.task_id])
+                logger.warning(f"[TaskQueue] 任务已在队列中，忽略重复添加: {task.task_id}")
+                return False
+
+            self._writer.insert(task.task_id, (
+                task.task_id,
+                task.task_type,
+                task.priority,
+                task.status,
+                json.dumps(task.data),
+                task.max_retries,
+                task.created_at.isoformat()
+            ))
             logger.info(f"[TaskQueue] 任务已添加: {task.task_id} ({task.task_type})")
             return True
 
@@ -173,30 +524,17 @@ class TaskQueueManager:
             return False
 
     def update_task_status(self, task: Task):
-        """更新任务状态到数据库"""
+        """更新任务状态到数据库（合并进写线程的下一个批次）"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE task_queue SET
-                        status = ?,
-                        result = ?,
-                        error_message = ?,
-                        retry_count = ?,
-                        started_at = ?,
-                        completed_at = ?,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE task_id = ?
-                """, (
-                    task.status,
-                    json.dumps(task.result) if task.result else None,
-                    task.error_message,
-                    task.retry_count,
-                    task.started_at.isoformat() if task.started_at else None,
-                    task.completed_at.isoformat() if task.completed_at else None,
-                    task.task_id
-                ))
-                conn.commit()
+            self._writer.update(task.task_id, (
+                task.status,
+                json.dumps(task.result) if task.result else None,
+                task.error_message,
+                task.retry_count,
+                task.started_at.isoformat() if task.started_at else None,
+                task.completed_at.isoformat() if task.completed_at else None,
+                task.task_id
+            ))
         except Exception as e:
             logger.error(f"[TaskQueue] 更新任务状态失败: {e}")
 
@@ -307,7 +645,7 @@ class TaskQueueManager:
                 )
                 retry_task.retry_count = task.retry_count
                 task.status = TaskStatus.PENDING  # 重置为pending
-                self.task_queue.put((retry_task.priority, retry_task))
+                self.task_queue.put(retry_task)
                 return False
 
             # 检查是否是账号封禁异常（不重试，直接失败）
@@ -360,53 +698,22 @@ class TaskQueueManager:
                     del self.active_tasks[task.task_id]
 
     async def worker(self, worker_id: int):
-        """工作线程"""
+        """工作协程：在任务堆上等待，有到期任务时才被唤醒"""
         logger.info(f"[TaskQueue] Worker-{worker_id} 启动")
 
         while self.running:
-            try:
-                # 从队列获取任务（超时1秒）
-                try:
-                    priority, task = self.task_queue.get(timeout=1)
-                except Empty:
-                    await asyncio.sleep(0.1)
-                    continue
-
-                # Optional scheduling: if task specifies `not_before`, delay execution.
-                try:
-                    not_before = task.data.get("not_before") if isinstance(task.data, dict) else None
-                    if not_before:
-                        nb_dt: Optional[datetime] = None
-                        if isinstance(not_before, (int, float)):
-                            nb_dt = datetime.fromtimestamp(float(not_before))
-                        elif isinstance(not_before, str):
-                            s = not_before.strip().replace("T", " ").replace("Z", "")
-                            try:
-                                nb_dt = datetime.fromisoformat(s)
-                            except Exception:
-                                nb_dt = None
-
-                        if nb_dt:
-                            now = datetime.now()
-                            if now < nb_dt:
-                                # Re-queue and sleep a bit to avoid busy looping.
-                                self.task_queue.put((priority, task))
-                                self.task_queue.task_done()
-                                await asyncio.sleep(min((nb_dt - now).total_seconds(), 1.0))
-                                continue
-                except Exception:
-                    # Never block task execution due to scheduling parse errors.
-                    pass
+            task = await self.task_queue.get()
+            if task is None:
+                break
 
+            try:
                 # 执行任务
                 await self.execute_task(task)
-
-                # 标记任务完成
-                self.task_queue.task_done()
-
             except Exception as e:
                 logger.error(f"[TaskQueue] Worker-{worker_id} 错误: {e}")
-                await asyncio.sleep(1)
+            finally:
+                # 标记任务完成
+                self.task_queue.task_done()
 
         logger.info(f"[TaskQueue] Worker-{worker_id} 停止")
 
@@ -427,52 +734,72 @@ class TaskQueueManager:
 
         def run_workers():
             asyncio.set_event_loop(loop)
-            tasks = [self.worker(i) for i in range(self.max_workers)]
-            loop.run_until_complete(asyncio.gather(*tasks))
+
+            async def main():
+                self.task_queue.bind(loop)
+                await asyncio.gather(*[self.worker(i) for i in range(self.max_workers)])
+
+            try:
+                loop.run_until_complete(main())
+            finally:
+                loop.close()
 
         worker_thread = threading.Thread(target=run_workers, daemon=True)
         worker_thread.start()
         self.workers.append(worker_thread)
 
     def stop(self):
-        """停止任务队列"""
+        """
+        停止任务队列
+
+        正在执行的任务会执行完毕；尚未执行的任务保持 pending 状态，下次 start() 时重新加载。
+        """
         logger.info("[TaskQueue] 停止任务队列...")
         self.running = False
-
-        # 等待所有任务完成
-        self.task_queue.join()
+        self.task_queue.close()
 
         # 等待工作线程结束
         for worker in self.workers:
             worker.join(timeout=5)
+        self.workers.clear()
+
+        # 确保状态更新全部落库
+        try:
+            self._writer.flush()
+        except Exception as e:
+            logger.error(f"[TaskQueue] 刷新写队列失败: {e}")
 
         logger.info("[TaskQueue] 任务队列已停止")
 
+    def close(self):
+        """停止队列并关闭数据库连接"""
+        self.stop()
+        self._writer.close()
+        with self._read_lock:
+            self._reader.close()
+
     def load_pending_tasks(self):
         """从数据库加载未完成的任务"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT task_id, task_type, priority, data, retry_count, max_retries
-                    FROM task_queue
-                    WHERE status IN ('pending', 'retry')
-                    ORDER BY priority ASC, created_at ASC
-                """)
-
-                rows = cursor.fetchall()
-                for row in rows:
-                    task = Task(
-                        task_id=row[0],
-                        task_type=TaskType(row[1]),
-                        data=json.loads(row[3]) if row[3] else {},
-                        priority=row[2],
-                        max_retries=row[5]
-                    )
-                    task.retry_count = row[4]
-                    self.task_queue.put((task.priority, task))
+            rows = self._query("""
+                SELECT task_id, task_type, priority, data, retry_count, max_retries
+                FROM task_queue
+                WHERE status IN ('pending', 'retry')
+                ORDER BY priority ASC, created_at ASC
+            """)
+
+            for row in rows:
+                task = Task(
+                    task_id=row[0],
+                    task_type=TaskType(row[1]),
+                    data=json.loads(row[3]) if row[3] else {},
+                    priority=row[2],
+                    max_retries=row[5]
+                )
+                task.retry_count = row[4]
+                self.task_queue.put(task)
 
-                logger.info(f"[TaskQueue] 加载了 {len(rows)} 个待执行任务")
+            logger.info(f"[TaskQueue] 加载了 {len(rows)} 个待执行任务")
 
         except Exception as e:
             logger.error(f"[TaskQueue] 加载任务失败: {e}")
@@ -486,32 +813,30 @@ class TaskQueueManager:
 
         # 从数据库查询
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT task_id, task_type, priority, status, data, result,
-                           error_message, retry_count, max_retries, created_at,
-                           started_at, completed_at
-                    FROM task_queue
-                    WHERE task_id = ?
-                """, (task_id,))
-
-                row = cursor.fetchone()
-                if row:
-                    return {
-                        "task_id": row[0],
-                        "task_type": row[1],
-                        "priority": row[2],
-                        "status": row[3],
-                        "data": json.loads(row[4]) if row[4] else {},
-                        "result": json.loads(row[5]) if row[5] else None,
-                        "error_message": row[6],
-                        "retry_count": row[7],
-                        "max_retries": row[8],
-                        "created_at": row[9],
-                        "started_at": row[10],
-                        "completed_at": row[11]
-                    }
+            rows = self._query("""
+                SELECT task_id, task_type, priority, status, data, result,
+                       error_message, retry_count, max_retries, created_at,
+                       started_at, completed_at
+                FROM task_queue
+                WHERE task_id = ?
+            """, (task_id,))
+
+            if rows:
+                row = rows[0]
+                return {
+                    "task_id": row[0],
+                    "task_type": row[1],
+                    "priority": row[2],
+                    "status": row[3],
+                    "data": json.loads(row[4]) if row[4] else {},
+                    "result": json.loads(row[5]) if row[5] else None,
+                    "error_message": row[6],
+                    "retry_count": row[7],
+                    "max_retries": row[8],
+                    "created_at": row[9],
+                    "started_at": row[10],
+                    "completed_at": row[11]
+                }
 
         except Exception as e:
             logger.error(f"[TaskQueue] 查询任务失败: {e}")
@@ -521,45 +846,41 @@ class TaskQueueManager:
     def list_tasks(self, limit: int = 50, status: Optional[str] = None) -> List[Dict]:
         """获取任务列表"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                if status:
-                    cursor.execute("""
-                        SELECT task_id, task_type, priority, status, data, result,
-                               retry_count, max_retries, created_at, started_at, completed_at
-                        FROM task_queue
-                        WHERE status = ?
-                        ORDER BY created_at DESC
-                        LIMIT ?
-                    """, (status, limit))
-                else:
-                    cursor.execute("""
-                        SELECT task_id, task_type, priority, status, data, result,
-                               retry_count, max_retries, created_at, started_at, completed_at
-                        FROM task_queue
-                        ORDER BY created_at DESC
-                        LIMIT ?
-                    """, (limit,))
-
-                rows = cursor.fetchall()
-                tasks = []
-                for row in rows:
-                    tasks.append({
-                        "task_id": row[0],
-                        "task_type": row[1],
-                        "priority": row[2],
-                        "status": row[3],
-                        "data": json.loads(row[4]) if row[4] else {},
-                        "result": json.loads(row[5]) if row[5] else None,
-                        "retry_count": row[6],
-                        "max_retries": row[7],
-                        "created_at": row[8],
-                        "started_at": row[9],
-                        "completed_at": row[10]
-                    })
-
-                return tasks
+            if status:
+                rows = self._query("""
+                    SELECT task_id, task_type, priority, status, data, result,
+                           retry_count, max_retries, created_at, started_at, completed_at
+                    FROM task_queue
+                    WHERE status = ?
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                """, (status, limit))
+            else:
+                rows = self._query("""
+                    SELECT task_id, task_type, priority, status, data, result,
+                           retry_count, max_retries, created_at, started_at, completed_at
+                    FROM task_queue
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                """, (limit,))
+
+            tasks = []
+            for row in rows:
+                tasks.append({
+                    "task_id": row[0],
+                    "task_type": row[1],
+                    "priority": row[2],
+                    "status": row[3],
+                    "data": json.loads(row[4]) if row[4] else {},
+                    "result": json.loads(row[5]) if row[5] else None,
+                    "retry_count": row[6],
+                    "max_retries": row[7],
+                    "created_at": row[8],
+                    "started_at": row[9],
+                    "completed_at": row[10]
+                })
+
+            return tasks
 
         except Exception as e:
             logger.error(f"[TaskQueue] 获取任务列表失败: {e}")
@@ -568,34 +889,30 @@ class TaskQueueManager:
     def get_queue_stats(self) -> Dict:
         """获取队列统计信息"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                # 统计各状态任务数
-                cursor.execute("""
-                    SELECT status, COUNT(*) as count
-                    FROM task_queue
-                    GROUP BY status
-                """)
-
-                status_counts = {row[0]: row[1] for row in cursor.fetchall()}
-
-                # 格式化返回数据
-                stats = {
-                    'pending': status_counts.get('pending', 0) + status_counts.get('retry', 0),
-                    'running': status_counts.get('running', 0),
-                    'completed': status_counts.get('success', 0),
-                    'failed': status_counts.get('failed', 0),
-                    'cancelled': status_counts.get('cancelled', 0),
-                    'total': sum(status_counts.values()),
-                    'queued': self.task_queue.qsize()
-                }
-
-                # 活跃任务数
-                with self.lock:
-                    stats['active'] = len(self.active_tasks)
+            # 统计各状态任务数
+            rows = self._query("""
+                SELECT status, COUNT(*) as count
+                FROM task_queue
+                GROUP BY status
+            """)
+            status_counts = {row[0]: row[1] for row in rows}
+
+            # 格式化返回数据
+            stats = {
+                'pending': status_counts.get('pending', 0) + status_counts.get('retry', 0),
+                'running': status_counts.get('running', 0),
+                'completed': status_counts.get('success', 0),
+                'failed': status_counts.get('failed', 0),
+                'cancelled': status_counts.get('cancelled', 0),
+                'total': sum(status_counts.values()),
+                'queued': self.task_queue.qsize()
+            }
+
+            # 活跃任务数
+            with self.lock:
+                stats['active'] = len(self.active_tasks)
 
-                return stats
+            return stats
 
         except Exception as e:
             logger.error(f"[TaskQueue] 获取统计信息失败: {e}")
@@ -612,42 +929,44 @@ class TaskQueueManager:
         Returns:
             bool: 是否成功取消
         """
+        def _cancel(conn: sqlite3.Connection) -> int:
+            if force:
+                # 强制取消：包括running状态的任务
+                cursor = conn.execute("""
+                    UPDATE task_queue
+                    SET status = ?,
+                        error_message = 'Force cancelled by user',
+                        completed_at = CURRENT_TIMESTAMP,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE task_id = ? AND status IN ('pending', 'retry', 'running')
+                """, (TaskStatus.FAILED, task_id))
+            else:
+                # 正常取消：仅pending和retry
+                cursor = conn.execute("""
+                    UPDATE task_queue
+                    SET status = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE task_id = ? AND status IN ('pending', 'retry')
+                """, (TaskStatus.CANCELLED, task_id))
+            return cursor.rowcount
+
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                if force:
-                    # 强制取消：包括running状态的任务
-                    cursor.execute("""
-                        UPDATE task_queue
-                        SET status = ?,
-                            error_message = 'Force cancelled by user',
-                            completed_at = CURRENT_TIMESTAMP,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE task_id = ? AND status IN ('pending', 'retry', 'running')
-                    """, (TaskStatus.FAILED, task_id))
-
-                    # 从内存活跃任务中移除
-                    with self.lock:
-                        if task_id in self.active_tasks:
-                            del self.active_tasks[task_id]
-                            logger.info(f"[TaskQueue] 从活跃任务中移除: {task_id}")
-                else:
-                    # 正常取消：仅pending和retry
-                    cursor.execute("""
-                        UPDATE task_queue
-                        SET status = ?, updated_at = CURRENT_TIMESTAMP
-                        WHERE task_id = ? AND status IN ('pending', 'retry')
-                    """, (TaskStatus.CANCELLED, task_id))
-
-                conn.commit()
-
-                if cursor.rowcount > 0:
-                    logger.info(f"[TaskQueue] 任务已取消: {task_id} (force={force})")
-                    return True
-                else:
-                    logger.warning(f"[TaskQueue] 无法取消任务（可能正在执行或已完成）: {task_id}")
-                    return False
+            rowcount = self._writer.call(_cancel)
+
+            if force:
+                # 从内存活跃任务中移除
+                with self.lock:
+                    if task_id in self.active_tasks:
+                        del self.active_tasks[task_id]
+                        logger.info(f"[TaskQueue] 从活跃任务中移除: {task_id}")
+
+            if rowcount > 0:
+                # 已取消的任务不再被 worker 取出
+                self.task_queue.remove(task_id)
+                logger.info(f"[TaskQueue] 任务已取消: {task_id} (force={force})")
+                return True
+            else:
+                logger.warning(f"[TaskQueue] 无法取消任务（可能正在执行或已完成）: {task_id}")
+                return False
 
         except Exception as e:
             logger.error(f"[TaskQueue] 取消任务失败: {e}")
@@ -656,22 +975,22 @@ class TaskQueueManager:
     def delete_task(self, task_id: str) -> bool:
         """删除任务"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM task_queue WHERE task_id = ?", (task_id,))
-                conn.commit()
-                
-                # 同时也从内存队列中尝试移除（如果可能）
-                with self.lock:
-                    if task_id in self.active_tasks:
-                        del self.active_tasks[task_id]
+            rowcount = self._writer.call(
+                lambda conn: conn.execute("DELETE FROM task_queue WHERE task_id = ?", (task_id,)).rowcount
+            )
 
-                if cursor.rowcount > 0:
-                    logger.info(f"[TaskQueue] 任务已删除: {task_id}")
-                    return True
-                else:
-                    logger.warning(f"[TaskQueue] 无法删除任务（未找到）: {task_id}")
-                    return False
+            # 同时从内存队列中移除
+            self.task_queue.remove(task_id)
+            with self.lock:
+                if task_id in self.active_tasks:
+                    del self.active_tasks[task_id]
+
+            if rowcount > 0:
+                logger.info(f"[TaskQueue] 任务已删除: {task_id}")
+                return True
+            else:
+                logger.warning(f"[TaskQueue] 无法删除任务（未找到）: {task_id}")
+                return False
 
         except Exception as e:
             logger.error(f"[TaskQueue] 删除任务失败: {e}")
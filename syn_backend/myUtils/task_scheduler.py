@@ -1,62 +1,133 @@
+"""
+发布任务调度器
+
+待发布任务按 schedule_time 放入统一调度引擎（schedule_engine）的小顶堆，准点触发：
+- 启动时通过 (status, publish_mode, schedule_time) 索引一次性加载全部 pending/auto 任务
+- 新建定时任务时调用 schedule_task() 热插入，无需等待下一轮轮询
+- 到期后先原子认领（pending -> publishing），再交给 dispatcher（在引擎为 publish 单独配置的线程池中执行，
+  不与巡检/采集等长任务共用工作线程）
+- 低频对账（默认 5 分钟）兜底其他进程直接写入 publish_tasks 的任务
+"""
+import os
 import sqlite3
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Dict, Optional
 import json
 
+from myUtils.schedule_engine import ScheduleEngine, every, schedule_engine
+
+RECONCILE_SECONDS = int(os.getenv("TASK_SCHEDULER_RECONCILE_SECONDS", "300"))
+
+
+def _parse_schedule_time(value) -> float:
+    """schedule_time 为空或无法解析时视为立即执行"""
+    if not value:
+        return time.time()
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "")).timestamp()
+    except ValueError:
+        return time.time()
+
+
 class TaskScheduler:
     """发布任务调度器 - 自动执行待发布任务"""
-    
-    def __init__(self, db_path='db/database.db'):
+
+    TAG = "publish"
+
+    def __init__(
+        self,
+        db_path='db/database.db',
+        engine: Optional[ScheduleEngine] = None,
+        dispatcher: Optional[Callable[[Dict], None]] = None,
+    ):
         self.db_path = db_path
+        self.engine = engine or schedule_engine
+        # dispatcher(task) 负责真正执行/投递（例如提交到 Celery）；默认在引擎线程池中执行 execute_task
+        self.dispatcher = dispatcher or self.execute_task
         self.running = False
-    
+
     def start(self):
-        """启动调度器"""
+        """启动调度器（非阻塞）"""
+        self.ensure_index()
         self.running = True
-        print("📅 任务调度器已启动...")
-        
-        while self.running:
-            try:
-                self.check_and_execute_tasks()
-                time.sleep(30)  # 每30秒检查一次
-            except Exception as e:
-                print(f"❌ 调度器错误: {e}")
-                time.sleep(60)
-    
+        loaded = self.load_pending_tasks()
+        self.engine.schedule_recurring(
+            "publish:reconcile", every(RECONCILE_SECONDS), self.load_pending_tasks, tag="publish-reconcile"
+        )
+        self.engine.start()
+        print(f"📅 任务调度器已启动，已加载 {loaded} 个待执行任务")
+
     def stop(self):
         """停止调度器"""
         self.running = False
+        self.engine.cancel_tag(self.TAG)
+        self.engine.cancel("publish:reconcile")
         print("🛑 任务调度器已停止")
-    
-    def check_and_execute_tasks(self):
-        """检查并执行待发布的任务"""
+
+    def ensure_index(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_publish_tasks_due "
+                "ON publish_tasks(status, publish_mode, schedule_time)"
+            )
+
+    def load_pending_tasks(self) -> int:
+        """从索引加载全部 pending/auto 任务到调度堆（已在堆中的任务不重复加入）"""
         try:
             with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                # 查找待执行的任务
-                # 条件: status = 'pending' 且 schedule_time <= now 且 publish_mode = 'auto'
-                cursor.execute("""
-                    SELECT * FROM publish_tasks 
-                    WHERE status = 'pending' 
-                    AND publish_mode = 'auto'
-                    AND (schedule_time IS NULL OR schedule_time <= datetime('now', 'localtime'))
-                    LIMIT 10
-                """)
-                
-                tasks = cursor.fetchall()
-                
-                if tasks:
-                    print(f"⏰ 发现 {len(tasks)} 个待执行任务")
-                    
-                    for task in tasks:
-                        self.execute_task(dict(task))
-                
+                rows = conn.execute("""
+                    SELECT task_id, schedule_time FROM publish_tasks
+                    WHERE status = 'pending' AND publish_mode = 'auto'
+                    ORDER BY schedule_time
+                """).fetchall()
         except Exception as e:
-            print(f"检查任务时出错: {e}")
-    
+            print(f"加载待执行任务时出错: {e}")
+            return 0
+
+        added = 0
+        for task_id, schedule_time in rows:
+            if not self.engine.has_job(self._job_id(task_id)):
+                self.schedule_task(task_id, schedule_time)
+                added += 1
+        return added
+
+    @staticmethod
+    def _job_id(task_id) -> str:
+        return f"publish:{task_id}"
+
+    def schedule_task(self, task_id, schedule_time=None):
+        """热插入一个待发布任务（新建或修改 schedule_time 后调用）"""
+        self.engine.schedule_at(
+            self._job_id(task_id),
+            _parse_schedule_time(schedule_time),
+            lambda: self._on_due(task_id),
+            tag=self.TAG,
+        )
+
+    def unschedule_task(self, task_id) -> bool:
+        return self.engine.cancel(self._job_id(task_id))
+
+    def _on_due(self, task_id):
+        """到期：原子认领后交给 dispatcher；已被取消/改为手动/被别处认领的任务直接跳过"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            claimed = conn.execute("""
+                UPDATE publish_tasks
+                SET status = 'publishing', updated_at = CURRENT_TIMESTAMP
+                WHERE task_id = ? AND status = 'pending' AND publish_mode = 'auto'
+            """, (task_id,)).rowcount
+            if not claimed:
+                return
+            task = dict(conn.execute("SELECT * FROM publish_tasks WHERE task_id = ?", (task_id,)).fetchone())
+        print(f"⏰ 任务 #{task_id} 到期，开始执行")
+        self.dispatcher(task)
+
+    def check_and_execute_tasks(self):
+        """立即对账一次（兼容旧调用）：把遗漏的待执行任务加入调度堆"""
+        return self.load_pending_tasks()
+
     def execute_task(self, task):
         """执行单个发布任务"""
         task_id = task['task_id']
@@ -183,6 +254,8 @@ if __name__ == "__main__":
     scheduler = TaskScheduler()
     try:
         scheduler.start()
+        while True:
+            time.sleep(1)
     except KeyboardInterrupt:
         scheduler.stop()
         print("\n程序已退出")
@@ -149,6 +149,8 @@ class TikHubClient:
         self.base_url = _normalize_base_url(base_url)
         self.api_root = f"{self.base_url}/api/v1"
         self._client: Optional[httpx.AsyncClient] = None
+        # Optional per-provider limiter (see myUtils.collection_scheduler.RateLimiter)
+        self.rate_limiter = None
 
     async def __aenter__(self) -> "TikHubClient":
         if not self._client:
@@ -163,6 +165,8 @@ class TikHubClient:
     async def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         if not self._client:
             self._client = httpx.AsyncClient(timeout=60.0)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
         headers = {"Authorization": f"Bearer {self.api_key}"}
         url = f"{self.api_root}{path}"
         resp = await self._client.get(url, params=params, headers=headers)
@@ -7,9 +7,7 @@ Account status scheduler:
 import asyncio
 import os
 import random
-import schedule
 import time
-import threading
 from datetime import datetime
 from loguru import logger
 
@@ -17,14 +15,17 @@ from myUtils.cookie_manager import cookie_manager
 from myUtils.fast_cookie_validator import FastCookieValidator
 from myUtils.profile_manager import cleanup_profiles, cleanup_fingerprints, export_profile_storage_states, ensure_profiles_for_accounts
 from myUtils.login_status_checker import login_status_checker
+from myUtils.schedule_engine import ScheduleEngine, every, random_every, schedule_engine
 
 
 class UserInfoSyncScheduler:
     """Account status scheduler (kept name for compatibility)."""
 
-    def __init__(self):
+    TAG = "account_status"
+
+    def __init__(self, engine: ScheduleEngine = None):
+        self.engine = engine or schedule_engine
         self.running = False
-        self.scheduler_thread = None
         # 用于动态调度登录状态检查的下次执行时间
         self.next_login_check_minutes = self._random_login_check_interval()
 
@@ -168,49 +169,60 @@ class UserInfoSyncScheduler:
             logger.error(f"[AccountStatus] Profile storage_state export failed: {e}")
             return None
 
+    def compact_analytics_history(self):
+        """Downsample analytics_history snapshots to hourly/daily resolution."""
+        try:
+            from fastapi_app.core.config import settings
+            from myUtils.analytics_db import compact_analytics_history
+
+            stats = compact_analytics_history(
+                settings.DATABASE_PATH,
+                hourly_after_days=settings.ANALYTICS_HISTORY_HOURLY_AFTER_DAYS,
+                daily_after_days=settings.ANALYTICS_HISTORY_DAILY_AFTER_DAYS,
+            )
+            logger.info(f"[AccountStatus] Analytics history compaction done: {stats}")
+            return stats
+        except Exception as e:
+            logger.error(f"[AccountStatus] Analytics history compaction failed: {e}")
+            return None
+
     def check_login_status(self):
         """检查账号登录状态（轮询策略，每次检查5个账号）"""
         try:
             logger.info(f"[LoginStatus] Start login status check - {datetime.now().isoformat()}")
             stats = login_status_checker.check_batch_accounts(batch_size=5)
             logger.info(f"[LoginStatus] Login status check done: {stats}")
-
-            # 执行完毕后，重新安排下次检查时间
-            self._reschedule_login_check()
-
             return stats
         except Exception as e:
             logger.error(f"[LoginStatus] Login status check failed: {e}")
             return None
 
-    def _reschedule_login_check(self):
-        """重新安排下次登录状态检查（随机间隔3-6小时）"""
-        # 取消当前的登录检查任务
-        schedule.clear('login-status-check')
-
-        # 生成新的随机间隔
-        interval_minutes = self._random_login_check_interval()
-        self.next_login_check_minutes = interval_minutes
-
-        # 安排新的任务
-        schedule.every(interval_minutes).minutes.do(self.check_login_status).tag('login-status-check')
-
-        logger.info(f"[LoginStatus] Next check scheduled in {interval_minutes} minutes ({interval_minutes/60:.1f} hours)")
-
     def setup_schedules(self):
         """Setup scheduled tasks."""
-        schedule.every(30).minutes.do(self.check_account_status)
-        schedule.every(2).hours.do(lambda: self.collect_platform_videos("douyin"))
-        schedule.every(2).hours.do(lambda: self.collect_platform_videos("bilibili"))
-        schedule.every(6).hours.do(self.cleanup_accounts)
-        schedule.every(6).hours.do(self.export_profile_states)
-
-        # 登录状态检查：首次在随机间隔后执行
+        jobs = [
+            ("status-check", every(30 * 60), self.check_account_status),
+            ("collect-douyin", every(2 * 3600), lambda: self.collect_platform_videos("douyin")),
+            ("collect-bilibili", every(2 * 3600), lambda: self.collect_platform_videos("bilibili")),
+            ("cleanup", every(6 * 3600), self.cleanup_accounts),
+            ("export-profiles", every(6 * 3600), self.export_profile_states),
+            ("compact-analytics-history", every(24 * 3600), self.compact_analytics_history),
+        ]
+        for name, next_fn, callback in jobs:
+            self.engine.schedule_recurring(f"{self.TAG}:{name}", next_fn, callback, tag=self.TAG)
+
+        # 登录状态检查：首次在随机间隔后执行，之后每次触发后重新抽取 3-6 小时
         initial_interval = self.next_login_check_minutes
-        schedule.every(initial_interval).minutes.do(self.check_login_status).tag('login-status-check')
+        self.engine.schedule_recurring(
+            f"{self.TAG}:login-status-check",
+            random_every(180 * 60, 360 * 60),
+            self.check_login_status,
+            tag=self.TAG,
+            first_at=time.time() + initial_interval * 60,
+        )
 
         logger.info(
             f"[AccountStatus] Scheduled: status check 30m, douyin/bilibili collect 2h, cleanup 6h, export 6h, "
+            f"history compaction 24h, "
             f"login status check first in {initial_interval}m ({initial_interval/60:.1f}h, then random 3-6h)"
         )
 
@@ -224,14 +236,7 @@ class UserInfoSyncScheduler:
         logger.info("[AccountStatus] Starting scheduler...")
 
         self.setup_schedules()
-
-        def run_scheduler():
-            while self.running:
-                schedule.run_pending()
-                time.sleep(60)
-
-        self.scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-        self.scheduler_thread.start()
+        self.engine.start()
         logger.info("[AccountStatus] Scheduler started")
 
     def stop(self):
@@ -239,10 +244,8 @@ class UserInfoSyncScheduler:
         logger.info("[AccountStatus] Stopping scheduler...")
         self.running = False
 
-        if self.scheduler_thread:
-            self.scheduler_thread.join(timeout=5)
-
-        schedule.clear()
+        # 只移除本调度器的任务，引擎与其他调度器共用
+        self.engine.cancel_tag(self.TAG)
         logger.info("[AccountStatus] Scheduler stopped")
 
     def trigger_now(self):
@@ -39,7 +39,7 @@ except ImportError:
     def now_beijing_naive():
         return dt.now()
 
-from myUtils.analytics_db import ensure_analytics_schema, upsert_video_analytics_by_key
+from myUtils.analytics_db import ensure_analytics_schema, upsert_video_analytics_batch
 from myUtils.functional_route_manager import functional_route_manager
 from myUtils.cookie_manager import cookie_manager
 from myUtils.tikhub_client import get_tikhub_client, TikHubClient
@@ -47,6 +47,10 @@ from myUtils.tikhub_client import get_tikhub_client, TikHubClient
 WAIT_TIMEOUT = int(os.getenv("COLLECT_WAIT_MS", "45000"))
 HEADLESS = PLAYWRIGHT_HEADLESS
 TIKHUB_MAX_PAGES = int(os.getenv("TIKHUB_MAX_PAGES", "5"))
+TIKHUB_RATE_PER_SEC = float(os.getenv("TIKHUB_RATE_PER_SEC", "5"))
+COLLECT_CONCURRENCY = int(os.getenv("COLLECT_CONCURRENCY", "8"))
+COLLECT_PLATFORM_CONCURRENCY = int(os.getenv("COLLECT_PLATFORM_CONCURRENCY", "2"))
+COLLECT_BROWSER_BUDGET = int(os.getenv("COLLECT_BROWSER_BUDGET", "2"))
 DEFAULT_UA = os.getenv(
     "PLAYWRIGHT_UA",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -165,23 +169,16 @@ class VideoDataCollector:
             logger.warning(f"Failed to recover ID by clicking: {e}")
         return None
 
-    def _proximity_match_and_recover(self, account_id: str, platform: str, scraped_video: Dict[str, Any]):
+    def _proximity_match_and_recover(self, account_id: str, platform: str, scraped_videos: List[Dict[str, Any]]):
         """
         近似对比与 ID 回收逻辑。
         对比维度：标题、预览图、发布时间、标签。
+        一批视频共用一个连接和一次候选任务查询，已匹配的任务从候选中移除。
         """
         try:
             with sqlite3.connect(DB_PATH) as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
-                
-                title = scraped_video.get("title", "").strip()
-                publish_time_str = scraped_video.get("publish_time", "")
-                video_id = scraped_video.get("video_id")
-                scraped_tags = scraped_video.get("tags", [])
-                
-                if not video_id:
-                    return
 
                 # 查找匹配的任务 (24小时内或待处理的)
                 query = """
@@ -192,53 +189,58 @@ class VideoDataCollector:
                 """
                 cursor.execute(query, (platform, account_id))
                 tasks = cursor.fetchall()
+                if not tasks:
+                    return
 
-                best_match = None
-                for task in tasks:
-                    task_title = (task["title"] or "").strip()
-                    task_tags = json.loads(task["tags"]) if task["tags"] else []
-                    
-                    # 1. 标题完全匹配或高度相似
-                    if title and task_title:
-                        if title == task_title or title in task_title or task_title in title:
-                            best_match = task
-                            break
-                    
-                    # 2. 标签匹配 (如果有)
-                    if scraped_tags and task_tags:
-                        overlap = set(scraped_tags) & set(task_tags)
-                        if len(overlap) >= 1: # 至少有一个标签相同
-                            # 这里可以进一步结合标题或时间
-                            if not title or not task_title or (title[:5] == task_title[:5]):
+                for scraped_video in scraped_videos:
+                    title = (scraped_video.get("title") or "").strip()
+                    publish_time_str = scraped_video.get("publish_time", "")
+                    video_id = scraped_video.get("video_id")
+                    scraped_tags = scraped_video.get("tags", [])
+
+                    if not video_id or not tasks:
+                        continue
+
+                    best_match = None
+                    for task in tasks:
+                        task_title = (task["title"] or "").strip()
+                        task_tags = json.loads(task["tags"]) if task["tags"] else []
+                        
+                        # 1. 标题完全匹配或高度相似
+                        if title and task_title:
+                            if title == task_title or title in task_title or task_title in title:
                                 best_match = task
                                 break
+                        
+                        # 2. 标签匹配 (如果有)
+                        if scraped_tags and task_tags:
+                            overlap = set(scraped_tags) & set(task_tags)
+                            if len(overlap) >= 1: # 至少有一个标签相同
+                                # 这里可以进一步结合标题或时间
+                                if not title or not task_title or (title[:5] == task_title[:5]):
+                                    best_match = task
+                                    break
 
-                if best_match:
-                    task_id = best_match["task_id"]
-                    cursor.execute(
-                        "UPDATE publish_tasks SET video_id = ?, status = 'success', published_at = ? WHERE task_id = ?",
-                        (video_id, publish_time_str, task_id)
-                    )
-                    logger.info(f"Recovered video_id {video_id} for platform {platform} matching task {task_id}")
-                    conn.commit()
-                    
-                    # 同时尝试同步到 manual_tasks (如果 task_id 对应)
-                    # ...
+                    if best_match:
+                        task_id = best_match["task_id"]
+                        cursor.execute(
+                            "UPDATE publish_tasks SET video_id = ?, status = 'success', published_at = ? WHERE task_id = ?",
+                            (video_id, publish_time_str, task_id)
+                        )
+                        tasks.remove(best_match)
+                        logger.info(f"Recovered video_id {video_id} for platform {platform} matching task {task_id}")
+                        
+                        # 同时尝试同步到 manual_tasks (如果 task_id 对应)
+                        # ...
+                conn.commit()
         except Exception as e:
             logger.error(f"Error in proximity matching: {e}")
 
-    def save_video_data(self, account_id: str, platform: str, video: Dict[str, Any]):
-        """Save video data using analytics_db helper and trigger recovery."""
-        # ✅ CRITICAL: Validate video_id before saving
-        video_id = video.get("video_id")
-        if not video_id or not str(video_id).strip():
-            logger.warning(f"[Collector] Skipping video without valid ID: {video.get('title', 'NO_TITLE')[:40]}")
-            return
-
-        data_to_save = {
+    def _video_record(self, account_id: str, platform: str, video: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "account_id": account_id,
             "platform": platform,
-            "video_id": str(video_id).strip(),
+            "video_id": str(video.get("video_id")).strip(),
             "title": video.get("title") or "",
             "thumbnail": video.get("cover_url") or "",
             "publish_date": video.get("publish_time") or "",
@@ -251,20 +253,35 @@ class VideoDataCollector:
             "raw_data": video
         }
 
+    def save_videos(self, account_id: str, platform: str, videos: List[Dict[str, Any]]) -> int:
+        """
+        Save a page/list of videos in one transaction and trigger recovery.
+        Returns the number of videos that carried a video_id.
+        Blocking SQLite I/O: async collectors call it via asyncio.to_thread.
+        """
+        # ✅ CRITICAL: Validate video_id before saving
+        valid = [v for v in videos if v.get("video_id") and str(v.get("video_id")).strip()]
+        if len(valid) < len(videos):
+            logger.debug(f"[Collector] Skipping {len(videos) - len(valid)} {platform} videos without valid ID")
+        if not valid:
+            return 0
+
         try:
-            upsert_video_analytics_by_key(
-                DB_PATH,
-                platform=platform,
-                video_id=data_to_save["video_id"],
-                data=data_to_save
+            stats = upsert_video_analytics_batch(
+                DB_PATH, [self._video_record(account_id, platform, video) for video in valid]
             )
-            logger.debug(f"[Collector] Saved {platform} video {data_to_save['video_id']}: {data_to_save['title'][:30] if data_to_save['title'] else 'NO_TITLE'}")
+            logger.debug(f"[Collector] Saved {len(valid)} {platform} videos for {account_id}: {stats}")
         except Exception as e:
             logger.error(f"[Collector] Error saving to DB: {e}")
-            return
+            return len(valid)
 
         # 触发 ID 回写到后端任务表
-        self._proximity_match_and_recover(account_id, platform, video)
+        self._proximity_match_and_recover(account_id, platform, valid)
+        return len(valid)
+
+    def save_video_data(self, account_id: str, platform: str, video: Dict[str, Any]):
+        """Save video data using analytics_db helper and trigger recovery."""
+        self.save_videos(account_id, platform, [video])
 
     async def collect_douyin_data_api(self, cookie_file: str, account_id: str) -> Dict[str, Any]:
         cookies = self._load_cookie_list(cookie_file)
@@ -331,11 +348,7 @@ class VideoDataCollector:
                 has_more = has_more_raw in (1, "1", True)
                 cursor = payload.get("cursor", cursor + 20)
 
-        saved_count = 0
-        for video in videos:
-            if video.get("video_id"):
-                self.save_video_data(account_id, "douyin", video)
-                saved_count += 1
+        saved_count = await asyncio.to_thread(self.save_videos, account_id, "douyin", videos)
 
         return {"success": True, "count": saved_count, "videos": videos}
 
@@ -384,11 +397,7 @@ class VideoDataCollector:
             return {"success": False, "error": "TikHub requires Kuaishou eid (non-numeric). Update account.user_id"}
 
         videos, pages = await client.collect_kuaishou_posts(user_id=user_id, max_pages=max_pages)
-        saved_count = 0
-        for video in videos:
-            if video.get("video_id"):
-                self.save_video_data(account["account_id"], "kuaishou", video)
-                saved_count += 1
+        saved_count = await asyncio.to_thread(self.save_videos, account["account_id"], "kuaishou", videos)
 
         return {
             "success": saved_count > 0,
@@ -409,11 +418,7 @@ class VideoDataCollector:
             return {"success": False, "error": "TikHub requires Xiaohongshu user_id in account.user_id"}
 
         videos, pages = await client.collect_xiaohongshu_notes(user_id=user_id, max_pages=max_pages)
-        saved_count = 0
-        for video in videos:
-            if video.get("video_id"):
-                self.save_video_data(account["account_id"], "xiaohongshu", video)
-                saved_count += 1
+        saved_count = await asyncio.to_thread(self.save_videos, account["account_id"], "xiaohongshu", videos)
 
         return {
             "success": saved_count > 0,
@@ -434,11 +439,7 @@ class VideoDataCollector:
             return {"success": False, "error": "TikHub requires WeChat Channels username in account.user_id"}
 
         videos, pages = await client.collect_channels_home(username=username, max_pages=max_pages)
-        saved_count = 0
-        for video in videos:
-            if video.get("video_id"):
-                self.save_video_data(account["account_id"], "channels", video)
-                saved_count += 1
+        saved_count = await asyncio.to_thread(self.save_videos, account["account_id"], "channels", videos)
 
         return {
             "success": saved_count > 0,
@@ -574,11 +575,7 @@ class VideoDataCollector:
                     except Exception as e:
                         logger.warning(f"Failed to recover ID for video {video.get('title')}: {e}")
 
-                saved_count = 0
-                for video in videos:
-                    if video.get("video_id"):
-                        self.save_video_data(account_id, "kuaishou", video)
-                        saved_count += 1
+                saved_count = await asyncio.to_thread(self.save_videos, account_id, "kuaishou", videos)
 
                 if saved_count > 0:
                     print(f"[Kuaishou] Collected {saved_count} videos")
@@ -587,11 +584,7 @@ class VideoDataCollector:
                 # Fallback to click-to-detail if no IDs found
                 print("[Kuaishou] No ids from DOM, trying click-to-detail fallback...")
                 click_videos = await self._collect_kuaishou_ids_by_click(page, max_items=30)
-                click_saved = 0
-                for video in click_videos:
-                    if video.get("video_id"):
-                        self.save_video_data(account_id, "kuaishou", video)
-                        click_saved += 1
+                click_saved = await asyncio.to_thread(self.save_videos, account_id, "kuaishou", click_videos)
                 
                 if click_saved > 0:
                     return {"success": True, "count": click_saved, "videos": click_videos}
@@ -662,11 +655,7 @@ class VideoDataCollector:
                     wait_ms=1200,
                 )
 
-                saved_count = 0
-                for video in videos:
-                    if video.get("video_id"):
-                        self.save_video_data(account_id, "xiaohongshu", video)
-                        saved_count += 1
+                saved_count = await asyncio.to_thread(self.save_videos, account_id, "xiaohongshu", videos)
 
                 print(f"[XHS] Collected {saved_count} videos")
                 return {"success": True, "count": saved_count, "videos": videos}
@@ -757,11 +746,7 @@ class VideoDataCollector:
                         """
                     )
 
-                saved_count = 0
-                for video in videos:
-                    if video.get("video_id"):  # ✅ Changed from title to video_id
-                        self.save_video_data(account_id, "douyin", video)
-                        saved_count += 1
+                saved_count = await asyncio.to_thread(self.save_videos, account_id, "douyin", videos)
 
                 if saved_count > 0:
                     print(f"[Douyin] Page collect finished: {saved_count} videos")
@@ -770,11 +755,7 @@ class VideoDataCollector:
                 # Fallback: click each video card to navigate to work-detail page and extract ID from URL.
                 print("[Douyin] No ids from DOM, trying click-to-detail fallback...")
                 click_videos = await self._collect_douyin_ids_by_click(page, max_items=50)
-                click_saved = 0
-                for video in click_videos:
-                    if video.get("video_id"):
-                        self.save_video_data(account_id, "douyin", video)
-                        click_saved += 1
+                click_saved = await asyncio.to_thread(self.save_videos, account_id, "douyin", click_videos)
 
                 if click_saved > 0:
                     print(f"[Douyin] Collected {click_saved} videos (click fallback)")
@@ -1048,11 +1029,7 @@ class VideoDataCollector:
                     wait_ms=1200,
                 )
 
-                saved_count = 0
-                for video in videos:
-                    if video.get("video_id"):
-                        self.save_video_data(account_id, "channels", video)
-                        saved_count += 1
+                saved_count = await asyncio.to_thread(self.save_videos, account_id, "channels", videos)
 
                 print(f"[Channels] Collected {saved_count} videos")
                 return {"success": True, "count": saved_count, "videos": videos}
@@ -1168,17 +1145,52 @@ class VideoDataCollector:
         self,
         account_ids: Optional[List[str]] = None,
         platform_filter: Optional[str] = None,
+        concurrency: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """Collect videos for all valid accounts, optionally filtered."""
+        """
+        Collect videos for all valid accounts, optionally filtered.
+
+        Accounts run concurrently through CollectionScheduler: TikHub-backed
+        accounts in a fast lane, Playwright scroll collection (and TikHub
+        fallbacks) in a slow lane capped by COLLECT_BROWSER_BUDGET.
+        `concurrency` sizes the fast lane; when no account can use it (no
+        TikHub client, or only browser-only platforms) it sizes the slow lane.
+        """
         from myUtils.cookie_manager import cookie_manager
+        from myUtils.collection_scheduler import CollectionScheduler
 
         allowed_ids = set(account_ids) if account_ids else None
         platform_name = platform_filter.lower() if platform_filter else None
 
-        accounts = cookie_manager.list_flat_accounts()
-        results: Dict[str, Any] = {"total": 0, "success": 0, "failed": 0, "details": []}
+        accounts = [
+            account for account in cookie_manager.list_flat_accounts()
+            if account.get("status") == "valid" and account.get("cookie_file")
+            and (not allowed_ids or account.get("account_id") in allowed_ids)
+            and (not platform_name or account.get("platform") == platform_name)
+        ]
+
+        def _log_result(detail: Dict[str, Any]) -> None:
+            status = "OK" if detail.get("success") else "FAIL"
+            logger.info(
+                f"[Collector] {status} {detail.get('account')} ({detail.get('platform')}): "
+                f"{detail.get('count', 0)} videos {detail.get('error') or ''}"
+            )
 
         tikhub_client = get_tikhub_client()
+        browser_budget = COLLECT_BROWSER_BUDGET
+        if concurrency and not CollectionScheduler.uses_api_lane(accounts, tikhub_client):
+            # only the browser lane will run, so the requested concurrency applies to it
+            browser_budget = concurrency
+
+        scheduler = CollectionScheduler(
+            self,
+            concurrency=concurrency or COLLECT_CONCURRENCY,
+            platform_concurrency=COLLECT_PLATFORM_CONCURRENCY,
+            browser_budget=browser_budget,
+            api_rates={"tikhub": TIKHUB_RATE_PER_SEC},
+            tikhub_max_pages=TIKHUB_MAX_PAGES,
+            on_result=_log_result,
+        )
 
         @asynccontextmanager
         async def _maybe_tikhub(client: Optional[TikHubClient]):
@@ -1189,84 +1201,30 @@ class VideoDataCollector:
                 yield opened
 
         async with _maybe_tikhub(tikhub_client) as tikhub:
-            for account in accounts:
-                if account.get("status") != "valid" or not account.get("cookie_file"):
-                    continue
-                if allowed_ids and account.get("account_id") not in allowed_ids:
-                    continue
-                if platform_name and account.get("platform") != platform_name:
-                    continue
-
-                platform = account["platform"]
-                account_id = account["account_id"]
-                cookie_file = account["cookie_file"]
-
-                print("\n" + "=" * 50)
-                print(f"[Collector] Collect account: {account['name']} ({platform})")
-                print("=" * 50)
-
-                result: Optional[Dict[str, Any]] = None
-                if platform == "kuaishou":
-                    if tikhub:
-                        result = await self.collect_kuaishou_data_tikhub(account, tikhub, TIKHUB_MAX_PAGES)
-                        if result.get("success"):
-                            pass
-                        else:
-                            logger.warning(f"[Kuaishou] TikHub failed, falling back: {result.get('error')}")
-                            result = await self.collect_kuaishou_data(cookie_file, account_id)
-                    else:
-                        result = await self.collect_kuaishou_data(cookie_file, account_id)
-                elif platform == "xiaohongshu":
-                    if tikhub:
-                        result = await self.collect_xiaohongshu_data_tikhub(account, tikhub, TIKHUB_MAX_PAGES)
-                        if result.get("success"):
-                            pass
-                        else:
-                            logger.warning(f"[XHS] TikHub failed, falling back: {result.get('error')}")
-                            result = await self.collect_xiaohongshu_data(cookie_file, account_id)
-                    else:
-                        result = await self.collect_xiaohongshu_data(cookie_file, account_id)
-                elif platform == "douyin":
-                    result = await self.collect_douyin_data(cookie_file, account_id)
-                elif platform == "channels":
-                    if tikhub:
-                        result = await self.collect_channels_data_tikhub(account, tikhub, TIKHUB_MAX_PAGES)
-                        if result.get("success"):
-                            pass
-                        else:
-                            logger.warning(f"[Channels] TikHub failed, falling back: {result.get('error')}")
-                            result = await self.collect_channels_data(cookie_file, account_id)
-                    else:
-                        result = await self.collect_channels_data(cookie_file, account_id)
-
-                if result:
-                    results["total"] += 1
-                    if result.get("success"):
-                        results["success"] += 1
-                    else:
-                        results["failed"] += 1
-
-                    results["details"].append(
-                        {
-                            "account": account["name"],
-                            "account_id": account_id,
-                            "platform": platform,
-                            **result,
-                        }
-                    )
-
-        return results
+            return await scheduler.run(accounts, tikhub)
 
 
 collector = VideoDataCollector()
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Video data auto-collector")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help=f"accounts collected in parallel (default: COLLECT_CONCURRENCY={COLLECT_CONCURRENCY}); "
+                             f"without TikHub it sizes the browser lane instead of "
+                             f"COLLECT_BROWSER_BUDGET={COLLECT_BROWSER_BUDGET}")
+    parser.add_argument("--platform", default=None, help="only collect one platform")
+    cli_args = parser.parse_args()
+
     print("=" * 50)
     print("Video data auto-collector")
     print("=" * 50)
 
-    results = asyncio.run(collector.collect_all_accounts())
+    results = asyncio.run(
+        collector.collect_all_accounts(platform_filter=cli_args.platform, concurrency=cli_args.concurrency)
+    )
 
     print("\n" + "=" * 50)
     print("Collection report")
@@ -1274,6 +1232,7 @@ if __name__ == "__main__":
     print(f"Total accounts: {results['total']}")
     print(f"Success: {results['success']}")
     print(f"Failed: {results['failed']}")
+    print(f"Elapsed: {results.get('elapsed_seconds')}s ({results.get('accounts_per_minute')} accounts/min)")
 
     for detail in results["details"]:
         status = "OK" if detail.get("success") else "FAIL"
@@ -3,6 +3,7 @@
 """
 import os
 import asyncio
+import contextlib
 import time
 import logging
 from pathlib import Path
@@ -17,6 +18,15 @@ from utils.video_probe import probe_video_metadata
 from ..base import BasePlatform
 from ..path_utils import resolve_cookie_file, resolve_video_file
 
+try:
+    from fastapi_app.tasks.worker_runtime import current_browser_pool, phase
+except ImportError:  # 脱离后端单独运行上传脚本
+    def current_browser_pool():
+        return None
+
+    def phase(name: str):
+        return contextlib.nullcontext()
+
 logger = logging.getLogger(__name__)
 
 # Build tag for runtime identification (helps confirm which implementation is used).
@@ -149,6 +159,34 @@ class DouyinUpload(BasePlatform):
         """登录功能在 login.py 中实现"""
         raise NotImplementedError("请使用 DouyinLogin 类进行登录")
     
+    @contextlib.asynccontextmanager
+    async def _open_context(self, browser_options: Dict[str, Any], context_options: Dict[str, Any],
+                            proxy: Optional[Dict[str, str]] = None):
+        """
+        打开隔离的浏览器上下文
+
+        Celery Worker 内从共享浏览器池借用（代理按上下文设置）；否则自行启动 Chromium，用完关闭。
+        """
+        pool = current_browser_pool()
+        if pool is not None:
+            if proxy:
+                context_options = {**context_options, "proxy": proxy}
+            async with pool.context(**context_options) as context:
+                yield context
+            return
+
+        if proxy:
+            browser_options = {**browser_options, "proxy": proxy}
+        async with async_playwright() as playwright:
+            with phase("launch"):
+                browser = await playwright.chromium.launch(**browser_options)
+            try:
+                yield await browser.new_context(**context_options)
+            finally:
+                # ⚠️ 确保异常时也关闭浏览器，避免资源泄露
+                with contextlib.suppress(Exception):
+                    await browser.close()
+
     async def upload(self,
                     account_file: str,
                     title: str,
@@ -182,76 +220,75 @@ class DouyinUpload(BasePlatform):
             上传结果
         """
         try:
-            async with async_playwright() as playwright:
-                logger.info(f"[DouyinUpload] 实现版本: {DOUYIN_PLATFORM_UPLOAD_BUILD_TAG} (file={__file__})")
-
-                # 🆕 标题清理逻辑（从旧版迁移）
-                clean_title = str(title).splitlines()[0].strip()
-                if "#" in clean_title:
-                    clean_title = clean_title.split("#", 1)[0].strip()
-                    logger.info(f"[DouyinUpload] 标题已清理: {title} -> {clean_title}")
-                title = clean_title
-
-                account_file = resolve_cookie_file(account_file)
-                file_path = resolve_video_file(file_path)
-
-                video_meta = probe_video_metadata(file_path)
-                cover_aspect_ratio = video_meta.get("cover_aspect_ratio")
-                logger.info(
-                    f"[DouyinUpload] 视频元数据: {video_meta.get('width')}x{video_meta.get('height')} "
-                    f"({video_meta.get('aspect_ratio')}, {video_meta.get('orientation')}), cover={cover_aspect_ratio}"
-                )
-                
-                publish_dt: Optional[datetime] = None
-                if publish_date:
-                    if isinstance(publish_date, datetime):
-                        publish_dt = publish_date
-                    elif isinstance(publish_date, (int, float)):
-                        publish_dt = datetime.fromtimestamp(publish_date)
-                    elif isinstance(publish_date, str):
-                        s = publish_date.strip().replace("T", " ").replace("Z", "")
-                        try:
-                            publish_dt = datetime.fromisoformat(s)
-                        except Exception:
-                            for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
-                                try:
-                                    publish_dt = datetime.strptime(s, fmt)
-                                    break
-                                except Exception:
-                                    continue
-
-                    # 抖音定时发布规则验证：2小时后~14天内
-                    if publish_dt:
-                        now = datetime.now()
-                        time_diff = (publish_dt - now).total_seconds()
-                        min_delay = 2 * 3600  # 2小时
-                        max_delay = 14 * 24 * 3600  # 14天
-
-                        if time_diff < min_delay:
-                            raise ValueError(
-                                f"抖音定时发布时间必须在2小时后，当前距离: {int(time_diff / 60)}分钟"
-                            )
-                        if time_diff > max_delay:
-                            raise ValueError(
-                                f"抖音定时发布时间不能超过14天，当前距离: {int(time_diff / 86400)}天"
-                            )
-                # Use Chromium for Douyin publish.
-                browser_options = build_browser_args()
-                browser_options["headless"] = HEADLESS_FLAG
-                # Do not pass empty executable_path, otherwise Playwright may try to spawn '.' (ENOENT)
-                if not browser_options.get("executable_path"):
-                    browser_options.pop("executable_path", None)
-                    logger.info("[DouyinUpload] 使用 Playwright 内置 Chromium")
-                else:
-                    logger.info(f"[DouyinUpload] 使用本地 Chromium: {browser_options['executable_path']}")
+            logger.info(f"[DouyinUpload] 实现版本: {DOUYIN_PLATFORM_UPLOAD_BUILD_TAG} (file={__file__})")
+
+            # 🆕 标题清理逻辑（从旧版迁移）
+            clean_title = str(title).splitlines()[0].strip()
+            if "#" in clean_title:
+                clean_title = clean_title.split("#", 1)[0].strip()
+                logger.info(f"[DouyinUpload] 标题已清理: {title} -> {clean_title}")
+            title = clean_title
+
+            # 路径解析与 ffprobe 都是阻塞调用，放到线程中执行，避免卡住 Worker 常驻循环上的其它发布
+            account_file = await asyncio.to_thread(resolve_cookie_file, account_file)
+            file_path = await asyncio.to_thread(resolve_video_file, file_path)
+
+            video_meta = await asyncio.to_thread(probe_video_metadata, file_path)
+            cover_aspect_ratio = video_meta.get("cover_aspect_ratio")
+            logger.info(
+                f"[DouyinUpload] 视频元数据: {video_meta.get('width')}x{video_meta.get('height')} "
+                f"({video_meta.get('aspect_ratio')}, {video_meta.get('orientation')}), cover={cover_aspect_ratio}"
+            )
+            
+            publish_dt: Optional[datetime] = None
+            if publish_date:
+                if isinstance(publish_date, datetime):
+                    publish_dt = publish_date
+                elif isinstance(publish_date, (int, float)):
+                    publish_dt = datetime.fromtimestamp(publish_date)
+                elif isinstance(publish_date, str):
+                    s = publish_date.strip().replace("T", " ").replace("Z", "")
+                    try:
+                        publish_dt = datetime.fromisoformat(s)
+                    except Exception:
+                        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+                            try:
+                                publish_dt = datetime.strptime(s, fmt)
+                                break
+                            except Exception:
+                                continue
 
-                # 🆕 代理支持（从旧版迁移）
-                if proxy:
-                    browser_options['proxy'] = proxy
-                    logger.info(f"[DouyinUpload] 使用代理: {proxy.get('server', 'unknown')}")
+                # 抖音定时发布规则验证：2小时后~14天内
+                if publish_dt:
+                    now = datetime.now()
+                    time_diff = (publish_dt - now).total_seconds()
+                    min_delay = 2 * 3600  # 2小时
+                    max_delay = 14 * 24 * 3600  # 14天
+
+                    if time_diff < min_delay:
+                        raise ValueError(
+                            f"抖音定时发布时间必须在2小时后，当前距离: {int(time_diff / 60)}分钟"
+                        )
+                    if time_diff > max_delay:
+                        raise ValueError(
+                            f"抖音定时发布时间不能超过14天，当前距离: {int(time_diff / 86400)}天"
+                        )
+            # Use Chromium for Douyin publish.
+            browser_options = build_browser_args()
+            browser_options["headless"] = HEADLESS_FLAG
+            # Do not pass empty executable_path, otherwise Playwright may try to spawn '.' (ENOENT)
+            if not browser_options.get("executable_path"):
+                browser_options.pop("executable_path", None)
+                logger.info("[DouyinUpload] 使用 Playwright 内置 Chromium")
+            else:
+                logger.info(f"[DouyinUpload] 使用本地 Chromium: {browser_options['executable_path']}")
 
-                browser = await playwright.chromium.launch(**browser_options)
-                context = await browser.new_context(**build_context_options(storage_state=account_file))
+            # 🆕 代理支持（从旧版迁移）
+            if proxy:
+                logger.info(f"[DouyinUpload] 使用代理: {proxy.get('server', 'unknown')}")
+            context_options = build_context_options(storage_state=account_file)
+
+            async with self._open_context(browser_options, context_options, proxy) as context:
                 context = await set_init_script(context)
                 page = await context.new_page()
 
@@ -268,7 +305,8 @@ class DouyinUpload(BasePlatform):
                 page.on("dialog", handle_dialog)
 
                 # 访问上传页面
-                await page.goto(self.upload_url, wait_until="domcontentloaded", timeout=60000)
+                with phase("navigate"):
+                    await page.goto(self.upload_url, wait_until="domcontentloaded", timeout=60000)
 
                 # 处理可能的验证码
                 await self._check_and_handle_verification(page, account_file)
@@ -280,17 +318,19 @@ class DouyinUpload(BasePlatform):
 
                 # 上传视频文件（直接上传，不再等待页面URL）
                 logger.info(f"[DouyinUpload] 准备上传视频文件: {file_path}")
-                await page.locator("div[class^='container'] input").set_input_files(file_path)
+                with phase("upload"):
+                    await page.locator("div[class^='container'] input").set_input_files(file_path)
 
-                # 等待进入发布页面
-                await self._wait_for_upload_page(page)
+                    # 等待进入发布页面
+                    await self._wait_for_upload_page(page)
                 await dismiss_douyin_tour(page, max_attempts=2)
 
                 # 填充标题和标签
                 await self._fill_title_and_tags(page, title, tags, enable_third_party=enable_third_party)
                 
                 # 等待视频上传完成
-                await self._wait_for_video_upload(page)
+                with phase("upload"):
+                    await self._wait_for_video_upload(page)
                 
                 # 设置封面（尽量设置，避免"请设置封面后再发布"）
                 await self._set_thumbnail_best_effort(page, thumbnail_path, cover_aspect_ratio=cover_aspect_ratio)
@@ -308,31 +348,24 @@ class DouyinUpload(BasePlatform):
                     await self._set_schedule_time(page, publish_dt)
 
                 # 点击发布
-                await self._publish_video(page, thumbnail_path, cover_aspect_ratio=cover_aspect_ratio)
+                with phase("publish"):
+                    await self._publish_video(page, thumbnail_path, cover_aspect_ratio=cover_aspect_ratio)
 
                 # 保存Cookie
                 await context.storage_state(path=account_file)
                 logger.info("[DouyinUpload] Cookie已更新")
-                
-                await browser.close()
-                
-                return {
-                    "success": True,
-                    "message": "视频发布成功",
-                    "data": {
-                        "title": title,
-                        "file_path": file_path
-                    }
+
+            return {
+                "success": True,
+                "message": "视频发布成功",
+                "data": {
+                    "title": title,
+                    "file_path": file_path
                 }
-                
+            }
+
         except Exception as e:
             logger.error(f"[DouyinUpload] 上传失败: {e}")
-            # ⚠️ 确保异常时也关闭浏览器，避免资源泄露
-            try:
-                if 'browser' in locals():
-                    await browser.close()
-            except Exception:
-                pass
             return {
                 "success": False,
                 "message": str(e)
@@ -0,0 +1,365 @@
+"""
+Worker 内共享的 Chromium 浏览器池
+
+- 常驻 N 个浏览器进程，每个浏览器最多同时承载 M 个上下文
+- 每次检查都新建隔离的上下文（账号指纹 + storage_state），用完即关
+- 浏览器累计服务 recycle_after 个上下文、或本池浏览器进程树的总内存超过阈值时回收重启
+  （按启动参数中的池标记定位进程，不统计同进程里其它 Chromium）
+- 暴露排队深度、上下文创建耗时、单次检查耗时等指标（/health）
+- 除 `async with pool.context()` 外，也可用 acquire_context() 长时间持有上下文（扫码登录会话）；
+  长期持有的时长单独计入 lease_duration，不混入 check_duration
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+class _RollingStat:
+    """最近 N 次耗时（毫秒）的滚动统计"""
+
+    def __init__(self, window: int = 500):
+        self._samples: deque = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, ms: float) -> None:
+        self._samples.append(ms)
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        if not self._samples:
+            return {"count": self.count, "avg_ms": None, "p50_ms": None, "p95_ms": None, "max_ms": None}
+        ordered = sorted(self._samples)
+        p50 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.5))]
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return {
+            "count": self.count,
+            "avg_ms": round(sum(ordered) / len(ordered), 1),
+            "p50_ms": round(p50, 1),
+            "p95_ms": round(p95, 1),
+            "max_ms": round(ordered[-1], 1),
+        }
+
+
+# 附加到池内浏览器启动参数上的标记，Chromium 忽略未知开关，用于按命令行找到对应的浏览器主进程
+POOL_TAG_SWITCH = "--browser-pool-id"
+
+
+class _PooledBrowser:
+    def __init__(self, browser: Any, tag: Optional[str] = None):
+        self.browser = browser
+        self.tag = tag
+        self.pid: Optional[int] = None
+        self.active = 0
+        self.served = 0
+        self.retiring = False
+        self.launched_at = time.time()
+
+    def is_alive(self) -> bool:
+        try:
+            return bool(self.browser.is_connected())
+        except Exception:
+            return False
+
+
+class PooledContext:
+    """从池中借出的上下文；close() 关闭上下文并归还浏览器槽位（可重复调用）"""
+
+    def __init__(self, pool: "BrowserPool", slot: _PooledBrowser, context: Any, started: float):
+        self._pool = pool
+        self._slot = slot
+        self.context = context
+        self._started = started
+        self.closed = False
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        with contextlib.suppress(Exception):
+            await self.context.close()
+        await self._pool._release(self._slot)
+        self._pool.lease_duration_stat.add((time.perf_counter() - self._started) * 1000)
+
+
+class BrowserPool:
+    """共享浏览器池（只在 Worker 的事件循环内使用）"""
+
+    def __init__(
+        self,
+        *,
+        browsers: int = 2,
+        contexts_per_browser: int = 4,
+        recycle_after: int = 200,
+        max_memory_mb: int = 0,
+        headless: bool = True,
+        launch_kwargs: Optional[Dict[str, Any]] = None,
+        launcher: Optional[Callable[[], Awaitable[Any]]] = None,
+        context_factory: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        self.max_browsers = max(1, int(browsers))
+        self.contexts_per_browser = max(1, int(contexts_per_browser))
+        self.recycle_after = max(0, int(recycle_after))
+        self.max_memory_mb = max(0, int(max_memory_mb))
+        self.headless = headless
+        self.launch_kwargs = launch_kwargs
+
+        self._launcher = launcher or self._launch_default
+        self._launch_tags: Dict[int, str] = {}
+        self._context_factory = context_factory or self._create_context_default
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._launching = 0
+        self._cond = asyncio.Condition()
+        self._closed = False
+
+        self._waiting = 0
+        self._recycled = 0
+        self._last_memory_check = 0.0
+        self._last_memory_mb: Optional[float] = None
+        self.context_create_stat = _RollingStat()
+        self.check_duration_stat = _RollingStat()
+        self.lease_duration_stat = _RollingStat()
+
+    # ---------- 默认实现（Playwright） ----------
+
+    async def _ensure_playwright(self):
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+        return self._playwright
+
+    async def _launch_default(self):
+        from myUtils.playwright_context_factory import launch_browser
+
+        pw = await self._ensure_playwright()
+        tag = uuid.uuid4().hex
+        launch_kwargs = dict(self.launch_kwargs or {})
+        launch_kwargs["args"] = [*launch_kwargs.get("args", []), f"{POOL_TAG_SWITCH}={tag}"]
+        browser = await launch_browser(pw, headless=self.headless, launch_kwargs=launch_kwargs)
+        self._launch_tags[id(browser)] = tag
+        return browser
+
+    async def _create_context_default(self, browser, **kwargs):
+        from myUtils.playwright_context_factory import create_context_with_policy
+
+        pw = await self._ensure_playwright()
+        _, context, _, _ = await create_context_with_policy(pw, browser=browser, headless=self.headless, **kwargs)
+        return context
+
+    # ---------- 槽位管理 ----------
+
+    def _pick(self) -> Optional[_PooledBrowser]:
+        candidates = [
+            b for b in self._browsers
+            if not b.retiring and b.active < self.contexts_per_browser and b.is_alive()
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda b: b.active)
+
+    def _prune_dead(self) -> List[_PooledBrowser]:
+        dead = [b for b in self._browsers if not b.is_alive() and b.active == 0]
+        for b in dead:
+            self._browsers.remove(b)
+        return dead
+
+    async def _acquire(self) -> _PooledBrowser:
+        self._waiting += 1
+        try:
+            while True:
+                async with self._cond:
+                    if self._closed:
+                        raise RuntimeError("browser pool is closed")
+                    self._prune_dead()
+                    slot = self._pick()
+                    if slot is not None:
+                        slot.active += 1
+                        return slot
+                    can_launch = len(self._browsers) + self._launching < self.max_browsers
+                    if can_launch:
+                        self._launching += 1
+                    else:
+                        await self._cond.wait()
+                        continue
+                await self._launch_reserved()
+        finally:
+            self._waiting -= 1
+
+    async def _launch_reserved(self) -> None:
+        """启动一个已预留名额（_launching 已 +1）的浏览器；在锁外启动，避免阻塞其它归还/获取"""
+        try:
+            browser = await self._launcher()
+        except BaseException:
+            async with self._cond:
+                self._launching -= 1
+                self._cond.notify_all()
+            raise
+        async with self._cond:
+            self._launching -= 1
+            self._browsers.append(_PooledBrowser(browser, self._launch_tags.pop(id(browser), None)))
+            logger.info(f"[BrowserPool] 启动浏览器 ({len(self._browsers)}/{self.max_browsers})")
+            self._cond.notify_all()
+
+    async def warm(self, count: Optional[int] = None) -> int:
+        """提前启动浏览器（默认补足到 max_browsers），返回本次启动数量"""
+        target = self.max_browsers if count is None else min(max(0, int(count)), self.max_browsers)
+        launched = 0
+        while True:
+            async with self._cond:
+                if self._closed:
+                    return launched
+                self._prune_dead()
+                if len(self._browsers) + self._launching >= target:
+                    return launched
+                self._launching += 1
+            await self._launch_reserved()
+            launched += 1
+
+    async def _release(self, slot: _PooledBrowser) -> None:
+        to_close = None
+        async with self._cond:
+            slot.active -= 1
+            slot.served += 1
+            if not slot.retiring:
+                if self.recycle_after and slot.served >= self.recycle_after:
+                    slot.retiring = True
+                    logger.info(f"[BrowserPool] 浏览器已服务 {slot.served} 个上下文，回收")
+                elif self._memory_exceeded():
+                    slot.retiring = True
+                    logger.warning(
+                        f"[BrowserPool] 浏览器内存 {self._last_memory_mb:.0f}MB 超过阈值 {self.max_memory_mb}MB，回收"
+                    )
+            if (slot.retiring or not slot.is_alive()) and slot.active == 0 and slot in self._browsers:
+                self._browsers.remove(slot)
+                self._recycled += 1
+                to_close = slot
+            self._cond.notify_all()
+        if to_close is not None:
+            with contextlib.suppress(Exception):
+                await to_close.browser.close()
+
+    def _memory_exceeded(self) -> bool:
+        if not self.max_memory_mb:
+            return False
+        now = time.monotonic()
+        if now - self._last_memory_check >= 5:
+            self._last_memory_check = now
+            self._last_memory_mb = self._browser_memory_mb()
+        return self._last_memory_mb is not None and self._last_memory_mb > self.max_memory_mb
+
+    def _browser_memory_mb(self) -> Optional[float]:
+        """统计本池浏览器（主进程及其渲染/GPU 等子进程）的 RSS；无法定位任何浏览器进程时返回 None"""
+        try:
+            import psutil
+        except ImportError:
+            return None
+        total = 0
+        measured = False
+        for slot in list(self._browsers):
+            try:
+                if slot.pid is None:
+                    slot.pid = self._find_browser_pid(psutil, slot.tag)
+                if slot.pid is None:
+                    continue
+                root = psutil.Process(slot.pid)
+                total += root.memory_info().rss
+                for child in root.children(recursive=True):
+                    with contextlib.suppress(psutil.NoSuchProcess, psutil.AccessDenied):
+                        total += child.memory_info().rss
+                measured = True
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                slot.pid = None
+            except Exception:
+                return None
+        return total / (1024 * 1024) if measured else None
+
+    @staticmethod
+    def _find_browser_pid(psutil, tag: Optional[str]) -> Optional[int]:
+        """按启动参数中的池标记找到浏览器主进程（子进程的命令行带 --type=）"""
+        if not tag:
+            return None
+        marker = f"{POOL_TAG_SWITCH}={tag}"
+        for proc in psutil.Process().children(recursive=True):
+            try:
+                cmdline = proc.cmdline()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            if marker in cmdline and not any(arg.startswith("--type=") for arg in cmdline):
+                return proc.pid
+        return None
+
+    # ---------- 对外接口 ----------
+
+    async def acquire_context(self, **kwargs) -> PooledContext:
+        """
+        借出一个隔离的浏览器上下文，调用方负责 close()
+
+        kwargs 透传给 create_context_with_policy（platform/account_id/storage_state 等）
+        """
+        started = time.perf_counter()
+        slot = await self._acquire()
+        try:
+            created = time.perf_counter()
+            context = await self._context_factory(slot.browser, **kwargs)
+            self.context_create_stat.add((time.perf_counter() - created) * 1000)
+        except BaseException:
+            await self._release(slot)
+            raise
+        return PooledContext(self, slot, context, started)
+
+    @contextlib.asynccontextmanager
+    async def context(self, **kwargs):
+        """借出一个隔离的浏览器上下文，退出时关闭"""
+        lease = await self.acquire_context(**kwargs)
+        try:
+            yield lease.context
+        finally:
+            await lease.close()
+            self.check_duration_stat.add((time.perf_counter() - lease._started) * 1000)
+
+    def idle_capacity(self) -> int:
+        """当前无需排队即可借出的上下文数量（含尚未启动的浏览器名额）"""
+        free = sum(
+            self.contexts_per_browser - b.active
+            for b in self._browsers
+            if not b.retiring and b.is_alive()
+        )
+        unlaunched = max(0, self.max_browsers - len(self._browsers) - self._launching)
+        return max(0, free + unlaunched * self.contexts_per_browser - self._waiting)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "browsers": len(self._browsers),
+            "max_browsers": self.max_browsers,
+            "contexts_per_browser": self.contexts_per_browser,
+            "active_contexts": sum(b.active for b in self._browsers),
+            "queue_depth": self._waiting,
+            "recycled_browsers": self._recycled,
+            "recycle_after": self.recycle_after,
+            "max_memory_mb": self.max_memory_mb,
+            "browser_memory_mb": round(self._last_memory_mb, 1) if self._last_memory_mb is not None else None,
+            "context_create": self.context_create_stat.snapshot(),
+            "check_duration": self.check_duration_stat.snapshot(),
+            "lease_duration": self.lease_duration_stat.snapshot(),
+        }
+
+    async def close(self) -> None:
+        async with self._cond:
+            self._closed = True
+            browsers, self._browsers = self._browsers, []
+            self._cond.notify_all()
+        for b in browsers:
+            with contextlib.suppress(Exception):
+                await b.browser.close()
+        if self._playwright is not None:
+            with contextlib.suppress(Exception):
+                await self._playwright.stop()
+            self._playwright = None
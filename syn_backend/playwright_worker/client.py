@@ -2,8 +2,10 @@
 Playwright Worker 客户端
 FastAPI 使用此客户端与 Playwright Worker 通信
 """
+import json
+
 import httpx
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 from loguru import logger
 
 
@@ -98,6 +100,44 @@ class PlaywrightWorkerClient:
             logger.error(f"[WorkerClient] Error: {e}")
             raise
 
+    async def stream_status(self, session_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        订阅登录状态推送（SSE），逐个产出与 poll_status 相同结构的状态数据，终态后结束
+
+        Args:
+            session_id: 会话ID
+        """
+        url = f"{self.worker_url}/qrcode/events/{session_id}"
+        timeout = httpx.Timeout(30.0, read=None)
+        try:
+            async with self.client.stream("GET", url, timeout=timeout) as response:
+                if response.status_code >= 400:
+                    body = await response.aread()
+                    raise RuntimeError(
+                        f"Playwright Worker error ({response.status_code}): {body.decode(errors='ignore')}".strip()
+                    )
+                event_type = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        event_type = line[6:].strip()
+                        continue
+                    if not line.startswith("data:"):
+                        if not line:
+                            event_type = None
+                        continue
+                    try:
+                        data = json.loads(line[5:].strip())
+                    except ValueError:
+                        logger.warning(f"[WorkerClient] Bad status event: {line[:200]}")
+                        continue
+                    if event_type == "error":
+                        # Worker 侧监听中止，会话仍有效，由调用方回退到轮询
+                        raise RuntimeError(data.get("error") or "status stream aborted")
+                    yield data
+        except httpx.HTTPError as e:
+            logger.error(f"[WorkerClient] HTTP error: {e}")
+            raise Exception(f"Failed to stream status: {e}")
+
     async def cancel_session(self, session_id: str) -> bool:
         """
         取消登录会话
@@ -0,0 +1,198 @@
+"""
+QR 登录状态推送
+
+每个二维码会话最多一个 LoginWatcher，在有订阅者（SSE 连接）时才运行：
+- 监听登录页的导航、与登录相关的响应（扫码确认 / 下发 Cookie 的接口）和新开页面，
+  有动静时立即调用一次状态检查（即 adapter.poll_status，判定逻辑不变）
+- 纯 API 登录（无页面）或页面长时间无事件时，按兜底间隔检查
+- 只在状态变化时推送；终态（confirmed/failed/expired）推送后自动结束
+- 单次检查出错（页面/网络抖动）只记录并在下个周期重试，failed 只来自 adapter 的判定；
+  连续出错达到上限时停止监听并通知订阅者出错（不改变会话状态），由客户端回退到轮询
+客户端轮询接口保持不变，作为推送不可用时的兜底。
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+TERMINAL_STATUSES = {"confirmed", "failed", "expired"}
+
+# 响应 URL 中出现这些片段时视为登录状态可能变化
+LOGIN_URL_HINTS = ("login", "passport", "qrcode", "qrconnect", "scan", "sso", "auth", "session")
+
+
+class LoginWatcher:
+    """单个登录会话的事件监听与推送"""
+
+    def __init__(
+        self,
+        session_id: str,
+        check: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+        targets: Optional[Tuple[Any, Any]] = None,
+        fallback_interval: float = 5.0,
+        min_interval: float = 0.5,
+        max_errors: int = 5,
+    ):
+        """
+        Args:
+            session_id: 会话ID
+            check: 执行一次状态检查，返回状态数据（会话已不存在时返回 None）
+            targets: (page, context)，纯 API 登录为 None
+            fallback_interval: 无事件时的兜底检查间隔（秒）
+            min_interval: 两次检查的最小间隔，合并短时间内的连续事件
+            max_errors: 连续检查出错的上限，达到后停止监听
+        """
+        self.session_id = session_id
+        self._check = check
+        self._page, self._context = targets or (None, None)
+        self.fallback_interval = fallback_interval if targets else min(fallback_interval, 2.0)
+        self.min_interval = min_interval
+        self.max_errors = max(1, int(max_errors))
+
+        self._subscribers: List[asyncio.Queue] = []
+        self._nudge = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Tuple[Any, str, Callable]] = []
+        self.last_event: Optional[Dict[str, Any]] = None
+        self.checks = 0
+        self.nudges = 0
+        self.errors = 0
+
+    @property
+    def finished(self) -> bool:
+        return bool(self.last_event and self.last_event.get("status") in TERMINAL_STATUSES)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    # ---------- 订阅 ----------
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        if self.last_event is not None:
+            queue.put_nowait(self.last_event)
+        self._subscribers.append(queue)
+        if not self.finished and self._task is None:
+            self._attach()
+            self._task = asyncio.create_task(self._run(), name=f"login-watch-{self.session_id[:8]}")
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with contextlib.suppress(ValueError):
+            self._subscribers.remove(queue)
+        if not self._subscribers:
+            self.stop()
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """状态变化时推送给所有订阅者（轮询路径得到的结果也经由这里同步给推送端）"""
+        if self.last_event and self.last_event.get("status") == event.get("status"):
+            return
+        self.last_event = event
+        for queue in list(self._subscribers):
+            queue.put_nowait(event)
+        if self.finished:
+            self.stop()
+
+    def _abort(self, message: str) -> None:
+        """通知订阅者监听已中止（非终态，不缓存到 last_event），会话本身不受影响"""
+        for queue in list(self._subscribers):
+            queue.put_nowait({"error": message})
+        self.stop()
+
+    def stop(self) -> None:
+        self._detach()
+        task, self._task = self._task, None
+        if task and task is not asyncio.current_task():
+            task.cancel()
+
+    # ---------- 页面事件 ----------
+
+    def nudge(self, *_: Any) -> None:
+        self.nudges += 1
+        self._nudge.set()
+
+    def _on_response(self, response: Any) -> None:
+        try:
+            url = (response.url or "").lower()
+        except Exception:
+            return
+        if any(hint in url for hint in LOGIN_URL_HINTS):
+            self.nudge()
+
+    def _on_frame_navigated(self, frame: Any) -> None:
+        # 只关心主文档跳转（登录成功后通常离开 login 页）
+        if self._page is None or frame == self._page.main_frame:
+            self.nudge()
+
+    def _attach(self) -> None:
+        listeners = []
+        if self._page is not None:
+            listeners += [
+                (self._page, "framenavigated", self._on_frame_navigated),
+                (self._page, "response", self._on_response),
+            ]
+        if self._context is not None:
+            listeners.append((self._context, "page", self.nudge))
+        for emitter, event, handler in listeners:
+            try:
+                emitter.on(event, handler)
+                self._listeners.append((emitter, event, handler))
+            except Exception as e:
+                logger.debug(f"[LoginWatch] attach {event} failed: {e}")
+
+    def _detach(self) -> None:
+        for emitter, event, handler in self._listeners:
+            with contextlib.suppress(Exception):
+                emitter.remove_listener(event, handler)
+        self._listeners.clear()
+
+    # ---------- 检查循环 ----------
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        consecutive_errors = 0
+        try:
+            while not self.finished:
+                started = loop.time()
+                self._nudge.clear()
+                self.checks += 1
+                try:
+                    event = await self._check()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.errors += 1
+                    consecutive_errors += 1
+                    logger.warning(
+                        f"[LoginWatch] {self.session_id[:8]} check failed "
+                        f"({consecutive_errors}/{self.max_errors}): {e}"
+                    )
+                    if consecutive_errors >= self.max_errors:
+                        self._abort(f"status check failed {consecutive_errors} times: {e}")
+                        break
+                else:
+                    consecutive_errors = 0
+                    if event is None:
+                        self.publish({"status": "expired", "message": "Session not found or expired"})
+                        break
+                    self.publish(event)
+                    if self.finished:
+                        break
+
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._nudge.wait(), timeout=self.fallback_interval)
+                # 合并突发事件（一次登录通常伴随多次跳转和请求）
+                delay = self.min_interval - (loop.time() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[LoginWatch] {self.session_id[:8]} watch failed: {e}")
+            self._abort(str(e))
+        finally:
+            self._detach()
@@ -0,0 +1,273 @@
+"""
+扫码登录会话池
+
+建立在 BrowserPool 之上，供 Worker 无头模式的扫码登录使用：
+- 浏览器常驻（启动时可预热），每个登录会话一个隔离上下文，单浏览器并发上下文数受 BrowserPool 限制
+- 每个平台保留少量已打开登录页（二维码已加载）的预热页面，生成二维码时直接取用，随后在后台补充；
+  预热页面超过 warm_max_age 即丢弃（二维码会过期），近期有需求的平台才会补充
+- 需要账号指纹/代理的会话不能使用通用预热页面，在常驻浏览器上新建上下文；
+  需要账号持久化 profile 的会话返回 None，由调用方单独启动浏览器
+- 借出超过 session_ttl 未归还的会话被强制回收
+- 按平台记录生成二维码耗时（time-to-QR）分位数
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+from playwright_worker.browser_pool import BrowserPool, PooledContext, _RollingStat
+
+Navigator = Callable[[Any], Awaitable[None]]
+
+LOGIN_CONTEXT_OPTS = {"viewport": {"width": 1280, "height": 800}}
+
+
+class LoginLease:
+    """借出的登录页面；close() 关闭上下文并归还浏览器槽位"""
+
+    def __init__(self, pool: "LoginSessionPool", platform: str, context_lease: PooledContext, page: Any, warm: bool):
+        self._pool = pool
+        self.platform = platform
+        self._context_lease = context_lease
+        self.context = context_lease.context
+        self.page = page
+        self.warm = warm
+        self.opened_at = time.monotonic()
+
+    @property
+    def closed(self) -> bool:
+        return self._context_lease.closed
+
+    async def close(self) -> None:
+        self._pool._leases.discard(self)
+        await self._context_lease.close()
+
+
+class _WarmPage:
+    __slots__ = ("context_lease", "page", "ready_at")
+
+    def __init__(self, context_lease: PooledContext, page: Any):
+        self.context_lease = context_lease
+        self.page = page
+        self.ready_at = time.monotonic()
+
+
+class LoginSessionPool:
+    """扫码登录会话池（只在 Worker 的事件循环内使用）"""
+
+    def __init__(
+        self,
+        browser_pool: BrowserPool,
+        *,
+        warm_pages: int = 1,
+        warm_max_age: float = 60.0,
+        session_ttl: float = 420.0,
+        demand_window: float = 900.0,
+        describe_policy: Optional[Callable[[str, Optional[str]], Dict[str, bool]]] = None,
+    ):
+        self.browser_pool = browser_pool
+        self.warm_pages = max(0, int(warm_pages))
+        self.warm_max_age = warm_max_age
+        self.session_ttl = session_ttl
+        self.demand_window = demand_window
+        self._describe_policy = describe_policy or self._describe_default
+
+        self._warm: Dict[str, List[_WarmPage]] = {}
+        self._navigators: Dict[str, Navigator] = {}
+        self._last_demand: Dict[str, float] = {}
+        self._refilling: Set[str] = set()
+        self._refill_tasks: Set[asyncio.Task] = set()
+        self._leases: Set[LoginLease] = set()
+        self._closed = False
+
+        self.warm_hits = 0
+        self.warm_misses = 0
+        self.evicted = 0
+        self._time_to_qr: Dict[str, Dict[str, _RollingStat]] = {}
+
+    @staticmethod
+    def _describe_default(platform: str, account_id: Optional[str]) -> Dict[str, bool]:
+        from myUtils.playwright_context_factory import describe_context_policy
+
+        return describe_context_policy(platform, account_id)
+
+    # ---------- 借出 ----------
+
+    async def checkout(self, platform: str, account_id: Optional[str], navigate: Navigator) -> Optional[LoginLease]:
+        """
+        借出一个已打开登录页的页面
+
+        Args:
+            platform: 平台名称
+            account_id: 账号ID（决定指纹/代理/持久化 profile 策略）
+            navigate: 打开登录页并切换到二维码视图，同时用于补充该平台的预热页面
+
+        Returns:
+            LoginLease；账号需要持久化 profile 时返回 None
+        """
+        if self._closed:
+            raise RuntimeError("login session pool is closed")
+        self._navigators[platform] = navigate
+
+        policy = self._describe_policy(platform, account_id)
+        if policy.get("persistent"):
+            return None
+        if policy.get("per_account"):
+            return await self._fresh(platform, account_id, navigate)
+
+        self._last_demand[platform] = time.monotonic()
+        try:
+            warm = self._take_warm(platform)
+            if warm is not None:
+                self.warm_hits += 1
+                return self._lease(platform, warm.context_lease, warm.page, warm=True)
+            self.warm_misses += 1
+            return await self._fresh(platform, account_id, navigate)
+        finally:
+            self._schedule_refill(platform)
+
+    async def _fresh(self, platform: str, account_id: Optional[str], navigate: Navigator) -> LoginLease:
+        context_lease = await self.browser_pool.acquire_context(
+            platform=platform, account_id=account_id, base_context_opts=LOGIN_CONTEXT_OPTS,
+        )
+        page = await self._open_page(context_lease, navigate)
+        return self._lease(platform, context_lease, page, warm=False)
+
+    def _lease(self, platform: str, context_lease: PooledContext, page: Any, warm: bool) -> LoginLease:
+        lease = LoginLease(self, platform, context_lease, page, warm)
+        self._leases.add(lease)
+        return lease
+
+    @staticmethod
+    async def _open_page(context_lease: PooledContext, navigate: Navigator) -> Any:
+        try:
+            page = await context_lease.context.new_page()
+            await navigate(page)
+            return page
+        except BaseException:
+            await context_lease.close()
+            raise
+
+    def _take_warm(self, platform: str) -> Optional[_WarmPage]:
+        pages = self._warm.get(platform) or []
+        now = time.monotonic()
+        while pages:
+            warm = pages.pop(0)
+            if now - warm.ready_at <= self.warm_max_age and not warm.context_lease.closed:
+                return warm
+            self._discard(warm)
+        return None
+
+    def _discard(self, warm: _WarmPage) -> None:
+        task = asyncio.create_task(warm.context_lease.close())
+        self._refill_tasks.add(task)
+        task.add_done_callback(self._refill_tasks.discard)
+
+    # ---------- 预热 ----------
+
+    def prewarm(self, platform: str, navigate: Navigator) -> None:
+        """登记平台的登录页导航并开始预热（Worker 启动时调用）"""
+        self._navigators[platform] = navigate
+        self._last_demand[platform] = time.monotonic()
+        self._schedule_refill(platform)
+
+    def _schedule_refill(self, platform: str) -> None:
+        if self._closed or not self.warm_pages or platform in self._refilling:
+            return
+        if len(self._warm.get(platform) or []) >= self.warm_pages:
+            return
+        self._refilling.add(platform)
+        task = asyncio.create_task(self._refill(platform), name=f"login-pool-refill-{platform}")
+        self._refill_tasks.add(task)
+        task.add_done_callback(self._refill_tasks.discard)
+
+    async def _refill(self, platform: str) -> None:
+        try:
+            while (
+                not self._closed
+                and len(self._warm.get(platform) or []) < self.warm_pages
+                # 只用空闲容量预热，不与真实登录争抢浏览器槽位
+                and self.browser_pool.idle_capacity() > 0
+            ):
+                navigate = self._navigators[platform]
+                context_lease = await self.browser_pool.acquire_context(
+                    platform=platform, account_id=None, base_context_opts=LOGIN_CONTEXT_OPTS,
+                )
+                page = await self._open_page(context_lease, navigate)
+                if self._closed:
+                    await context_lease.close()
+                    return
+                self._warm.setdefault(platform, []).append(_WarmPage(context_lease, page))
+                logger.debug(f"[LoginPool] {platform} 预热页面就绪 ({len(self._warm[platform])}/{self.warm_pages})")
+        except Exception as e:
+            logger.warning(f"[LoginPool] {platform} 预热失败: {e}")
+        finally:
+            self._refilling.discard(platform)
+
+    # ---------- 回收 ----------
+
+    async def sweep(self) -> Dict[str, int]:
+        """回收超时未归还的会话与过期的预热页面（Worker 周期清理时调用）"""
+        now = time.monotonic()
+        stale_leases = [lease for lease in self._leases if now - lease.opened_at > self.session_ttl]
+        for lease in stale_leases:
+            logger.warning(f"[LoginPool] {lease.platform} 登录会话超过 {self.session_ttl:.0f}s 未释放，强制回收")
+            with contextlib.suppress(Exception):
+                await lease.close()
+        self.evicted += len(stale_leases)
+
+        # 先同步摘除过期页面（原地修改列表，不让出事件循环），再逐个关闭：
+        # 关闭期间 _refill 追加的新页面留在列表里，不会被覆盖丢失
+        expired: List[_WarmPage] = []
+        for pages in self._warm.values():
+            fresh = [w for w in pages if now - w.ready_at <= self.warm_max_age and not w.context_lease.closed]
+            expired += [w for w in pages if w not in fresh]
+            pages[:] = fresh
+        for warm in expired:
+            with contextlib.suppress(Exception):
+                await warm.context_lease.close()
+        expired_pages = len(expired)
+        for platform, last in self._last_demand.items():
+            if now - last <= self.demand_window:
+                self._schedule_refill(platform)
+        return {"sessions": len(stale_leases), "warm_pages": expired_pages}
+
+    # ---------- 指标 ----------
+
+    def record_time_to_qr(self, platform: str, ms: float, mode: str) -> None:
+        """mode: warm（预热页面）/ pooled（常驻浏览器新上下文）/ dedicated（单独启动浏览器）"""
+        stats = self._time_to_qr.setdefault(platform, {})
+        for key in ("all", mode):
+            stats.setdefault(key, _RollingStat(window=200)).add(ms)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._leases),
+            "warm_pages": {platform: len(pages) for platform, pages in self._warm.items()},
+            "warm_hits": self.warm_hits,
+            "warm_misses": self.warm_misses,
+            "evicted_sessions": self.evicted,
+            "time_to_qr": {
+                platform: {mode: stat.snapshot() for mode, stat in stats.items()}
+                for platform, stats in self._time_to_qr.items()
+            },
+            "browser_pool": self.browser_pool.stats(),
+        }
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in list(self._refill_tasks):
+            task.cancel()
+        for pages in self._warm.values():
+            for warm in pages:
+                with contextlib.suppress(Exception):
+                    await warm.context_lease.close()
+        self._warm.clear()
+        for lease in list(self._leases):
+            with contextlib.suppress(Exception):
+                await lease.close()
+        await self.browser_pool.close()
@@ -15,6 +15,7 @@ import platform
 import contextlib
 import traceback
 import json
+import time
 from datetime import datetime, timezone
 from urllib.parse import urlparse, parse_qs
 from pathlib import Path
@@ -22,7 +23,7 @@ from typing import Dict, Any
 from loguru import logger
 from fastapi import FastAPI
 from pydantic import BaseModel, Field
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
 from dotenv import load_dotenv
 import uuid
@@ -133,6 +134,16 @@ def _env_bool(name: str, default: bool) -> bool:
         return False
     return default
 
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return int(raw.strip())
+    except ValueError:
+        return default
+
 # 导入平台适配器
 from app_new.platforms.tencent import TencentAdapter
 from app_new.platforms.douyin import DouyinAdapter
@@ -140,6 +151,9 @@ from app_new.platforms.kuaishou import KuaishouAdapter
 from app_new.platforms.xiaohongshu import XiaohongshuAdapter
 from app_new.platforms.bilibili import BilibiliAdapter
 from app_new.platforms.base import LoginStatus
+from playwright_worker.browser_pool import BrowserPool
+from playwright_worker.login_events import LoginWatcher, TERMINAL_STATUSES
+from playwright_worker.login_pool import LoginSessionPool
 
 # 创建 FastAPI 应用
 app = FastAPI(title="Playwright Worker", version="1.0.0")
@@ -170,6 +184,54 @@ sessions: Dict[str, Dict[str, Any]] = {}
 sessions_lock = asyncio.Lock()
 _cleanup_task: asyncio.Task | None = None
 
+# 登录状态推送：每个二维码会话一个 watcher；终态结果短暂保留，
+# 让推送和轮询两条路径（以及断线重连）都能拿到同一个结果
+login_watchers: Dict[str, LoginWatcher] = {}
+finished_results: Dict[str, Dict[str, Any]] = {}
+FINISHED_RESULT_TTL = 120
+LOGIN_WATCH_FALLBACK_SECONDS = float(os.getenv("LOGIN_WATCH_FALLBACK_SECONDS", "5"))
+
+# 账号登录状态巡检使用的共享浏览器池（首次使用时创建）
+_login_check_pool: BrowserPool | None = None
+
+
+def _get_login_check_pool() -> BrowserPool:
+    global _login_check_pool
+    if _login_check_pool is None:
+        _login_check_pool = BrowserPool(
+            browsers=_env_int("LOGIN_CHECK_POOL_BROWSERS", 2),
+            contexts_per_browser=_env_int("LOGIN_CHECK_POOL_CONTEXTS_PER_BROWSER", 4),
+            recycle_after=_env_int("LOGIN_CHECK_POOL_RECYCLE_AFTER", 200),
+            max_memory_mb=_env_int("LOGIN_CHECK_POOL_MAX_MEMORY_MB", 2048),
+            headless=True,
+        )
+    return _login_check_pool
+
+
+# 扫码登录会话池：常驻浏览器 + 预热登录页（首次使用时创建）
+_login_session_pool: LoginSessionPool | None = None
+_prewarm_task: asyncio.Task | None = None
+
+
+def _get_login_session_pool() -> LoginSessionPool:
+    global _login_session_pool
+    if _login_session_pool is None:
+        _login_session_pool = LoginSessionPool(
+            BrowserPool(
+                browsers=_env_int("LOGIN_POOL_BROWSERS", 2),
+                contexts_per_browser=_env_int("LOGIN_POOL_CONTEXTS_PER_BROWSER", 6),
+                recycle_after=_env_int("LOGIN_POOL_RECYCLE_AFTER", 200),
+                max_memory_mb=_env_int("LOGIN_POOL_MAX_MEMORY_MB", 2048),
+                headless=True,
+                # 与单独启动的登录浏览器保持一致：容器内免沙箱 + 去除自动化特征
+                launch_kwargs={"args": ["--no-sandbox", "--disable-blink-features=AutomationControlled"]},
+            ),
+            warm_pages=_env_int("LOGIN_POOL_WARM_PAGES", 1),
+            warm_max_age=_env_int("LOGIN_POOL_WARM_MAX_AGE", 60),
+            session_ttl=_env_int("LOGIN_POOL_SESSION_TTL", 420),
+        )
+    return _login_session_pool
+
 # 平台适配器映射
 PLATFORM_ADAPTERS = {
     "tencent": TencentAdapter,
@@ -297,6 +359,8 @@ async def health_check():
         "platform": platform.platform(),
         "event_loop_policy": asyncio.get_event_loop_policy().__class__.__name__,
         "event_loop": loop_type,
+        "login_check_pool": _login_check_pool.stats() if _login_check_pool else None,
+        "login_session_pool": _login_session_pool.stats() if _login_session_pool else None,
     }
 
 
@@ -504,6 +568,8 @@ async def open_creator_center(req: OpenCreatorCenterRequest):
                 **persistent_context_opts,
                 **launch_kwargs,
             )
+            # 会话关闭后统计 profile 大小，超出预算时清理缓存
+            custom_manager.watch_context(context, user_data_dir)
 
             # 🔧 关键修复：即使是持久化上下文，也要检查并补充 Cookie
             # 原因：持久化目录可能存在但 Cookie 已过期/被清除
@@ -738,7 +804,7 @@ async def check_login_status_batch(req: CheckLoginStatusRequest):
 
     - 如果提供 account_ids，则检查指定账号
     - 如果不提供，则使用轮询策略检查下一批账号
-    - 使用高并发 asyncio.gather() 检查
+    - 使用 asyncio.gather() 并发检查，实际并发受共享浏览器池容量限制
     - 完全在Worker内部实现，无需调用外部 login_status_checker
     """
     try:
@@ -880,36 +946,24 @@ async def _check_single_account_login_worker(account_id: str, platform: str, coo
         result["error"] = f"读取Cookie文件失败: {str(e)}"
         return result
 
-    # 直接在 Worker 内部启动浏览器检查
-    browser = None
-    context = None
-    page = None
+    # 从共享浏览器池借用隔离上下文（账号指纹 + storage_state），池满时排队
     try:
-        from playwright.async_api import async_playwright
-        from myUtils.playwright_context_factory import create_context_with_policy
-
-        pw = await async_playwright().start()
-
-        # 使用 create_context_with_policy 创建浏览器上下文
-        browser, context, fingerprint, policy = await create_context_with_policy(
-            pw,
+        async with _get_login_check_pool().context(
             platform=platform,
             account_id=account_id,
-            headless=True,
             storage_state=storage_state,
-        )
+        ) as context:
+            page = await context.new_page()
 
-        page = await context.new_page()
+            # 访问创作者中心
+            logger.info(f"[Worker] 直接检查 {platform} 账号: {account_id}")
+            await page.goto(creator_url, wait_until="domcontentloaded", timeout=30000)
 
-        # 访问创作者中心
-        logger.info(f"[Worker] 直接检查 {platform} 账号: {account_id}")
-        response = await page.goto(creator_url, wait_until="domcontentloaded", timeout=30000)
+            # 等待1-2秒让页面加载/重定向
+            wait_time = random.uniform(1, 2)
+            await asyncio.sleep(wait_time)
 
-        # 等待1-2秒让页面加载/重定向
-        wait_time = random.uniform(1, 2)
-        await asyncio.sleep(wait_time)
-
-        final_url = page.url
+            final_url = page.url
 
         # 判断登录状态: 如果URL包含login则表示掉线
         if "login" in final_url.lower():
@@ -929,17 +983,6 @@ async def _check_single_account_login_worker(account_id: str, platform: str, coo
         result["login_status"] = "error"
         result["error"] = str(e)
         logger.error(f"[Worker] {account_id} 检查失败: {e}")
-    finally:
-        # 清理资源
-        try:
-            if page:
-                await page.close()
-            if context:
-                await context.close()
-            if browser:
-                await browser.close()
-        except Exception as e:
-            logger.warning(f"[Worker] 清理资源失败: {e}")
 
     return result
 
@@ -1082,19 +1125,7 @@ async def enrich_account(req: EnrichAccountRequest):
         headless = req.headless if req.headless is not None else _env_bool("PLAYWRIGHT_HEADLESS", True)
         adapter = adapter_class(config={"headless": headless, "account_id": req.account_id})
 
-        pw = await async_playwright().start()
-        browser = None
-        context = None
-        try:
-            browser, context, _, _ = await create_context_with_policy(
-                pw,
-                platform=platform_code,
-                account_id=req.account_id,
-                headless=headless,
-                storage_state=req.storage_state,
-                force_ephemeral=bool(req.storage_state),
-                launch_kwargs={"args": ["--no-sandbox"]},
-            )
+        async def _extract(context) -> Dict[str, Any]:
             page = await context.new_page()
             await page.goto(profile_url, timeout=req.timeout_ms, wait_until="domcontentloaded")
             await asyncio.sleep(2)
@@ -1127,6 +1158,30 @@ async def enrich_account(req: EnrichAccountRequest):
                     "extra": user_info.extra,
                 },
             }
+
+        # 无头补全（DeepSync 批量调用）走共享浏览器池，避免每个账号启动一次浏览器
+        if headless:
+            async with _get_login_check_pool().context(
+                platform=platform_code,
+                account_id=req.account_id,
+                storage_state=req.storage_state,
+            ) as context:
+                return await _extract(context)
+
+        pw = await async_playwright().start()
+        browser = None
+        context = None
+        try:
+            browser, context, _, _ = await create_context_with_policy(
+                pw,
+                platform=platform_code,
+                account_id=req.account_id,
+                headless=headless,
+                storage_state=req.storage_state,
+                force_ephemeral=bool(req.storage_state),
+                launch_kwargs={"args": ["--no-sandbox"]},
+            )
+            return await _extract(context)
         finally:
             with contextlib.suppress(Exception):
                 if context:
@@ -1167,11 +1222,17 @@ async def generate_qrcode(platform: str, account_id: str, headless: bool | None
         if headless is None:
             headless = _env_bool("PLAYWRIGHT_HEADLESS", True)
 
-        # 创建适配器实例
-        adapter = adapter_class(config={"headless": headless, "account_id": account_id})
+        # 创建适配器实例（无头模式从登录会话池借用常驻浏览器/预热页面）
+        started = time.perf_counter()
+        config = {"headless": headless, "account_id": account_id}
+        login_pool = _get_login_session_pool()
+        if headless and _env_bool("LOGIN_POOL_ENABLED", True):
+            config["login_pool"] = login_pool
+        adapter = adapter_class(config=config)
 
         # 生成二维码
         qr_data = await adapter.get_qrcode()
+        login_pool.record_time_to_qr(platform, (time.perf_counter() - started) * 1000, adapter.login_mode or "api")
 
         # 存储会话信息
         async with sessions_lock:
@@ -1180,6 +1241,7 @@ async def generate_qrcode(platform: str, account_id: str, headless: bool | None
                 "account_id": account_id,
                 "adapter": adapter,
                 "qr_data": qr_data,
+                "poll_lock": asyncio.Lock(),
                 "created_at": asyncio.get_running_loop().time(),
                 "expires_in": int(qr_data.expires_in or 300),
             }
@@ -1211,25 +1273,47 @@ async def generate_qrcode(platform: str, account_id: str, headless: bool | None
         )
 
 
-@app.get("/qrcode/status/{session_id}")
-async def poll_qrcode_status(session_id: str):
+def _result_payload(result) -> Dict[str, Any]:
+    return {
+        "status": result.status.value,
+        "message": result.message,
+        "cookies": result.cookies,
+        "user_info": {
+            "user_id": result.user_info.user_id,
+            "name": result.user_info.name,
+            "avatar": result.user_info.avatar,
+            "extra": result.user_info.extra,
+        } if result.user_info else None,
+        "full_state": result.full_state,
+    }
+
+
+async def _check_session(session_id: str) -> Dict[str, Any] | None:
     """
-    轮询登录状态
+    检查一次登录状态（轮询接口与推送 watcher 共用）
 
-    Args:
-        session_id: 会话ID
+    同一会话的检查串行执行；终态时清理会话并缓存结果。会话不存在时返回 None。
     """
-    try:
-        # 检查会话是否存在
-        async with sessions_lock:
-            session = sessions.get(session_id)
-        if not session:
-            return JSONResponse(status_code=404, content={"success": False, "error": "Session not found or expired"})
+    cached = finished_results.get(session_id)
+    if cached:
+        return cached["data"]
 
-        adapter = session["adapter"]
+    async with sessions_lock:
+        session = sessions.get(session_id)
+    if not session:
+        return None
+
+    async with session["poll_lock"]:
+        # 等锁期间另一路检查可能已经拿到终态
+        cached = finished_results.get(session_id)
+        if cached:
+            return cached["data"]
+        if session_id not in sessions:
+            return None
 
-        # 轮询状态
+        adapter = session["adapter"]
         result = await adapter.poll_status(session_id)
+        data = _result_payload(result)
 
         # 如果登录成功或失败，清理会话
         if result.status in (LoginStatus.CONFIRMED, LoginStatus.FAILED, LoginStatus.EXPIRED):
@@ -1238,23 +1322,28 @@ async def poll_qrcode_status(session_id: str):
             finally:
                 async with sessions_lock:
                     sessions.pop(session_id, None)
+                finished_results[session_id] = {"data": data, "at": asyncio.get_running_loop().time()}
             logger.info(f"[Worker] Session cleaned: {session_id[:8]} status={result.status.value}")
 
-        return {
-            "success": True,
-            "data": {
-                "status": result.status.value,
-                "message": result.message,
-                "cookies": result.cookies,
-                "user_info": {
-                    "user_id": result.user_info.user_id if result.user_info else None,
-                    "name": result.user_info.name if result.user_info else None,
-                    "avatar": result.user_info.avatar if result.user_info else None,
-                    "extra": result.user_info.extra if result.user_info else None,
-                } if result.user_info else None,
-                "full_state": result.full_state,
-            }
-        }
+    watcher = login_watchers.get(session_id)
+    if watcher:
+        watcher.publish(data)
+    return data
+
+
+@app.get("/qrcode/status/{session_id}")
+async def poll_qrcode_status(session_id: str):
+    """
+    轮询登录状态（推送不可用时的兜底）
+
+    Args:
+        session_id: 会话ID
+    """
+    try:
+        data = await _check_session(session_id)
+        if data is None:
+            return JSONResponse(status_code=404, content={"success": False, "error": "Session not found or expired"})
+        return {"success": True, "data": data}
 
     except Exception as e:
         err = str(e) or type(e).__name__
@@ -1271,6 +1360,70 @@ async def poll_qrcode_status(session_id: str):
         )
 
 
+async def _watch_stream(watcher: LoginWatcher):
+    queue = watcher.subscribe()
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=15)
+            except asyncio.TimeoutError:
+                # 保活，防止代理断开空闲连接
+                yield ": ping\n\n"
+                continue
+            if "error" in event:
+                # 监听中止（连续检查出错），客户端回退到轮询；会话仍然有效
+                yield f"event: error\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+                break
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if event.get("status") in TERMINAL_STATUSES:
+                break
+    finally:
+        watcher.unsubscribe(queue)
+
+
+@app.get("/qrcode/events/{session_id}")
+async def stream_qrcode_events(session_id: str):
+    """
+    登录状态推送（SSE）
+
+    页面跳转、登录接口响应等事件触发即时检查，只在状态变化时推送，终态后结束。
+    数据格式与 /qrcode/status 的 data 相同。
+    """
+    cached = finished_results.get(session_id)
+    async with sessions_lock:
+        session = sessions.get(session_id)
+    if not session and not cached:
+        return JSONResponse(status_code=404, content={"success": False, "error": "Session not found or expired"})
+
+    watcher = login_watchers.get(session_id)
+    if watcher is None:
+        targets = None
+        if session:
+            try:
+                targets = session["adapter"].watch_targets(session_id)
+            except Exception as e:
+                logger.debug(f"[Worker] watch_targets failed: {session_id[:8]} {e}")
+        watcher = LoginWatcher(
+            session_id,
+            lambda: _check_session(session_id),
+            targets=targets,
+            fallback_interval=LOGIN_WATCH_FALLBACK_SECONDS,
+        )
+        login_watchers[session_id] = watcher
+        if cached:
+            watcher.publish(cached["data"])
+
+    return StreamingResponse(
+        _watch_stream(watcher),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @app.delete("/qrcode/cancel/{session_id}")
 async def cancel_qrcode(session_id: str):
     """
@@ -1288,6 +1441,10 @@ async def cancel_qrcode(session_id: str):
         await _cleanup_session(session_id, session)
         async with sessions_lock:
             sessions.pop(session_id, None)
+        # 让推送端立即感知会话已结束
+        watcher = login_watchers.get(session_id)
+        if watcher:
+            watcher.nudge()
 
         logger.info(f"[Worker] Session cancelled: {session_id[:8]}")
 
@@ -1336,6 +1493,14 @@ async def startup_event():
                     finally:
                         async with sessions_lock:
                             sessions.pop(sid, None)
+                for sid in [sid for sid, r in finished_results.items() if now - r["at"] > FINISHED_RESULT_TTL]:
+                    finished_results.pop(sid, None)
+                for sid, watcher in list(login_watchers.items()):
+                    if sid not in sessions and sid not in finished_results and not watcher.has_subscribers:
+                        watcher.stop()
+                        login_watchers.pop(sid, None)
+                if _login_session_pool is not None:
+                    await _login_session_pool.sweep()
                 await asyncio.sleep(15)
             except asyncio.CancelledError:
                 raise
@@ -1346,6 +1511,26 @@ async def startup_event():
     global _cleanup_task
     _cleanup_task = asyncio.create_task(_periodic_cleanup())
 
+    # 预热扫码登录：提前启动浏览器，并为 LOGIN_POOL_PREWARM 中的平台打开登录页
+    if _env_bool("PLAYWRIGHT_HEADLESS", True) and _env_bool("LOGIN_POOL_ENABLED", True):
+        async def _prewarm():
+            pool = _get_login_session_pool()
+            try:
+                await pool.browser_pool.warm(_env_int("LOGIN_POOL_WARM_BROWSERS", 1))
+            except Exception as e:
+                logger.warning(f"[Worker] Login pool warmup failed: {e}")
+                return
+            for name in filter(None, (p.strip() for p in os.getenv("LOGIN_POOL_PREWARM", "").split(","))):
+                adapter_class = PLATFORM_ADAPTERS.get(name)
+                if adapter_class is None:
+                    continue
+                adapter = adapter_class(config={"headless": True})
+                if adapter.login_url:
+                    pool.prewarm(adapter.platform_name, adapter.navigate_login_page)
+
+        global _prewarm_task
+        _prewarm_task = asyncio.create_task(_prewarm())
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -1370,8 +1555,25 @@ async def shutdown_event():
 
     async with sessions_lock:
         sessions.clear()
+    for watcher in login_watchers.values():
+        watcher.stop()
+    login_watchers.clear()
+    finished_results.clear()
     logger.info("[Worker] All sessions cleaned")
 
+    global _login_check_pool
+    if _login_check_pool is not None:
+        await _login_check_pool.close()
+        _login_check_pool = None
+
+    global _login_session_pool, _prewarm_task
+    if _prewarm_task is not None:
+        _prewarm_task.cancel()
+        _prewarm_task = None
+    if _login_session_pool is not None:
+        await _login_session_pool.close()
+        _login_session_pool = None
+
 
 if __name__ == "__main__":
     # 配置
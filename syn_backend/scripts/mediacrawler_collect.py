@@ -215,6 +215,7 @@ async def _collect_xhs(cookie_path: Path, user_id: str, account_id: Optional[str
         if account_id and user_id:
             user_dir = persistent_browser_manager.get_user_data_dir(account_id, "xiaohongshu", user_id=user_id)
             context = await p.chromium.launch_persistent_context(str(user_dir), **launch_args)
+            persistent_browser_manager.watch_context(context, user_dir)
         else:
             browser = await p.chromium.launch(**launch_args)
             context = await browser.new_context()
@@ -334,6 +335,7 @@ async def _collect_kuaishou(cookie_path: Path, user_id: str, account_id: Optiona
         if account_id and user_id:
             user_dir = persistent_browser_manager.get_user_data_dir(account_id, "kuaishou", user_id=user_id)
             context = await p.chromium.launch_persistent_context(str(user_dir), **launch_args)
+            persistent_browser_manager.watch_context(context, user_dir)
         else:
             browser = await p.chromium.launch(**launch_args)
             context = await browser.new_context()